@@ -1392,9 +1392,9 @@ def profile_player_candidates(request):
 
     GET /api/auth/profile/player-candidates/
     """
-    from apps.players.models import Player
+    from apps.players.models import Player, PlayerNameKey
+    from apps.players.services.name_index import find_name_candidates
     from apps.telegram_bot.models import TelegramUser
-    from django.db.models import Q
 
     user = request.user
 
@@ -1407,16 +1407,22 @@ def profile_player_candidates(request):
     if not first or not last:
         return Response({"candidates": []})
 
-    qs = Player.objects.filter(
-        Q(first_name__iexact=first),
-        Q(last_name__iexact=last),
-    )
+    # Кандидаты по индексу имён (ё/е, латиница, опечатки), лучшие первыми
+    matches = find_name_candidates(PlayerNameKey.Source.BP, last, first, limit=20)
 
     # Исключаем игроков, уже связанных с кем-то через TelegramUser
-    qs = qs.filter(telegram_profile__isnull=True)
+    players = Player.objects.filter(
+        id__in=[m.object_id for m in matches],
+        telegram_profile__isnull=True,
+    ).in_bulk()
 
     candidates = []
-    for p in qs[:10]:
+    for match in matches:
+        p = players.get(match.object_id)
+        if p is None:
+            continue
+        if len(candidates) >= 10:
+            break
         candidates.append({
             "id": p.id,
             "first_name": p.first_name,
@@ -1424,6 +1430,7 @@ def profile_player_candidates(request):
             "patronymic": p.patronymic or "",
             "city": p.city or "",
             "current_rating": p.current_rating,
+            "match_score": match.score,
         })
 
     return Response({"candidates": candidates})
@@ -1438,30 +1445,15 @@ def search_players_for_link(request):
     GET /api/auth/profile/search-players/?q=Иван+Иванов
     Возвращает также флаг is_occupied для игроков, уже связанных с другими аккаунтами.
     """
-    from apps.players.models import Player
+    from apps.players.services.player_search import search_players
     from apps.telegram_bot.models import TelegramUser
-    from django.db.models import Q
     
     query = request.GET.get('q', '').strip()
     if not query or len(query) < 2:
         return Response({"players": []})
 
-    parts = query.split()
-
-    # Базовый фильтр: одно слово — ищем и по имени, и по фамилии
-    if len(parts) == 1:
-        term = parts[0]
-        q_filter = Q(first_name__icontains=term) | Q(last_name__icontains=term)
-    else:
-        # Два и более слова — поддерживаем оба порядка: "имя фамилия" и "фамилия имя"
-        first = parts[0]
-        last = parts[1]
-
-        q_name_first = Q(first_name__icontains=first) & Q(last_name__icontains=last)
-        q_name_last = Q(first_name__icontains=last) & Q(last_name__icontains=first)
-        q_filter = q_name_first | q_name_last
-
-    players = list(Player.objects.filter(q_filter)[:20])
+    # Одно или несколько слов в любом порядке: "имя фамилия" и "фамилия имя"
+    players = search_players(query, limit=20)
 
     # Определяем занятость игроков через TelegramUser
     tus = TelegramUser.objects.filter(player__in=players).values("player_id", "user_id")
@@ -4,13 +4,40 @@ API для рейтингов BTR (BeachTennisRussia).
 """
 from typing import Any, Dict, List
 from django.http import HttpRequest
-from django.db.models import Q, Max, Min
+from django.db.models import Case, Count, F, Max, Min, Q, Value, When, Window
+from django.db.models.functions import Rank
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from apps.btr.models import BtrPlayer, BtrRatingSnapshot
+from apps.btr.models import BtrLatestRating, BtrPlayer, BtrRatingSnapshot
+from apps.btr.services.latest_ratings import get_latest_ratings, latest_dates_by_category
+
+# Порядок категорий в ответах — как в BtrRatingSnapshot.Category
+CATEGORY_ORDER = {code: idx for idx, (code, _) in enumerate(BtrRatingSnapshot.Category.choices)}
+
+
+def _leaderboard_item(row: BtrLatestRating) -> Dict[str, Any]:
+    player = row.player
+    return {
+        'id': player.id,
+        'rni': player.rni,
+        'first_name': player.first_name,
+        'last_name': player.last_name,
+        'middle_name': player.middle_name,
+        'gender': player.gender,
+        'birth_date': str(player.birth_date) if player.birth_date else None,
+        'city': player.city,
+        'current_rating': row.rating_value,
+        'rank': row.position,  # Позиция с учётом одинаковых рейтингов
+        'category': row.category,
+        'category_display': row.get_category_display(),
+        'rating_date': str(row.rating_date),
+        'tournaments_total': row.tournaments_total,
+        'tournaments_52_weeks': row.tournaments_52_weeks,
+        'tournaments_counted': row.tournaments_counted,
+    }
 
 
 @api_view(["GET"])
@@ -22,98 +49,74 @@ def btr_leaderboard(request: HttpRequest) -> Response:
     
     Параметры:
         - q: поиск по имени (опционально)
+        - category: код категории (опционально, по умолчанию все категории)
+        - page, page_size: страница результатов (опционально, по умолчанию весь список)
         
     Возвращает:
-        - categories: словарь {category_code: {label, results, latest_date}}
+        - categories: словарь {category_code: {label, results, latest_date, total, page, page_size, total_pages}}
         - Для каждой категории results содержит список игроков с рейтингом и позицией
         - При поиске сохраняется позиция из общего рейтинга категории
     """
     # Параметры
     q = (request.GET.get('q') or '').strip()
-
-    # Получаем последнюю дату рейтинга для каждой категории
-    latest_dates = {}
-    for cat_choice in BtrRatingSnapshot.Category.choices:
-        cat_code = cat_choice[0]
-        latest_date = BtrRatingSnapshot.objects.filter(category=cat_code).aggregate(
-            max_date=Max('rating_date')
-        )['max_date']
-        if latest_date:
-            latest_dates[cat_code] = latest_date
+    category = (request.GET.get('category') or '').strip()
+    try:
+        page = max(1, int(request.GET.get('page') or '1'))
+    except ValueError:
+        page = 1
+    page_size = None
+    if request.GET.get('page_size'):
+        try:
+            page_size = max(1, int(request.GET.get('page_size')))
+        except ValueError:
+            page_size = None
+
+    # Последняя дата выгрузки по каждой категории
+    latest_dates = latest_dates_by_category()
 
     # Если нет данных, возвращаем пустой результат
     if not latest_dates:
         return Response({'categories': {}})
 
-    # Получаем все последние снимки для всех категорий
-    all_snapshots = []
-    for cat_code, latest_date in latest_dates.items():
-        snapshots = BtrRatingSnapshot.objects.filter(
-            category=cat_code,
-            rating_date=latest_date
-        ).select_related('player').order_by('-rating_value')
-        all_snapshots.extend(list(snapshots))
-
-    # Группируем снимки по категориям и вычисляем позиции
     categories_data = {}
-    
-    for cat_choice in BtrRatingSnapshot.Category.choices:
-        cat_code = cat_choice[0]
-        cat_label = cat_choice[1]
-        
-        if cat_code not in latest_dates:
+    for cat_code, cat_label in BtrRatingSnapshot.Category.choices:
+        if cat_code not in latest_dates or (category and cat_code != category):
             continue
-        
-        # Фильтруем снимки для этой категории
-        cat_snapshots = [s for s in all_snapshots if s.category == cat_code]
-        
-        # Сортируем по рейтингу (по убыванию)
-        cat_snapshots.sort(key=lambda s: s.rating_value, reverse=True)
-        
-        # Вычисляем позиции с учётом одинаковых рейтингов
-        results = []
-        current_rank = 0
-        prev_rating = None
-        
-        for idx, snapshot in enumerate(cat_snapshots):
-            # Если рейтинг отличается от предыдущего, обновляем позицию
-            if snapshot.rating_value != prev_rating:
-                current_rank = idx + 1
-                prev_rating = snapshot.rating_value
-            
-            player = snapshot.player
-            
-            # Применяем поиск
-            if q:
-                if not (q.lower() in player.first_name.lower() or 
-                       q.lower() in player.last_name.lower() or 
-                       q.lower() in (player.middle_name or '').lower()):
-                    continue
-            
-            results.append({
-                'id': player.id,
-                'rni': player.rni,
-                'first_name': player.first_name,
-                'last_name': player.last_name,
-                'middle_name': player.middle_name,
-                'gender': player.gender,
-                'birth_date': str(player.birth_date) if player.birth_date else None,
-                'city': player.city,
-                'current_rating': snapshot.rating_value,
-                'rank': current_rank,  # Позиция с учётом одинаковых рейтингов
-                'category': snapshot.category,
-                'category_display': snapshot.get_category_display(),
-                'rating_date': str(snapshot.rating_date),
-                'tournaments_total': snapshot.tournaments_total,
-                'tournaments_52_weeks': snapshot.tournaments_52_weeks,
-                'tournaments_counted': snapshot.tournaments_counted,
-            })
-        
+
+        board = BtrLatestRating.objects.filter(category=cat_code, rating_date=latest_dates[cat_code])
+
+        # Позиция — RANK() по рейтингу во всей категории (одинаковые рейтинги
+        # делят позицию), одно окно на запрос
+        rows = board.select_related('player').annotate(
+            position=Window(Rank(), order_by=F('rating_value').desc()),
+        )
+        if q:
+            found = (
+                Q(player__first_name__icontains=q) |
+                Q(player__last_name__icontains=q) |
+                Q(player__middle_name__icontains=q)
+            )
+            total = board.filter(found).count()
+            # Условие поиска завёрнуто в выражение с окном: такой фильтр Django
+            # применяет во внешнем запросе, поэтому сохраняется позиция из общего
+            # рейтинга категории
+            rows = rows.annotate(
+                found_position=Case(When(found, then=F('position')), default=Value(0)),
+            ).filter(found_position__gt=0)
+        else:
+            total = board.count()
+        rows = rows.order_by('-rating_value', 'player_id')
+        if page_size:
+            rows = rows[(page - 1) * page_size: page * page_size]
+
         categories_data[cat_code] = {
             'label': cat_label,
-            'results': results,
+            'results': [_leaderboard_item(row) for row in rows],
             'latest_date': str(latest_dates[cat_code]),
-            'total': len(results),
+            'total': total,
+            'page': page if page_size else 1,
+            'page_size': page_size or total,
+            'total_pages': ((total + page_size - 1) // page_size) if page_size else 1,
         }
 
     return Response({'categories': categories_data})
@@ -137,42 +140,38 @@ def btr_player_detail(request: HttpRequest, player_id: int) -> Response:
     except BtrPlayer.DoesNotExist:
         return Response({'error': 'Player not found'}, status=404)
 
-    # Получаем последние снимки по всем категориям
+    # Текущие рейтинги по всем категориям (одна выборка из BtrLatestRating)
     latest_snapshots = {}
-    for cat_choice in BtrRatingSnapshot.Category.choices:
-        cat_code = cat_choice[0]
-        latest_snapshot = BtrRatingSnapshot.objects.filter(
-            player_id=player_id,
-            category=cat_code
-        ).order_by('-rating_date').first()
-        
-        if latest_snapshot:
-            latest_snapshots[cat_code] = {
-                'category': cat_code,
-                'category_display': latest_snapshot.get_category_display(),
-                'current_rating': latest_snapshot.rating_value,
-                'rank': latest_snapshot.rank,
-                'rating_date': str(latest_snapshot.rating_date),
-                'tournaments_total': latest_snapshot.tournaments_total,
-                'tournaments_52_weeks': latest_snapshot.tournaments_52_weeks,
-                'tournaments_counted': latest_snapshot.tournaments_counted,
-            }
-
-    # Получаем статистику по каждой категории
+    for cat_code, latest in sorted(get_latest_ratings(player_id).items(), key=lambda item: CATEGORY_ORDER[item[0]]):
+        latest_snapshots[cat_code] = {
+            'category': cat_code,
+            'category_display': latest.get_category_display(),
+            'current_rating': latest.rating_value,
+            'rank': latest.rank,
+            'rating_date': str(latest.rating_date),
+            'tournaments_total': latest.tournaments_total,
+            'tournaments_52_weeks': latest.tournaments_52_weeks,
+            'tournaments_counted': latest.tournaments_counted,
+        }
+
+    # Статистика по каждой категории (один групповой запрос)
     stats = {}
-    for cat_code in latest_snapshots.keys():
-        snapshots = BtrRatingSnapshot.objects.filter(
-            player_id=player_id,
-            category=cat_code
-        ).aggregate(
+    category_stats = (
+        BtrRatingSnapshot.objects
+        .filter(player_id=player_id, category__in=list(latest_snapshots))
+        .values('category')
+        .annotate(
             max_rating=Max('rating_value'),
             min_rating=Min('rating_value'),
-            total_tournaments=Max('tournaments_total')
+            total_tournaments=Max('tournaments_total'),
         )
-        stats[cat_code] = {
-            'max_rating': snapshots['max_rating'],
-            'min_rating': snapshots['min_rating'],
-            'total_tournaments': snapshots['total_tournaments'] or 0,
+        .order_by()
+    )
+    for row in category_stats:
+        stats[row['category']] = {
+            'max_rating': row['max_rating'],
+            'min_rating': row['min_rating'],
+            'total_tournaments': row['total_tournaments'] or 0,
         }
 
     return Response({
@@ -276,22 +275,15 @@ def btr_player_by_bp_id(request: HttpRequest, bp_player_id: int) -> Response:
     except BtrPlayer.DoesNotExist:
         return Response({'btr_player_id': None, 'categories': {}})
 
-    # Получаем последние снимки по всем категориям
+    # Текущие рейтинги по всем категориям
     latest_snapshots = {}
-    for cat_choice in BtrRatingSnapshot.Category.choices:
-        cat_code = cat_choice[0]
-        latest_snapshot = BtrRatingSnapshot.objects.filter(
-            player_id=btr_player.id,
-            category=cat_code
-        ).order_by('-rating_date').first()
-        
-        if latest_snapshot:
-            latest_snapshots[cat_code] = {
-                'category': cat_code,
-                'category_display': latest_snapshot.get_category_display(),
-                'current_rating': latest_snapshot.rating_value,
-                'rank': latest_snapshot.rank,
-            }
+    for cat_code, latest in sorted(get_latest_ratings(btr_player.id).items(), key=lambda item: CATEGORY_ORDER[item[0]]):
+        latest_snapshots[cat_code] = {
+            'category': cat_code,
+            'category_display': latest.get_category_display(),
+            'current_rating': latest.rating_value,
+            'rank': latest.rank,
+        }
 
     return Response({
         'btr_player_id': btr_player.id,
@@ -318,10 +310,7 @@ def btr_player_brief(request: HttpRequest, player_id: int) -> Response:
     # Получаем последний снимок в основной категории (по полу)
     main_category = 'men_double' if player.gender == 'male' else 'women_double'
     
-    latest_snapshot = BtrRatingSnapshot.objects.filter(
-        player_id=player_id,
-        category=main_category
-    ).order_by('-rating_date').first()
+    latest_snapshot = BtrLatestRating.objects.filter(player_id=player_id, category=main_category).first()
 
     result = {
         'id': player.id,
@@ -364,29 +353,27 @@ def btr_categories(request: HttpRequest) -> Response:
         - categories: список категорий с метаданными
     """
     categories = []
+
+    # Количество игроков в последней выгрузке каждой категории (один запрос)
+    players_counts = {
+        (row['category'], row['rating_date']): row['cnt']
+        for row in BtrLatestRating.objects.values('category', 'rating_date').annotate(cnt=Count('id')).order_by()
+    }
     
-    for cat_choice in BtrRatingSnapshot.Category.choices:
-        cat_code = cat_choice[0]
-        cat_label = cat_choice[1]
-        
-        # Получаем последнюю дату для категории
-        latest_date = BtrRatingSnapshot.objects.filter(category=cat_code).aggregate(
-            max_date=Max('rating_date')
-        )['max_date']
-        
+    latest_dates = {}
+    for category, rating_date in players_counts:
+        if rating_date > latest_dates.get(category, rating_date.min):
+            latest_dates[category] = rating_date
+
+    for cat_code, cat_label in BtrRatingSnapshot.Category.choices:
+        latest_date = latest_dates.get(cat_code)
         if not latest_date:
             continue
         
-        # Считаем количество игроков
-        players_count = BtrRatingSnapshot.objects.filter(
-            category=cat_code,
-            rating_date=latest_date
-        ).count()
-        
         categories.append({
             'code': cat_code,
             'label': cat_label,
-            'players_count': players_count,
+            'players_count': players_counts[(cat_code, latest_date)],
             'latest_date': str(latest_date),
         })
     
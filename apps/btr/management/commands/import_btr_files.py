@@ -3,13 +3,13 @@ Management команда для импорта BTR-файлов из локал
 """
 import logging
 import re
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
 
 from django.core.management.base import BaseCommand
-from django.db import transaction
 
-from apps.btr.models import BtrPlayer, BtrRatingSnapshot, BtrSourceFile
+from apps.btr.services.ingest import IngestFile, IngestFileResult, IngestReport, ingest_btr_files
 from apps.btr.services.parser import parse_btr_file
 
 logger = logging.getLogger(__name__)
@@ -29,6 +29,17 @@ class Command(BaseCommand):
             action="store_true",
             help="Только показать, что будет импортировано, без сохранения в БД",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Количество процессов для парсинга файлов (по умолчанию: по числу ядер)",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Импортировать файлы заново, даже если файл с таким содержимым уже применён",
+        )
 
     def handle(self, *args, **options):
         directory = Path(options["directory"])
@@ -61,52 +72,27 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS(f"Найдено {len(files_with_dates)} файлов для обработки"))
         self.stdout.write(f"Период: {files_with_dates[0][1].strftime('%Y-%m-%d')} - {files_with_dates[-1][1].strftime('%Y-%m-%d')}\n")
 
-        for file_path, rating_date in files_with_dates:
-            self.stdout.write(f"\n{'='*80}")
-            self.stdout.write(f"Обработка файла: {file_path.name}")
-            self.stdout.write(f"{'='*80}")
-            self.stdout.write(f"Дата рейтинга: {rating_date.strftime('%Y-%m-%d')}")
-
-            try:
-                # Парсим файл
-                players_data = parse_btr_file(str(file_path), rating_date)
-
-                if not players_data:
-                    self.stdout.write(self.style.WARNING("Не найдено данных игроков в файле"))
-                    continue
-
-                # Группируем по категориям для статистики
-                by_category = {}
-                for player in players_data:
-                    if player.category not in by_category:
-                        by_category[player.category] = []
-                    by_category[player.category].append(player)
-
-                self.stdout.write(f"\nНайдено записей по категориям:")
-                for category, players in by_category.items():
-                    self.stdout.write(f"  - {category}: {len(players)} игроков")
-
-                if dry_run:
-                    self.stdout.write(self.style.WARNING("\n[DRY RUN] Данные не сохранены в БД"))
-                    # Показываем примеры
-                    self.stdout.write("\nПримеры данных:")
-                    for i, player in enumerate(players_data[:5]):
-                        self.stdout.write(
-                            f"  {i+1}. {player.last_name} {player.first_name} {player.middle_name} "
-                            f"(РНИ: {player.rni}, {player.category}): {player.rating_value} очков"
-                        )
-                else:
-                    # Сохраняем в БД
-                    self._import_to_database(file_path, rating_date, players_data)
-                    self.stdout.write(self.style.SUCCESS(f"\n✓ Файл {file_path.name} успешно импортирован"))
-
-            except Exception as e:
-                self.stderr.write(self.style.ERROR(f"Ошибка при обработке файла {file_path.name}: {e}"))
-                logger.exception(f"Ошибка при обработке файла {file_path}")
-                continue
+        if dry_run:
+            for file_path, rating_date in files_with_dates:
+                self.stdout.write(f"\n{'='*80}")
+                self.stdout.write(f"Обработка файла: {file_path.name}")
+                self.stdout.write(f"{'='*80}")
+                self.stdout.write(f"Дата рейтинга: {rating_date.strftime('%Y-%m-%d')}")
+                try:
+                    self._show_dry_run(file_path, rating_date)
+                except Exception as e:
+                    self.stderr.write(self.style.ERROR(f"Ошибка при обработке файла {file_path.name}: {e}"))
+                    logger.exception(f"Ошибка при обработке файла {file_path}")
+            return
 
-        self.stdout.write(f"\n{'='*80}")
-        self.stdout.write(self.style.SUCCESS("Импорт завершён"))
+        # Хэширование, параллельный парсинг и последовательная запись в БД
+        report = ingest_btr_files(
+            [IngestFile(path=file_path, rating_date=rating_date) for file_path, rating_date in files_with_dates],
+            workers=options.get("workers"),
+            force=options.get("force", False),
+            progress=self._write_result,
+        )
+        self._write_report(report)
 
     def _extract_date_from_filename(self, filename: str) -> datetime | None:
         """
@@ -136,103 +122,63 @@ class Command(BaseCommand):
 
         return None
 
-    @transaction.atomic
-    def _import_to_database(self, file_path: Path, rating_date: datetime, players_data: list):
-        """Импортирует данные в базу данных."""
-        # Создаём запись о файле-источнике
-        source_file, created = BtrSourceFile.objects.get_or_create(
-            filename=file_path.name,
-            defaults={
-                "url": f"file://{file_path}",
-                "applied_at": datetime.now(),
-            },
-        )
+    def _show_dry_run(self, file_path: Path, rating_date: datetime):
+        """Показывает, что будет импортировано, без сохранения в БД."""
+        players_data = parse_btr_file(str(file_path), rating_date)
 
-        if not created:
-            self.stdout.write(self.style.WARNING(f"Файл {file_path.name} уже был импортирован ранее"))
-            # Можно решить, перезаписывать данные или нет
-            # Пока пропускаем
+        if not players_data:
+            self.stdout.write(self.style.WARNING("Не найдено данных игроков в файле"))
             return
 
-        # Обрабатываем каждого игрока
-        players_created = 0
-        players_updated = 0
-        snapshots_created = 0
-
-        for player_data in players_data:
-            # Ищем или создаём игрока по РНИ
-            player, created = BtrPlayer.objects.get_or_create(
-                rni=player_data.rni,
-                defaults={
-                    "external_id": player_data.rni,  # Используем РНИ как external_id
-                    "last_name": player_data.last_name,
-                    "first_name": player_data.first_name,
-                    "middle_name": player_data.middle_name,
-                    "gender": player_data.gender,  # Автоматически определённый пол
-                    "birth_date": player_data.birth_date,
-                    "city": player_data.city,
-                    "country": "RU",  # По умолчанию Россия
-                },
-            )
+        self._write_category_counts(Counter(player.category for player in players_data))
 
-            if created:
-                players_created += 1
-            else:
-                # Всегда обновляем данные игрока из нового файла
-                # Данные могут меняться: фамилия, имя, отчество, город, дата рождения
-                # Также могут заполняться пустые поля
-                updated = False
-                
-                # Обновляем ФИО (всегда, так как может измениться)
-                if player.last_name != player_data.last_name:
-                    player.last_name = player_data.last_name
-                    updated = True
-                if player.first_name != player_data.first_name:
-                    player.first_name = player_data.first_name
-                    updated = True
-                
-                # Обновляем отчество (всегда, даже если было пустым)
-                if player.middle_name != player_data.middle_name:
-                    player.middle_name = player_data.middle_name
-                    updated = True
-                
-                # Обновляем пол (если не был установлен или изменился)
-                if player.gender != player_data.gender:
-                    player.gender = player_data.gender
-                    updated = True
-                
-                # Обновляем дату рождения (если есть новые данные или была пустой)
-                if player_data.birth_date and player.birth_date != player_data.birth_date:
-                    player.birth_date = player_data.birth_date
-                    updated = True
-                
-                # Обновляем город (всегда, даже если был пустым)
-                if player.city != player_data.city:
-                    player.city = player_data.city
-                    updated = True
-
-                if updated:
-                    player.save()
-                    players_updated += 1
-
-            # Создаём снимок рейтинга
-            snapshot, created = BtrRatingSnapshot.objects.get_or_create(
-                player=player,
-                category=player_data.category,
-                rating_date=rating_date.date(),
-                defaults={
-                    "rating_value": int(player_data.rating_value),
-                    "rank": player_data.rank,
-                    "tournaments_total": player_data.tournaments_total,
-                    "tournaments_52_weeks": player_data.tournaments_52_weeks,
-                    "tournaments_counted": player_data.tournaments_counted,
-                },
+        self.stdout.write(self.style.WARNING("\n[DRY RUN] Данные не сохранены в БД"))
+        # Показываем примеры
+        self.stdout.write("\nПримеры данных:")
+        for i, player in enumerate(players_data[:5]):
+            self.stdout.write(
+                f"  {i+1}. {player.last_name} {player.first_name} {player.middle_name} "
+                f"(РНИ: {player.rni}, {player.category}): {player.rating_value} очков"
             )
 
-            if created:
-                snapshots_created += 1
+    def _write_category_counts(self, by_category):
+        self.stdout.write(f"\nНайдено записей по категориям:")
+        for category, count in by_category.items():
+            self.stdout.write(f"  - {category}: {count} игроков")
+
+    def _write_result(self, result: IngestFileResult):
+        date_str = result.rating_date.strftime("%Y-%m-%d")
+        if result.status == "skipped":
+            self.stdout.write(self.style.WARNING(f"[{date_str}] {result.filename}: уже импортирован, пропущен"))
+            return
+        if result.status == "failed":
+            self.stderr.write(self.style.ERROR(f"[{date_str}] {result.filename}: ошибка — {result.error}"))
+            return
+        if result.status == "empty":
+            self.stdout.write(self.style.WARNING(f"[{date_str}] {result.filename}: не найдено данных игроков"))
+            return
 
-        self.stdout.write(f"\nСтатистика импорта:")
-        self.stdout.write(f"  - Создано игроков: {players_created}")
-        self.stdout.write(f"  - Обновлено игроков: {players_updated}")
-        self.stdout.write(f"  - Создано снимков рейтинга: {snapshots_created}")
+        stats = result.stats
+        self.stdout.write(self.style.SUCCESS(
+            f"[{date_str}] ✓ {result.filename} "
+            f"(парсинг {result.parse_seconds:.1f}с, БД {result.db_seconds:.1f}с)"
+        ))
+        self.stdout.write(
+            f"  - игроков создано/обновлено: {stats['players_created']}/{stats['players_updated']}; "
+            f"снимков создано/обновлено: {stats['snapshots_created']}/{stats['snapshots_updated']}"
+        )
+
+    def _write_report(self, report: IngestReport):
+        timings = report.timings
+        self.stdout.write(f"\n{'='*80}")
+        self.stdout.write(
+            f"Импортировано: {report.count('imported')}, пропущено: {report.count('skipped')}, "
+            f"без данных: {report.count('empty')}, ошибок: {report.count('failed')}"
+        )
+        self.stdout.write(f"Создано игроков: {report.total('players_created')}")
+        self.stdout.write(f"Создано снимков рейтинга: {report.total('snapshots_created')}")
+        self.stdout.write(
+            f"Время: хэши {timings['hash']:.1f}с, парсинг {timings['parse']:.1f}с (суммарно по процессам), "
+            f"БД {timings['db']:.1f}с, всего {timings['total']:.1f}с"
+        )
+        self.stdout.write(self.style.SUCCESS("Импорт завершён"))
@@ -0,0 +1,14 @@
+"""
+Management команда для пересборки текущих рейтингов BTR (BtrLatestRating) из истории снимков.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.btr.services.latest_ratings import rebuild_latest_ratings
+
+
+class Command(BaseCommand):
+    help = "Пересобирает таблицу текущих рейтингов BTR из истории снимков"
+
+    def handle(self, *args, **options):
+        total = rebuild_latest_ratings()
+        self.stdout.write(self.style.SUCCESS(f"✓ Текущих рейтингов записано: {total}"))
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_snapshots(apps, schema_editor):
+    """Оставить по одному снимку на (игрок, категория, дата) — последний по id."""
+    BtrRatingSnapshot = apps.get_model("btr", "BtrRatingSnapshot")
+    keep_ids = (
+        BtrRatingSnapshot.objects.values("player_id", "category", "rating_date")
+        .annotate(keep_id=Max("id"))
+        .values("keep_id")
+    )
+    BtrRatingSnapshot.objects.exclude(id__in=keep_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('btr', '0002_alter_btrplayer_external_id_alter_btrplayer_rni'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_snapshots, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='btrratingsnapshot',
+            name='btr_btrrati_player__69d573_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='btrratingsnapshot',
+            constraint=models.UniqueConstraint(fields=('player', 'category', 'rating_date'), name='uniq_btr_snapshot_player_category_date'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+LATEST_FIELDS = [
+    "rating_date",
+    "rating_value",
+    "rank",
+    "tournaments_total",
+    "tournaments_52_weeks",
+    "tournaments_counted",
+]
+
+
+def fill_latest_ratings(apps, schema_editor):
+    """Заполнить текущие рейтинги из истории снимков (последний снимок на игрока и категорию)."""
+    BtrRatingSnapshot = apps.get_model("btr", "BtrRatingSnapshot")
+    BtrLatestRating = apps.get_model("btr", "BtrLatestRating")
+
+    batch = []
+    previous_key = None
+    snapshots = BtrRatingSnapshot.objects.order_by("player_id", "category", "-rating_date")
+    for snapshot in snapshots.iterator(chunk_size=5000):
+        key = (snapshot.player_id, snapshot.category)
+        if key == previous_key:
+            continue
+        previous_key = key
+        batch.append(BtrLatestRating(
+            player_id=snapshot.player_id,
+            category=snapshot.category,
+            **{name: getattr(snapshot, name) for name in LATEST_FIELDS},
+        ))
+        if len(batch) >= 5000:
+            BtrLatestRating.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        BtrLatestRating.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('btr', '0003_btrratingsnapshot_unique_player_category_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BtrLatestRating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('men_double', 'Взрослые, парный, мужчины'), ('men_mixed', 'Взрослые, смешанный, мужчины'), ('women_double', 'Взрослые, парный, женщины'), ('women_mixed', 'Взрослые, смешанный, женщины'), ('junior_male', 'До 19, Юноши'), ('junior_female', 'До 19, Девушки')], max_length=32, verbose_name='Категория')),
+                ('rating_date', models.DateField(verbose_name='Дата рейтинга')),
+                ('rating_value', models.IntegerField(verbose_name='Значение рейтинга')),
+                ('rank', models.IntegerField(blank=True, null=True, verbose_name='Позиция в рейтинге')),
+                ('tournaments_total', models.IntegerField(default=0, verbose_name='Турниров всего')),
+                ('tournaments_52_weeks', models.IntegerField(default=0, verbose_name='Турниров за 52 недели')),
+                ('tournaments_counted', models.IntegerField(default=0, verbose_name='Учтённых турниров')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='latest_ratings', to='btr.btrplayer')),
+            ],
+            options={
+                'verbose_name': 'Текущий рейтинг BTR',
+                'verbose_name_plural': 'Текущие рейтинги BTR',
+                'indexes': [models.Index(fields=['category', 'rating_date', 'rating_value'], name='btr_latest_board_idx')],
+                'constraints': [models.UniqueConstraint(fields=('player', 'category'), name='uniq_btr_latest_player_category')],
+            },
+        ),
+        migrations.RunPython(fill_latest_ratings, migrations.RunPython.noop),
+    ]
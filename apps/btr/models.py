@@ -1,7 +1,9 @@
 from django.db import models
 
+from sandmatch.model_state import LoadedValuesMixin
 
-class BtrPlayer(models.Model):
+
+class BtrPlayer(LoadedValuesMixin, models.Model):
     """Игрок в системе BTR (BeachTennisRussia).
 
     Связь с основным игроком осуществляется через поле Player.btr_player.
@@ -74,8 +76,46 @@ class BtrRatingSnapshot(models.Model):
     class Meta:
         verbose_name = "Снимок рейтинга BTR"
         verbose_name_plural = "Снимки рейтинга BTR"
+        constraints = [
+            # Ключ upsert-импорта (bulk_create(update_conflicts=True)); заменяет
+            # прежний обычный индекс по тем же полям
+            models.UniqueConstraint(
+                fields=["player", "category", "rating_date"],
+                name="uniq_btr_snapshot_player_category_date",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.player} [{self.category}] {self.rating_date}: {self.rating_value}"
+
+
+class BtrLatestRating(models.Model):
+    """Последний снимок рейтинга BTR игрока в категории (материализованная таблица).
+
+    Обновляется при импорте (apps.btr.services.latest_ratings), чтобы таблица
+    лидеров, карточки игроков и расчёт стартового рейтинга читали текущий
+    рейтинг одной индексированной выборкой, а не искали «последнюю дату» по
+    всей истории снимков.
+    """
+
+    player = models.ForeignKey(BtrPlayer, on_delete=models.CASCADE, related_name="latest_ratings")
+    category = models.CharField("Категория", max_length=32, choices=BtrRatingSnapshot.Category.choices)
+    rating_date = models.DateField("Дата рейтинга")
+    rating_value = models.IntegerField("Значение рейтинга")
+    rank = models.IntegerField("Позиция в рейтинге", blank=True, null=True)
+    tournaments_total = models.IntegerField("Турниров всего", default=0)
+    tournaments_52_weeks = models.IntegerField("Турниров за 52 недели", default=0)
+    tournaments_counted = models.IntegerField("Учтённых турниров", default=0)
+
+    class Meta:
+        verbose_name = "Текущий рейтинг BTR"
+        verbose_name_plural = "Текущие рейтинги BTR"
+        constraints = [
+            models.UniqueConstraint(fields=["player", "category"], name="uniq_btr_latest_player_category"),
+        ]
         indexes = [
-            models.Index(fields=["player", "category", "rating_date"]),
+            # Таблица лидеров: категория + дата выгрузки, сортировка по рейтингу
+            models.Index(fields=["category", "rating_date", "rating_value"], name="btr_latest_board_idx"),
         ]
 
     def __str__(self) -> str:
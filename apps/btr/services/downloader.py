@@ -5,7 +5,8 @@ import logging
 import re
 from datetime import datetime
 from pathlib import Path
-from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Sequence, Tuple
 from urllib.parse import urljoin
 
 import requests
@@ -16,6 +17,9 @@ logger = logging.getLogger(__name__)
 
 BTR_ARCHIVE_URL = "https://btrussia.com/ru/cl/arkhiv"
 
+# Параллельных загрузок по умолчанию (не нагружаем сайт BTR)
+DOWNLOAD_WORKERS = 4
+
 
 def fetch_available_files(url: str = BTR_ARCHIVE_URL) -> List[Tuple[str, str, datetime]]:
     """
@@ -128,10 +132,29 @@ def download_file(file_url: str, destination: Path) -> bool:
         return False
 
 
+def download_files(items: Sequence[Tuple[str, Path]], workers: int = DOWNLOAD_WORKERS) -> List[Path]:
+    """
+    Скачивает несколько файлов параллельно (потоками).
+    
+    Args:
+        items: Пары (url_файла, путь_для_сохранения)
+        workers: Количество параллельных загрузок
+        
+    Returns:
+        Пути успешно скачанных файлов в порядке items
+    """
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(items)))) as executor:
+        results = list(executor.map(lambda item: download_file(*item), items))
+    return [destination for (_, destination), ok in zip(items, results) if ok]
+
+
 def download_latest_files(
     output_dir: Path,
     limit: int | None = None,
-    skip_existing: bool = True
+    skip_existing: bool = True,
+    workers: int = DOWNLOAD_WORKERS,
 ) -> List[Path]:
     """
     Скачивает последние файлы рейтингов BTR.
@@ -140,6 +163,7 @@ def download_latest_files(
         output_dir: Директория для сохранения файлов
         limit: Максимальное количество файлов для скачивания (None = все)
         skip_existing: Пропускать уже существующие файлы
+        workers: Количество параллельных загрузок
         
     Returns:
         Список путей к скачанным файлам
@@ -153,6 +177,7 @@ def download_latest_files(
     if limit:
         available_files = available_files[:limit]
     
+    to_download = []
     downloaded_files = []
     
     for file_url, filename, rating_date in available_files:
@@ -164,9 +189,10 @@ def download_latest_files(
             downloaded_files.append(destination)
             continue
         
-        # Скачиваем файл
-        if download_file(file_url, destination):
-            downloaded_files.append(destination)
+        to_download.append((file_url, destination))
+    
+    # Скачиваем параллельно
+    downloaded_files.extend(download_files(to_download, workers=workers))
     
     logger.info(f"Скачано {len(downloaded_files)} файлов")
     return downloaded_files
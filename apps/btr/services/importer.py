@@ -0,0 +1,201 @@
+"""
+Пакетный импорт рейтингов BTR в базу данных.
+
+Вместо get_or_create на каждую строку файла записи обрабатываются порциями:
+игроки BTR подгружаются одним запросом по РНИ/external_id, недостающие
+создаются bulk_create, изменившиеся — bulk_update, а снимки рейтинга
+записываются upsert'ом bulk_create(update_conflicts=True) по ключу
+(player, category, rating_date). В той же транзакции порции обновляются
+текущие рейтинги BtrLatestRating. Каждая порция — отдельная транзакция,
+поэтому повторный запуск после сбоя просто перезаписывает те же снимки.
+"""
+import logging
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.btr.models import BtrPlayer, BtrRatingSnapshot, BtrSourceFile
+from apps.btr.services.latest_ratings import upsert_latest_ratings
+
+logger = logging.getLogger(__name__)
+
+# Строк файла на одну транзакцию (обычный файл BTR целиком помещается в одну порцию)
+DEFAULT_CHUNK_SIZE = 5000
+
+# Поля игрока, которые обновляются из нового файла
+PLAYER_UPDATE_FIELDS = ["last_name", "first_name", "middle_name", "gender", "birth_date", "city"]
+
+SNAPSHOT_UPDATE_FIELDS = [
+    "rating_value",
+    "rank",
+    "tournaments_total",
+    "tournaments_52_weeks",
+    "tournaments_counted",
+]
+
+
+def _as_date(value: Union[date, datetime, None]) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _chunks(records: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _player_fields(record) -> dict:
+    return {
+        "last_name": record.last_name,
+        "first_name": record.first_name,
+        "middle_name": record.middle_name,
+        "gender": record.gender,
+        "birth_date": _as_date(record.birth_date),
+        "city": record.city,
+    }
+
+
+def _resolve_players(records: List, updated_rnis: set) -> Tuple[Dict[int, int], int]:
+    """Найти/создать/обновить игроков порции. Возвращает ({rni: player_id}, число созданных)."""
+    # Данные игрока из последней строки (как при построчном импорте); дата
+    # рождения — последняя непустая
+    incoming: Dict[int, dict] = {}
+    for record in records:
+        fields = _player_fields(record)
+        previous = incoming.get(record.rni)
+        if previous and not fields["birth_date"]:
+            fields["birth_date"] = previous["birth_date"]
+        incoming[record.rni] = fields
+
+    rnis = list(incoming)
+    existing: Dict[int, BtrPlayer] = {}
+    by_external_id: Dict[int, BtrPlayer] = {}
+    for player in BtrPlayer.objects.filter(Q(rni__in=rnis) | Q(external_id__in=rnis)):
+        existing[player.rni] = player
+        by_external_id[player.external_id] = player
+
+    to_create: List[BtrPlayer] = []
+    to_update: List[BtrPlayer] = []
+    renamed: Dict[int, BtrPlayer] = {}
+    for rni, fields in incoming.items():
+        player = existing.get(rni) or by_external_id.get(rni)
+        if player is None:
+            to_create.append(BtrPlayer(rni=rni, external_id=rni, country="RU", **fields))
+            continue
+        existing[rni] = player
+        changed = False
+        for name, value in fields.items():
+            if name == "birth_date" and not value:
+                continue
+            if getattr(player, name) != value:
+                setattr(player, name, value)
+                changed = True
+                if name in ("last_name", "first_name"):
+                    renamed[player.pk] = player
+        if changed:
+            to_update.append(player)
+            updated_rnis.add(rni)
+
+    created: List[BtrPlayer] = []
+    if to_create:
+        created = BtrPlayer.objects.bulk_create(to_create)
+        if any(player.pk is None for player in created):
+            # Бэкенд не вернул первичные ключи — дочитываем их
+            created = list(BtrPlayer.objects.filter(rni__in=[p.rni for p in to_create]))
+        for player in created:
+            existing[player.rni] = player
+    if to_update:
+        BtrPlayer.objects.bulk_update(to_update, PLAYER_UPDATE_FIELDS)
+
+    # bulk-операции не вызывают сигналы — индекс имён обновляем явно
+    new_names = list(created) + list(renamed.values())
+    if new_names:
+        from apps.players.models import PlayerNameKey
+        from apps.players.services.name_index import index_names
+
+        index_names(PlayerNameKey.Source.BTR, new_names)
+
+    return {rni: existing[rni].pk for rni in incoming}, len(to_create)
+
+
+def _upsert_snapshots(records: List, player_ids: Dict[int, int], rating_date: date) -> List[BtrRatingSnapshot]:
+    # Одна строка на (игрок, категория): ON CONFLICT не может обновить строку дважды
+    snapshots: Dict[tuple, BtrRatingSnapshot] = {}
+    for record in records:
+        player_id = player_ids[record.rni]
+        snapshots[(player_id, record.category)] = BtrRatingSnapshot(
+            player_id=player_id,
+            category=record.category,
+            rating_date=rating_date,
+            rating_value=int(record.rating_value),
+            rank=record.rank,
+            tournaments_total=record.tournaments_total,
+            tournaments_52_weeks=record.tournaments_52_weeks,
+            tournaments_counted=record.tournaments_counted,
+        )
+    rows = list(snapshots.values())
+    BtrRatingSnapshot.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["player", "category", "rating_date"],
+        update_fields=SNAPSHOT_UPDATE_FIELDS,
+    )
+    return rows
+
+
+def import_btr_records(
+    records: Iterable,
+    rating_date: Union[date, datetime],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> dict:
+    """Импортировать записи игроков одного файла рейтинга (все категории).
+
+    records — итерируемое записей парсера (BtrPlayerData), может быть генератором
+    (iter_btr_file): в памяти держится только текущая порция.
+    Возвращает статистику: players_created, players_updated, snapshots_created,
+    snapshots_updated и by_category (число прочитанных записей по категориям).
+    """
+    rating_date = _as_date(rating_date)
+    snapshots_before = BtrRatingSnapshot.objects.filter(rating_date=rating_date).count()
+
+    players_created = 0
+    updated_rnis: set = set()
+    snapshots_written = 0
+    by_category: Counter = Counter()
+    for chunk in _chunks(records, chunk_size):
+        by_category.update(record.category for record in chunk)
+        with transaction.atomic():
+            player_ids, created = _resolve_players(chunk, updated_rnis)
+            players_created += created
+            snapshots = _upsert_snapshots(chunk, player_ids, rating_date)
+            upsert_latest_ratings(snapshots)
+            snapshots_written += len(snapshots)
+
+    snapshots_created = BtrRatingSnapshot.objects.filter(rating_date=rating_date).count() - snapshots_before
+    return {
+        "players_created": players_created,
+        "players_updated": len(updated_rnis),
+        "snapshots_created": snapshots_created,
+        "snapshots_updated": snapshots_written - snapshots_created,
+        "by_category": dict(by_category),
+    }
+
+
+def mark_source_file_applied(url: str, filename: str, file_hash: str = "") -> BtrSourceFile:
+    """Создать или обновить запись о применённом файле-источнике."""
+    defaults = {"url": url, "applied_at": timezone.now()}
+    if file_hash:
+        defaults["file_hash"] = file_hash
+    source_file, _ = BtrSourceFile.objects.update_or_create(filename=filename, defaults=defaults)
+    return source_file
@@ -0,0 +1,197 @@
+"""
+Пакетная загрузка архива BTR: несколько файлов за один проход.
+
+Этапы:
+1. hash   — SHA-256 содержимого; файлы, уже применённые с тем же хэшем
+            (BtrSourceFile.file_hash), пропускаются;
+2. parse  — разбор файлов в пуле процессов (parse_btr_file не трогает БД);
+3. db     — запись в БД строго последовательно и в порядке дат
+            (import_btr_records), чтобы новые данные игроков перезаписывали старые.
+
+Пока файл пишется в БД, следующие файлы уже разбираются в других процессах.
+"""
+import hashlib
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from apps.btr.services.parser import parse_btr_file
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestFile:
+    """Файл для загрузки."""
+
+    path: Path
+    rating_date: datetime
+    url: str = ""
+
+    @property
+    def filename(self) -> str:
+        return self.path.name
+
+
+@dataclass
+class IngestFileResult:
+    filename: str
+    rating_date: datetime
+    status: str  # imported / skipped / empty / failed
+    file_hash: str = ""
+    stats: dict = field(default_factory=dict)
+    error: str = ""
+    parse_seconds: float = 0.0
+    db_seconds: float = 0.0
+
+
+@dataclass
+class IngestReport:
+    files: List[IngestFileResult] = field(default_factory=list)
+    # Время этапов: hash, parse (суммарно по процессам), db, total (по часам)
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def count(self, status: str) -> int:
+        return sum(1 for result in self.files if result.status == status)
+
+    def total(self, key: str) -> int:
+        return sum(result.stats.get(key, 0) for result in self.files)
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _parse_timed(path: str, rating_date: datetime):
+    """Разбор файла в процессе пула: (записи, секунды)."""
+    started = time.perf_counter()
+    records = parse_btr_file(path, rating_date)
+    return records, time.perf_counter() - started
+
+
+def _applied_files():
+    """Уже применённые файлы: (хэши, имена файлов без хэша — старые записи)."""
+    from apps.btr.models import BtrSourceFile
+
+    hashes = set()
+    legacy_names = set()
+    for filename, file_hash in BtrSourceFile.objects.filter(applied_at__isnull=False).values_list(
+        "filename", "file_hash"
+    ):
+        if file_hash:
+            hashes.add(file_hash)
+        else:
+            legacy_names.add(filename)
+    return hashes, legacy_names
+
+
+def ingest_btr_files(
+    files: Sequence[IngestFile],
+    workers: Optional[int] = None,
+    force: bool = False,
+    progress: Optional[Callable[[IngestFileResult], None]] = None,
+) -> IngestReport:
+    """Загрузить файлы архива BTR (см. описание модуля).
+
+    workers — число процессов разбора (по умолчанию по числу ядер; 1 — без пула).
+    force — не пропускать уже применённые файлы.
+    progress — вызывается после обработки каждого файла.
+    """
+    from apps.btr.services.importer import import_btr_records, mark_source_file_applied
+
+    started = time.perf_counter()
+    report = IngestReport()
+    files = sorted(files, key=lambda item: item.rating_date)
+    workers = max(1, workers or os.cpu_count() or 1)
+
+    def finish(result: IngestFileResult) -> None:
+        report.files.append(result)
+        if progress:
+            progress(result)
+
+    # 1. Хэши и отбор новых файлов
+    stage = time.perf_counter()
+    applied_hashes, legacy_names = (set(), set()) if force else _applied_files()
+    seen_hashes = set()
+    pending = []
+    for item in files:
+        file_hash = file_sha256(item.path)
+        if file_hash in applied_hashes or file_hash in seen_hashes or item.filename in legacy_names:
+            finish(IngestFileResult(item.filename, item.rating_date, "skipped", file_hash))
+            continue
+        seen_hashes.add(file_hash)
+        pending.append((item, file_hash))
+    report.timings["hash"] = time.perf_counter() - stage
+
+    parse_seconds = 0.0
+    db_seconds = 0.0
+
+    def apply(item: IngestFile, file_hash: str, parsed) -> None:
+        nonlocal parse_seconds, db_seconds
+        result = IngestFileResult(item.filename, item.rating_date, "imported", file_hash)
+        try:
+            records, result.parse_seconds = parsed()
+            parse_seconds += result.parse_seconds
+            db_started = time.perf_counter()
+            result.stats = import_btr_records(records, item.rating_date)
+            if result.stats["by_category"]:
+                mark_source_file_applied(item.url or f"file://{item.path}", item.filename, file_hash)
+            else:
+                result.status = "empty"
+            result.db_seconds = time.perf_counter() - db_started
+            db_seconds += result.db_seconds
+        except Exception as e:
+            logger.exception(f"Ошибка при загрузке файла {item.path}")
+            result.status = "failed"
+            result.error = str(e)
+        finish(result)
+
+    # 2–3. Разбор в пуле, запись в БД по порядку
+    if workers == 1 or len(pending) <= 1:
+        for item, file_hash in pending:
+            apply(item, file_hash, lambda item=item: _parse_timed(str(item.path), item.rating_date))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            # Окно задач ограничено, чтобы разобранные файлы не копились в памяти
+            window = workers * 2
+            queue = deque()
+            remaining = iter(pending)
+            for item, file_hash in remaining:
+                queue.append((item, file_hash, executor.submit(_parse_timed, str(item.path), item.rating_date)))
+                if len(queue) >= window:
+                    break
+            while queue:
+                item, file_hash, future = queue.popleft()
+                apply(item, file_hash, future.result)
+                next_item = next(remaining, None)
+                if next_item is not None:
+                    queue.append((
+                        next_item[0],
+                        next_item[1],
+                        executor.submit(_parse_timed, str(next_item[0].path), next_item[0].rating_date),
+                    ))
+
+    report.timings["parse"] = parse_seconds
+    report.timings["db"] = db_seconds
+    report.timings["total"] = time.perf_counter() - started
+    logger.info(
+        "Загрузка BTR: импортировано %s, пропущено %s, ошибок %s; hash %.1fs, parse %.1fs, db %.1fs, всего %.1fs",
+        report.count("imported"),
+        report.count("skipped"),
+        report.count("failed"),
+        report.timings["hash"],
+        report.timings["parse"],
+        report.timings["db"],
+        report.timings["total"],
+    )
+    return report
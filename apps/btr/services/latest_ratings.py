@@ -0,0 +1,112 @@
+"""
+Материализованные текущие рейтинги BTR (BtrLatestRating).
+
+Одна строка на (игрок, категория) с последним снимком. Импорт вызывает
+upsert_latest_ratings для каждой записанной порции снимков: строка
+перезаписывается, только если дата снимка не старше уже сохранённой, поэтому
+загрузка архива в любом порядке даёт тот же результат. rebuild_latest_ratings
+пересобирает таблицу целиком из истории снимков (после ручных правок/удалений).
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Max
+
+from apps.btr.models import BtrLatestRating, BtrRatingSnapshot
+
+LATEST_FIELDS = [
+    "rating_date",
+    "rating_value",
+    "rank",
+    "tournaments_total",
+    "tournaments_52_weeks",
+    "tournaments_counted",
+]
+
+REBUILD_BATCH_SIZE = 5000
+
+
+def _from_snapshot(snapshot: BtrRatingSnapshot) -> BtrLatestRating:
+    return BtrLatestRating(
+        player_id=snapshot.player_id,
+        category=snapshot.category,
+        **{name: getattr(snapshot, name) for name in LATEST_FIELDS},
+    )
+
+
+def _upsert(rows: List[BtrLatestRating]) -> None:
+    BtrLatestRating.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["player", "category"],
+        update_fields=LATEST_FIELDS,
+    )
+
+
+def upsert_latest_ratings(snapshots: Iterable[BtrRatingSnapshot]) -> int:
+    """Обновить текущие рейтинги по только что записанным снимкам.
+
+    Снимки старше уже сохранённого текущего рейтинга пропускаются.
+    Возвращает число записанных строк.
+    """
+    snapshots = list(snapshots)
+    if not snapshots:
+        return 0
+
+    current: Dict[tuple, date] = {
+        (player_id, category): rating_date
+        for player_id, category, rating_date in BtrLatestRating.objects.filter(
+            player_id__in={s.player_id for s in snapshots}
+        ).values_list("player_id", "category", "rating_date")
+    }
+    rows = [
+        _from_snapshot(snapshot)
+        for snapshot in snapshots
+        if current.get((snapshot.player_id, snapshot.category), snapshot.rating_date) <= snapshot.rating_date
+    ]
+    if rows:
+        _upsert(rows)
+    return len(rows)
+
+
+def rebuild_latest_ratings(batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """Пересобрать BtrLatestRating из всей истории снимков. Возвращает число строк."""
+    total = 0
+    with transaction.atomic():
+        BtrLatestRating.objects.all().delete()
+        batch: List[BtrLatestRating] = []
+        previous_key = None
+        snapshots = BtrRatingSnapshot.objects.order_by("player_id", "category", "-rating_date").only(
+            "player_id", "category", *LATEST_FIELDS
+        )
+        for snapshot in snapshots.iterator(chunk_size=batch_size):
+            key = (snapshot.player_id, snapshot.category)
+            if key == previous_key:
+                continue
+            previous_key = key
+            batch.append(_from_snapshot(snapshot))
+            if len(batch) >= batch_size:
+                BtrLatestRating.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            BtrLatestRating.objects.bulk_create(batch)
+            total += len(batch)
+    return total
+
+
+def get_latest_ratings(player_id: int, categories: Optional[Iterable[str]] = None) -> Dict[str, BtrLatestRating]:
+    """Текущие рейтинги игрока BTR: {category: BtrLatestRating} (один запрос)."""
+    qs = BtrLatestRating.objects.filter(player_id=player_id)
+    if categories is not None:
+        qs = qs.filter(category__in=list(categories))
+    return {row.category: row for row in qs}
+
+
+def latest_dates_by_category() -> Dict[str, date]:
+    """Дата последней выгрузки по каждой категории (один групповой запрос)."""
+    return {
+        row["category"]: row["latest_date"]
+        for row in BtrLatestRating.objects.values("category").annotate(latest_date=Max("rating_date"))
+    }
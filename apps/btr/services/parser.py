@@ -2,14 +2,16 @@
 Парсер BTR-файлов в формате Excel.
 Поддерживает три различных формата файлов с рейтингами BTR.
 Поддерживает как новый формат .xlsx, так и старый .xls.
+Файлы читаются потоково (iter_btr_file): строки листа перебираются по одной,
+заголовки ищутся только в первых строках.
 """
 import logging
 from datetime import datetime
+from itertools import chain, islice
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import openpyxl
-from openpyxl.worksheet.worksheet import Worksheet
 import xlrd
 
 logger = logging.getLogger(__name__)
@@ -42,7 +44,23 @@ SHEET_MAPPINGS = {
 
 
 class BtrPlayerData:
-    """Данные игрока из BTR-файла."""
+    """Данные игрока из BTR-файла (компактная запись для потокового импорта)."""
+
+    __slots__ = (
+        "category",
+        "rank",
+        "rating_value",
+        "last_name",
+        "first_name",
+        "middle_name",
+        "rni",
+        "birth_date",
+        "city",
+        "tournaments_total",
+        "tournaments_52_weeks",
+        "tournaments_counted",
+        "gender",
+    )
 
     def __init__(
         self,
@@ -153,59 +171,36 @@ def _determine_gender_from_category(category: str) -> str:
         return "male"  # По умолчанию
 
 
-class SheetAdapter:
-    """Универсальный адаптер для работы с листами openpyxl и xlrd."""
-    
-    def __init__(self, sheet, is_xls=False):
-        self.sheet = sheet
-        self.is_xls = is_xls
-        if is_xls:
-            self.max_row = sheet.nrows
-        else:
-            self.max_row = sheet.max_row
-    
-    def get_row(self, row_num):
-        """Получить строку (1-indexed для совместимости с openpyxl)."""
-        if self.is_xls:
-            # xlrd использует 0-indexed
-            if row_num - 1 >= self.sheet.nrows:
-                return []
-            return self.sheet.row_values(row_num - 1)
-        else:
-            # openpyxl использует 1-indexed
-            return [cell.value for cell in self.sheet[row_num]]
-    
-    def get_cell_value(self, row_num, col_num):
-        """Получить значение ячейки (1-indexed)."""
-        if self.is_xls:
-            # xlrd использует 0-indexed
-            if row_num - 1 >= self.sheet.nrows or col_num - 1 >= self.sheet.ncols:
-                return None
-            cell = self.sheet.cell(row_num - 1, col_num - 1)
-            # Обработка дат в xlrd
-            if cell.ctype == 3:  # XL_CELL_DATE
+# Строки, в которых ищутся заголовки: 1-я (форматы 1 и 2), 10-я или 11-я (формат 3)
+HEADER_SCAN_ROWS = 11
+
+
+def _iter_xlsx_rows(sheet) -> Iterator[tuple]:
+    """Строки листа openpyxl (read_only) как кортежи значений."""
+    return sheet.iter_rows(values_only=True)
+
+
+def _iter_xls_rows(sheet, datemode: int) -> Iterator[list]:
+    """Строки листа xlrd как списки значений; ячейки-даты приводятся к datetime."""
+    for row_idx in range(sheet.nrows):
+        values = sheet.row_values(row_idx)
+        types = sheet.row_types(row_idx)
+        for col_idx, ctype in enumerate(types):
+            if ctype == xlrd.XL_CELL_DATE:
                 try:
-                    date_tuple = xlrd.xldate_as_tuple(cell.value, 0)
-                    return datetime(*date_tuple)
-                except:
-                    return cell.value
-            return cell.value
-        else:
-            # openpyxl использует 1-indexed
-            return self.sheet.cell(row_num, col_num).value
+                    values[col_idx] = datetime(*xlrd.xldate_as_tuple(values[col_idx], datemode))
+                except Exception:
+                    pass
+        yield values
 
 
-def _detect_format_and_header_row(sheet: Union[Worksheet, SheetAdapter]) -> Tuple[int, Optional[Dict[str, int]]]:
+def _detect_format_and_header_row(head_rows: Sequence[Sequence]) -> Tuple[int, Optional[Dict[str, int]]]:
     """
-    Определяет формат файла и находит строку с заголовками.
-    Возвращает (номер_строки_с_заголовками, маппинг_колонок).
+    Определяет формат файла и находит строку с заголовками по первым строкам листа.
+    Возвращает (номер_строки_с_заголовками, маппинг_колонок) — номера с 1.
     """
-    # Адаптируем sheet если это не SheetAdapter
-    if not isinstance(sheet, SheetAdapter):
-        sheet = SheetAdapter(sheet, is_xls=False)
-    
     # Формат 1 и 2: заголовки в первой строке
-    first_row = sheet.get_row(1)
+    first_row = head_rows[0] if head_rows else ()
     if "Место" in first_row and "Очки" in first_row and "Фамилия" in first_row:
         # Формат 1 или 2
         col_map = {}
@@ -236,9 +231,9 @@ def _detect_format_and_header_row(sheet: Union[Worksheet, SheetAdapter]) -> Tupl
 
     # Формат 3: заголовки в 10-й или 11-й строке
     for row_num in [10, 11]:
-        if row_num > sheet.max_row:
+        if row_num > len(head_rows):
             continue
-        row = sheet.get_row(row_num)
+        row = head_rows[row_num - 1]
         if "№" in row and "Очки" in row and ("ФИО" in row or "Ф" in row):
             col_map = {}
             for idx, val in enumerate(row, start=1):
@@ -286,81 +281,88 @@ def _parse_fio(fio_str: str) -> Tuple[str, str, str]:
     return last_name, first_name, middle_name
 
 
-def _parse_sheet(sheet: Union[Worksheet, SheetAdapter], category: str) -> List[BtrPlayerData]:
-    """Парсит один лист Excel-файла."""
-    players = []
+def _iter_sheet(rows: Iterable[Sequence], category: str, sheet_name: str = "") -> Iterator[BtrPlayerData]:
+    """Потоково парсит строки одного листа Excel-файла."""
+    rows = iter(rows)
 
-    # Адаптируем sheet если это не SheetAdapter
-    if not isinstance(sheet, SheetAdapter):
-        sheet = SheetAdapter(sheet, is_xls=False)
-
-    # Определяем формат и находим заголовки
-    header_row, col_map = _detect_format_and_header_row(sheet)
+    # Определяем формат и находим заголовки только по первым строкам
+    head_rows = list(islice(rows, HEADER_SCAN_ROWS))
+    header_row, col_map = _detect_format_and_header_row(head_rows)
     if not col_map:
-        logger.warning(f"Не удалось определить формат листа '{sheet.title}'")
-        return players
+        logger.warning(f"Не удалось определить формат листа '{sheet_name}'")
+        return
+
+    # Индексы колонок (с 0) с теми же значениями по умолчанию, что и раньше
+    def col(name: str, default: int) -> int:
+        return col_map.get(name, default) - 1
+
+    rank_col = col("rank", 1)
+    rating_col = col("rating", 2)
+    fio_col = col_map["fio"] - 1 if "fio" in col_map else None
+    last_name_col = col("last_name", 3)
+    first_name_col = col("first_name", 4)
+    middle_name_col = col("middle_name", 5)
+    rni_col = col("rni", 6)
+    birth_date_col = col("birth_date", 7)
+    city_col = col("city", 8)
+    total_col = col("tournaments_total", 10)
+    weeks_col = col("tournaments_52_weeks", 11)
+    counted_col = col("tournaments_counted", 12)
+
+    # Данные начинаются со строки после заголовков
+    for row in chain(head_rows[header_row:], rows):
+        width = len(row)
+
+        def value(idx: int):
+            return row[idx] if 0 <= idx < width else None
 
-    # Читаем данные, начиная со строки после заголовков
-    for row_num in range(header_row + 1, sheet.max_row + 1):
         # Проверяем, что строка не пустая
-        rank_val = sheet.get_cell_value(row_num, col_map.get("rank", 1))
+        rank_val = value(rank_col)
         if rank_val is None or rank_val == "":
             continue
 
-        # Парсим данные
-        rank = _parse_number(rank_val)
-        rating_value = _parse_rating(sheet.get_cell_value(row_num, col_map.get("rating", 2)))
-
         # ФИО может быть в одном столбце или в трёх разных
-        if "fio" in col_map:
-            fio_str = sheet.get_cell_value(row_num, col_map["fio"]) or ""
-            last_name, first_name, middle_name = _parse_fio(str(fio_str))
+        if fio_col is not None:
+            last_name, first_name, middle_name = _parse_fio(str(value(fio_col) or ""))
         else:
-            last_name = str(sheet.get_cell_value(row_num, col_map.get("last_name", 3)) or "").strip()
-            first_name = str(sheet.get_cell_value(row_num, col_map.get("first_name", 4)) or "").strip()
-            middle_name = str(sheet.get_cell_value(row_num, col_map.get("middle_name", 5)) or "").strip()
+            last_name = str(value(last_name_col) or "").strip()
+            first_name = str(value(first_name_col) or "").strip()
+            middle_name = str(value(middle_name_col) or "").strip()
 
-        rni = _parse_number(sheet.get_cell_value(row_num, col_map.get("rni", 6)))
-        birth_date = _parse_date(sheet.get_cell_value(row_num, col_map.get("birth_date", 7)))
-        city = str(sheet.get_cell_value(row_num, col_map.get("city", 8)) or "").strip()
-        tournaments_total = _parse_number(sheet.get_cell_value(row_num, col_map.get("tournaments_total", 10)))
-        tournaments_52_weeks = _parse_number(sheet.get_cell_value(row_num, col_map.get("tournaments_52_weeks", 11)))
-        tournaments_counted = _parse_number(sheet.get_cell_value(row_num, col_map.get("tournaments_counted", 12)))
+        rni = _parse_number(value(rni_col))
 
         # Пропускаем строки без РНИ или фамилии
-        if not rni or rni == 0 or not last_name:
+        if not rni or not last_name:
             continue
 
-        player = BtrPlayerData(
+        yield BtrPlayerData(
             category=category,
-            rank=rank,
-            rating_value=rating_value,
+            rank=_parse_number(rank_val),
+            rating_value=_parse_rating(value(rating_col)),
             last_name=last_name,
             first_name=first_name,
             middle_name=middle_name,
             rni=rni,
-            birth_date=birth_date,
-            city=city,
-            tournaments_total=tournaments_total,
-            tournaments_52_weeks=tournaments_52_weeks,
-            tournaments_counted=tournaments_counted,
+            birth_date=_parse_date(value(birth_date_col)),
+            city=str(value(city_col) or "").strip(),
+            tournaments_total=_parse_number(value(total_col)),
+            tournaments_52_weeks=_parse_number(value(weeks_col)),
+            tournaments_counted=_parse_number(value(counted_col)),
         )
-        players.append(player)
 
-    return players
 
-
-def parse_btr_file(file_path: str, rating_date: datetime) -> List[BtrPlayerData]:
+def iter_btr_file(file_path: str, rating_date: datetime) -> Iterator[BtrPlayerData]:
     """
-    Парсит BTR-файл и возвращает список данных игроков.
-    Поддерживает как .xlsx (openpyxl), так и .xls (xlrd) форматы.
+    Потоково парсит BTR-файл, отдавая записи игроков по одной.
+    .xlsx читается в режиме read_only (строки не держатся в памяти целиком),
+    .xls — через xlrd.
 
     Args:
         file_path: Путь к Excel-файлу
         rating_date: Дата рейтинга
 
-    Returns:
-        Список объектов BtrPlayerData
+    Yields:
+        Объекты BtrPlayerData
     """
     file_path_obj = Path(file_path)
     if not file_path_obj.exists():
@@ -368,13 +370,13 @@ def parse_btr_file(file_path: str, rating_date: datetime) -> List[BtrPlayerData]
 
     logger.info(f"Парсинг файла: {file_path}")
 
-    # Определяем формат файла по расширению или содержимому
+    # Определяем формат файла по содержимому
     is_xls = False
     workbook = None
     
     try:
         # Сначала пробуем открыть как .xlsx
-        workbook = openpyxl.load_workbook(file_path, data_only=True)
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
         sheet_names = workbook.sheetnames
     except Exception as xlsx_error:
         # Если не получилось, пробуем как .xls
@@ -387,8 +389,6 @@ def parse_btr_file(file_path: str, rating_date: datetime) -> List[BtrPlayerData]
             logger.error(f"Не удалось открыть файл ни как .xlsx, ни как .xls: {xls_error}")
             raise ValueError(f"Неподдерживаемый формат файла: {file_path}")
 
-    all_players = []
-    
     # Все ожидаемые категории
     expected_categories = {
         "men_double",
@@ -399,26 +399,35 @@ def parse_btr_file(file_path: str, rating_date: datetime) -> List[BtrPlayerData]
         "junior_female",
     }
     found_categories = set()
+    total = 0
 
-    # Обрабатываем только известные листы
-    for sheet_name in sheet_names:
-        # Убираем пробелы в начале и конце названия листа
-        sheet_name_clean = sheet_name.strip()
-        if sheet_name_clean in SHEET_MAPPINGS:
+    try:
+        # Обрабатываем только известные листы
+        for sheet_name in sheet_names:
+            # Убираем пробелы в начале и конце названия листа
+            sheet_name_clean = sheet_name.strip()
+            if sheet_name_clean not in SHEET_MAPPINGS:
+                continue
             category = SHEET_MAPPINGS[sheet_name_clean]
             logger.info(f"Обработка листа '{sheet_name}' -> категория '{category}'")
-            
+
             if is_xls:
-                sheet = workbook.sheet_by_name(sheet_name)
-                sheet_adapter = SheetAdapter(sheet, is_xls=True)
+                rows = _iter_xls_rows(workbook.sheet_by_name(sheet_name), workbook.datemode)
             else:
-                sheet = workbook[sheet_name]
-                sheet_adapter = SheetAdapter(sheet, is_xls=False)
-            
-            players = _parse_sheet(sheet_adapter, category)
-            all_players.extend(players)
+                rows = _iter_xlsx_rows(workbook[sheet_name])
+
+            count = 0
+            for player in _iter_sheet(rows, category, sheet_name):
+                count += 1
+                yield player
+            total += count
             found_categories.add(category)
-            logger.info(f"Найдено {len(players)} игроков в категории '{category}'")
+            logger.info(f"Найдено {count} игроков в категории '{category}'")
+    finally:
+        if is_xls:
+            workbook.release_resources()
+        else:
+            workbook.close()
 
     # Проверяем, все ли категории найдены
     missing_categories = expected_categories - found_categories
@@ -429,8 +438,18 @@ def parse_btr_file(file_path: str, rating_date: datetime) -> List[BtrPlayerData]
             f"Доступные листы: {', '.join(sheet_names[:10])}"
         )
 
-    if not is_xls:
-        workbook.close()
+    logger.info(f"Всего найдено {total} записей игроков из {len(found_categories)}/6 категорий")
+
+
+def parse_btr_file(file_path: str, rating_date: datetime) -> List[BtrPlayerData]:
+    """
+    Парсит BTR-файл и возвращает список данных игроков (см. iter_btr_file).
 
-    logger.info(f"Всего найдено {len(all_players)} записей игроков из {len(found_categories)}/6 категорий")
-    return all_players
+    Args:
+        file_path: Путь к Excel-файлу
+        rating_date: Дата рейтинга
+
+    Returns:
+        Список объектов BtrPlayerData
+    """
+    return list(iter_btr_file(file_path, rating_date))
@@ -0,0 +1,189 @@
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+
+import openpyxl
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from apps.btr.models import BtrLatestRating, BtrPlayer, BtrRatingSnapshot, BtrSourceFile
+from apps.btr.services.importer import import_btr_records
+from apps.btr.services.latest_ratings import rebuild_latest_ratings
+from apps.btr.services.ingest import IngestFile, ingest_btr_files
+from apps.btr.services.parser import BtrPlayerData, iter_btr_file
+
+
+def _record(rni: int, category: str, rating: float, city: str = "Москва", rank: int = 1) -> BtrPlayerData:
+    return BtrPlayerData(
+        category=category,
+        rank=rank,
+        rating_value=rating,
+        last_name=f"Игрок{rni}",
+        first_name="Тест",
+        middle_name="",
+        rni=rni,
+        birth_date=datetime(2000, 1, 1),
+        city=city,
+        tournaments_total=5,
+        tournaments_52_weeks=3,
+        tournaments_counted=2,
+    )
+
+
+class BtrBulkImportTestCase(TestCase):
+    """Пакетный импорт: фиксированное число запросов и upsert снимков"""
+
+    def _records(self, count: int, rating: float = 100, city: str = "Москва"):
+        records = []
+        for rni in range(1, count + 1):
+            records.append(_record(rni, "men_double", rating, city=city, rank=rni))
+            records.append(_record(rni, "men_mixed", rating + 1, city=city, rank=rni))
+        return records
+
+    def test_query_count_does_not_depend_on_file_size(self):
+        with self.assertNumQueries(13):
+            import_btr_records(self._records(5), datetime(2026, 1, 1))
+        with self.assertNumQueries(13):
+            # 15 записей: ключи индекса имён новых игроков укладываются в один
+            # INSERT даже с лимитом параметров SQLite
+            stats = import_btr_records(self._records(15), datetime(2026, 2, 1))
+
+        self.assertEqual(stats["players_created"], 10)
+        self.assertEqual(stats["snapshots_created"], 30)
+        self.assertEqual(BtrPlayer.objects.count(), 15)
+
+    def test_reimport_updates_players_and_snapshots(self):
+        import_btr_records(self._records(3), datetime(2026, 1, 1))
+
+        stats = import_btr_records(self._records(3, rating=150, city="Сочи"), datetime(2026, 1, 1))
+
+        self.assertEqual(stats, {
+            "players_created": 0,
+            "players_updated": 3,
+            "snapshots_created": 0,
+            "snapshots_updated": 6,
+            "by_category": {"men_double": 3, "men_mixed": 3},
+        })
+        snapshot = BtrRatingSnapshot.objects.get(player__rni=2, category="men_double")
+        self.assertEqual(snapshot.rating_value, 150)
+        self.assertEqual(snapshot.rating_date, date(2026, 1, 1))
+        self.assertEqual(BtrPlayer.objects.get(rni=2).city, "Сочи")
+
+    def test_chunks_are_imported_separately(self):
+        stats = import_btr_records(self._records(10), datetime(2026, 1, 1), chunk_size=7)
+
+        self.assertEqual(stats["players_created"], 10)
+        self.assertEqual(BtrRatingSnapshot.objects.count(), 20)
+
+
+class BtrStreamingParserTestCase(SimpleTestCase):
+    """Потоковый парсер: заголовки в 1-й и в 10-й строке, пропуск пустых строк"""
+
+    def test_iter_btr_file(self):
+        workbook = openpyxl.Workbook()
+        workbook.remove(workbook.active)
+        men = workbook.create_sheet("M")
+        men.append(["Место", "Очки", "Фамилия", "Имя", "Отчество", "РНИ", "ДеньРождения", "Город"])
+        men.append([1, 250.5, "Иванов", "Иван", "", 101, datetime(1990, 5, 1), "Москва"])
+        men.append([None, None, None])
+        men.append([2, "120,0", "Петров", "Пётр", "Петрович", 102, "01.02.1995", "Сочи"])
+        women = workbook.create_sheet("Ж")
+        for _ in range(9):
+            women.append(["Рейтинг BTR"])
+        women.append(["№", "Очки", "ФИО", "РНИ"])
+        women.append([1, 300, "Сидорова Анна Сергеевна", 201])
+        women.append([2, 100, "Без Рни", None])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "btr_2026-01-01.xlsx"
+            workbook.save(path)
+            records = list(iter_btr_file(str(path), datetime(2026, 1, 1)))
+
+        self.assertEqual(
+            [(r.category, r.rank, r.rating_value, r.last_name, r.middle_name, r.rni, r.gender) for r in records],
+            [
+                ("men_double", 1, 250.5, "Иванов", "", 101, "male"),
+                ("men_double", 2, 120.0, "Петров", "Петрович", 102, "male"),
+                ("women_double", 1, 300.0, "Сидорова", "Сергеевна", 201, "female"),
+            ],
+        )
+        self.assertEqual(records[1].birth_date, datetime(1995, 2, 1))
+        self.assertFalse(hasattr(records[0], "__dict__"))
+
+
+def _write_btr_file(path: Path, ratings) -> None:
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "M"
+    sheet.append(["Место", "Очки", "Фамилия", "Имя", "Отчество", "РНИ"])
+    for rank, (rni, rating) in enumerate(ratings, start=1):
+        sheet.append([rank, rating, f"Игрок{rni}", "Тест", "", rni])
+    workbook.save(path)
+
+
+class BtrIngestTestCase(TestCase):
+    """Загрузка архива: параллельный парсинг, порядок дат, пропуск по хэшу"""
+
+    def test_ingest_skips_applied_content(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            _write_btr_file(tmp / "a.xlsx", [(1, 100), (2, 90)])
+            _write_btr_file(tmp / "b.xlsx", [(1, 120), (3, 80)])
+            files = [
+                IngestFile(tmp / "b.xlsx", datetime(2026, 2, 1)),
+                IngestFile(tmp / "a.xlsx", datetime(2026, 1, 1)),
+            ]
+
+            report = ingest_btr_files(files, workers=2)
+            # Копия уже применённого файла под другим именем
+            (tmp / "a_copy.xlsx").write_bytes((tmp / "a.xlsx").read_bytes())
+            rerun = ingest_btr_files(files + [IngestFile(tmp / "a_copy.xlsx", datetime(2026, 1, 1))], workers=2)
+
+        self.assertEqual([r.filename for r in report.files], ["a.xlsx", "b.xlsx"])
+        self.assertEqual(report.count("imported"), 2)
+        self.assertEqual(set(report.timings), {"hash", "parse", "db", "total"})
+        self.assertEqual(rerun.count("skipped"), 3)
+        self.assertEqual(BtrPlayer.objects.count(), 3)
+        self.assertEqual(
+            BtrRatingSnapshot.objects.get(player__rni=1, rating_date=date(2026, 2, 1)).rating_value, 120
+        )
+        self.assertEqual(BtrSourceFile.objects.exclude(file_hash="").count(), 2)
+
+
+class BtrLatestRatingTestCase(TestCase):
+    """Текущие рейтинги: обновление при импорте и таблица лидеров из BtrLatestRating"""
+
+    def test_latest_rating_keeps_newest_snapshot(self):
+        import_btr_records([_record(1, "men_double", 200), _record(2, "men_double", 150)], datetime(2026, 2, 1))
+        # Более старый файл, загруженный позже, не перетирает текущий рейтинг
+        import_btr_records([_record(1, "men_double", 100), _record(3, "men_double", 90)], datetime(2026, 1, 1))
+
+        latest = {
+            row.player.rni: (row.rating_value, row.rating_date)
+            for row in BtrLatestRating.objects.select_related("player")
+        }
+        self.assertEqual(latest, {
+            1: (200, date(2026, 2, 1)),
+            2: (150, date(2026, 2, 1)),
+            3: (90, date(2026, 1, 1)),
+        })
+        self.assertEqual(rebuild_latest_ratings(), 3)
+        self.assertEqual(BtrLatestRating.objects.get(player__rni=1).rating_value, 200)
+
+    def test_leaderboard_paginates_and_searches_in_db(self):
+        import_btr_records(
+            [_record(rni, "men_double", rating, rank=rni) for rni, rating in [(1, 300), (2, 200), (3, 200), (4, 100)]],
+            datetime(2026, 2, 1),
+        )
+        client = APIClient()
+
+        response = client.get("/api/btr/leaderboard/", {"category": "men_double", "page": 2, "page_size": 2})
+        board = response.json()["categories"]["men_double"]
+        self.assertEqual(list(response.json()["categories"]), ["men_double"])
+        self.assertEqual((board["total"], board["total_pages"]), (4, 2))
+        self.assertEqual([(r["rni"], r["rank"]) for r in board["results"]], [(3, 2), (4, 4)])
+
+        # Поиск сохраняет позицию из общего рейтинга категории
+        response = client.get("/api/btr/leaderboard/", {"q": "Игрок4"})
+        board = response.json()["categories"]["men_double"]
+        self.assertEqual([(r["rni"], r["rank"]) for r in board["results"]], [(4, 4)])
@@ -1,6 +1,9 @@
 from django.db import models
 
-class Match(models.Model):
+from sandmatch.model_state import LoadedValuesMixin
+
+
+class Match(LoadedValuesMixin, models.Model):
     class Stage(models.TextChoices):
         GROUP = "group", "Групповой этап"
         PLAYOFF = "playoff", "Плей-офф"
@@ -3,8 +3,14 @@ from typing import Any, Dict, List
 from django.http import JsonResponse, HttpRequest
 from django.views.decorators.http import require_GET
 from django.db.models import Count, Q
-from apps.players.models import Player, PlayerRatingDynamic
-from apps.matches.models import Match, MatchSet
+from apps.players.models import Player, PlayerRatingDynamic, PlayerRatingHistory
+from apps.players.services.history_bundle import (
+    load_match_bundle,
+    load_player_history_bundle,
+    master_tournament,
+    team_player_ids,
+)
+from apps.matches.models import Match
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -43,108 +49,16 @@ def _auth_required(request: HttpRequest) -> JsonResponse | None:
     return None
 
 
-def _match_score_str(match_id: int, flip: bool = False) -> str:
-    sets = list(MatchSet.objects.filter(match_id=match_id).order_by('index'))
-    if not sets:
-        return ''
-    parts: List[str] = []
-    for s in sets:
-        if s.is_tiebreak_only:
-            if s.tb_1 is not None and s.tb_2 is not None:
-                if flip:
-                    parts.append(f"TB({s.tb_2}:{s.tb_1})")
-                else:
-                    parts.append(f"TB({s.tb_1}:{s.tb_2})")
-            else:
-                parts.append("TB")
-        else:
-            if flip:
-                base = f"{s.games_2}:{s.games_1}"
-            else:
-                base = f"{s.games_1}:{s.games_2}"
-            if (s.tb_1 is not None) and (s.tb_2 is not None):
-                if flip:
-                    base += f"({s.tb_2}:{s.tb_1})"
-                else:
-                    base += f"({s.tb_1}:{s.tb_2})"
-            parts.append(base)
-    return ', '.join(parts)
-
-
-def _opponent_name(m: Match, player_id: int) -> str:
-    # Определяем id игроков соперника
-    t1 = m.team_1
-    t2 = m.team_2
-    in_team1 = t1 and (t1.player_1_id == player_id or t1.player_2_id == player_id)
-    opp_ids: List[int] = []
-    if in_team1 and t2:
-        if t2.player_1_id:
-            opp_ids.append(t2.player_1_id)
-        if t2.player_2_id:
-            opp_ids.append(t2.player_2_id)
-    elif (not in_team1) and t1:
-        if t1.player_1_id:
-            opp_ids.append(t1.player_1_id)
-        if t1.player_2_id:
-            opp_ids.append(t1.player_2_id)
-    players = list(Player.objects.filter(id__in=opp_ids).values('display_name', 'last_name'))
-    if not players:
-        return ''
-    names = [f"{p['display_name']} {p['last_name']}".strip() for p in players]
-    return ' vs '.join(names)
-
-
-def _opponent_ids(m: Match, player_id: int) -> list[int]:
-    t1 = m.team_1
-    t2 = m.team_2
-    in_team1 = t1 and (t1.player_1_id == player_id or t1.player_2_id == player_id)
-    opp_ids: list[int] = []
-    if in_team1 and t2:
-        if t2.player_1_id:
-            opp_ids.append(t2.player_1_id)
-        if t2.player_2_id:
-            opp_ids.append(t2.player_2_id)
-    elif (not in_team1) and t1:
-        if t1.player_1_id:
-            opp_ids.append(t1.player_1_id)
-        if t1.player_2_id:
-            opp_ids.append(t1.player_2_id)
-    return opp_ids
-
-
-def _partner_name(m: Match, player_id: int) -> str:
-    t1 = m.team_1
-    t2 = m.team_2
-    in_team1 = t1 and (t1.player_1_id == player_id or t1.player_2_id == player_id)
-    partner_id = None
-    if in_team1 and t1:
-        ids = [t1.player_1_id, t1.player_2_id]
-        ids = [pid for pid in ids if pid and pid != player_id]
-        partner_id = ids[0] if ids else None
-    elif (not in_team1) and t2:
-        ids = [t2.player_1_id, t2.player_2_id]
-        ids = [pid for pid in ids if pid and pid != player_id]
-        partner_id = ids[0] if ids else None
-    if not partner_id:
-        return ''
-    p = Player.objects.filter(id=partner_id).values('display_name', 'last_name').first()
-    if not p:
-        return ''
-    return f"{p['display_name']} {p['last_name']}".strip()
-
-
 def _last5_badges(player_id: int, hard: bool, medium: bool, tbo: bool) -> List[Dict[str, Any]]:
-    qs = list(
+    bundle = load_match_bundle(
         Match.objects
         .filter(_match_base_q(player_id, hard, medium, tbo), status=Match.Status.COMPLETED)
-        .select_related('tournament', 'team_1', 'team_2')
         .order_by('-tournament__date', '-finished_at', '-id')[:5]
     )
     # Вернём в порядке от более старой игры к более новой,
     # чтобы крайний правый кружок был самой последней игрой
-    qs.reverse()
     result: List[Dict[str, Any]] = []
-    for m in qs:
+    for m in reversed(bundle.matches):
         # Для завершённых матчей winner_id гарантирован
         in_team1 = (m.team_1 and (m.team_1.player_1_id == player_id or m.team_1.player_2_id == player_id))
         in_team2 = (m.team_2 and (m.team_2.player_1_id == player_id or m.team_2.player_2_id == player_id))
@@ -157,9 +71,9 @@ def _last5_badges(player_id: int, hard: bool, medium: bool, tbo: bool) -> List[D
             'tournament_id': m.tournament_id,
             'tournament_name': getattr(m.tournament, 'name', ''),
             'tournament_date': str(getattr(m.tournament, 'date', '') or ''),
-            'opponent': _opponent_name(m, player_id),
-            'partner': _partner_name(m, player_id),
-            'score': _match_score_str(m.id, flip=flip),
+            'opponent': bundle.opponent_name(m, player_id),
+            'partner': bundle.partner_name(m, player_id),
+            'score': bundle.score(m.id, flip=flip),
         })
     return result
 
@@ -307,31 +221,16 @@ def player_briefs(request: HttpRequest) -> Response:
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def player_match_deltas(request: HttpRequest, player_id: int) -> Response:
-    from apps.players.models import PlayerRatingHistory, PlayerRatingDynamic
-    from apps.tournaments.models import Tournament
     from collections import defaultdict
     
-    items = list(
-        PlayerRatingHistory.objects
-        .filter(player_id=player_id)
-        .select_related('match', 'tournament')
-        .order_by('created_at', 'id')
-        .values('id', 'value', 'created_at', 'match_id', 'tournament_id', 'tournament__name', 'tournament__parent_tournament_id')
-    )
+    bundle = load_player_history_bundle(player_id)
+    matches = bundle.matches_by_id
     
     # Группируем матчи по головному турниру
     tournaments_data = defaultdict(lambda: {'matches': [], 'total_delta': 0})
-    match_ids = [it['match_id'] for it in items if it['match_id']]
-    matches = {m.id: m for m in Match.objects.filter(id__in=match_ids).select_related('team_1', 'team_2', 'tournament')}
     
-    # Получаем информацию о головных турнирах
-    tournament_ids = set(it['tournament_id'] for it in items if it['tournament_id'])
-    tournaments = {t.id: t for t in Tournament.objects.filter(id__in=tournament_ids)}
-    
-    for it in items:
+    for it in bundle.history:
         match_id = it['match_id']
-        if match_id is None:
-            continue
         m = matches.get(match_id)
         if not m:
             continue
@@ -340,47 +239,13 @@ def player_match_deltas(request: HttpRequest, player_id: int) -> Response:
             continue
         
         # Определяем головной турнир
-        stage_tournament = tournaments.get(m.tournament_id)
-        if not stage_tournament:
-            continue
-        
-        master_tournament_id = stage_tournament.parent_tournament_id or m.tournament_id
-        master_tournament = tournaments.get(master_tournament_id) if stage_tournament.parent_tournament_id else stage_tournament
+        stage_tournament = m.tournament
+        master = master_tournament(m)
+        master_tournament_id = master.id
         
         delta = it['value']
-        opp = _opponent_name(m, player_id)
-        partner = _partner_name(m, player_id)
-        opp_ids = _opponent_ids(m, player_id)
-        t1 = m.team_1
-        t2 = m.team_2
-        in_team1 = t1 and (t1.player_1_id == player_id or t1.player_2_id == player_id)
-        partner_id = None
-        if in_team1 and t1:
-            ids = [t1.player_1_id, t1.player_2_id]
-            ids = [pid for pid in ids if pid and pid != player_id]
-            partner_id = ids[0] if ids else None
-        elif (not in_team1) and t2:
-            ids = [t2.player_1_id, t2.player_2_id]
-            ids = [pid for pid in ids if pid and pid != player_id]
-            partner_id = ids[0] if ids else None
-        score = _match_score_str(m.id)
-        
-        # Средние рейтинги до турнира
-        def avg_before(tid: int, ids: list[int | None]) -> float | None:
-            valid_ids = [pid for pid in ids if pid]
-            if not valid_ids:
-                return None
-            # Ищем рейтинг в головном турнире
-            dyn = list(PlayerRatingDynamic.objects.filter(player_id__in=valid_ids, tournament_id=master_tournament_id).values_list('rating_before', flat=True))
-            vals = [float(x) for x in dyn if x is not None]
-            if not vals:
-                return None
-            return sum(vals) / len(vals)
-        
-        team1_ids = [getattr(m.team_1, 'player_1_id', None), getattr(m.team_1, 'player_2_id', None)] if m.team_1 else []
-        team2_ids = [getattr(m.team_2, 'player_1_id', None), getattr(m.team_2, 'player_2_id', None)] if m.team_2 else []
-        team1_avg = avg_before(master_tournament_id, team1_ids)
-        team2_avg = avg_before(master_tournament_id, team2_ids)
+        team1_ids = team_player_ids(m.team_1)
+        team2_ids = team_player_ids(m.team_2)
         
         match_data = {
             'match_id': match_id,
@@ -388,15 +253,16 @@ def player_match_deltas(request: HttpRequest, player_id: int) -> Response:
             'stage_name': getattr(stage_tournament, 'stage_name', '') or getattr(stage_tournament, 'name', ''),
             'finished_at': str(getattr(m, 'finished_at', '') or ''),
             'delta': delta,
-            'opponent': opp,
-            'opponent_ids': opp_ids,
-            'partner': partner,
-            'partner_id': partner_id,
-            'score': score,
-            'team1': [getattr(m.team_1, 'player_1_id', None), getattr(m.team_1, 'player_2_id', None)],
-            'team2': [getattr(m.team_2, 'player_1_id', None), getattr(m.team_2, 'player_2_id', None)],
-            'team1_avg_before': team1_avg,
-            'team2_avg_before': team2_avg,
+            'opponent': bundle.opponent_name(m, player_id),
+            'opponent_ids': bundle.opponent_ids(m, player_id),
+            'partner': bundle.partner_name(m, player_id),
+            'partner_id': bundle.partner_id(m, player_id),
+            'score': bundle.score(m.id),
+            'team1': team1_ids,
+            'team2': team2_ids,
+            # Средние рейтинги до турнира (по головному турниру)
+            'team1_avg_before': bundle.avg_before(master_tournament_id, team1_ids),
+            'team2_avg_before': bundle.avg_before(master_tournament_id, team2_ids),
         }
         
         tournaments_data[master_tournament_id]['matches'].append(match_data)
@@ -406,10 +272,10 @@ def player_match_deltas(request: HttpRequest, player_id: int) -> Response:
         if 'tournament_name' not in tournaments_data[master_tournament_id]:
             tournaments_data[master_tournament_id].update({
                 'tournament_id': master_tournament_id,
-                'tournament_name': getattr(master_tournament, 'name', ''),
-                'tournament_date': str(getattr(master_tournament, 'date', '') or ''),
-                'tournament_system': getattr(master_tournament, 'system', ''),
-                'participant_mode': getattr(master_tournament, 'participant_mode', ''),
+                'tournament_name': getattr(master, 'name', ''),
+                'tournament_date': str(getattr(master, 'date', '') or ''),
+                'tournament_system': getattr(master, 'system', ''),
+                'participant_mode': getattr(master, 'participant_mode', ''),
             })
     
     # Сортируем матчи внутри каждого турнира по finished_at
@@ -436,52 +302,30 @@ def h2h(request: HttpRequest) -> Response:
         return JsonResponse({'results': []})
     if not a or not b or a == b:
         return JsonResponse({'results': []})
-    # Матчи, где A и B на противоположных сторонах
-    q = (
+    # Завершённые матчи, где A и B на противоположных сторонах
+    q = Q(status=Match.Status.COMPLETED) & (
         Q(team_1__player_1_id=a) | Q(team_1__player_2_id=a) | Q(team_2__player_1_id=a) | Q(team_2__player_2_id=a)
     ) & (
         Q(team_1__player_1_id=b) | Q(team_1__player_2_id=b) | Q(team_2__player_1_id=b) | Q(team_2__player_2_id=b)
     )
-    # Подтянем динамику рейтингов "до турнира"
-    dyn = {(d.player_id, d.tournament_id): d for d in PlayerRatingDynamic.objects.filter(player_id__in=[a, b])}
-    dyn_cache: dict[tuple[int, int], PlayerRatingDynamic] = dict(dyn)
-
-    # Построим словарь per-match дельт по A напрямую из истории
-    from apps.players.models import PlayerRatingHistory
-    a_hist = list(PlayerRatingHistory.objects.filter(player_id=a, match__isnull=False))
-    a_delta_by_match: dict[int, int] = {h.match_id: int(h.value) for h in a_hist}
-
-    def team_avg_before(tournament_id: int, p1: int | None, p2: int | None) -> float | None:
-        ids = [pid for pid in [p1, p2] if pid]
-        vals: list[float] = []
-        for pid in ids:
-            key = (pid, tournament_id)
-            d = dyn_cache.get(key)
-            if not d:
-                d = PlayerRatingDynamic.objects.filter(player_id=pid, tournament_id=tournament_id).first()
-                if d:
-                    dyn_cache[key] = d
-            if d:
-                vals.append(float(d.rating_before))
-        if not vals:
-            return None
-        return sum(vals) / len(vals)
+    # Если по графу связей A и B ни разу не играли друг против друга — матчей нет
+    from apps.players.models import PlayerPairStats
+    if not PlayerPairStats.objects.filter(player_id=a, other_id=b, opponent_matches__gt=0).exists():
+        return Response({'a': a, 'b': b, 'matches': []})
+
+    # Все матчи A против B со счётом и динамикой рейтингов участников
+    bundle = load_match_bundle(Match.objects.filter(q).order_by('-id'))
+    a_delta_by_match: dict[int, int] = {
+        match_id: int(value)
+        for match_id, value in PlayerRatingHistory.objects.filter(
+            player_id=a, match_id__in=[m.id for m in bundle.matches]
+        ).values_list('match_id', 'value')
+    }
 
     res = []
-    # Возьмём все матчи, где учавствовали A и B
-    matches = Match.objects.filter(q).select_related('team_1', 'team_2', 'tournament').order_by('-id')
-    def flip_score(score: str) -> str:
-        import re
-        if not score:
-            return score
-        def repl(m):
-            a_s, b_s = m.group(1), m.group(2)
-            return f"{b_s}:{a_s}"
-        return re.sub(r"(\d+):(\d+)", repl, score)
-
-    for m in matches:
-        t1_ids = [getattr(m.team_1, 'player_1_id', None), getattr(m.team_1, 'player_2_id', None)] if m.team_1 else []
-        t2_ids = [getattr(m.team_2, 'player_1_id', None), getattr(m.team_2, 'player_2_id', None)] if m.team_2 else []
+    for m in bundle.matches:
+        t1_ids = team_player_ids(m.team_1)
+        t2_ids = team_player_ids(m.team_2)
         # A должен быть в одной команде, B — в другой
         if (a in t1_ids and b in t1_ids) or (a in t2_ids and b in t2_ids):
             continue
@@ -490,16 +334,7 @@ def h2h(request: HttpRequest) -> Response:
         delta_a = a_delta_by_match.get(m.id, 0)
         # Ориентируем так, чтобы команда A всегда была первой
         a_in_team1 = a in t1_ids
-        if a_in_team1:
-            out_team1 = t1_ids
-            out_team2 = t2_ids
-            out_score = _match_score_str(m.id)
-        else:
-            out_team1 = t2_ids
-            out_team2 = t1_ids
-            out_score = flip_score(_match_score_str(m.id))
-        avg1 = team_avg_before(m.tournament_id, *(out_team1 + [None, None])[:2])
-        avg2 = team_avg_before(m.tournament_id, *(out_team2 + [None, None])[:2])
+        out_team1, out_team2 = (t1_ids, t2_ids) if a_in_team1 else (t2_ids, t1_ids)
         res.append({
             'match_id': m.id,
             'tournament_id': m.tournament_id,
@@ -507,10 +342,10 @@ def h2h(request: HttpRequest) -> Response:
             'tournament_date': str(getattr(m.tournament, 'date', '') or ''),
             'team1': out_team1,
             'team2': out_team2,
-            'score': out_score,
+            'score': bundle.score(m.id, flip=not a_in_team1),
             'delta_for_a': delta_a,
-            'team1_avg_before': avg1,
-            'team2_avg_before': avg2,
+            'team1_avg_before': bundle.avg_before(m.tournament_id, out_team1),
+            'team2_avg_before': bundle.avg_before(m.tournament_id, out_team2),
         })
     return Response({'a': a, 'b': b, 'matches': res})
 
@@ -519,34 +354,12 @@ def h2h(request: HttpRequest) -> Response:
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def player_relations(request: HttpRequest, player_id: int) -> Response:
-    # Собираем только те матчи, которые фигурируют в PlayerRatingHistory игрока
-    from apps.players.models import PlayerRatingHistory
-    hist = list(
-        PlayerRatingHistory.objects
-        .filter(player_id=player_id)
-        .exclude(match_id__isnull=True)
-        .values_list('match_id', flat=True)
-    )
-    opponents: set[int] = set()
-    partners: set[int] = set()
-    partner_counts: dict[int, int] = {}
-    for m in Match.objects.filter(id__in=hist).select_related('team_1', 'team_2'):
-        t1 = m.team_1
-        t2 = m.team_2
-        ids1 = [getattr(t1, 'player_1_id', None), getattr(t1, 'player_2_id', None)] if t1 else []
-        ids2 = [getattr(t2, 'player_1_id', None), getattr(t2, 'player_2_id', None)] if t2 else []
-        if player_id in ids1:
-            for pid in [pid for pid in ids1 if pid and pid != player_id]:
-                partners.add(pid)
-                partner_counts[pid] = partner_counts.get(pid, 0) + 1
-            opponents.update([pid for pid in ids2 if pid])
-        elif player_id in ids2:
-            for pid in [pid for pid in ids2 if pid and pid != player_id]:
-                partners.add(pid)
-                partner_counts[pid] = partner_counts.get(pid, 0) + 1
-            opponents.update([pid for pid in ids1 if pid])
-    partners_list = [{'id': pid, 'count': partner_counts.get(pid, 0)} for pid in sorted(partners)]
-    return Response({'player_id': player_id, 'opponents': sorted(opponents), 'partners': partners_list})
+    # Напарники и соперники — из графа связей игроков (PlayerPairStats)
+    from apps.players.services.pair_stats import get_pair_stats
+    edges = get_pair_stats(player_id)
+    opponents = [e.other_id for e in edges if e.opponent_matches]
+    partners_list = [{'id': e.other_id, 'count': e.partner_matches} for e in edges if e.partner_matches]
+    return Response({'player_id': player_id, 'opponents': opponents, 'partners': partners_list})
 
 
 @api_view(["GET"])
@@ -554,30 +367,27 @@ def player_relations(request: HttpRequest, player_id: int) -> Response:
 @permission_classes([IsAuthenticated])
 def player_top_wins(request: HttpRequest, player_id: int) -> Response:
     # Топ-5 побед по per-match дельте из истории
-    from apps.players.models import PlayerRatingHistory
-    top = list(
+    bundle = load_player_history_bundle(
+        player_id,
         PlayerRatingHistory.objects
         .filter(player_id=player_id, match__isnull=False, value__gt=0)
-        .select_related('match__tournament', 'match__team_1', 'match__team_2')
-        .order_by('-value')[:5]
+        .order_by('-value')[:5],
     )
+    matches = bundle.matches_by_id
     # Соберём соперников/партнёра и счёт
     data = []
-    for h in top:
-        m = h.match
+    for h in bundle.history:
+        m = matches.get(h['match_id'])
         if not m:
             continue
-        opp = _opponent_name(m, player_id)
-        partner = _partner_name(m, player_id)
-        score = _match_score_str(m.id)
         data.append({
             'match_id': m.id,
             'tournament_id': m.tournament_id,
             'tournament_name': getattr(m.tournament, 'name', ''),
             'tournament_date': str(getattr(m.tournament, 'date', '') or ''),
-            'delta': int(h.value),
-            'opponent': opp,
-            'partner': partner,
-            'score': score,
+            'delta': int(h['value']),
+            'opponent': bundle.opponent_name(m, player_id),
+            'partner': bundle.partner_name(m, player_id),
+            'score': bundle.score(m.id),
         })
     return Response({'player_id': player_id, 'wins': data})
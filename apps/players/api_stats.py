@@ -1,13 +1,11 @@
 from __future__ import annotations
-from typing import Dict, Any, Set
 from datetime import datetime
-import math
 from django.http import JsonResponse, HttpRequest
 from django.views.decorators.http import require_GET
-from django.db.models import Q
+from django.db.models import Count, Q
 
-from apps.players.models import Player
-from apps.matches.models import Match, MatchSet
+from apps.matches.models import Match
+from apps.players.services.summary_stats import collect_period, completed_matches_q, player_rows
 from apps.tournaments.models import Tournament
 
 
@@ -20,70 +18,22 @@ def _parse_date(s: str | None) -> datetime | None:
         return None
 
 
-def _date_filters(from_dt: datetime | None, to_dt: datetime | None) -> Q:
-    q = Q()
-    if from_dt:
-        q &= Q(tournament__date__gte=from_dt.date())
-    if to_dt:
-        q &= Q(tournament__date__lte=to_dt.date())
-    return q
-
-
 @require_GET
 def summary_stats(request: HttpRequest) -> JsonResponse:
     d_from = _parse_date(request.GET.get('from'))
     d_to = _parse_date(request.GET.get('to'))
 
-    # Исключаем матчи с BYE (где одна из команд отсутствует)
-    base_match_q = Q(status=Match.Status.COMPLETED) & Q(team_1__isnull=False) & Q(team_2__isnull=False)
-    match_q = base_match_q & _date_filters(d_from, d_to)
+    base_match_q = completed_matches_q()
 
-    # Общая статистика
-    matches_qs = Match.objects.filter(match_q)
-    total_matches = matches_qs.count()
-
-    # игроки с матчами
-    player_ids: Set[int] = set()
-    for m in matches_qs.select_related('team_1', 'team_2').only('team_1_id', 'team_2_id'):
-        if m.team_1:
-            if m.team_1.player_1_id:
-                player_ids.add(m.team_1.player_1_id)
-            if m.team_1.player_2_id:
-                player_ids.add(m.team_1.player_2_id)
-        if m.team_2:
-            if m.team_2.player_1_id:
-                player_ids.add(m.team_2.player_1_id)
-            if m.team_2.player_2_id:
-                player_ids.add(m.team_2.player_2_id)
-    total_players_with_matches = len(player_ids)
+    # Агрегаты по игрокам за период: закрытые дни — из дневной сводки, сегодня — по матчам
+    period = collect_period(d_from.date() if d_from else None, d_to.date() if d_to else None)
+    players = period['players']
+    total_matches = period['matches']
+    total_players_with_matches = len(players)
     avg_matches_per_player = (total_matches / total_players_with_matches) if total_players_with_matches > 0 else 0
 
     # средний процент побед как среднее по игрокам
-    # посчитаем wins/matches для каждого игрока
-    wins_map: Dict[int, int] = {pid: 0 for pid in player_ids}
-    matches_map: Dict[int, int] = {pid: 0 for pid in player_ids}
-    for m in matches_qs.select_related('team_1', 'team_2'):
-        t1 = m.team_1
-        t2 = m.team_2
-        ids1 = [t1.player_1_id, t1.player_2_id] if t1 else []
-        ids2 = [t2.player_1_id, t2.player_2_id] if t2 else []
-        for pid in ids1 + ids2:
-            if pid:
-                matches_map[pid] = matches_map.get(pid, 0) + 1
-        if m.winner_id and t1 and t2:
-            if m.winner_id == getattr(m, 'team_1_id', None):
-                for pid in ids1:
-                    if pid:
-                        wins_map[pid] = wins_map.get(pid, 0) + 1
-            elif m.winner_id == getattr(m, 'team_2_id', None):
-                for pid in ids2:
-                    if pid:
-                        wins_map[pid] = wins_map.get(pid, 0) + 1
-    winrates = []
-    for pid in player_ids:
-        mm = matches_map.get(pid, 0)
-        if mm > 0:
-            winrates.append(100.0 * wins_map.get(pid, 0) / mm)
+    winrates = [100.0 * ps['wins'] / ps['matches'] for ps in players.values() if ps['matches'] > 0]
     avg_winrate = round(sum(winrates) / len(winrates), 1) if winrates else 0.0
 
     # Статистика по типам турниров
@@ -92,94 +42,24 @@ def summary_stats(request: HttpRequest) -> JsonResponse:
         t_q &= Q(date__gte=d_from.date())
     if d_to:
         t_q &= Q(date__lte=d_to.date())
-    hard_tournaments = Tournament.objects.filter(t_q & Q(name__icontains='HARD')).count()
-    medium_tournaments = Tournament.objects.filter(t_q & Q(name__icontains='MEDIUM')).count()
-    other_tournaments = Tournament.objects.filter(t_q & ~Q(name__icontains='HARD') & ~Q(name__icontains='MEDIUM')).count()
-    # турниры ПроАм: по названию турнира (без учёта регистра)
-    proam_tournaments = Tournament.objects.filter(t_q & Q(name__icontains='ПроАм')).count()
+    by_types = Tournament.objects.filter(t_q).aggregate(
+        hard=Count('id', filter=Q(name__icontains='HARD')),
+        medium=Count('id', filter=Q(name__icontains='MEDIUM')),
+        other=Count('id', filter=~Q(name__icontains='HARD') & ~Q(name__icontains='MEDIUM')),
+        # турниры ПроАм: по названию турнира (без учёта регистра)
+        proam=Count('id', filter=Q(name__icontains='ПроАм')),
+    )
 
     # Распределение игроков по типам турниров (по участию в матчах)
-    hard_players: Set[int] = set()
-    medium_players: Set[int] = set()
-    typed_match_qs = Match.objects.filter(match_q & (Q(tournament__name__icontains='HARD') | Q(tournament__name__icontains='MEDIUM'))).select_related('team_1', 'team_2')
-    for m in typed_match_qs:
-        ids1 = [m.team_1.player_1_id, m.team_1.player_2_id] if m.team_1 else []
-        ids2 = [m.team_2.player_1_id, m.team_2.player_2_id] if m.team_2 else []
-        group = 'HARD' if 'HARD' in (m.tournament.name or '').upper() else ('MEDIUM' if 'MEDIUM' in (m.tournament.name or '').upper() else None)
-        if group == 'HARD':
-            for pid in ids1 + ids2:
-                if pid:
-                    hard_players.add(pid)
-        elif group == 'MEDIUM':
-            for pid in ids1 + ids2:
-                if pid:
-                    medium_players.add(pid)
+    hard_players = {pid for pid, ps in players.items() if ps['hard_matches']}
+    medium_players = {pid for pid, ps in players.items() if ps['medium_matches']}
     only_hard = len(hard_players - medium_players)
     only_medium = len(medium_players - hard_players)
     both_types = len(hard_players & medium_players)
-    without_typed = len(set(player_ids) - (hard_players | medium_players))
+    without_typed = len(set(players) - (hard_players | medium_players))
 
     # Табличные данные по игрокам
-    # Собираем статистику за период
-    player_stats: Dict[int, Dict[str, Any]] = {}
-    for m in matches_qs.select_related('team_1', 'team_2'):
-        ids1 = [m.team_1.player_1_id, m.team_1.player_2_id] if m.team_1 else []
-        ids2 = [m.team_2.player_1_id, m.team_2.player_2_id] if m.team_2 else []
-        for pid in (pid for pid in ids1 + ids2 if pid):
-            ps = player_stats.setdefault(pid, {
-                'matches': 0,
-                'wins': 0,
-                'losses': 0,
-                'tournaments': set(),
-                'partners': set(),
-                'opponents': set(),
-            })
-            ps['matches'] += 1
-            if pid in ids1:
-                ps['partners'].update([x for x in ids1 if x and x != pid])
-                ps['opponents'].update([x for x in ids2 if x])
-            else:
-                ps['partners'].update([x for x in ids2 if x and x != pid])
-                ps['opponents'].update([x for x in ids1 if x])
-            ps['tournaments'].add(m.tournament_id)
-        if m.winner_id and m.team_1 and m.team_2:
-            win_ids = ids1 if m.winner_id == getattr(m, 'team_1_id', None) else ids2
-            lose_ids = ids2 if win_ids is ids1 else ids1
-            for pid in win_ids:
-                if pid:
-                    player_stats[pid]['wins'] += 1
-            for pid in lose_ids:
-                if pid:
-                    player_stats[pid]['losses'] += 1
-
-    # Сформируем массив для таблиц с необходимыми полями
-    rows: list[Dict[str, Any]] = []
-    players_map = {p.id: p for p in Player.objects.filter(id__in=player_stats.keys()).only('id', 'first_name', 'last_name', 'display_name')}
-    for pid, ps in player_stats.items():
-        matches_cnt = ps['matches']
-        wins_cnt = ps['wins']
-        losses_cnt = ps['losses']
-        winrate = round(100.0 * wins_cnt / matches_cnt, 1) if matches_cnt > 0 else 0.0
-        # Взвешенная оценка: winrate * (1 - exp(-matches/alpha))
-        # При малом числе матчей множитель маленький, при большом стремится к 1.
-        alpha = 20.0
-        reliability = 1.0 - math.exp(-matches_cnt / alpha) if matches_cnt > 0 else 0.0
-        score = round(winrate * reliability, 2)
-        p = players_map.get(pid)
-        rows.append({
-            'id': pid,
-            'first_name': getattr(p, 'first_name', ''),
-            'last_name': getattr(p, 'last_name', ''),
-            'display_name': getattr(p, 'display_name', ''),
-            'tournaments_count': len(ps['tournaments']),
-            'matches_count': matches_cnt,
-            'wins': wins_cnt,
-            'losses': losses_cnt,
-            'winrate': winrate,
-            'unique_partners': len(ps['partners']),
-            'unique_opponents': len(ps['opponents']),
-            'score': score,
-        })
+    rows = player_rows(players)
 
     # Таблицы
     # Топ-20 по оценке: сортировка по score (winrate * надёжность), затем по количеству матчей
@@ -211,10 +91,10 @@ def summary_stats(request: HttpRequest) -> JsonResponse:
             'avg_winrate': avg_winrate,
         },
         'by_tournament_types': {
-            'hard_tournaments': hard_tournaments,
-            'medium_tournaments': medium_tournaments,
-            'other_tournaments': other_tournaments,
-            'proam_tournaments': proam_tournaments,
+            'hard_tournaments': by_types['hard'],
+            'medium_tournaments': by_types['medium'],
+            'other_tournaments': by_types['other'],
+            'proam_tournaments': by_types['proam'],
         },
         'players_distribution_by_types': {
             'only_hard': only_hard,
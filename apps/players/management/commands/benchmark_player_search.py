@@ -0,0 +1,123 @@
+"""
+Замер задержки поиска игроков (services/player_search.py) на синтетической таблице.
+
+Игроки создаются внутри транзакции, которая в конце откатывается, поэтому
+команду можно запускать на копии рабочей БД: реальные данные не меняются.
+Для сравнения замеряется и прежний поиск через цепочку icontains по полям.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from apps.players.models import Player, build_search_text
+from apps.players.services.player_search import search_players
+
+LAST_NAME_ROOTS = [
+    "Иван", "Петр", "Сидор", "Смирн", "Кузнец", "Попов", "Васильев", "Соколов", "Михайл", "Новик",
+    "Фёдор", "Морозов", "Волков", "Алексе", "Лебед", "Семён", "Егор", "Павл", "Козл", "Степан",
+    "Николаев", "Орл", "Андрее", "Макар", "Никит", "Захар", "Зайц", "Соловь", "Борисов", "Яковлев",
+]
+LAST_NAME_SUFFIXES = ["ов", "ев", "ин", "ский", "енко", "ук", "ых", ""]
+FIRST_NAMES = [
+    "Александр", "Алексей", "Андрей", "Артём", "Дмитрий", "Иван", "Максим", "Михаил", "Никита", "Сергей",
+    "Анна", "Екатерина", "Елена", "Мария", "Наталья", "Ольга", "Светлана", "Татьяна", "Юлия", "Дарья",
+]
+PATRONYMICS = ["Александрович", "Сергеевич", "Игоревна", "Петровна", "", ""]
+CITIES = ["Москва", "Санкт-Петербург", "Сочи", "Казань", "Анапа", "Калининград", ""]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Замер задержки поиска игроков на синтетической таблице (данные откатываются)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--players", type=int, default=100_000, help="Сколько синтетических игроков создать")
+        parser.add_argument("--queries", type=int, default=200, help="Сколько запросов каждого вида выполнить")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--no-legacy", action="store_true", help="Не замерять прежний поиск через icontains")
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options["seed"])
+        try:
+            with transaction.atomic():
+                names = self._create_players(rnd, options["players"])
+                queries = self._queries(rnd, names, options["queries"])
+                for kind, items in queries.items():
+                    self._report(kind, [self._time(lambda q=q: search_players(q)) for q in items])
+                if not options["no_legacy"]:
+                    items = queries["фамилия"]
+                    self._report("icontains (прежний)", [self._time(lambda q=q: self._legacy(q)) for q in items])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _create_players(self, rnd, count):
+        names = []
+        batch = []
+        started = time.perf_counter()
+        for _ in range(count):
+            last_name = rnd.choice(LAST_NAME_ROOTS) + rnd.choice(LAST_NAME_SUFFIXES)
+            first_name = rnd.choice(FIRST_NAMES)
+            patronymic = rnd.choice(PATRONYMICS)
+            city = rnd.choice(CITIES)
+            names.append((last_name, first_name))
+            batch.append(Player(
+                last_name=last_name,
+                first_name=first_name,
+                patronymic=patronymic,
+                display_name=first_name,
+                city=city,
+                search_text=build_search_text(last_name, first_name, patronymic, first_name, city),
+            ))
+            if len(batch) >= 5000:
+                Player.objects.bulk_create(batch)
+                batch = []
+        Player.objects.bulk_create(batch)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE players_player")
+        self.stdout.write(f"Создано игроков: {count} за {time.perf_counter() - started:.1f} с")
+        return names
+
+    def _queries(self, rnd, names, count):
+        sample = [rnd.choice(names) for _ in range(count)]
+        return {
+            "префикс фамилии": [last[:3] for last, _ in sample],
+            "фамилия": [last for last, _ in sample],
+            "фамилия имя": [f"{last} {first[:2]}" for last, first in sample],
+            "имя фамилия": [f"{first} {last}" for last, first in sample],
+            "подстрока": [last[1:5] for last, _ in sample],
+        }
+
+    @staticmethod
+    def _legacy(query):
+        return list(
+            Player.objects.filter(
+                Q(first_name__icontains=query)
+                | Q(last_name__icontains=query)
+                | Q(patronymic__icontains=query)
+                | Q(display_name__icontains=query)
+                | Q(city__icontains=query)
+            ).order_by("last_name", "first_name")[:20]
+        )
+
+    @staticmethod
+    def _time(func):
+        started = time.perf_counter()
+        func()
+        return (time.perf_counter() - started) * 1000
+
+    def _report(self, kind, timings):
+        timings = sorted(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"{kind:<22} p50={statistics.median(timings):7.2f} мс  "
+            f"p95={p95:7.2f} мс  max={timings[-1]:7.2f} мс"
+        )
@@ -0,0 +1,110 @@
+"""
+Бенчмарк и регрессия расчёта рейтинга на синтетической истории (services/rating_benchmark.py).
+
+История создаётся внутри транзакции, которая в конце откатывается, поэтому
+команду можно запускать на копии рабочей БД (SQLite или PostgreSQL): реальные
+данные не меняются. Замеряются compute_ratings_for_tournament,
+compute_ratings_for_multi_stage_tournament и recompute_history; итог сверяется
+с эталоном (--golden) или записывается в него (--write-golden). Превышение
+QUERY_BUDGETS или расхождение с эталоном — ошибка команды.
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.players.services.rating_benchmark import (
+    QUERY_BUDGETS,
+    BenchmarkConfig,
+    diff_snapshots,
+    dump_golden,
+    generate_history,
+    reset_history,
+    run_recompute_history,
+    run_serial,
+    snapshot,
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Бенчмарк расчёта рейтинга на синтетической истории со сверкой с эталоном (данные откатываются)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--players", type=int, default=BenchmarkConfig.players, help="Сколько синтетических игроков создать")
+        parser.add_argument("--tournaments", type=int, default=BenchmarkConfig.tournaments, help="Сколько турниров создать")
+        parser.add_argument("--seed", type=int, default=BenchmarkConfig.seed)
+        parser.add_argument(
+            "--multi-stage-every", type=int, default=BenchmarkConfig.multi_stage_every,
+            help="Каждый n-й турнир — многостадийный (0 — без многостадийных)",
+        )
+        parser.add_argument("--golden", help="Сверить итог с эталонным JSON")
+        parser.add_argument("--write-golden", help="Записать итог в эталонный JSON")
+        parser.add_argument("--skip-recompute-history", action="store_true", help="Не замерять recompute_history")
+
+    def handle(self, *args, **options):
+        config = BenchmarkConfig(
+            players=options["players"],
+            tournaments=options["tournaments"],
+            seed=options["seed"],
+            multi_stage_every=options["multi_stage_every"],
+        )
+        try:
+            with transaction.atomic():
+                result = self._run(config, skip_recompute=options["skip_recompute_history"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if options["write_golden"]:
+            with open(options["write_golden"], "w", encoding="utf-8") as fh:
+                fh.write(dump_golden(result))
+            self.stdout.write(self.style.SUCCESS(f"Эталон записан: {options['write_golden']}"))
+
+        problems = []
+        if options["golden"]:
+            with open(options["golden"], encoding="utf-8") as fh:
+                golden = json.load(fh)
+            for section, actual in result.items():
+                problems += [f"{section}: {line}" for line in diff_snapshots(golden.get(section, {}), actual)]
+            if not problems:
+                self.stdout.write(self.style.SUCCESS("Итог совпадает с эталоном"))
+        problems += self._over_budget
+        if problems:
+            for line in problems:
+                self.stderr.write(line)
+            raise CommandError(f"Регрессия расчёта рейтинга: {len(problems)} расхождений")
+
+    def _run(self, config, skip_recompute):
+        started = time.perf_counter()
+        history = generate_history(config)
+        self.stdout.write(
+            f"Создано игроков: {len(history.players)}, турниров: {len(history.masters)} "
+            f"(многостадийных: {len(history.stages)}) за {time.perf_counter() - started:.1f} с"
+        )
+        initial_ratings = {p.id: p.current_rating for p in history.players}
+
+        stats = list(run_serial(history).values())
+        result = {"serial": snapshot(history)}
+        if not skip_recompute:
+            reset_history(history, initial_ratings)
+            stats.append(run_recompute_history(history))
+            result["recompute_history"] = snapshot(history)
+
+        self._over_budget = []
+        for item in stats:
+            if not item.calls:
+                continue
+            budget = QUERY_BUDGETS.get(item.name)
+            self.stdout.write(
+                f"{item.name:<45} вызовов={item.calls:<5} всего={item.seconds * 1000:9.1f} мс  "
+                f"среднее={item.seconds / item.calls * 1000:7.2f} мс  max={item.max_seconds * 1000:7.2f} мс  "
+                f"запросов max={item.max_queries}" + (f" (лимит {budget})" if budget else "")
+            )
+            if item.over_budget:
+                self._over_budget.append(f"{item.name}: {item.max_queries} запросов при лимите {budget}")
+        return result
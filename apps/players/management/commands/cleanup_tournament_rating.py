@@ -2,6 +2,7 @@ from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
 from apps.players.models import Player, PlayerRatingHistory, PlayerRatingDynamic
+from apps.players.services.rating_timeline import invalidate_rating_timelines
 from apps.tournaments.models import Tournament
 
 
@@ -70,5 +71,6 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("DRY-RUN: удаление записей пропущено"))
         else:
             hist_qs.delete()
+            invalidate_rating_timelines(affected_players)
             dyn_qs.delete()
             self.stdout.write(self.style.SUCCESS("Готово: история и агрегаты удалены, рейтинги откатаны"))
@@ -9,7 +9,7 @@ from django.db.models import Count, Q
 from apps.accounts.models import UserProfile
 from apps.btr.models import BtrPlayer
 from apps.matches.models import Match
-from apps.players.models import Player, PlayerRatingDynamic, PlayerRatingHistory, SocialLink
+from apps.players.models import Player, PlayerNameKey, PlayerRatingDynamic, PlayerRatingHistory, SocialLink
 from apps.teams.models import Team
 from apps.tournaments.registration_models import PairInvitation, TournamentRegistration
 
@@ -36,7 +36,8 @@ class PlayerUsage:
 class Command(BaseCommand):
     help = (
         "Найти потенциальные дубликаты игроков (обычно после импорта BTR). "
-        "Группировка по ФИО (и опционально по дате рождения). "
+        "Группировка по ФИО из индекса имён (ё/е, латиница; с --fuzzy — по фонетическому ключу) "
+        "и опционально по дате рождения. "
         "Выводит сводку использования игрока (матчи/рейтинг/регистрация/связь с BTR)."
     )
 
@@ -46,6 +47,11 @@ class Command(BaseCommand):
             action="store_true",
             help="Учитывать дату рождения при группировке (ФИО+birth_date)",
         )
+        parser.add_argument(
+            "--fuzzy",
+            action="store_true",
+            help="Группировать по фонетическому ключу имени (Алексеев ≈ Алексеив)",
+        )
         parser.add_argument(
             "--only-with-btr",
             action="store_true",
@@ -66,6 +72,7 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         by_birth_date: bool = bool(options.get("by_birth_date"))
+        fuzzy: bool = bool(options.get("fuzzy"))
         only_with_btr: bool = bool(options.get("only_with_btr"))
         min_group_size: int = int(options.get("min_group_size") or 2)
         limit_groups = options.get("limit_groups")
@@ -82,12 +89,15 @@ class Command(BaseCommand):
             )
         )
 
-        # Ключ группировки: Фамилия + Имя + Отчество (+ опционально дата рождения)
-        groups: dict[tuple[str, str, str, str | None], list[Player]] = defaultdict(list)
+        # Ключ группировки: Фамилия + Имя из индекса имён + Отчество (+ опционально дата рождения)
+        name_kind = PlayerNameKey.Kind.PHONETIC if fuzzy else PlayerNameKey.Kind.EXACT
+        name_keys = dict(
+            PlayerNameKey.objects.filter(source=PlayerNameKey.Source.BP, kind=name_kind).values_list("object_id", "key")
+        )
+        groups: dict[tuple[str, str, str | None], list[Player]] = defaultdict(list)
         for p in players:
             key = (
-                _norm(p.last_name),
-                _norm(p.first_name),
+                name_keys.get(p.id, ""),
                 _norm(getattr(p, "patronymic", "")),
                 str(p.birth_date) if (by_birth_date and p.birth_date) else ("" if by_birth_date else None),
             )
@@ -96,21 +106,21 @@ class Command(BaseCommand):
         dup_groups = [
             (k, ps)
             for k, ps in groups.items()
-            if len(ps) >= min_group_size and k[0] and k[1]
+            if len(ps) >= min_group_size and k[0]
         ]
 
         # optional filter
         if only_with_btr:
             dup_groups = [(k, ps) for k, ps in dup_groups if any(getattr(p, "btr_player_id", None) for p in ps)]
 
-        dup_groups.sort(key=lambda x: (-len(x[1]), x[0][0], x[0][1], x[0][2]))
+        dup_groups.sort(key=lambda x: (-len(x[1]), x[0][0], x[0][1]))
         if limit_groups:
             dup_groups = dup_groups[: int(limit_groups)]
 
         self.stdout.write(self.style.SUCCESS("=" * 100))
         self.stdout.write(self.style.SUCCESS("Поиск дубликатов игроков"))
         self.stdout.write(self.style.SUCCESS("=" * 100))
-        self.stdout.write(f"Группировка: ФИО{' + birth_date' if by_birth_date else ''}")
+        self.stdout.write(f"Группировка: ФИО{' (фонетически)' if fuzzy else ''}{' + birth_date' if by_birth_date else ''}")
         self.stdout.write(f"Найдено групп с дубликатами: {len(dup_groups)}")
         self.stdout.write("")
 
@@ -196,9 +206,12 @@ class Command(BaseCommand):
 
         shown = 0
         for key, ps in dup_groups:
-            ln, fn, pt, bd = key
-            fio = " ".join([part for part in [ln, fn, pt] if part])
+            name_key, pt, bd = key
+            first = min(ps, key=lambda x: x.id)
+            fio = " ".join([part for part in [first.last_name, first.first_name, pt] if part])
             title = fio.strip() or "(без ФИО)"
+            if fuzzy:
+                title += f" [{name_key}]"
             if by_birth_date:
                 title += f" ({bd or '-'})"
 
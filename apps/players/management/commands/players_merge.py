@@ -10,6 +10,8 @@ from apps.accounts.models import UserProfile
 from apps.btr.models import BtrPlayer
 from apps.matches.models import Match
 from apps.players.models import Player, PlayerRatingDynamic, PlayerRatingHistory, SocialLink
+from apps.players.services.pair_stats import match_player_ids, refresh_pair_stats
+from apps.players.services.summary_stats import invalidate_tournament_days
 from apps.teams.models import Team
 from apps.tournaments.models import DrawPosition, TournamentEntry, TournamentPlacement
 from apps.tournaments.registration_models import PairInvitation, TournamentRegistration
@@ -187,6 +189,17 @@ class Command(BaseCommand):
                         qs.update(**{f"{field}_id": new_team_id})
             return updated_total
 
+        # Матчи переносятся queryset-обновлением без сигналов: граф связей (PlayerPairStats)
+        # и дневная сводка по их турнирам пересчитываются явно после удаления source
+        pair_player_ids: set[int] = set()
+        stats_tournament_ids: set[int] = set()
+        if team_map:
+            merged_matches = Match.objects.filter(
+                Q(team_1_id__in=list(team_map.keys())) | Q(team_2_id__in=list(team_map.keys()))
+            )
+            pair_player_ids = match_player_ids(merged_matches)
+            stats_tournament_ids = set(merged_matches.values_list("tournament_id", flat=True))
+
         if team_map:
             # TournamentEntry может сколлапсировать по unique_entry_team_in_tournament.
             # Поэтому обновляем по-турнирно с дедупликацией.
@@ -344,4 +357,8 @@ class Command(BaseCommand):
         except IntegrityError as e:
             raise CommandError(f"Не удалось удалить source игрока из-за связей: {e}")
 
+        if pair_player_ids:
+            refresh_pair_stats((pair_player_ids - {source_id}) | {target_id})
+        invalidate_tournament_days(stats_tournament_ids)
+
         self.stdout.write(self.style.SUCCESS("\nГотово: игрок слит и source удалён"))
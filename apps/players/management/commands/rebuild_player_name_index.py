@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.players.models import PlayerNameKey
+from apps.players.services.name_index import rebuild_name_index
+
+
+class Command(BaseCommand):
+    help = "Пересобрать индекс имён игроков BP и BTR (PlayerNameKey)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--source",
+            choices=[choice for choice, _ in PlayerNameKey.Source.choices],
+            default=None,
+            help="Пересобрать только один источник (bp или btr)",
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_name_index(options.get("source"))
+        self.stdout.write(self.style.SUCCESS(f"Индекс имён пересобран, ключей: {total}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.players.services.pair_stats import rebuild_pair_stats
+
+
+class Command(BaseCommand):
+    help = "Пересобрать граф связей игроков (PlayerPairStats) по всем завершённым матчам"
+
+    def handle(self, *args, **options):
+        total = rebuild_pair_stats()
+        self.stdout.write(self.style.SUCCESS(f"Граф связей пересобран, рёбер: {total}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.players.services.summary_stats import rebuild_all_days
+
+
+class Command(BaseCommand):
+    help = "Пересчитать дневную сводку статистики (StatsDay/PlayerDayStats/PlayerDayPair) за все закрытые дни"
+
+    def handle(self, *args, **options):
+        days = rebuild_all_days()
+        self.stdout.write(self.style.SUCCESS(f"Дневная сводка пересчитана, дней: {days}"))
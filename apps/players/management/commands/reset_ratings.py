@@ -24,7 +24,8 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 
 from apps.players.models import Player, PlayerRatingHistory, PlayerRatingDynamic
-from apps.players.services.initial_rating_service import get_initial_bp_rating
+from apps.players.services.initial_rating_service import get_initial_bp_ratings
+from apps.players.services.rating_timeline import invalidate_rating_timelines
 from apps.players.services.rating_service import recompute_history, RecomputeOptions
 
 
@@ -102,6 +103,7 @@ class Command(BaseCommand):
             with transaction.atomic():
                 PlayerRatingHistory.objects.all().delete()
                 PlayerRatingDynamic.objects.all().delete()
+                invalidate_rating_timelines()
                 Player.objects.all().update(current_rating=0)
             
             self.stdout.write(self.style.SUCCESS('✓ История очищена, рейтинги сброшены'))
@@ -123,48 +125,36 @@ class Command(BaseCommand):
         
         assigned_count = 0
         skipped_count = 0
-        
-        if not self.dry_run:
-            with transaction.atomic():
-                for player in players_with_btr:
-                    initial_rating = get_initial_bp_rating(player)
-                    
-                    if initial_rating > 0:
-                        player.current_rating = initial_rating
-                        player.save(update_fields=['current_rating'])
-                        
-                        self.stdout.write(
-                            f'  [{player.id}] {player.first_name} {player.last_name}: '
-                            f'BTR_ID={player.btr_player_id} → рейтинг={initial_rating}'
-                        )
-                        assigned_count += 1
-                    else:
-                        self.stdout.write(
-                            self.style.WARNING(
-                                f'  [{player.id}] {player.first_name} {player.last_name}: '
-                                f'BTR_ID={player.btr_player_id} → не удалось определить рейтинг (пропущен)'
-                            )
-                        )
-                        skipped_count += 1
-        else:
-            # Dry-run режим
-            for player in players_with_btr:
-                initial_rating = get_initial_bp_rating(player)
+        prefix = '[DRY-RUN] ' if self.dry_run else ''
+
+        # Стартовые рейтинги считаются пакетно (один запрос к BTR), сохраняются bulk_update
+        players = list(players_with_btr)
+        initial_ratings = get_initial_bp_ratings(players)
+        to_update = []
+        for player in players:
+            initial_rating = initial_ratings[player.id]
+            
+            if initial_rating > 0:
+                player.current_rating = initial_rating
+                to_update.append(player)
                 
-                if initial_rating > 0:
-                    self.stdout.write(
-                        f'  [DRY-RUN] [{player.id}] {player.first_name} {player.last_name}: '
-                        f'BTR_ID={player.btr_player_id} → рейтинг={initial_rating}'
+                self.stdout.write(
+                    f'  {prefix}[{player.id}] {player.first_name} {player.last_name}: '
+                    f'BTR_ID={player.btr_player_id} → рейтинг={initial_rating}'
+                )
+                assigned_count += 1
+            else:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f'  {prefix}[{player.id}] {player.first_name} {player.last_name}: '
+                        f'BTR_ID={player.btr_player_id} → не удалось определить рейтинг (пропущен)'
                     )
-                    assigned_count += 1
-                else:
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f'  [DRY-RUN] [{player.id}] {player.first_name} {player.last_name}: '
-                            f'BTR_ID={player.btr_player_id} → не удалось определить рейтинг (пропущен)'
-                        )
-                    )
-                    skipped_count += 1
+                )
+                skipped_count += 1
+
+        if not self.dry_run and to_update:
+            with transaction.atomic():
+                Player.objects.bulk_update(to_update, ['current_rating'], batch_size=1000)
         
         if not self.dry_run:
             self.stdout.write(self.style.SUCCESS(
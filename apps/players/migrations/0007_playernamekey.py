@@ -0,0 +1,121 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:11
+
+import re
+
+from django.db import migrations, models
+
+# Замороженная копия нормализации имён из apps.players.services.name_index
+# на момент миграции: изменения сервиса не должны менять эту миграцию.
+_TRANSLIT = [
+    ("shch", "щ"), ("sch", "щ"),
+    ("zh", "ж"), ("kh", "х"), ("ts", "ц"), ("ch", "ч"), ("sh", "ш"),
+    ("yu", "ю"), ("ya", "я"), ("yo", "е"), ("ye", "е"),
+    ("a", "а"), ("b", "б"), ("v", "в"), ("g", "г"), ("d", "д"), ("e", "е"),
+    ("z", "з"), ("i", "и"), ("j", "й"), ("k", "к"), ("l", "л"), ("m", "м"),
+    ("n", "н"), ("o", "о"), ("p", "п"), ("r", "р"), ("s", "с"), ("t", "т"),
+    ("u", "у"), ("f", "ф"), ("h", "х"), ("c", "к"), ("w", "в"), ("x", "кс"),
+    ("q", "к"),
+]
+_CYR_VOWELS = set("аеёиоуыэюя")
+_PHONETIC = str.maketrans({
+    "о": "а", "я": "а", "ы": "и", "е": "и", "э": "и", "й": "и", "ю": "у",
+    "б": "п", "в": "ф", "г": "к", "д": "т", "ж": "ш", "з": "с", "щ": "ш",
+    "ь": None, "ъ": None,
+})
+_NON_LETTERS = re.compile(r"[^a-zа-я]+")
+
+
+def _transliterate(token):
+    out = []
+    i = 0
+    while i < len(token):
+        if token[i] == "y" and not token.startswith(("yu", "ya", "yo", "ye"), i):
+            out.append("й" if out and out[-1] in _CYR_VOWELS else "ы")
+            i += 1
+            continue
+        for latin, cyrillic in _TRANSLIT:
+            if token.startswith(latin, i):
+                out.append(cyrillic)
+                i += len(latin)
+                break
+        else:
+            i += 1
+    return "".join(out)
+
+
+def _name_tokens(*parts):
+    text = " ".join(part for part in parts if part).lower().replace("ё", "е")
+    tokens = []
+    for token in _NON_LETTERS.split(text):
+        if not token:
+            continue
+        if re.search(r"[a-z]", token):
+            token = _transliterate(token).replace("ё", "е")
+        tokens.append(token)
+    return tokens
+
+
+def _phonetic_code(token):
+    return re.sub(r"(.)\1+", r"\1", token.translate(_PHONETIC))
+
+
+def _name_keys(last_name, first_name):
+    tokens = _name_tokens(last_name, first_name)
+    if not tokens:
+        return []
+    grams = set()
+    for token in tokens:
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    keys = [
+        ("exact", " ".join(sorted(tokens)), 0),
+        ("phonetic", " ".join(sorted(_phonetic_code(token) for token in tokens)), 0),
+    ]
+    keys.extend(("trigram", gram, len(grams)) for gram in sorted(grams))
+    return keys
+
+
+def fill_name_index(apps, schema_editor):
+    """Построить индекс имён для существующих игроков BP и BTR."""
+    PlayerNameKey = apps.get_model("players", "PlayerNameKey")
+    sources = {
+        "bp": apps.get_model("players", "Player"),
+        "btr": apps.get_model("btr", "BtrPlayer"),
+    }
+    for source, model in sources.items():
+        rows = []
+        for obj in model.objects.only("id", "last_name", "first_name").iterator(chunk_size=2000):
+            for kind, key, size in _name_keys(obj.last_name, obj.first_name):
+                rows.append(PlayerNameKey(source=source, object_id=obj.id, kind=kind, key=key[:255], size=size))
+            if len(rows) >= 20000:
+                PlayerNameKey.objects.bulk_create(rows)
+                rows = []
+        PlayerNameKey.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('btr', '0001_initial'),
+        ('players', '0006_player_created_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerNameKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('bp', 'Игрок BP'), ('btr', 'Игрок BTR')], max_length=8, verbose_name='Источник')),
+                ('object_id', models.BigIntegerField(verbose_name='ID игрока')),
+                ('kind', models.CharField(choices=[('exact', 'Нормализованное имя'), ('phonetic', 'Фонетический ключ'), ('trigram', 'Триграмма')], max_length=16, verbose_name='Тип ключа')),
+                ('key', models.CharField(max_length=255, verbose_name='Ключ')),
+                ('size', models.PositiveSmallIntegerField(default=0, verbose_name='Размер')),
+            ],
+            options={
+                'verbose_name': 'Ключ индекса имён',
+                'verbose_name_plural': 'Индекс имён игроков',
+                'indexes': [models.Index(fields=['source', 'kind', 'key'], name='player_name_key_lookup_idx'), models.Index(fields=['source', 'object_id'], name='player_name_key_object_idx')],
+            },
+        ),
+        migrations.RunPython(fill_name_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:02
+
+from django.db import migrations, models
+
+SEARCH_TEXT_FIELDS = ("last_name", "first_name", "patronymic", "display_name", "city")
+
+
+def build_search_text(*parts):
+    # Замороженная копия apps.players.models.build_search_text на момент миграции
+    text = " ".join(part for part in parts if part).lower().replace("ё", "е")
+    return (" " + " ".join(text.split()))[:512] if text.strip() else ""
+
+
+def fill_search_text(apps, schema_editor):
+    """Заполнить строку поиска для существующих игроков."""
+    Player = apps.get_model("players", "Player")
+    batch = []
+    for player in Player.objects.only("id", *SEARCH_TEXT_FIELDS).iterator(chunk_size=2000):
+        player.search_text = build_search_text(*(getattr(player, field) for field in SEARCH_TEXT_FIELDS))
+        batch.append(player)
+        if len(batch) >= 2000:
+            Player.objects.bulk_update(batch, ["search_text"])
+            batch = []
+    Player.objects.bulk_update(batch, ["search_text"])
+
+
+def create_trigram_index(apps, schema_editor):
+    """GIN-индекс pg_trgm по строке поиска (только PostgreSQL)."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS players_player_search_trgm_idx "
+        "ON players_player USING gin (search_text gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS players_player_search_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0007_playernamekey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='search_text',
+            field=models.CharField(blank=True, default='', editable=False, max_length=512, verbose_name='Строка поиска'),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
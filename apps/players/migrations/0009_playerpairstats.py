@@ -0,0 +1,98 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Замороженная копия подсчёта рёбер из apps.players.services.pair_stats на момент миграции
+MATCH_ROW_FIELDS = (
+    "team_1_id",
+    "team_2_id",
+    "winner_id",
+    "team_1__player_1_id",
+    "team_1__player_2_id",
+    "team_2__player_1_id",
+    "team_2__player_2_id",
+    "tournament__date",
+)
+
+
+def _accumulate_pair_stats(rows):
+    stats = {}
+
+    def bump(a, b, prefix, won, played):
+        counters = stats.setdefault((a, b), {
+            "partner_matches": 0, "partner_wins": 0, "last_partner_date": None,
+            "opponent_matches": 0, "opponent_wins": 0, "last_opponent_date": None,
+        })
+        counters[f"{prefix}_matches"] += 1
+        counters[f"{prefix}_wins"] += int(won)
+        last = counters[f"last_{prefix}_date"]
+        if played is not None and (last is None or played > last):
+            counters[f"last_{prefix}_date"] = played
+
+    for team_1_id, team_2_id, winner_id, t1p1, t1p2, t2p1, t2p2, played in rows:
+        side_1 = [pid for pid in (t1p1, t1p2) if pid]
+        side_2 = [pid for pid in (t2p1, t2p2) if pid]
+        won_1 = winner_id is not None and winner_id == team_1_id
+        won_2 = winner_id is not None and winner_id == team_2_id
+        for side, won in ((side_1, won_1), (side_2, won_2)):
+            for a in side:
+                for b in side:
+                    if a != b:
+                        bump(a, b, "partner", won, played)
+        for a in side_1:
+            for b in side_2:
+                bump(a, b, "opponent", won_1, played)
+                bump(b, a, "opponent", won_2, played)
+    return stats
+
+
+def fill_pair_stats(apps, schema_editor):
+    """Построить граф связей игроков по существующим завершённым матчам."""
+    Match = apps.get_model("matches", "Match")
+    PlayerPairStats = apps.get_model("players", "PlayerPairStats")
+    rows = (
+        Match.objects
+        .filter(status="completed", team_1__isnull=False, team_2__isnull=False)
+        .values_list(*MATCH_ROW_FIELDS)
+        .iterator(chunk_size=5000)
+    )
+    PlayerPairStats.objects.bulk_create(
+        [
+            PlayerPairStats(player_id=a, other_id=b, **counters)
+            for (a, b), counters in _accumulate_pair_stats(rows).items()
+        ],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0002_initial'),
+        ('players', '0008_player_search_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerPairStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('partner_matches', models.PositiveIntegerField(default=0, verbose_name='Матчей вместе')),
+                ('partner_wins', models.PositiveIntegerField(default=0, verbose_name='Побед вместе')),
+                ('last_partner_date', models.DateField(blank=True, null=True, verbose_name='Последний матч вместе')),
+                ('opponent_matches', models.PositiveIntegerField(default=0, verbose_name='Матчей друг против друга')),
+                ('opponent_wins', models.PositiveIntegerField(default=0, verbose_name='Побед над соперником')),
+                ('last_opponent_date', models.DateField(blank=True, null=True, verbose_name='Последний матч друг против друга')),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='players.player')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pair_stats', to='players.player')),
+            ],
+            options={
+                'verbose_name': 'Связь игроков',
+                'verbose_name_plural': 'Связи игроков (напарники/соперники)',
+                'constraints': [models.UniqueConstraint(fields=('player', 'other'), name='uniq_player_pair_stats')],
+            },
+        ),
+        migrations.RunPython(fill_pair_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0009_playerpairstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatsDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='День')),
+                ('matches', models.PositiveIntegerField(default=0, verbose_name='Завершённых матчей')),
+                ('built_at', models.DateTimeField(auto_now=True, verbose_name='Посчитано')),
+            ],
+            options={
+                'verbose_name': 'День сводки статистики',
+                'verbose_name_plural': 'Дни сводки статистики',
+            },
+        ),
+        migrations.CreateModel(
+            name='PlayerDayPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='День')),
+                ('partner_matches', models.PositiveIntegerField(default=0)),
+                ('opponent_matches', models.PositiveIntegerField(default=0)),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='players.player')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='players.player')),
+            ],
+            options={
+                'verbose_name': 'Связь игроков за день',
+                'verbose_name_plural': 'Связи игроков по дням',
+                'constraints': [models.UniqueConstraint(fields=('date', 'player', 'other'), name='uniq_player_day_pair')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlayerDayStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='День')),
+                ('matches', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('losses', models.PositiveIntegerField(default=0)),
+                ('tournaments', models.PositiveIntegerField(default=0)),
+                ('hard_matches', models.PositiveIntegerField(default=0)),
+                ('medium_matches', models.PositiveIntegerField(default=0)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='players.player')),
+            ],
+            options={
+                'verbose_name': 'Дневная статистика игрока',
+                'verbose_name_plural': 'Дневная статистика игроков',
+                'constraints': [models.UniqueConstraint(fields=('date', 'player'), name='uniq_player_day_stats')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0010_summary_stats_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerRatingTimeline',
+            fields=[
+                ('player', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_timeline', serialize=False, to='players.player')),
+                ('points', models.JSONField(default=dict)),
+                ('built_at', models.DateTimeField(auto_now=True, verbose_name='Построен')),
+            ],
+            options={
+                'verbose_name': 'Индекс рейтинга игрока по датам',
+                'verbose_name_plural': 'Индексы рейтинга игроков по датам',
+            },
+        ),
+    ]
@@ -2,7 +2,19 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.contrib.auth.models import User
 
-class Player(models.Model):
+from sandmatch.model_state import LoadedValuesMixin
+
+# Поля игрока, из которых собирается Player.search_text
+SEARCH_TEXT_FIELDS = ("last_name", "first_name", "patronymic", "display_name", "city")
+
+
+def build_search_text(*parts) -> str:
+    """Строка поиска: « иванов иван петрович ваня москва» (ведущий пробел — граница слова)."""
+    text = " ".join(part for part in parts if part).lower().replace("ё", "е")
+    return (" " + " ".join(text.split()))[:512] if text.strip() else ""
+
+
+class Player(LoadedValuesMixin, models.Model):
     last_name = models.CharField("Фамилия", max_length=100)
     first_name = models.CharField("Имя", max_length=100)
     patronymic = models.CharField("Отчество", max_length=100, blank=True, null=True)
@@ -23,6 +35,8 @@ class Player(models.Model):
     phone = models.CharField("Телефон", max_length=20, blank=True, null=True)
     display_name = models.CharField("Отображаемое имя", max_length=150, blank=True)
     city = models.CharField("Город", max_length=100, blank=True, default="")
+    # Денормализованная строка для поиска (нижний регистр, ё → е), см. services/player_search.py
+    search_text = models.CharField("Строка поиска", max_length=512, blank=True, default="", editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(
         User,
@@ -61,10 +75,17 @@ class Player(models.Model):
     def __str__(self) -> str:
         return f"{self.last_name} {self.first_name}"
 
+    def build_search_text(self) -> str:
+        return build_search_text(*(getattr(self, field) for field in SEARCH_TEXT_FIELDS))
+
     def save(self, *args, **kwargs):
         # Если отображаемое имя не задано, используем имя игрока (first_name)
         if not self.display_name:
             self.display_name = self.first_name or ""
+        self.search_text = self.build_search_text()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) & set(SEARCH_TEXT_FIELDS):
+            kwargs["update_fields"] = set(update_fields) | {"search_text", "display_name"}
         super().save(*args, **kwargs)
 
 
@@ -151,3 +172,142 @@ class PlayerRatingDynamic(models.Model):
 
     def __str__(self) -> str:
         return f"{self.player} Δ{self.total_change:+.1f} ({self.tournament_date})"
+
+
+class PlayerNameKey(models.Model):
+    """Ключ поискового индекса имён игроков BP и BTR.
+
+    На каждого игрока хранится нормализованное «Фамилия Имя» (exact),
+    фонетический ключ (phonetic) и триграммы имени (trigram); поиск кандидатов
+    идёт по индексу (source, kind, key). Поддерживается сервисом
+    apps.players.services.name_index.
+    """
+
+    class Source(models.TextChoices):
+        BP = "bp", "Игрок BP"
+        BTR = "btr", "Игрок BTR"
+
+    class Kind(models.TextChoices):
+        EXACT = "exact", "Нормализованное имя"
+        PHONETIC = "phonetic", "Фонетический ключ"
+        TRIGRAM = "trigram", "Триграмма"
+
+    source = models.CharField("Источник", max_length=8, choices=Source.choices)
+    object_id = models.BigIntegerField("ID игрока")
+    kind = models.CharField("Тип ключа", max_length=16, choices=Kind.choices)
+    key = models.CharField("Ключ", max_length=255)
+    # Для триграмм — число различных триграмм имени (знаменатель сходства)
+    size = models.PositiveSmallIntegerField("Размер", default=0)
+
+    class Meta:
+        verbose_name = "Ключ индекса имён"
+        verbose_name_plural = "Индекс имён игроков"
+        indexes = [
+            models.Index(fields=["source", "kind", "key"], name="player_name_key_lookup_idx"),
+            models.Index(fields=["source", "object_id"], name="player_name_key_object_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.source}#{self.object_id} {self.kind}: {self.key}"
+
+
+class PlayerPairStats(models.Model):
+    """Ребро графа «игрок — другой игрок» по завершённым матчам.
+
+    Хранится в обе стороны (A→B и B→A), поэтому все связи игрока читаются
+    одним запросом по player. Победы — с точки зрения player. Поддерживается
+    сервисом apps.players.services.pair_stats (сигналы Match и полная пересборка).
+    """
+
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name="pair_stats")
+    other = models.ForeignKey(Player, on_delete=models.CASCADE, related_name="+")
+    partner_matches = models.PositiveIntegerField("Матчей вместе", default=0)
+    partner_wins = models.PositiveIntegerField("Побед вместе", default=0)
+    last_partner_date = models.DateField("Последний матч вместе", null=True, blank=True)
+    opponent_matches = models.PositiveIntegerField("Матчей друг против друга", default=0)
+    opponent_wins = models.PositiveIntegerField("Побед над соперником", default=0)
+    last_opponent_date = models.DateField("Последний матч друг против друга", null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Связь игроков"
+        verbose_name_plural = "Связи игроков (напарники/соперники)"
+        constraints = [
+            models.UniqueConstraint(fields=["player", "other"], name="uniq_player_pair_stats"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.player_id}→{self.other_id}: вместе {self.partner_matches}, против {self.opponent_matches}"
+
+
+class StatsDay(models.Model):
+    """Закрытый день в дневной сводке статистики (services/summary_stats.py).
+
+    Наличие строки означает, что PlayerDayStats/PlayerDayPair за этот день
+    посчитаны; изменение матчей или турниров дня удаляет строку, и день
+    пересчитывается при следующем запросе сводки.
+    """
+
+    date = models.DateField("День", unique=True)
+    matches = models.PositiveIntegerField("Завершённых матчей", default=0)
+    built_at = models.DateTimeField("Посчитано", auto_now=True)
+
+    class Meta:
+        verbose_name = "День сводки статистики"
+        verbose_name_plural = "Дни сводки статистики"
+
+    def __str__(self) -> str:
+        return f"{self.date}: {self.matches}"
+
+
+class PlayerDayStats(models.Model):
+    """Дневная сводка игрока по завершённым матчам (турниры с датой date)."""
+
+    date = models.DateField("День")
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name="+")
+    matches = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    losses = models.PositiveIntegerField(default=0)
+    tournaments = models.PositiveIntegerField(default=0)
+    hard_matches = models.PositiveIntegerField(default=0)
+    medium_matches = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Дневная статистика игрока"
+        verbose_name_plural = "Дневная статистика игроков"
+        constraints = [
+            models.UniqueConstraint(fields=["date", "player"], name="uniq_player_day_stats"),
+        ]
+
+
+class PlayerDayPair(models.Model):
+    """Напарники и соперники игрока за день (для числа уникальных за период)."""
+
+    date = models.DateField("День")
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name="+")
+    other = models.ForeignKey(Player, on_delete=models.CASCADE, related_name="+")
+    partner_matches = models.PositiveIntegerField(default=0)
+    opponent_matches = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Связь игроков за день"
+        verbose_name_plural = "Связи игроков по дням"
+        constraints = [
+            models.UniqueConstraint(fields=["date", "player", "other"], name="uniq_player_day_pair"),
+        ]
+
+
+class PlayerRatingTimeline(models.Model):
+    """Индекс «рейтинг на дату» игрока — компактная копия его PlayerRatingDynamic.
+
+    points — отсортированные по (дата турнира, id записи) параллельные массивы:
+    d — дата (ordinal), t — турнир, b — рейтинг до, a — рейтинг после.
+    Поддерживается сервисом apps.players.services.rating_timeline.
+    """
+
+    player = models.OneToOneField(Player, on_delete=models.CASCADE, primary_key=True, related_name="rating_timeline")
+    points = models.JSONField(default=dict)
+    built_at = models.DateTimeField("Построен", auto_now=True)
+
+    class Meta:
+        verbose_name = "Индекс рейтинга игрока по датам"
+        verbose_name_plural = "Индексы рейтинга игроков по датам"
@@ -1,7 +1,17 @@
 """
 Сервис для расчета стартового BP рейтинга на основе BTR рейтинга.
 """
-from apps.btr.models import BtrPlayer, BtrRatingSnapshot
+from typing import Dict, Iterable, List, Sequence
+
+from apps.btr.models import BtrLatestRating, BtrPlayer, BtrRatingSnapshot
+from apps.btr.services.latest_ratings import get_latest_ratings
+
+# Категории, по которым считается стартовый рейтинг
+ADULT_CATEGORIES = ['men_double', 'women_double']
+JUNIOR_CATEGORIES = ['junior_male', 'junior_female']
+
+DEFAULT_BP_RATING = 1000
+JUNIOR_ONLY_BP_RATING = 800
 
 
 def calculate_initial_bp_rating_from_btr(btr_player_id: int) -> int:
@@ -32,61 +42,47 @@ def calculate_initial_bp_rating_from_btr(btr_player_id: int) -> int:
     Returns:
         Стартовый BP рейтинг (целое число, от 1000 до 2000)
     """
-    if not BtrPlayer.objects.filter(id=btr_player_id).exists():
-        return 1000  # Дефолтный стартовый рейтинг
-    
-    # Получаем последние рейтинги в категориях men_double и women_double
-    relevant_categories = ['men_double', 'women_double']
-    junior_categories = ['junior_male', 'junior_female']
-    
-    max_btr_rating = 0
-    
-    for category in relevant_categories:
-        # Получаем последний снимок в этой категории
-        latest_snapshot = BtrRatingSnapshot.objects.filter(
-            player_id=btr_player_id,
-            category=category
-        ).order_by('-rating_date').first()
-        
-        if latest_snapshot and latest_snapshot.rating_value > max_btr_rating:
-            max_btr_rating = latest_snapshot.rating_value
+    return calculate_initial_bp_ratings_from_btr([btr_player_id])[btr_player_id]
+
+
+def calculate_initial_bp_ratings_from_btr(btr_player_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Пакетный вариант calculate_initial_bp_rating_from_btr для массового назначения
+    стартовых рейтингов.
+
+    Последние рейтинги всех игроков в категориях men_double/women_double и
+    юниорских берутся одним запросом из BtrLatestRating, формула применяется
+    ко всему списку значений сразу.
+
+    Returns:
+        {btr_player_id: стартовый BP рейтинг} для каждого переданного ID
+        (неизвестные ID получают дефолтные 1000)
+    """
+    btr_player_ids = set(btr_player_ids)
+    result = dict.fromkeys(btr_player_ids, DEFAULT_BP_RATING)
+    if not btr_player_ids:
+        return result
+
+    max_adult: Dict[int, int] = {}
+    has_junior = set()
+    latest = BtrLatestRating.objects.filter(
+        player_id__in=btr_player_ids,
+        category__in=ADULT_CATEGORIES + JUNIOR_CATEGORIES,
+    ).values_list('player_id', 'category', 'rating_value')
+    for player_id, category, rating_value in latest:
+        if category in ADULT_CATEGORIES:
+            max_adult[player_id] = max(max_adult.get(player_id, 0), rating_value)
+        else:
+            has_junior.add(player_id)
 
     # Спец-правило для юниоров:
     # если у игрока есть ТОЛЬКО юниорские категории (MU/WU),
     # а взрослых men_double/women_double нет, стартовый BP = 800.
-    has_adult_snapshots = BtrRatingSnapshot.objects.filter(
-        player_id=btr_player_id,
-        category__in=relevant_categories,
-    ).exists()
-    has_junior_snapshots = BtrRatingSnapshot.objects.filter(
-        player_id=btr_player_id,
-        category__in=junior_categories,
-    ).exists()
-
-    if not has_adult_snapshots and has_junior_snapshots:
-        return 800
-    
-    # Если нет рейтинга в BTR или он меньше 80 (любители)
-    if max_btr_rating < 80:
-        return 1000
-    
-    # Элита: обратное скошенное распределение (штраф растет)
-    if max_btr_rating >= 1500:
-        # Ограничиваем максимум на уровне BTR 4000
-        capped_btr = min(max_btr_rating, 4000)
-        normalized = (capped_btr - 1500) / 2500.0  # Нормализуем в диапазон [0, 1]
-        skewed = normalized ** 1.05  # Применяем степень > 1 для обратного скоса
-        bp_rating = 1600 + 400 * skewed
-        return min(2000, max(1600, int(round(bp_rating))))
-    
-    # Профессиональный уровень: скошенное распределение
-    # Используем степенную функцию для более быстрого роста в начале
-    normalized = (max_btr_rating - 80) / 1420.0  # Нормализуем в диапазон [0, 1]
-    skewed = normalized ** 0.7  # Применяем степень < 1 для скоса влево
-    bp_rating = 1000 + 600 * skewed
-    
-    # Округляем до целого и ограничиваем диапазон
-    return min(1600, max(1000, int(round(bp_rating))))
+    result.update(dict.fromkeys(has_junior, JUNIOR_ONLY_BP_RATING))
+
+    adult_ids = list(max_adult)
+    result.update(zip(adult_ids, calculate_bp_from_btr_values([max_adult[i] for i in adult_ids])))
+    return result
 
 
 def get_btr_rating_info(btr_player_id: int) -> dict:
@@ -108,18 +104,13 @@ def get_btr_rating_info(btr_player_id: int) -> dict:
     }
     
     # Получаем рейтинги по всем категориям
-    for cat_choice in BtrRatingSnapshot.Category.choices:
-        cat_code = cat_choice[0]
-        latest_snapshot = BtrRatingSnapshot.objects.filter(
-            player_id=btr_player_id,
-            category=cat_code
-        ).order_by('-rating_date').first()
-        
-        if latest_snapshot:
+    latest = get_latest_ratings(btr_player_id)
+    for cat_code, _ in BtrRatingSnapshot.Category.choices:
+        if cat_code in latest:
             info['ratings'][cat_code] = {
-                'rating': latest_snapshot.rating_value,
-                'date': str(latest_snapshot.rating_date),
-                'rank': latest_snapshot.rank,
+                'rating': latest[cat_code].rating_value,
+                'date': str(latest[cat_code].rating_date),
+                'rank': latest[cat_code].rank,
             }
     
     return info
@@ -195,6 +186,11 @@ def calculate_bp_from_btr_value(btr_value: int) -> int:
     return min(1600, max(1000, int(round(bp_rating))))
 
 
+def calculate_bp_from_btr_values(btr_values: Sequence[int]) -> List[int]:
+    """Формула calculate_bp_from_btr_value для списка значений BTR (без обращения к БД)."""
+    return [calculate_bp_from_btr_value(value) for value in btr_values]
+
+
 # Примеры использования
 if __name__ == '__main__':
     """
@@ -0,0 +1,166 @@
+"""
+Пакетная загрузка истории матчей игрока для страниц рейтинга.
+
+Эндпоинты истории (player_match_deltas, h2h, player_top_wins, last5 в
+лидерборде) показывают для каждого матча счёт, имена партнёра и соперников
+и средний рейтинг команд до турнира. Раньше всё это добиралось запросом на
+каждый матч; MatchBundle загружает матчи, сеты, игроков и таймлайны рейтинга
+(rating_timeline) фиксированным числом запросов, а дальше всё считается в памяти.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import QuerySet
+
+from apps.matches.models import Match, MatchSet
+from apps.players.models import Player, PlayerRatingHistory
+from apps.players.services.rating_timeline import RatingTimeline, load_rating_timelines
+
+
+def format_score(sets: Iterable[MatchSet], flip: bool = False) -> str:
+    """Счёт матча строкой: «6:4, 3:6, TB(10:8)»; flip — со стороны второй команды."""
+    parts: List[str] = []
+    for s in sets:
+        if s.is_tiebreak_only:
+            if s.tb_1 is not None and s.tb_2 is not None:
+                parts.append(f"TB({s.tb_2}:{s.tb_1})" if flip else f"TB({s.tb_1}:{s.tb_2})")
+            else:
+                parts.append("TB")
+        else:
+            base = f"{s.games_2}:{s.games_1}" if flip else f"{s.games_1}:{s.games_2}"
+            if (s.tb_1 is not None) and (s.tb_2 is not None):
+                base += f"({s.tb_2}:{s.tb_1})" if flip else f"({s.tb_1}:{s.tb_2})"
+            parts.append(base)
+    return ', '.join(parts)
+
+
+def team_player_ids(team) -> List[Optional[int]]:
+    return [team.player_1_id, team.player_2_id] if team else []
+
+
+@dataclass
+class MatchBundle:
+    matches: List[Match]
+    sets: Dict[int, List[MatchSet]] = field(default_factory=dict)
+    players: Dict[int, dict] = field(default_factory=dict)
+    timelines: Dict[int, RatingTimeline] = field(default_factory=dict)
+    # турнир матча (стадия или головной) -> (головной турнир, его дата)
+    tournaments: Dict[int, Tuple[int, date]] = field(default_factory=dict)
+
+    def score(self, match_id: int, flip: bool = False) -> str:
+        return format_score(self.sets.get(match_id, ()), flip=flip)
+
+    @staticmethod
+    def in_team1(m: Match, player_id: int) -> bool:
+        return bool(m.team_1 and player_id in (m.team_1.player_1_id, m.team_1.player_2_id))
+
+    def opponent_ids(self, m: Match, player_id: int) -> List[int]:
+        team = m.team_2 if self.in_team1(m, player_id) else m.team_1
+        return [pid for pid in team_player_ids(team) if pid]
+
+    def partner_id(self, m: Match, player_id: int) -> Optional[int]:
+        team = m.team_1 if self.in_team1(m, player_id) else m.team_2
+        ids = [pid for pid in team_player_ids(team) if pid and pid != player_id]
+        return ids[0] if ids else None
+
+    def _name(self, player_id: int) -> str:
+        p = self.players.get(player_id)
+        return f"{p['display_name']} {p['last_name']}".strip() if p else ''
+
+    def opponent_name(self, m: Match, player_id: int) -> str:
+        ids = [pid for pid in self.opponent_ids(m, player_id) if pid in self.players]
+        # Порядок как у Player.Meta.ordering (фамилия, имя)
+        ids.sort(key=lambda pid: (self.players[pid]['last_name'], self.players[pid]['first_name']))
+        return ' vs '.join(self._name(pid) for pid in ids)
+
+    def partner_name(self, m: Match, player_id: int) -> str:
+        pid = self.partner_id(m, player_id)
+        return self._name(pid) if pid else ''
+
+    def rating_before(self, tournament_id: int, player_id: int) -> Optional[float]:
+        """Рейтинг игрока до турнира (для стадии — до головного турнира)."""
+        master_id, day = self.tournaments.get(tournament_id, (tournament_id, None))
+        timeline = self.timelines.get(player_id)
+        if timeline is None or day is None:
+            return None
+        return timeline.at(day, master_id)
+
+    def avg_before(self, tournament_id: int, ids: Iterable[Optional[int]]) -> Optional[float]:
+        """Средний рейтинг игроков ids до турнира tournament_id."""
+        vals = [v for v in (self.rating_before(tournament_id, pid) for pid in ids if pid) if v is not None]
+        if not vals:
+            return None
+        return sum(vals) / len(vals)
+
+
+def master_tournament(m: Match):
+    """Головной турнир матча (для стадий — родительский)."""
+    stage = m.tournament
+    return stage.parent_tournament if stage.parent_tournament_id else stage
+
+
+def load_match_bundle(matches: QuerySet) -> MatchBundle:
+    """Матчи (с командами и турнирами) и всё для их отображения — 3 запроса + таймлайны рейтинга."""
+    matches = list(
+        matches.select_related('team_1', 'team_2', 'tournament', 'tournament__parent_tournament')
+    )
+    bundle = MatchBundle(matches=matches)
+    if not matches:
+        return bundle
+
+    for s in MatchSet.objects.filter(match_id__in=[m.id for m in matches]).order_by('match_id', 'index'):
+        bundle.sets.setdefault(s.match_id, []).append(s)
+
+    player_ids = {pid for m in matches for team in (m.team_1, m.team_2) for pid in team_player_ids(team) if pid}
+    bundle.players = {
+        row['id']: row
+        for row in Player.objects.filter(id__in=player_ids).values('id', 'display_name', 'last_name', 'first_name')
+    }
+
+    for m in matches:
+        master = master_tournament(m)
+        bundle.tournaments[m.tournament_id] = bundle.tournaments[master.id] = (master.id, master.date)
+    bundle.timelines = load_rating_timelines(player_ids)
+    return bundle
+
+
+@dataclass
+class PlayerHistoryBundle(MatchBundle):
+    player_id: int = 0
+    # Строки PlayerRatingHistory по матчам: id, value, match_id
+    history: List[dict] = field(default_factory=list)
+
+    @property
+    def matches_by_id(self) -> Dict[int, Match]:
+        return {m.id: m for m in self.matches}
+
+
+def load_player_history_bundle(
+    player_id: int,
+    history: Optional[QuerySet] = None,
+) -> PlayerHistoryBundle:
+    """История рейтинга игрока по матчам + MatchBundle этих матчей — 4 запроса + таймлайны рейтинга.
+
+    history — выборка PlayerRatingHistory по матчам (фильтр/сортировка/срез);
+    по умолчанию вся история игрока по матчам в хронологическом порядке.
+    """
+    if history is None:
+        history = (
+            PlayerRatingHistory.objects
+            .filter(player_id=player_id, match__isnull=False)
+            .order_by('created_at', 'id')
+        )
+    rows = [row for row in history.values('id', 'value', 'created_at', 'match_id') if row['match_id']]
+    match_bundle = load_match_bundle(Match.objects.filter(id__in={row['match_id'] for row in rows}))
+    return PlayerHistoryBundle(
+        matches=match_bundle.matches,
+        sets=match_bundle.sets,
+        players=match_bundle.players,
+        timelines=match_bundle.timelines,
+        tournaments=match_bundle.tournaments,
+        player_id=player_id,
+        history=rows,
+    )
@@ -1,8 +1,12 @@
 """
 Сервис для определения стартового BP рейтинга игрока.
 """
-from typing import Optional
-from apps.players.services.btr_rating_mapper import calculate_initial_bp_rating_from_btr
+from typing import Dict, Iterable, Optional
+from apps.players.services.btr_rating_mapper import (
+    calculate_initial_bp_rating_from_btr,
+    calculate_initial_bp_ratings_from_btr,
+)
+from apps.players.services.rating_timeline import rating_at
 
 
 def get_initial_bp_rating(player, tournament=None) -> int:
@@ -49,6 +53,35 @@ def get_initial_bp_rating(player, tournament=None) -> int:
     return 1000
 
 
+def get_initial_bp_ratings(players: Iterable, tournament=None, persist: bool = True) -> Dict[int, int]:
+    """
+    Пакетный вариант get_initial_bp_rating: {player.id: стартовый BP рейтинг}.
+
+    Если передан турнир и у игрока уже была история рейтинга (рейтинг сброшен
+    в 0 откатом или очисткой), берётся его рейтинг на дату турнира из индекса
+    rating_timeline. Рейтинги игроков со связью BTR считаются одним запросом
+    (calculate_initial_bp_ratings_from_btr), остальные — по названию турнира.
+    persist=False — не сохранять собранные таймлайны (см. rating_timeline.load_rating_timelines).
+    """
+    players = list(players)
+    default_rating = get_initial_rating_for_player_without_btr(tournament.name if tournament else None)
+    historical: Dict[int, float] = {}
+    if tournament is not None and getattr(tournament, 'date', None):
+        historical = rating_at((player.id for player in players if player.id), tournament.date, persist=persist)
+    from_btr = calculate_initial_bp_ratings_from_btr(
+        player.btr_player_id for player in players if player.btr_player_id and historical.get(player.id, 0) <= 0
+    )
+    result: Dict[int, int] = {}
+    for player in players:
+        if historical.get(player.id, 0) > 0:
+            result[player.id] = int(round(historical[player.id]))
+        elif player.btr_player_id:
+            result[player.id] = from_btr[player.btr_player_id]
+        else:
+            result[player.id] = default_rating
+    return result
+
+
 def get_initial_rating_for_player_without_btr(tournament_name: Optional[str] = None) -> int:
     """
     Определяет стартовый BP рейтинг для игрока без связи с BTR.
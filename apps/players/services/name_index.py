@@ -0,0 +1,284 @@
+"""
+Индекс имён игроков для нечёткого сопоставления BP ↔ BTR и поиска дубликатов.
+
+Имя «Фамилия Имя» нормализуется (нижний регистр, ё → е, латиница →
+кириллица, только буквы), и для него сохраняются ключи PlayerNameKey:
+- exact    — нормализованные токены в алфавитном порядке (порядок
+             «имя фамилия» / «фамилия имя» не важен);
+- phonetic — упрощённый фонетический код токенов (оглушение согласных,
+             редукция гласных, схлопывание удвоений): Алексеев ≈ Алексеив;
+- trigram  — триграммы токенов (как в pg_trgm) для опечаток.
+
+Поиск кандидатов — выборка по индексу (source, kind, key), без перебора
+всех игроков; результат ранжируется: exact > phonetic > сходство триграмм.
+Для списка имён (find_name_candidates_bulk) число запросов не зависит от
+числа имён.
+Индекс обновляется сигналами при сохранении Player/BtrPlayer, а пакетные
+операции (импорт BTR) вызывают index_names явно.
+"""
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from django.db import transaction
+from django.db.models import Count, IntegerField, Max, Value
+
+from apps.players.models import PlayerNameKey
+
+Source = PlayerNameKey.Source
+Kind = PlayerNameKey.Kind
+
+# Минимальное сходство триграмм для кандидата
+DEFAULT_MIN_SCORE = 0.5
+# Оценки точного и фонетического совпадения
+EXACT_SCORE = 1.0
+PHONETIC_SCORE = 0.9
+# Сколько кандидатов по триграммам дочитывать до ранжирования
+TRIGRAM_SHORTLIST = 50
+# Сколько имён объединять в один UNION ALL по триграммам (SQLite — не более 500)
+BULK_CHUNK = 100
+
+# Латиница → кириллица (многобуквенные сочетания раньше одиночных)
+_TRANSLIT = [
+    ("shch", "щ"), ("sch", "щ"),
+    ("zh", "ж"), ("kh", "х"), ("ts", "ц"), ("ch", "ч"), ("sh", "ш"),
+    ("yu", "ю"), ("ya", "я"), ("yo", "е"), ("ye", "е"),
+    ("a", "а"), ("b", "б"), ("v", "в"), ("g", "г"), ("d", "д"), ("e", "е"),
+    ("z", "з"), ("i", "и"), ("j", "й"), ("k", "к"), ("l", "л"), ("m", "м"),
+    ("n", "н"), ("o", "о"), ("p", "п"), ("r", "р"), ("s", "с"), ("t", "т"),
+    ("u", "у"), ("f", "ф"), ("h", "х"), ("c", "к"), ("w", "в"), ("x", "кс"),
+    ("q", "к"),
+]
+_CYR_VOWELS = set("аеёиоуыэюя")
+
+# Фонетика: редукция гласных, оглушение согласных, мягкий/твёрдый знак
+_PHONETIC = str.maketrans({
+    "о": "а", "я": "а", "ы": "и", "е": "и", "э": "и", "й": "и", "ю": "у",
+    "б": "п", "в": "ф", "г": "к", "д": "т", "ж": "ш", "з": "с", "щ": "ш",
+    "ь": None, "ъ": None,
+})
+
+_NON_LETTERS = re.compile(r"[^a-zа-я]+")
+
+
+@dataclass(frozen=True)
+class NameCandidate:
+    object_id: int
+    score: float
+    match: str  # exact / phonetic / trigram
+
+
+def _transliterate(token: str) -> str:
+    out: List[str] = []
+    i = 0
+    while i < len(token):
+        # «y» после гласной — «й» (Andrey → андрей), иначе «ы»
+        if token[i] == "y" and not token.startswith(("yu", "ya", "yo", "ye"), i):
+            out.append("й" if out and out[-1] in _CYR_VOWELS else "ы")
+            i += 1
+            continue
+        for latin, cyrillic in _TRANSLIT:
+            if token.startswith(latin, i):
+                out.append(cyrillic)
+                i += len(latin)
+                break
+        else:
+            i += 1
+    return "".join(out)
+
+
+def name_tokens(*parts: Optional[str]) -> List[str]:
+    """Нормализованные токены имени: нижний регистр, ё → е, латиница → кириллица."""
+    text = " ".join(part for part in parts if part).lower().replace("ё", "е")
+    tokens = []
+    for token in _NON_LETTERS.split(text):
+        if not token:
+            continue
+        if re.search(r"[a-z]", token):
+            token = _transliterate(token).replace("ё", "е")
+        tokens.append(token)
+    return tokens
+
+
+def phonetic_code(token: str) -> str:
+    code = token.translate(_PHONETIC)
+    # Схлопываем удвоения: Алексеев → алексиф
+    return re.sub(r"(.)\1+", r"\1", code)
+
+
+def trigrams(tokens: Sequence[str]) -> set:
+    result = set()
+    for token in tokens:
+        padded = f"  {token} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def name_keys(last_name: Optional[str], first_name: Optional[str]) -> List[Tuple[str, str, int]]:
+    """Ключи индекса для имени: [(kind, key, size)]."""
+    tokens = name_tokens(last_name, first_name)
+    if not tokens:
+        return []
+    grams = trigrams(tokens)
+    keys = [
+        (Kind.EXACT, " ".join(sorted(tokens)), 0),
+        (Kind.PHONETIC, " ".join(sorted(phonetic_code(token) for token in tokens)), 0),
+    ]
+    keys.extend((Kind.TRIGRAM, gram, len(grams)) for gram in sorted(grams))
+    return keys
+
+
+def _rows(source: str, objects: Iterable) -> List[PlayerNameKey]:
+    return [
+        PlayerNameKey(source=source, object_id=obj.pk, kind=kind, key=key[:255], size=size)
+        for obj in objects
+        for kind, key, size in name_keys(obj.last_name, obj.first_name)
+    ]
+
+
+def index_names(source: str, objects: Iterable) -> None:
+    """Переиндексировать имена объектов (Player для BP, BtrPlayer для BTR)."""
+    objects = [obj for obj in objects if obj.pk]
+    if not objects:
+        return
+    with transaction.atomic():
+        PlayerNameKey.objects.filter(source=source, object_id__in=[obj.pk for obj in objects]).delete()
+        PlayerNameKey.objects.bulk_create(_rows(source, objects), batch_size=5000)
+
+
+def remove_names(source: str, object_ids: Iterable[int]) -> None:
+    PlayerNameKey.objects.filter(source=source, object_id__in=list(object_ids)).delete()
+
+
+def rebuild_name_index(source: Optional[str] = None, batch_size: int = 2000) -> int:
+    """Пересобрать индекс целиком (для одного источника или для обоих). Возвращает число ключей."""
+    from apps.btr.models import BtrPlayer
+    from apps.players.models import Player
+
+    models_by_source = {Source.BP: Player, Source.BTR: BtrPlayer}
+    total = 0
+    for src, model in models_by_source.items():
+        if source and src != source:
+            continue
+        with transaction.atomic():
+            PlayerNameKey.objects.filter(source=src).delete()
+            batch = []
+            for obj in model.objects.only("id", "last_name", "first_name").iterator(chunk_size=batch_size):
+                batch.append(obj)
+                if len(batch) >= batch_size:
+                    rows = _rows(src, batch)
+                    PlayerNameKey.objects.bulk_create(rows, batch_size=5000)
+                    total += len(rows)
+                    batch = []
+            rows = _rows(src, batch)
+            PlayerNameKey.objects.bulk_create(rows, batch_size=5000)
+            total += len(rows)
+    return total
+
+
+def find_name_candidates(
+    source: str,
+    last_name: Optional[str],
+    first_name: Optional[str],
+    limit: int = 10,
+    min_score: float = DEFAULT_MIN_SCORE,
+    exclude_ids: Iterable[int] = (),
+) -> List[NameCandidate]:
+    """Кандидаты из индекса source, ранжированные по убыванию сходства имени.
+
+    Два запроса по индексу: точные/фонетические ключи и триграммы.
+    """
+    return find_name_candidates_bulk(
+        source, {None: (last_name, first_name)}, limit=limit, min_score=min_score, exclude_ids=exclude_ids
+    )[None]
+
+
+def find_name_candidates_bulk(
+    source: str,
+    names: Mapping[Hashable, Tuple[Optional[str], Optional[str]]],
+    limit: int = 10,
+    min_score: float = DEFAULT_MIN_SCORE,
+    exclude_ids: Iterable[int] = (),
+) -> Dict[Hashable, List[NameCandidate]]:
+    """Кандидаты для набора имён {ключ: (фамилия, имя)} → {ключ: [NameCandidate]}.
+
+    Один запрос точных/фонетических ключей на все имена и по одному UNION ALL
+    триграмм на BULK_CHUNK имён. Результат для каждого имени тот же, что у
+    find_name_candidates.
+    """
+    exclude_ids = set(exclude_ids)
+    prepared = {}
+    for ref, (last_name, first_name) in names.items():
+        keys = name_keys(last_name, first_name)
+        if keys:
+            prepared[ref] = (keys[0][1], keys[1][1], [key for kind, key, _ in keys if kind == Kind.TRIGRAM])
+
+    best: Dict[Hashable, dict] = {ref: {} for ref in names}
+
+    def offer(ref: Hashable, object_id: int, score: float, match: str) -> None:
+        if object_id in exclude_ids or score < min_score:
+            return
+        current = best[ref].get(object_id)
+        if current is None or score > current.score:
+            best[ref][object_id] = NameCandidate(object_id, round(score, 3), match)
+
+    if prepared:
+        refs_by_key: Dict[Tuple[str, str], List[Hashable]] = {}
+        for ref, (exact_key, phonetic_key, _) in prepared.items():
+            refs_by_key.setdefault((Kind.EXACT, exact_key), []).append(ref)
+            refs_by_key.setdefault((Kind.PHONETIC, phonetic_key), []).append(ref)
+        whole = (
+            PlayerNameKey.objects
+            .filter(
+                source=source,
+                kind__in=[Kind.EXACT, Kind.PHONETIC],
+                key__in={key for _, key in refs_by_key},
+            )
+            .values_list("object_id", "kind", "key")
+        )
+        for object_id, kind, key in whole:
+            for ref in refs_by_key.get((kind, key), ()):
+                if kind == Kind.EXACT:
+                    offer(ref, object_id, EXACT_SCORE, "exact")
+                else:
+                    offer(ref, object_id, PHONETIC_SCORE, "phonetic")
+
+        refs = list(prepared)
+        for start in range(0, len(refs), BULK_CHUNK):
+            chunk = refs[start:start + BULK_CHUNK]
+            queries = []
+            for position, ref in enumerate(chunk):
+                grams = prepared[ref][2]
+                # Сходство Жаккара не меньше min_score только при hits >= min_score * |grams|
+                min_hits = math.ceil(min_score * len(grams) - 1e-9)
+                queries.append(
+                    PlayerNameKey.objects
+                    .filter(source=source, kind=Kind.TRIGRAM, key__in=grams)
+                    .values("object_id")
+                    .annotate(
+                        hits=Count("id"),
+                        size=Max("size"),
+                        position=Value(position, output_field=IntegerField()),
+                    )
+                    .filter(hits__gte=min_hits)
+                    .order_by()
+                    .values_list("position", "object_id", "hits", "size")
+                )
+            rows_by_position: Dict[int, list] = {}
+            for position, object_id, hits, size in queries[0].union(*queries[1:], all=True):
+                rows_by_position.setdefault(position, []).append((object_id, hits, size))
+            for position, rows in rows_by_position.items():
+                ref = chunk[position]
+                grams_count = len(prepared[ref][2])
+                rows.sort(key=lambda row: (-row[1], row[0]))
+                for object_id, hits, size in rows[:TRIGRAM_SHORTLIST]:
+                    # Коэффициент Жаккара по множествам триграмм
+                    offer(ref, object_id, hits / (grams_count + size - hits), "trigram")
+
+    return {
+        ref: sorted(candidates.values(), key=lambda c: (-c.score, c.object_id))[:limit]
+        for ref, candidates in best.items()
+    }
@@ -0,0 +1,177 @@
+"""
+Граф связей игроков (PlayerPairStats): сколько раз пара играла вместе и
+друг против друга, победы и дата последнего матча.
+
+Рёбра считаются только по завершённым матчам с обеими командами. При
+сохранении матча (сигналы в apps/players/signals.py) пересчитываются рёбра
+между участниками этого матча — это несколько запросов независимо от
+размера истории; при смене даты турнира — рёбра между его игроками.
+Удаления матчей (в том числе каскадом вместе с турниром) идут queryset'ом
+без сигналов: места удаления собирают игроков через match_player_ids() до
+удаления и вызывают refresh_pair_stats() один раз. Полная пересборка —
+rebuild_pair_stats() / команда rebuild_player_pair_stats.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+
+from apps.matches.models import Match
+from apps.players.models import PlayerPairStats
+
+# (id, team_1_id, team_2_id, winner_id, t1p1, t1p2, t2p1, t2p2, дата турнира)
+MATCH_ROW_FIELDS = (
+    "id",
+    "team_1_id",
+    "team_2_id",
+    "winner_id",
+    "team_1__player_1_id",
+    "team_1__player_2_id",
+    "team_2__player_1_id",
+    "team_2__player_2_id",
+    "tournament__date",
+)
+
+
+@dataclass
+class PairCounters:
+    partner_matches: int = 0
+    partner_wins: int = 0
+    last_partner_date: Optional[date] = None
+    opponent_matches: int = 0
+    opponent_wins: int = 0
+    last_opponent_date: Optional[date] = None
+
+
+def _later(current: Optional[date], value: Optional[date]) -> Optional[date]:
+    if value is None:
+        return current
+    return value if current is None or value > current else current
+
+
+def accumulate_pair_stats(
+    rows: Iterable[tuple],
+    only_players: Optional[Set[int]] = None,
+) -> Dict[Tuple[int, int], PairCounters]:
+    """Посчитать рёбра по строкам матчей (MATCH_ROW_FIELDS).
+
+    only_players — учитывать только рёбра, оба конца которых в этом множестве.
+    """
+    stats: Dict[Tuple[int, int], PairCounters] = {}
+
+    def edge(a: int, b: int) -> Optional[PairCounters]:
+        if only_players is not None and (a not in only_players or b not in only_players):
+            return None
+        counters = stats.get((a, b))
+        if counters is None:
+            counters = stats[(a, b)] = PairCounters()
+        return counters
+
+    for _id, team_1_id, team_2_id, winner_id, t1p1, t1p2, t2p1, t2p2, played in rows:
+        side_1 = [pid for pid in (t1p1, t1p2) if pid]
+        side_2 = [pid for pid in (t2p1, t2p2) if pid]
+        won_1 = winner_id is not None and winner_id == team_1_id
+        won_2 = winner_id is not None and winner_id == team_2_id
+
+        for side, won in ((side_1, won_1), (side_2, won_2)):
+            for a in side:
+                for b in side:
+                    if a == b:
+                        continue
+                    counters = edge(a, b)
+                    if counters:
+                        counters.partner_matches += 1
+                        counters.partner_wins += int(won)
+                        counters.last_partner_date = _later(counters.last_partner_date, played)
+
+        for a in side_1:
+            for b in side_2:
+                for x, y, won in ((a, b, won_1), (b, a, won_2)):
+                    counters = edge(x, y)
+                    if counters:
+                        counters.opponent_matches += 1
+                        counters.opponent_wins += int(won)
+                        counters.last_opponent_date = _later(counters.last_opponent_date, played)
+    return stats
+
+
+def _completed_matches():
+    return Match.objects.filter(
+        status=Match.Status.COMPLETED,
+        team_1__isnull=False,
+        team_2__isnull=False,
+    )
+
+
+def _rows_to_objects(stats: Dict[Tuple[int, int], PairCounters]) -> List[PlayerPairStats]:
+    return [
+        PlayerPairStats(player_id=a, other_id=b, **counters.__dict__)
+        for (a, b), counters in stats.items()
+    ]
+
+
+def match_player_ids(matches) -> Set[int]:
+    """Игроки завершённых матчей из queryset matches (собирать до удаления матчей)."""
+    rows = matches.filter(
+        status=Match.Status.COMPLETED,
+        team_1__isnull=False,
+        team_2__isnull=False,
+    ).values_list(
+        "team_1__player_1_id",
+        "team_1__player_2_id",
+        "team_2__player_1_id",
+        "team_2__player_2_id",
+    )
+    return {pid for row in rows for pid in row if pid}
+
+
+def refresh_pair_stats(player_ids: Iterable[Optional[int]]) -> None:
+    """Пересчитать рёбра между указанными игроками (участниками матча или турнира)."""
+    ids = {pid for pid in player_ids if pid}
+    if len(ids) < 2:
+        return
+    involving = (
+        Q(team_1__player_1_id__in=ids)
+        | Q(team_1__player_2_id__in=ids)
+        | Q(team_2__player_1_id__in=ids)
+        | Q(team_2__player_2_id__in=ids)
+    )
+    rows = _completed_matches().filter(involving).values_list(*MATCH_ROW_FIELDS)
+    stats = accumulate_pair_stats(rows, only_players=ids)
+    with transaction.atomic():
+        PlayerPairStats.objects.filter(player_id__in=ids, other_id__in=ids).delete()
+        PlayerPairStats.objects.bulk_create(_rows_to_objects(stats))
+
+
+def rebuild_pair_stats(batch_size: int = 5000) -> int:
+    """Пересобрать граф целиком по всем завершённым матчам. Возвращает число рёбер."""
+    rows = _completed_matches().values_list(*MATCH_ROW_FIELDS).iterator(chunk_size=batch_size)
+    objects = _rows_to_objects(accumulate_pair_stats(rows))
+    with transaction.atomic():
+        PlayerPairStats.objects.all().delete()
+        PlayerPairStats.objects.bulk_create(objects, batch_size=batch_size)
+    return len(objects)
+
+
+def get_pair_stats(player_id: int) -> List[PlayerPairStats]:
+    """Все рёбра игрока (напарники и соперники)."""
+    return list(PlayerPairStats.objects.filter(player_id=player_id).order_by("other_id"))
+
+
+def recommended_partner_ids(player_id: int, recent: int = 3, total: int = 5) -> List[int]:
+    """Рекомендуемые напарники: recent последних + самые частые, всего не больше total."""
+    partners = [edge for edge in get_pair_stats(player_id) if edge.partner_matches]
+    by_recent = sorted(partners, key=lambda e: (e.last_partner_date or date.min, e.partner_matches), reverse=True)
+    by_count = sorted(partners, key=lambda e: (e.partner_matches, e.last_partner_date or date.min), reverse=True)
+
+    result: List[int] = [edge.other_id for edge in by_recent[:recent]]
+    for edge in by_count:
+        if len(result) >= total:
+            break
+        if edge.other_id not in result:
+            result.append(edge.other_id)
+    return result
@@ -0,0 +1,163 @@
+"""
+Параллельный полный пересчёт рейтинга по турнирам.
+
+Последовательный пересчёт (scripts/full_rating_recalculation.py, шаг 5) идёт
+по турнирам строго по одному. Турнир зависит только от предыдущих турниров
+со общими игроками: его «рейтинг до» — результат их расчёта. Поэтому турниры
+раскладываются по волнам графа зависимостей (dependency_waves): в одной
+волне нет общих игроков, и чистый расчёт (rating_service.plan_tournament_ratings)
+волны идёт в пуле процессов.
+
+Запись в БД выполняется в главном процессе строго в последовательном
+порядке турниров, каждый турнир — своей транзакцией, как
+compute_ratings_for_tournament. Результат (рейтинги, история, агрегаты и
+порядок их записи) совпадает с последовательным пересчётом.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from django.db import transaction
+
+from apps.players.services import rating_service
+from apps.players.services.rating_service import TournamentRatingInput, TournamentRatingPlan
+from apps.tournaments.models import Tournament
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ParallelRecomputeResult:
+    processed: List[int] = field(default_factory=list)
+    # tournament_id -> текст ошибки расчёта
+    errors: Dict[int, str] = field(default_factory=dict)
+    waves: int = 0
+
+
+def dependency_waves(order: Sequence[int], players_by_tournament: Dict[int, Iterable[int]]) -> List[List[int]]:
+    """Волны графа зависимостей турниров.
+
+    Ребро A → B, если A идёт раньше B в order и у них есть общий игрок.
+    Волна турнира — на единицу больше самой поздней волны его предшественников,
+    так что турниры одной волны не пересекаются по игрокам. Внутри волны
+    турниры идут в порядке order.
+    """
+    last_wave: Dict[int, int] = {}
+    waves: List[List[int]] = []
+    for tournament_id in order:
+        players = set(players_by_tournament.get(tournament_id, ()))
+        wave = max((last_wave[pid] + 1 for pid in players if pid in last_wave), default=0)
+        if wave == len(waves):
+            waves.append([])
+        waves[wave].append(tournament_id)
+        for pid in players:
+            last_wave[pid] = wave
+    return waves
+
+
+def _init_worker() -> None:
+    # При spawn-запуске воркера Django ещё не настроен (модели нужны для распаковки задач)
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def _plan(job) -> TournamentRatingPlan:
+    data, ratings_before, k_factor = job
+    return rating_service.plan_tournament_ratings(data, ratings_before, k_factor)
+
+
+def recompute_tournaments_parallel(
+    tournaments: Sequence[Tournament],
+    workers: Optional[int] = None,
+    k_factor: float = 32.0,
+    on_applied: Optional[Callable[[Tournament, Optional[str]], None]] = None,
+) -> ParallelRecomputeResult:
+    """Пересчитать одиночные турниры в заданном порядке (как compute_ratings_for_tournament по очереди).
+
+    workers — размер пула процессов (None — число ядер, 1 — без пула).
+    on_applied(tournament, error) вызывается по каждому турниру в последовательном порядке.
+    Ошибка расчёта турнира не прерывает пересчёт (рейтинги его игроков не меняются,
+    как при откате в последовательном режиме); ошибка записи в БД прерывает его.
+    """
+    workers = workers or os.cpu_count() or 1
+    by_id = {t.id: t for t in tournaments}
+    order = [t.id for t in tournaments]
+    position = {tid: index for index, tid in enumerate(order)}
+    inputs, players_map = rating_service.load_tournament_rating_inputs(list(tournaments))
+    waves = dependency_waves(order, {tid: inputs[tid].player_ids for tid in order})
+    result = ParallelRecomputeResult(waves=len(waves))
+    logger.info("[recompute] Параллельный пересчёт: турниров=%s, волн=%s, процессов=%s", len(order), len(waves), workers)
+
+    plans: Dict[int, Optional[TournamentRatingPlan]] = {}
+    next_to_apply = 0
+
+    def apply_ready() -> None:
+        # Запись — строго в исходном порядке турниров
+        nonlocal next_to_apply
+        while next_to_apply < len(order) and order[next_to_apply] in plans:
+            tid = order[next_to_apply]
+            plan = plans.pop(tid)
+            if plan is not None:
+                with transaction.atomic():
+                    rating_service.apply_tournament_rating_plan(plan)
+                result.processed.append(tid)
+            if on_applied is not None:
+                on_applied(by_id[tid], result.errors.get(tid))
+            next_to_apply += 1
+
+    pool: Optional[Executor] = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers > 1 else None
+    try:
+        for wave in waves:
+            jobs: List[tuple] = []
+            for tid in wave:
+                data: TournamentRatingInput = inputs[tid]
+                if not data.matches:
+                    # Нет завершённых матчей — рейтинг не меняется
+                    plans[tid] = None
+                    result.processed.append(tid)
+                    continue
+                wave_players = {pid: players_map[pid] for pid in data.player_ids}
+                ratings_before = rating_service._initial_ratings_before(wave_players, by_id[tid], "Турнир")
+                jobs.append((data, ratings_before, k_factor))
+
+            if pool is not None and len(jobs) > 1:
+                futures = [pool.submit(_plan, job) for job in jobs]
+                outcomes = []
+                for future in futures:
+                    try:
+                        outcomes.append(future.result())
+                    except Exception as exc:
+                        outcomes.append(exc)
+            else:
+                outcomes = []
+                for job in jobs:
+                    try:
+                        outcomes.append(_plan(job))
+                    except Exception as exc:
+                        outcomes.append(exc)
+
+            for (data, _, _), outcome in zip(jobs, outcomes):
+                tid = data.tournament_id
+                if isinstance(outcome, Exception):
+                    logger.error("[recompute] Турнир #%s: ошибка расчёта: %s", tid, outcome)
+                    result.errors[tid] = str(outcome)
+                    plans[tid] = None
+                    continue
+                # Следующие волны берут «рейтинг до» из памяти, не дожидаясь записи
+                for pid, after in outcome.ratings_after.items():
+                    players_map[pid].current_rating = after
+                plans[tid] = outcome
+            apply_ready()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    result.processed.sort(key=position.__getitem__)
+    return result
@@ -0,0 +1,86 @@
+"""
+Поиск игроков по строке (typeahead): общий сервис для всех эндпоинтов поиска.
+
+Ищем по денормализованной колонке Player.search_text (нижний регистр, ё → е,
+ФИО + отображаемое имя + город), которая пересчитывается в Player.save().
+В PostgreSQL по ней построен GIN-индекс pg_trgm (миграция 0008), поэтому
+LIKE '%токен%' и word_similarity не сканируют таблицу целиком.
+
+Ранжирование:
+- 3 — строка запроса — префикс «фамилия имя …» («иванов ив»);
+- 2 — каждый токен запроса — начало какого-либо слова;
+- 1 — каждый токен запроса встречается как подстрока;
+- 0 — только нечёткое совпадение по триграммам (опечатки, только PostgreSQL).
+Внутри уровня — по сходству триграмм (PostgreSQL), затем по фамилии и имени.
+"""
+from __future__ import annotations
+
+from typing import Iterable, List, Optional
+
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, QuerySet, Value, When
+
+from apps.players.models import Player, build_search_text
+
+DEFAULT_LIMIT = 20
+
+RANK_PREFIX = 3
+RANK_TOKEN = 2
+RANK_SUBSTRING = 1
+RANK_TRIGRAM = 0
+
+
+def _all_tokens(tokens: List[str], word_start: bool) -> Q:
+    condition = Q()
+    for token in tokens:
+        condition &= Q(search_text__contains=f" {token}" if word_start else token)
+    return condition
+
+
+def search_players(
+    query: Optional[str],
+    limit: Optional[int] = DEFAULT_LIMIT,
+    queryset: Optional[QuerySet] = None,
+    exclude_ids: Iterable[int] = (),
+) -> List[Player]:
+    """Игроки, подходящие под запрос, в порядке релевантности.
+
+    queryset — базовая выборка (select_related, дополнительные фильтры);
+    у найденных игроков заполнен атрибут search_rank.
+    """
+    normalized = build_search_text(query)
+    tokens = normalized.split()
+    if not tokens:
+        return []
+
+    qs = queryset if queryset is not None else Player.objects.all()
+    exclude_ids = [pk for pk in exclude_ids if pk]
+    if exclude_ids:
+        qs = qs.exclude(id__in=exclude_ids)
+
+    matched = _all_tokens(tokens, word_start=False)
+    rank = Case(
+        When(search_text__startswith=normalized, then=Value(RANK_PREFIX)),
+        When(_all_tokens(tokens, word_start=True), then=Value(RANK_TOKEN)),
+        When(matched, then=Value(RANK_SUBSTRING)),
+        default=Value(RANK_TRIGRAM),
+        output_field=IntegerField(),
+    )
+    ordering = ["-search_rank"]
+
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.lookups import TrigramWordSimilar
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        query_text = normalized.strip()
+        # search_text %> 'запрос' — word_similarity выше порога pg_trgm, использует GIN-индекс
+        qs = qs.filter(matched | Q(TrigramWordSimilar(F("search_text"), Value(query_text))))
+        qs = qs.annotate(search_similarity=TrigramWordSimilarity(Value(query_text), "search_text"))
+        ordering.append("-search_similarity")
+    else:
+        qs = qs.filter(matched)
+
+    qs = qs.annotate(search_rank=rank).order_by(*ordering, "last_name", "first_name", "id")
+    if limit is not None:
+        qs = qs[:limit]
+    return list(qs)
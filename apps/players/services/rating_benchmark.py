@@ -0,0 +1,350 @@
+"""
+Бенчмарк и регрессия расчёта рейтинга на синтетической истории.
+
+generate_history() создаёт N игроков и M турниров (круговая, Кинг, олимпийка,
+часть — многостадийные: круговая + плей-офф) со счетами из одного сета,
+тай-брейка, 2–3 сетов с чемпионским тай-брейком, без сетов, без победителя и
+с участниками вне зачёта. run_serial() прогоняет по истории
+compute_ratings_for_tournament / compute_ratings_for_multi_stage_tournament
+в хронологическом порядке, run_recompute_history() — recompute_history
+(после reset_history), замеряя время и число запросов каждого вызова.
+
+snapshot() — итог (рейтинги, история, агрегаты) в терминах порядковых номеров
+синтетических игроков/турниров/матчей, не зависящий от ID в БД; его сверяют с
+эталонным файлом (diff_snapshots). Любая оптимизация пути расчёта рейтинга
+должна оставлять эталон неизменным и укладываться в QUERY_BUDGETS.
+Используется командой benchmark_rating и тестами.
+"""
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import random
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.matches.models import Match, MatchSet
+from apps.players.models import Player, PlayerRatingDynamic, PlayerRatingHistory
+from apps.players.services import rating_service
+from apps.players.services.rating_timeline import invalidate_rating_timelines
+from apps.teams.models import Team
+from apps.tournaments.models import Ruleset, SetFormat, Tournament, TournamentEntry
+
+NAME_PREFIX = "BENCH"
+START_DATE = date(2020, 1, 1)
+
+# Предельное число запросов на один вызов; расчёт не должен зависеть от размера турнира
+QUERY_BUDGETS = {
+    "compute_ratings_for_tournament": 20,
+    "compute_ratings_for_multi_stage_tournament": 20,
+}
+
+
+@dataclass(frozen=True)
+class BenchmarkConfig:
+    players: int = 200
+    tournaments: int = 40
+    seed: int = 42
+    # Каждый n-й турнир — многостадийный (круговая + плей-офф); 0 — без многостадийных
+    multi_stage_every: int = 5
+
+
+@dataclass
+class SyntheticHistory:
+    config: BenchmarkConfig
+    players: List[Player]
+    # Мастер-турниры в порядке расчёта (дата, название)
+    masters: List[Tournament]
+    # master_id -> ID стадий (включая мастер) для многостадийных
+    stages: Dict[int, List[int]] = field(default_factory=dict)
+
+
+@dataclass
+class OperationStats:
+    name: str
+    calls: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    max_queries: int = 0
+
+    def add(self, seconds: float, queries: int) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.max_queries = max(self.max_queries, queries)
+
+    @property
+    def over_budget(self) -> bool:
+        budget = QUERY_BUDGETS.get(self.name)
+        return budget is not None and self.max_queries > budget
+
+
+class _Generator:
+    def __init__(self, config: BenchmarkConfig):
+        self.config = config
+        self.rnd = random.Random(config.seed)
+        self.set_format, _ = SetFormat.objects.get_or_create(name=f"{NAME_PREFIX} формат")
+        self.ruleset, _ = Ruleset.objects.get_or_create(name=f"{NAME_PREFIX} регламент", defaults={"ordering_priority": []})
+        self.teams: Dict[Tuple[int, Optional[int]], Team] = {}
+
+    def players(self) -> List[Player]:
+        # Каждый пятый без рейтинга — путь стартового рейтинга по названию турнира
+        return Player.objects.bulk_create([
+            Player(last_name=f"{NAME_PREFIX}{i:05d}", first_name="Игрок",
+                   current_rating=0 if i % 5 == 0 else self.rnd.randint(700, 1400))
+            for i in range(self.config.players)
+        ])
+
+    def team(self, p1: Player, p2: Player) -> Team:
+        key = (p1.id, p2.id)
+        if key not in self.teams:
+            self.teams[key] = Team.objects.create(player_1=p1, player_2=p2)
+        return self.teams[key]
+
+    def tournament(self, index: int, system: str, parent: Optional[Tournament] = None, stage_order: int = 0) -> Tournament:
+        level = ("hard", "medium", "")[index % 3]
+        return Tournament.objects.create(
+            name=f"{NAME_PREFIX} {index:04d} {system} {level}".strip() if parent is None else f"{NAME_PREFIX} {index:04d} плей-офф",
+            date=START_DATE + timedelta(days=index),
+            system=system,
+            set_format=self.set_format,
+            ruleset=self.ruleset,
+            status=Tournament.Status.COMPLETED,
+            rating_coefficient=self.rnd.choice([0.8, 1.0, 1.0, 1.2]),
+            parent_tournament=parent,
+            stage_order=stage_order,
+        )
+
+    def score(self) -> Tuple[int, List[dict]]:
+        """(победитель 1/2, сеты) — формат выбирается случайно."""
+        winner = self.rnd.choice([1, 2])
+        kind = self.rnd.random()
+        if kind < 0.05:
+            return winner, []
+        if kind < 0.25:
+            # Один тай-брейк (режим «только тай-брейк»: очки TB в геймах)
+            loser_points = self.rnd.randint(0, 8)
+            tb = (10, loser_points) if winner == 1 else (loser_points, 10)
+            return winner, [dict(games_1=tb[0], games_2=tb[1], tb_1=tb[0], tb_2=tb[1], is_tiebreak_only=True)]
+        if kind < 0.7:
+            loser_games = self.rnd.randint(0, 4)
+            return winner, [dict(games_1=6 if winner == 1 else loser_games, games_2=loser_games if winner == 1 else 6)]
+        # До двух побед: 2:0 или 2:1 с чемпионским тай-брейком (1:0 / 0:1)
+        sets = []
+        if self.rnd.random() < 0.5:
+            sets.append(dict(games_1=6 if winner == 1 else 3, games_2=3 if winner == 1 else 6))
+            sets.append(dict(games_1=7 if winner == 1 else 5, games_2=5 if winner == 1 else 7))
+        else:
+            sets.append(dict(games_1=6, games_2=4))
+            sets.append(dict(games_1=2, games_2=6))
+            tb = (10, 6) if winner == 1 else (6, 10)
+            sets.append(dict(games_1=int(winner == 1), games_2=int(winner == 2), tb_1=tb[0], tb_2=tb[1], is_tiebreak_only=True))
+        return winner, sets
+
+    def matches(
+        self, tournament: Tournament, pairs: List[Tuple[Optional[Team], Optional[Team]]], stage: str
+    ) -> List[Tuple[Team, Optional[Team]]]:
+        """Завершённые матчи пар; возвращает (прошедший дальше, выбывший) для каждой пары."""
+        matches: List[Match] = []
+        scores: List[List[dict]] = []
+        outcomes: List[Tuple[Team, Optional[Team]]] = []
+        for order, (team_1, team_2) in enumerate(pairs):
+            winner_side, sets = self.score()
+            if team_2 is None:
+                # BYE в сетке: победитель без соперника и без счёта
+                winner, sets = team_1, []
+            elif self.rnd.random() < 0.03:
+                # Завершён без победителя
+                winner = None
+            else:
+                winner = team_1 if winner_side == 1 else team_2
+            matches.append(Match(
+                tournament=tournament, team_1=team_1, team_2=team_2, winner=winner, stage=stage,
+                status=Match.Status.COMPLETED, round_index=1, order_in_round=order,
+            ))
+            scores.append(sets)
+            advanced = winner or team_1
+            outcomes.append((advanced, team_2 if advanced is team_1 else team_1))
+        Match.objects.bulk_create(matches)
+        MatchSet.objects.bulk_create([
+            MatchSet(match=match, index=index, **s)
+            for match, sets in zip(matches, scores)
+            for index, s in enumerate(sets, start=1)
+        ])
+        return outcomes
+
+    def entries(self, tournament: Tournament, teams: List[Team]) -> None:
+        # bulk_create — без сигналов регистрации; вне зачёта изредка последняя команда
+        out = self.rnd.random() < 0.2
+        TournamentEntry.objects.bulk_create([
+            TournamentEntry(tournament=tournament, team=team, group_index=1, row_index=row,
+                            is_out_of_competition=out and row == len(teams))
+            for row, team in enumerate(teams, start=1)
+        ])
+
+    def pairs_of(self, players: List[Player]) -> List[Team]:
+        return [self.team(players[i], players[i + 1]) for i in range(0, len(players) - 1, 2)]
+
+    def round_robin(self, tournament: Tournament, players: List[Player]) -> List[Team]:
+        teams = self.pairs_of(players)
+        self.entries(tournament, teams)
+        self.matches(tournament, [(a, b) for i, a in enumerate(teams) for b in teams[i + 1:]], Match.Stage.GROUP)
+        return teams
+
+    def king(self, tournament: Tournament, players: List[Player]) -> None:
+        # Группы по 4: ab–cd, ac–bd, ad–bc
+        pairs = []
+        for g in range(0, len(players) - 3, 4):
+            a, b, c, d = players[g:g + 4]
+            pairs += [(self.team(a, b), self.team(c, d)), (self.team(a, c), self.team(b, d)), (self.team(a, d), self.team(b, c))]
+        self.matches(tournament, pairs, Match.Stage.GROUP)
+
+    def knockout(self, tournament: Tournament, teams: List[Team]) -> None:
+        self.entries(tournament, teams)
+        # Сетка на 4 или 8 (недостающие — BYE), затем полуфиналы, финал и матч за 3-е место
+        size = 4 if len(teams) <= 4 else 8
+        seeded: List[Optional[Team]] = list(teams[:size]) + [None] * (size - len(teams[:size]))
+        pairs = [(seeded[i], seeded[size - 1 - i]) for i in range(size // 2)]
+        while len(pairs) > 2:
+            winners = [w for w, _ in self.matches(tournament, pairs, Match.Stage.PLAYOFF)]
+            pairs = [(winners[i], winners[len(winners) - 1 - i]) for i in range(len(winners) // 2)]
+        semis = self.matches(tournament, pairs, Match.Stage.PLAYOFF)
+        (w1, l1), (w2, l2) = semis
+        self.matches(tournament, [(w1, w2), (l1, l2)], Match.Stage.PLAYOFF)
+
+
+def generate_history(config: BenchmarkConfig) -> SyntheticHistory:
+    """Синтетическая история в текущей БД (вызывать внутри откатываемой транзакции)."""
+    gen = _Generator(config)
+    players = gen.players()
+    history = SyntheticHistory(config=config, players=players, masters=[])
+    systems = [Tournament.System.ROUND_ROBIN, Tournament.System.KING, Tournament.System.KNOCKOUT]
+    for index in range(config.tournaments):
+        participants = gen.rnd.sample(players, min(len(players), gen.rnd.choice([8, 12, 16])))
+        if config.multi_stage_every and index % config.multi_stage_every == config.multi_stage_every - 1:
+            master = gen.tournament(index, Tournament.System.ROUND_ROBIN)
+            teams = gen.round_robin(master, participants)
+            playoff = gen.tournament(index, Tournament.System.KNOCKOUT, parent=master, stage_order=1)
+            gen.knockout(playoff, teams)
+            history.stages[master.id] = [master.id, playoff.id]
+        else:
+            system = systems[index % len(systems)]
+            master = gen.tournament(index, system)
+            if system == Tournament.System.ROUND_ROBIN:
+                gen.round_robin(master, participants)
+            elif system == Tournament.System.KING:
+                gen.king(master, participants)
+            else:
+                gen.knockout(master, gen.pairs_of(participants))
+        history.masters.append(master)
+    history.masters.sort(key=lambda t: (t.date, t.name))
+    return history
+
+
+def _measure(stats: OperationStats, fn: Callable[[], None]) -> None:
+    with CaptureQueriesContext(connection) as ctx, contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+    stats.add(elapsed, len(ctx.captured_queries))
+
+
+def run_serial(history: SyntheticHistory) -> Dict[str, OperationStats]:
+    """Расчёт по турнирам в хронологическом порядке, как recompute_history, с замером каждого вызова."""
+    single = OperationStats("compute_ratings_for_tournament")
+    multi = OperationStats("compute_ratings_for_multi_stage_tournament")
+    for master in history.masters:
+        stage_ids = history.stages.get(master.id)
+        if stage_ids:
+            _measure(multi, lambda: rating_service.compute_ratings_for_multi_stage_tournament(master.id, stage_ids))
+        else:
+            _measure(single, lambda: rating_service.compute_ratings_for_tournament(master.id))
+    return {single.name: single, multi.name: multi}
+
+
+def reset_history(history: SyntheticHistory, initial_ratings: Dict[int, int]) -> None:
+    """Вернуть синтетических игроков в исходное состояние (без истории рейтинга)."""
+    player_ids = [p.id for p in history.players]
+    invalidate_rating_timelines(player_ids)
+    PlayerRatingHistory.objects.filter(player_id__in=player_ids).delete()
+    PlayerRatingDynamic.objects.filter(player_id__in=player_ids).delete()
+    Player.objects.bulk_update(
+        [Player(id=pid, current_rating=rating) for pid, rating in initial_ratings.items()], ["current_rating"]
+    )
+
+
+def run_recompute_history(history: SyntheticHistory) -> OperationStats:
+    stats = OperationStats("recompute_history")
+    options = rating_service.RecomputeOptions(tournaments=[t.id for t in history.masters])
+    _measure(stats, lambda: rating_service.recompute_history(options))
+    return stats
+
+
+def snapshot(history: SyntheticHistory) -> dict:
+    """Итог расчёта в порядковых номерах синтетических сущностей (без ID БД)."""
+    player_index = {p.id: i for i, p in enumerate(history.players)}
+    tournaments = Tournament.objects.filter(name__startswith=f"{NAME_PREFIX} ").order_by("date", "stage_order", "id")
+    tournament_index = {tid: i for i, tid in enumerate(tournaments.values_list("id", flat=True))}
+    match_index = {
+        mid: i for i, mid in enumerate(
+            Match.objects.filter(tournament_id__in=tournament_index).order_by("id").values_list("id", flat=True)
+        )
+    }
+    player_ids = list(player_index)
+    ratings = dict(Player.objects.filter(id__in=player_ids).values_list("id", "current_rating"))
+    rows = PlayerRatingHistory.objects.filter(player_id__in=player_ids).order_by("id")
+    dynamics = PlayerRatingDynamic.objects.filter(player_id__in=player_ids).order_by("id")
+    return {
+        "config": asdict(history.config),
+        "ratings": [ratings[p.id] for p in history.players],
+        "history": [
+            [player_index[h.player_id], tournament_index[h.tournament_id], match_index[h.match_id], h.value, h.reason]
+            for h in rows
+        ],
+        "dynamics": [
+            [
+                player_index[d.player_id], tournament_index[d.tournament_id], d.rating_before, d.rating_after,
+                d.total_change, d.matches_count,
+                [
+                    [match_index[m["match_id"]], m["change"], m["opponent_team_rating"], m["format_modifier"]]
+                    for m in d.meta or []
+                ],
+            ]
+            for d in dynamics
+        ],
+    }
+
+
+def diff_snapshots(expected: dict, actual: dict, limit: int = 20) -> List[str]:
+    """Расхождения с эталоном (не больше limit строк); пустой список — совпадает."""
+    if expected.get("config") != actual.get("config"):
+        return [f"другие параметры генерации: эталон {expected.get('config')}, прогон {actual.get('config')}"]
+    lines: List[str] = []
+    for key in ("ratings", "history", "dynamics"):
+        exp, act = expected.get(key, []), actual.get(key, [])
+        if len(exp) != len(act):
+            lines.append(f"{key}: {len(exp)} строк в эталоне, {len(act)} в прогоне")
+        for i, (e, a) in enumerate(zip(exp, act)):
+            if e != a:
+                lines.append(f"{key}[{i}]: эталон {e!r}, прогон {a!r}")
+                if len(lines) >= limit:
+                    return lines
+    return lines
+
+
+def dump_golden(result: Dict[str, dict]) -> str:
+    """Эталон в JSON по строке на запись — чтобы изменения были читаемы в diff."""
+    sections = []
+    for section, snap in result.items():
+        parts = [f'  "config": {json.dumps(snap["config"])}', f'  "ratings": {json.dumps(snap["ratings"])}']
+        for key in ("history", "dynamics"):
+            rows = ",\n   ".join(json.dumps(row, ensure_ascii=False) for row in snap[key])
+            parts.append(f'  "{key}": [\n   {rows}\n  ]' if rows else f'  "{key}": []')
+        sections.append(f' "{section}": {{\n' + ",\n".join(parts) + "\n }")
+    return "{\n" + ",\n".join(sections) + "\n}\n"
@@ -1,18 +1,22 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, FrozenSet, List, Optional, Tuple
 import logging
 
 from django.db import models, transaction
 
 from apps.players.models import Player, PlayerRatingHistory, PlayerRatingDynamic
-from apps.tournaments.models import Tournament
+from apps.tournaments.models import Tournament, TournamentEntry
 from apps.matches.models import Match, MatchSet
-from apps.players.services.initial_rating_service import get_initial_bp_rating
+from apps.players.services.initial_rating_service import get_initial_bp_ratings
+from apps.players.services.rating_timeline import invalidate_rating_timelines
 
 
 logger = logging.getLogger(__name__)
 
+# Поля агрегата PlayerRatingDynamic, которые пишет расчёт
+DYNAMIC_FIELDS = ('tournament_date', 'rating_before', 'rating_after', 'total_change', 'matches_count', 'meta')
+
 
 @dataclass
 class RecomputeOptions:
@@ -33,7 +37,7 @@ def _team_rating(p1: float, p2: Optional[float]) -> float:
     return (p1 + (p2 if p2 is not None else p1)) / 2.0
 
 
-def _format_modifier(match_id: int) -> float:
+def _format_modifier_from_sets(match_id: int, sets: List[MatchSet]) -> float:
     """Рассчитывает форматный множитель на основе количества и результатов сетов.
     
     Правила:
@@ -41,8 +45,9 @@ def _format_modifier(match_id: int) -> float:
     - Один полный сет: 1.0
     - Несколько сетов: 1.0 + 0.1 * |diff_sets|, где diff_sets - разница выигранных сетов
       Примеры: 2:0 → 1.2, 3:0 → 1.3, 2:1 → 1.1, 3:1 → 1.2, 1:1 → 1.0
+
+    sets — сеты матча по порядку (index).
     """
-    sets = list(MatchSet.objects.filter(match_id=match_id).order_by('index'))
     if not sets:
         # Частая ситуация при старых данных: матч завершён, но нет детализации по сетам.
         # Для прозрачности логируем это при полном пересчёте.
@@ -64,119 +69,198 @@ def _format_modifier(match_id: int) -> float:
     return 1.0 + diff_sets * 0.1
 
 
-@transaction.atomic
-def compute_ratings_for_tournament(tournament_id: int, k_factor: float = 32.0) -> None:
-    """
-    Полный расчёт рейтинга для одного турнира:
-    - Накапливаем изменения по матчам внутри турнира, но применяем к игрокам одним действием (после турнира)
-    - Пишем per-match записи в PlayerRatingHistory (значение = rating_after, reason = модификаторы)
-    - Пишем агрегат в PlayerRatingDynamic
-    - Обновляем Player.current_rating
-    - Применяем коэффициент турнира (rating_coefficient) к изменениям рейтинга
-    """
-    tournament = Tournament.objects.select_for_update().get(id=tournament_id)
-    tournament_date = getattr(tournament, 'date', None)
-    tournament_coefficient = float(getattr(tournament, 'rating_coefficient', 1.0))
-
-    # Дополнительный вывод в консоль для ручного пересчёта
-    print(f"[recompute] Турнир #{tournament.id} '{tournament.name}' ({tournament_date}) system={tournament.system} single-stage")
-    logger.info("[rating] === Турнир #%s '%s' (%s), k=%.1f, coef=%.2f ===", tournament.id, tournament.name, tournament_date, k_factor, tournament_coefficient)
+def _format_modifier(match_id: int) -> float:
+    """Форматный множитель одного матча (см. _format_modifier_from_sets)."""
+    return _format_modifier_from_sets(match_id, list(MatchSet.objects.filter(match_id=match_id).order_by('index')))
 
-    matches = (
-        Match.objects
-        .filter(tournament_id=tournament_id, status=Match.Status.COMPLETED)
-        .select_related('team_1', 'team_2')
-        .prefetch_related('tournament__entries')
-        .order_by('id')
-    )
 
-    matches_count = matches.count()
-    if matches_count == 0:
-        msg = f"[recompute] Турнир #{tournament.id}: нет завершённых матчей, рейтинг не меняется"
-        print(msg)
-        logger.warning("[rating] Турнир #%s: нет завершённых матчей, рейтинг не меняется", tournament_id)
-        return
-    print(f"[recompute] Турнир #{tournament.id}: завершённых матчей = {matches_count}")
-    logger.info("[rating] Турнир #%s: завершённых матчей = %s", tournament_id, matches_count)
-    
-    # Получаем все TournamentEntry для проверки is_out_of_competition
-    from apps.tournaments.models import TournamentEntry
-    entries_map = {
-        entry.team_id: entry
-        for entry in TournamentEntry.objects.filter(tournament_id=tournament_id).select_related('team')
-    }
+def _load_format_modifiers(match_ids: List[int]) -> Dict[int, float]:
+    """Форматные множители матчей одним запросом к сетам: {match_id: множитель}."""
+    sets_by_match: Dict[int, List[MatchSet]] = {mid: [] for mid in match_ids}
+    for s in MatchSet.objects.filter(match_id__in=match_ids).order_by('match_id', 'index'):
+        sets_by_match[s.match_id].append(s)
+    return {mid: _format_modifier_from_sets(mid, sets) for mid, sets in sets_by_match.items()}
 
-    # Собираем всех вовлечённых игроков
-    player_ids: set[int] = set()
-    for m in matches:
-        for p in [getattr(m.team_1, 'player_1_id', None), getattr(m.team_1, 'player_2_id', None),
-                  getattr(m.team_2, 'player_1_id', None), getattr(m.team_2, 'player_2_id', None)]:
-            if p:
-                player_ids.add(p)
 
-    players_map: Dict[int, Player] = Player.objects.in_bulk(player_ids)
-    # Текущие рейтинги на вход турнира
-    # Если рейтинг = 0, определяем стартовый рейтинг по BTR или по названию турнира
+def _initial_ratings_before(players_map: Dict[int, Player], tournament: Tournament, log_label: str) -> Dict[int, float]:
+    """Рейтинги игроков на вход турнира; игрокам без рейтинга — стартовый (пакетно, get_initial_bp_ratings)."""
+    unrated = [p for p in players_map.values() if not (p.current_rating and p.current_rating > 0)]
+    initial = get_initial_bp_ratings(unrated, tournament) if unrated else {}
     ratings_before: Dict[int, float] = {}
     for pid, p in players_map.items():
         if p.current_rating and p.current_rating > 0:
             ratings_before[pid] = float(p.current_rating)
         else:
-            initial_rating = get_initial_bp_rating(p, tournament)
-            ratings_before[pid] = float(initial_rating)
-            logger.info("[rating] Турнир #%s: игрок #%s '%s' не имел рейтинга, присвоен стартовый %.1f", tournament_id, pid, p, initial_rating)
+            ratings_before[pid] = float(initial[pid])
+            logger.info(
+                "[rating] %s #%s: игрок #%s '%s' не имел рейтинга, присвоен стартовый %.1f",
+                log_label,
+                tournament.id,
+                pid,
+                p,
+                initial[pid],
+            )
+    return ratings_before
+
+
+def _save_rating_dynamics(tournament_id: int, values_by_player: Dict[int, dict]) -> None:
+    """Пакетный update_or_create PlayerRatingDynamic по (игрок, турнир): существующие строки сохраняют id."""
+    existing = {
+        d.player_id: d
+        for d in PlayerRatingDynamic.objects.filter(tournament_id=tournament_id, player_id__in=list(values_by_player))
+    }
+    to_update: List[PlayerRatingDynamic] = []
+    to_create: List[PlayerRatingDynamic] = []
+    for pid, values in values_by_player.items():
+        row = existing.get(pid)
+        if row is None:
+            to_create.append(PlayerRatingDynamic(player_id=pid, tournament_id=tournament_id, **values))
+            continue
+        for field_name, value in values.items():
+            setattr(row, field_name, value)
+        to_update.append(row)
+    if to_update:
+        PlayerRatingDynamic.objects.bulk_update(to_update, list(DYNAMIC_FIELDS))
+    if to_create:
+        PlayerRatingDynamic.objects.bulk_create(to_create)
+    invalidate_rating_timelines(values_by_player)
+
+
+# Завершённый матч для расчёта: (match_id, team_1_id, team_2_id, winner_id, t1_p1, t1_p2, t2_p1, t2_p2)
+MatchRow = Tuple[int, Optional[int], Optional[int], Optional[int], Optional[int], Optional[int], Optional[int], Optional[int]]
+
+
+@dataclass(frozen=True)
+class TournamentRatingInput:
+    """Данные одиночного турнира для расчёта рейтинга — без обращений к БД (можно передать в другой процесс)."""
+    tournament_id: int
+    date: Optional[date]
+    coefficient: float
+    # Завершённые матчи по возрастанию id
+    matches: Tuple[MatchRow, ...]
+    # Команды, участвующие вне зачёта
+    out_of_competition: FrozenSet[int]
+    format_modifiers: Dict[int, float]
+    # (player_id, имя для лога) в порядке записи истории
+    players: Tuple[Tuple[int, str], ...]
+
+    @property
+    def player_ids(self) -> List[int]:
+        return [pid for pid, _ in self.players]
+
+
+@dataclass
+class TournamentRatingPlan:
+    """Результат расчёта турнира, ещё не записанный в БД."""
+    tournament_id: int
+    ratings_after: Dict[int, int]
+    # (player_id, match_id, value, reason) — строки PlayerRatingHistory
+    history: List[Tuple[int, int, int, str]]
+    dynamics: Dict[int, dict]
+
+
+def load_tournament_rating_inputs(
+    tournaments: List[Tournament],
+) -> Tuple[Dict[int, TournamentRatingInput], Dict[int, Player]]:
+    """Данные для расчёта одиночных турниров — по одному запросу на матчи, участников вне зачёта, сеты и игроков.
+
+    Возвращает ({tournament_id: TournamentRatingInput}, {player_id: Player}).
+    """
+    tournament_ids = [t.id for t in tournaments]
+    rows_by_tournament: Dict[int, List[MatchRow]] = {tid: [] for tid in tournament_ids}
+    for tid, *row in (
+        Match.objects
+        .filter(tournament_id__in=tournament_ids, status=Match.Status.COMPLETED)
+        .order_by('id')
+        .values_list('tournament_id', 'id', 'team_1_id', 'team_2_id', 'winner_id',
+                     'team_1__player_1_id', 'team_1__player_2_id', 'team_2__player_1_id', 'team_2__player_2_id')
+    ):
+        rows_by_tournament[tid].append(tuple(row))
+    if not any(rows_by_tournament.values()):
+        return {
+            t.id: TournamentRatingInput(t.id, getattr(t, 'date', None), float(getattr(t, 'rating_coefficient', 1.0)),
+                                        (), frozenset(), {}, ())
+            for t in tournaments
+        }, {}
+
+    out_of_competition: Dict[int, set] = {tid: set() for tid in tournament_ids}
+    for tid, team_id in TournamentEntry.objects.filter(
+        tournament_id__in=tournament_ids, is_out_of_competition=True
+    ).values_list('tournament_id', 'team_id'):
+        out_of_competition[tid].add(team_id)
+
+    fmt_by_match = _load_format_modifiers([row[0] for rows in rows_by_tournament.values() for row in rows])
+    all_player_ids = {pid for rows in rows_by_tournament.values() for row in rows for pid in row[4:] if pid}
+    # Явный порядок (как у Player.Meta.ordering, при равенстве — id): от него зависит порядок записи истории
+    players_map: Dict[int, Player] = Player.objects.order_by('last_name', 'first_name', 'id').in_bulk(all_player_ids)
+
+    inputs: Dict[int, TournamentRatingInput] = {}
+    for t in tournaments:
+        rows = rows_by_tournament[t.id]
+        player_ids = {pid for row in rows for pid in row[4:] if pid}
+        inputs[t.id] = TournamentRatingInput(
+            tournament_id=t.id,
+            date=getattr(t, 'date', None),
+            coefficient=float(getattr(t, 'rating_coefficient', 1.0)),
+            matches=tuple(rows),
+            out_of_competition=frozenset(out_of_competition[t.id]),
+            format_modifiers={row[0]: fmt_by_match[row[0]] for row in rows},
+            players=tuple((pid, str(player)) for pid, player in players_map.items() if pid in player_ids),
+        )
+    return inputs, players_map
+
+
+def plan_tournament_ratings(
+    data: TournamentRatingInput, ratings_before: Dict[int, float], k_factor: float = 32.0
+) -> TournamentRatingPlan:
+    """Чистый расчёт рейтинга одиночного турнира по рейтингам на вход (без БД).
+
+    - Накапливаем изменения по матчам внутри турнира, но применяем к игрокам одним действием (после турнира)
+    - Per-match записи для PlayerRatingHistory (значение = дельта за матч, reason = модификаторы)
+    - Агрегат для PlayerRatingDynamic
+    - Применяем коэффициент турнира (rating_coefficient) к изменениям рейтинга
+    """
+    tournament_id = data.tournament_id
+    tournament_date = data.date
+    tournament_coefficient = data.coefficient
+    fmt_by_match = data.format_modifiers
+    player_ids = data.player_ids
     # Накопленные изменения по игрокам за турнир (int)
     delta_by_player: Dict[int, int] = {pid: 0 for pid in player_ids}
     # Пер-матч журнал для записи истории: (match_id, change:int, fmt:float, opp_team_rating:float)
     per_match_records: Dict[int, List[Tuple[int, int, float, float]]] = {pid: [] for pid in player_ids}
 
-    for m in matches:
-        # Проверяем, не участвуют ли команды вне зачета (is_out_of_competition)
-        team1_id = getattr(m.team_1, 'id', None) if m.team_1 else None
-        team2_id = getattr(m.team_2, 'id', None) if m.team_2 else None
-        
-        team1_entry = entries_map.get(team1_id) if team1_id else None
-        team2_entry = entries_map.get(team2_id) if team2_id else None
-        
+    for match_id, team1_id, team2_id, winner_id, t1_p1, t1_p2, t2_p1, t2_p2 in data.matches:
         # Если хотя бы одна команда вне зачета - не считаем рейтинг для этого матча
-        if (team1_entry and team1_entry.is_out_of_competition) or (team2_entry and team2_entry.is_out_of_competition):
+        if team1_id in data.out_of_competition or team2_id in data.out_of_competition:
             # Записываем нулевые дельты для истории
-            t1_p1 = getattr(m.team_1, 'player_1_id', None) if m.team_1 else None
-            t1_p2 = getattr(m.team_1, 'player_2_id', None) if m.team_1 else None
-            t2_p1 = getattr(m.team_2, 'player_1_id', None) if m.team_2 else None
-            t2_p2 = getattr(m.team_2, 'player_2_id', None) if m.team_2 else None
-            
             t1_r1 = ratings_before.get(t1_p1, 0.0) if t1_p1 else 0.0
             t1_r2 = ratings_before.get(t1_p2, t1_r1) if t1_p1 else 0.0
             t2_r1 = ratings_before.get(t2_p1, 0.0) if t2_p1 else 0.0
             t2_r2 = ratings_before.get(t2_p2, t2_r1) if t2_p1 else 0.0
             team1_rating = _team_rating(t1_r1, t1_p2 and t1_r2 if t1_p1 else None)
             team2_rating = _team_rating(t2_r1, t2_p2 and t2_r2 if t2_p1 else None)
-            fmt = _format_modifier(m.id)
-            
+            fmt = fmt_by_match[match_id]
+
             for pid in filter(None, [t1_p1, t1_p2]):
-                per_match_records[pid].append((m.id, 0, fmt, team2_rating))
+                per_match_records[pid].append((match_id, 0, fmt, team2_rating))
             for pid in filter(None, [t2_p1, t2_p2]):
-                per_match_records[pid].append((m.id, 0, fmt, team1_rating))
+                per_match_records[pid].append((match_id, 0, fmt, team1_rating))
             continue
-        
+
         # Форматный множитель по сетам
-        fmt = _format_modifier(m.id)
+        fmt = fmt_by_match[match_id]
 
         # Если определить победителя нельзя или не хватает команд — пишем нулевые дельты
-        if not m.team_1 or not m.team_2 or not m.winner_id:
+        if not team1_id or not team2_id or not winner_id:
             logger.warning(
                 "[rating] Турнир #%s: матч #%s пропущен для расчёта (team_1=%s, team_2=%s, winner_id=%s)",
                 tournament_id,
-                m.id,
-                bool(m.team_1),
-                bool(m.team_2),
-                m.winner_id,
+                match_id,
+                bool(team1_id),
+                bool(team2_id),
+                winner_id,
             )
-            t1_p1 = getattr(m.team_1, 'player_1_id', None) if m.team_1 else None
-            t1_p2 = getattr(m.team_1, 'player_2_id', None) if m.team_1 else None
-            t2_p1 = getattr(m.team_2, 'player_1_id', None) if m.team_2 else None
-            t2_p2 = getattr(m.team_2, 'player_2_id', None) if m.team_2 else None
             # Рассчитаем рейтинги команд на вход турнира для заполнения meta
             t1_r1 = ratings_before.get(t1_p1, 0.0) if t1_p1 else 0.0
             t1_r2 = ratings_before.get(t1_p2, t1_r1) if t1_p1 else 0.0
@@ -185,25 +269,21 @@ def compute_ratings_for_tournament(tournament_id: int, k_factor: float = 32.0) -
             team1_rating = _team_rating(t1_r1, t1_p2 and t1_r2 if t1_p1 else None)
             team2_rating = _team_rating(t2_r1, t2_p2 and t2_r2 if t2_p1 else None)
             for pid in filter(None, [t1_p1, t1_p2]):
-                per_match_records[pid].append((m.id, 0, fmt, team2_rating))
+                per_match_records[pid].append((match_id, 0, fmt, team2_rating))
             for pid in filter(None, [t2_p1, t2_p2]):
-                per_match_records[pid].append((m.id, 0, fmt, team1_rating))
+                per_match_records[pid].append((match_id, 0, fmt, team1_rating))
             continue
-        t1_p1 = getattr(m.team_1, 'player_1_id', None)
-        t1_p2 = getattr(m.team_1, 'player_2_id', None)
-        t2_p1 = getattr(m.team_2, 'player_1_id', None)
-        t2_p2 = getattr(m.team_2, 'player_2_id', None)
         if not t1_p1 or not t2_p1:
             logger.warning(
                 "[rating] Турнир #%s: матч #%s без обеих команд для расчёта (t1_p1=%s, t2_p1=%s)",
                 tournament_id,
-                m.id,
+                match_id,
                 t1_p1,
                 t2_p1,
             )
             # Один из игроков отсутствует — трактуем как 0-дельты
             for pid in filter(None, [t1_p1, t1_p2, t2_p1, t2_p2]):
-                per_match_records[pid].append((m.id, 0, fmt, 0.0))
+                per_match_records[pid].append((match_id, 0, fmt, 0.0))
             continue
 
         # Рейтинги игроков на начало турнира (без применения промежуточных изменений)
@@ -214,9 +294,8 @@ def compute_ratings_for_tournament(tournament_id: int, k_factor: float = 32.0) -
         team1_rating = _team_rating(t1_r1, t1_r2)
         team2_rating = _team_rating(t2_r1, t2_r2)
 
-        actual1 = 1.0 if (m.winner_id == getattr(m, 'team_1_id', None) or m.winner_id == getattr(m.team_1, 'id', None)) else 0.0
+        actual1 = 1.0 if winner_id == team1_id else 0.0
         actual2 = 1.0 - actual1
-        reason_base = f"K={k_factor};FMT={fmt:.2f};COEF={tournament_coefficient:.2f}"
 
         # Изменение для игроков команды 1
         exp1 = _expected(team1_rating, team2_rating)
@@ -225,7 +304,7 @@ def compute_ratings_for_tournament(tournament_id: int, k_factor: float = 32.0) -
         for pid in filter(None, [t1_p1, t1_p2]):
             delta_by_player[pid] = int(delta_by_player.get(pid, 0)) + change1
             # Запомним per-match запись (match_id, delta:int, fmt, opp_team_rating)
-            per_match_records[pid].append((m.id, change1, fmt, team2_rating))
+            per_match_records[pid].append((match_id, change1, fmt, team2_rating))
 
         # Изменение для игроков команды 2
         exp2 = _expected(team2_rating, team1_rating)
@@ -233,11 +312,12 @@ def compute_ratings_for_tournament(tournament_id: int, k_factor: float = 32.0) -
         change2 = int(round(k_factor * fmt * (actual2 - exp2) * tournament_coefficient))
         for pid in filter(None, [t2_p1, t2_p2]):
             delta_by_player[pid] = int(delta_by_player.get(pid, 0)) + change2
-            per_match_records[pid].append((m.id, change2, fmt, team1_rating))
+            per_match_records[pid].append((match_id, change2, fmt, team1_rating))
 
-    # Применяем изменения: обновляем current_rating и пишем историю
+    # Итог по игрокам: новый рейтинг, пер-матч история и агрегат
     total_matches_by_player: Dict[int, int] = {pid: len(per_match_records.get(pid, [])) for pid in player_ids}
-    for pid, player in players_map.items():
+    plan = TournamentRatingPlan(tournament_id=tournament_id, ratings_after={}, history=[], dynamics={})
+    for pid, label in data.players:
         before = ratings_before.get(pid, 0.0)
         total_delta = int(delta_by_player.get(pid, 0))
         after = int(round(before + total_delta))
@@ -247,25 +327,17 @@ def compute_ratings_for_tournament(tournament_id: int, k_factor: float = 32.0) -
             "[rating] Турнир #%s: игрок #%s '%s' рейтинг %.1f → %.1f (Δ=%+d, матчей=%s)",
             tournament_id,
             pid,
-            player,
+            label,
             before,
             after,
             total_delta,
             total_matches_by_player.get(pid, 0),
         )
-        # Обновляем текущий рейтинг
-        player.current_rating = after
-        player.save(update_fields=["current_rating"])
+        plan.ratings_after[pid] = after
 
         # Пер-матч история: value = дельта за ЭТОТ матч (int, со знаком)
         for match_id, dlt, fmt_val, _opp_team_rating in per_match_records.get(pid, []):
-            PlayerRatingHistory.objects.create(
-                player_id=pid,
-                value=int(dlt),
-                tournament_id=tournament_id,
-                match_id=match_id,
-                reason=f"fmt={fmt_val:.2f}"
-            )
+            plan.history.append((pid, match_id, int(dlt), f"fmt={fmt_val:.2f}"))
 
         # Агрегат по турниру
         # Сохраняем meta: список матчей с деталями
@@ -279,18 +351,59 @@ def compute_ratings_for_tournament(tournament_id: int, k_factor: float = 32.0) -
                 'datetime': tournament_date.isoformat() if tournament_date else None,
             })
 
-        PlayerRatingDynamic.objects.update_or_create(
-            player_id=pid,
-            tournament_id=tournament_id,
-            defaults={
-                'tournament_date': tournament_date,
-                'rating_before': float(before),
-                'rating_after': float(after),
-                'total_change': float(total_delta),
-                'matches_count': total_matches_by_player.get(pid, 0),
-                'meta': meta,
-            }
-        )
+        plan.dynamics[pid] = {
+            'tournament_date': tournament_date,
+            'rating_before': float(before),
+            'rating_after': float(after),
+            'total_change': float(total_delta),
+            'matches_count': total_matches_by_player.get(pid, 0),
+            'meta': meta,
+        }
+    return plan
+
+
+def apply_tournament_rating_plan(plan: TournamentRatingPlan) -> None:
+    """Записать рассчитанный турнир: current_rating, PlayerRatingHistory, PlayerRatingDynamic (пакетно)."""
+    Player.objects.bulk_update(
+        [Player(id=pid, current_rating=after) for pid, after in plan.ratings_after.items()], ["current_rating"]
+    )
+    PlayerRatingHistory.objects.bulk_create([
+        PlayerRatingHistory(player_id=pid, value=value, tournament_id=plan.tournament_id, match_id=match_id, reason=reason)
+        for pid, match_id, value, reason in plan.history
+    ])
+    _save_rating_dynamics(plan.tournament_id, plan.dynamics)
+
+
+@transaction.atomic
+def compute_ratings_for_tournament(tournament_id: int, k_factor: float = 32.0) -> None:
+    """
+    Полный расчёт рейтинга для одного турнира:
+    загрузка (load_tournament_rating_inputs) → расчёт (plan_tournament_ratings) → запись (apply_tournament_rating_plan).
+    Обновляет Player.current_rating, пишет PlayerRatingHistory по матчам и агрегат PlayerRatingDynamic.
+    """
+    tournament = Tournament.objects.select_for_update().get(id=tournament_id)
+    tournament_date = getattr(tournament, 'date', None)
+    tournament_coefficient = float(getattr(tournament, 'rating_coefficient', 1.0))
+
+    # Дополнительный вывод в консоль для ручного пересчёта
+    print(f"[recompute] Турнир #{tournament.id} '{tournament.name}' ({tournament_date}) system={tournament.system} single-stage")
+    logger.info("[rating] === Турнир #%s '%s' (%s), k=%.1f, coef=%.2f ===", tournament.id, tournament.name, tournament_date, k_factor, tournament_coefficient)
+
+    inputs, players_map = load_tournament_rating_inputs([tournament])
+    data = inputs[tournament.id]
+    matches_count = len(data.matches)
+    if matches_count == 0:
+        msg = f"[recompute] Турнир #{tournament.id}: нет завершённых матчей, рейтинг не меняется"
+        print(msg)
+        logger.warning("[rating] Турнир #%s: нет завершённых матчей, рейтинг не меняется", tournament_id)
+        return
+    print(f"[recompute] Турнир #{tournament.id}: завершённых матчей = {matches_count}")
+    logger.info("[rating] Турнир #%s: завершённых матчей = %s", tournament_id, matches_count)
+
+    # Текущие рейтинги на вход турнира
+    # Если рейтинг = 0, определяем стартовый рейтинг по BTR или по названию турнира
+    ratings_before = _initial_ratings_before(players_map, tournament, "Турнир")
+    apply_tournament_rating_plan(plan_tournament_ratings(data, ratings_before, k_factor))
 
 
 @transaction.atomic
@@ -323,13 +436,25 @@ def compute_ratings_for_multi_stage_tournament(master_tournament_id: int, stage_
     )
 
     # Получаем все стадии
-    stages = Tournament.objects.filter(id__in=stage_ids).order_by('stage_order')
-    
+    stages = list(Tournament.objects.filter(id__in=stage_ids).order_by('stage_order'))
+
+    # Матчи и участники всех стадий — по одному запросу, дальше работаем в памяти
+    matches_by_stage: Dict[int, List[Match]] = {stage.id: [] for stage in stages}
+    for m in (
+        Match.objects
+        .filter(tournament_id__in=stage_ids, status=Match.Status.COMPLETED)
+        .select_related('team_1', 'team_2')
+        .order_by('id')
+    ):
+        matches_by_stage.setdefault(m.tournament_id, []).append(m)
+    entries_by_stage: Dict[int, Dict[int, TournamentEntry]] = {stage.id: {} for stage in stages}
+    for entry in TournamentEntry.objects.filter(tournament_id__in=stage_ids).select_related('team'):
+        entries_by_stage.setdefault(entry.tournament_id, {})[entry.team_id] = entry
+
     # Собираем всех игроков из всех стадий
     player_ids: set[int] = set()
     for stage in stages:
-        matches = Match.objects.filter(tournament=stage, status=Match.Status.COMPLETED).select_related('team_1', 'team_2')
-        for m in matches:
+        for m in matches_by_stage[stage.id]:
             for p in [getattr(m.team_1, 'player_1_id', None), getattr(m.team_1, 'player_2_id', None),
                       getattr(m.team_2, 'player_1_id', None), getattr(m.team_2, 'player_2_id', None)]:
                 if p:
@@ -338,22 +463,9 @@ def compute_ratings_for_multi_stage_tournament(master_tournament_id: int, stage_
     players_map: Dict[int, Player] = Player.objects.in_bulk(player_ids)
     
     # Шаг 2: Фиксируем "рейтинг до" для каждого игрока
-    ratings_before: Dict[int, float] = {}
-    for pid, p in players_map.items():
-        if p.current_rating and p.current_rating > 0:
-            ratings_before[pid] = float(p.current_rating)
-        else:
-            # Определяем стартовый рейтинг
-            initial_rating = get_initial_bp_rating(p, master_tournament)
-            ratings_before[pid] = float(initial_rating)
-            logger.info(
-                "[rating] Мастер-турнир #%s: игрок #%s '%s' не имел рейтинга, присвоен стартовый %.1f",
-                master_tournament_id,
-                pid,
-                p,
-                initial_rating,
-            )
-    
+    ratings_before = _initial_ratings_before(players_map, master_tournament, "Мастер-турнир")
+    fmt_by_match = _load_format_modifiers([m.id for stage in stages for m in matches_by_stage[stage.id]])
+
     # Накопленные изменения по игрокам за весь турнир
     delta_by_player: Dict[int, int] = {pid: 0 for pid in player_ids}
     # Пер-матч журнал для записи истории
@@ -363,20 +475,11 @@ def compute_ratings_for_multi_stage_tournament(master_tournament_id: int, stage_
     for stage in stages:
         tournament_coefficient = float(getattr(stage, 'rating_coefficient', 1.0))
         
-        matches = (
-            Match.objects
-            .filter(tournament=stage, status=Match.Status.COMPLETED)
-            .select_related('team_1', 'team_2')
-            .order_by('id')
-        )
-        
-        # Получаем TournamentEntry для проверки is_out_of_competition
-        from apps.tournaments.models import TournamentEntry
-        entries_map = {
-            entry.team_id: entry
-            for entry in TournamentEntry.objects.filter(tournament=stage).select_related('team')
-        }
+        matches = matches_by_stage[stage.id]
         
+        # TournamentEntry для проверки is_out_of_competition
+        entries_map = entries_by_stage[stage.id]
+
         for m in matches:
             # Проверяем участие вне зачета
             team1_id = getattr(m.team_1, 'id', None) if m.team_1 else None
@@ -398,7 +501,7 @@ def compute_ratings_for_multi_stage_tournament(master_tournament_id: int, stage_
                 t2_r2 = ratings_before.get(t2_p2, t2_r1) if t2_p2 else t2_r1
                 team1_rating = _team_rating(t1_r1, t1_r2 if t1_p2 else None)
                 team2_rating = _team_rating(t2_r1, t2_r2 if t2_p2 else None)
-                fmt = _format_modifier(m.id)
+                fmt = fmt_by_match[m.id]
                 
                 for pid in filter(None, [t1_p1, t1_p2]):
                     per_match_records[pid].append((m.id, 0, fmt, team2_rating, stage.id))
@@ -406,7 +509,7 @@ def compute_ratings_for_multi_stage_tournament(master_tournament_id: int, stage_
                     per_match_records[pid].append((m.id, 0, fmt, team1_rating, stage.id))
                 continue
             
-            fmt = _format_modifier(m.id)
+            fmt = fmt_by_match[m.id]
             
             if not m.team_1 or not m.team_2 or not m.winner_id:
                 logger.warning(
@@ -480,8 +583,10 @@ def compute_ratings_for_multi_stage_tournament(master_tournament_id: int, stage_
                 delta_by_player[pid] += change2
                 per_match_records[pid].append((m.id, change2, fmt, team1_rating, stage.id))
     
-    # Шаг 4: Фиксируем результаты в БД
+    # Шаг 4: Фиксируем результаты в БД (пакетно)
     total_matches_by_player: Dict[int, int] = {pid: len(per_match_records.get(pid, [])) for pid in player_ids}
+    history: List[PlayerRatingHistory] = []
+    dynamics: Dict[int, dict] = {}
     for pid, player in players_map.items():
         before = ratings_before.get(pid, 0.0)
         total_delta = int(delta_by_player.get(pid, 0))
@@ -501,17 +606,16 @@ def compute_ratings_for_multi_stage_tournament(master_tournament_id: int, stage_
         
         # Обновляем текущий рейтинг
         player.current_rating = after
-        player.save(update_fields=["current_rating"])
         
         # Пер-матч история для каждой стадии
         for match_id, dlt, fmt_val, _opp_team_rating, stage_id in per_match_records.get(pid, []):
-            PlayerRatingHistory.objects.create(
+            history.append(PlayerRatingHistory(
                 player_id=pid,
                 value=int(dlt),
                 tournament_id=stage_id,  # Записываем ID стадии
                 match_id=match_id,
                 reason=f"fmt={fmt_val:.2f}"
-            )
+            ))
         
         # Агрегат по головному турниру
         meta = []
@@ -525,18 +629,19 @@ def compute_ratings_for_multi_stage_tournament(master_tournament_id: int, stage_
                 'datetime': tournament_date.isoformat() if tournament_date else None,
             })
         
-        PlayerRatingDynamic.objects.update_or_create(
-            player_id=pid,
-            tournament_id=master_tournament_id,  # ID головного турнира
-            defaults={
-                'tournament_date': tournament_date,
-                'rating_before': float(before),
-                'rating_after': float(after),
-                'total_change': float(total_delta),
-                'matches_count': total_matches_by_player.get(pid, 0),
-                'meta': meta,
-            }
-        )
+        dynamics[pid] = {
+            'tournament_date': tournament_date,
+            'rating_before': float(before),
+            'rating_after': float(after),
+            'total_change': float(total_delta),
+            'matches_count': total_matches_by_player.get(pid, 0),
+            'meta': meta,
+        }
+
+    Player.objects.bulk_update(list(players_map.values()), ["current_rating"])
+    PlayerRatingHistory.objects.bulk_create(history)
+    # Агрегат — по ID головного турнира
+    _save_rating_dynamics(master_tournament_id, dynamics)
 
 
 @transaction.atomic
@@ -554,6 +659,7 @@ def recompute_history(options: RecomputeOptions) -> None:
     if options.wipe_history:
         PlayerRatingHistory.objects.all().delete()
         PlayerRatingDynamic.objects.all().delete()
+        invalidate_rating_timelines()
 
     # Инициализация стартовых рейтингов
     if options.start_ratings_per_player:
@@ -0,0 +1,290 @@
+"""
+Симуляция рейтинга «что, если» — без записи в БД.
+
+Организаторы хотят видеть, как результат изменит рейтинги, до завершения
+турнира. simulate() повторяет расчёт rating_service
+(compute_ratings_for_tournament / compute_ratings_for_multi_stage_tournament)
+над матчами в памяти и использует те же _expected, _team_rating и форматные
+множители. simulate_tournament() читает турнир фиксированным числом запросов
+(стадии, матчи, участники вне зачёта, сеты, игроки, таймлайны рейтинга),
+подставляет гипотетические счета и ничего не сохраняет.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.db.models import Q
+
+from apps.matches.models import Match, MatchSet
+from apps.players.models import Player
+from apps.players.services.initial_rating_service import get_initial_bp_ratings
+from apps.players.services.rating_service import (
+    _expected,
+    _format_modifier_from_sets,
+    _load_format_modifiers,
+    _team_rating,
+)
+from apps.players.services.rating_timeline import rating_at
+from apps.tournaments.models import Tournament, TournamentEntry
+
+DEFAULT_K_FACTOR = 32.0
+
+# Игроки команды: (player_1_id, player_2_id); None — команды нет
+TeamPlayers = Optional[Tuple[Optional[int], Optional[int]]]
+
+
+class SimulationError(ValueError):
+    """Некорректный гипотетический счёт"""
+
+
+@dataclass
+class SimulatedMatch:
+    match_id: int
+    stage_id: int
+    team_1: TeamPlayers
+    team_2: TeamPlayers
+    # 1 / 2 — победила команда 1 / 2, None — победитель не определён
+    winner: Optional[int]
+    format_modifier: float
+    out_of_competition: bool = False
+    hypothetical: bool = False
+
+
+@dataclass
+class MatchProjection:
+    match_id: int
+    stage_id: int
+    team_1_change: int
+    team_2_change: int
+    format_modifier: float
+    hypothetical: bool
+
+
+@dataclass
+class PlayerProjection:
+    player_id: int
+    rating_before: float
+    delta: int = 0
+    rating_after: int = 0
+    matches: int = 0
+
+
+@dataclass
+class SimulationResult:
+    players: Dict[int, PlayerProjection] = field(default_factory=dict)
+    matches: List[MatchProjection] = field(default_factory=list)
+
+
+def _team_ids(team: TeamPlayers) -> List[int]:
+    return [pid for pid in (team or ()) if pid]
+
+
+def simulate(
+    matches: Sequence[SimulatedMatch],
+    ratings_before: Dict[int, float],
+    stage_coefficients: Dict[int, float],
+    k_factor: float = DEFAULT_K_FACTOR,
+) -> SimulationResult:
+    """Расчёт изменений рейтинга по матчам в памяти (как rating_service, без записи).
+
+    Рейтинги команд берутся от рейтингов на вход турнира, изменения за матчи
+    суммируются и применяются в конце; итоговый рейтинг не ниже 1.
+    matches — в порядке расчёта (по стадиям, внутри стадии — по id матча).
+    """
+    result = SimulationResult()
+    delta_by_player: Dict[int, int] = {}
+    matches_by_player: Dict[int, int] = {}
+
+    for m in matches:
+        team_1_ids = _team_ids(m.team_1)
+        team_2_ids = _team_ids(m.team_2)
+        for pid in team_1_ids + team_2_ids:
+            delta_by_player.setdefault(pid, 0)
+            matches_by_player[pid] = matches_by_player.get(pid, 0) + 1
+
+        change1 = change2 = 0
+        # Как в rating_service: вне зачёта, без победителя или без игроков — нулевые дельты
+        playable = not m.out_of_competition and m.team_1 and m.team_2 and m.winner
+        if playable and m.team_1[0] and m.team_2[0]:
+            t1_p1, t1_p2 = m.team_1
+            t2_p1, t2_p2 = m.team_2
+            t1_r1 = ratings_before.get(t1_p1, 0.0)
+            t1_r2 = ratings_before.get(t1_p2, t1_r1) if t1_p2 else t1_r1
+            t2_r1 = ratings_before.get(t2_p1, 0.0)
+            t2_r2 = ratings_before.get(t2_p2, t2_r1) if t2_p2 else t2_r1
+            team1_rating = _team_rating(t1_r1, t1_r2)
+            team2_rating = _team_rating(t2_r1, t2_r2)
+            actual1 = 1.0 if m.winner == 1 else 0.0
+            coefficient = stage_coefficients.get(m.stage_id, 1.0)
+            change1 = int(round(k_factor * m.format_modifier * (actual1 - _expected(team1_rating, team2_rating)) * coefficient))
+            change2 = int(round(k_factor * m.format_modifier * ((1.0 - actual1) - _expected(team2_rating, team1_rating)) * coefficient))
+            for pid in team_1_ids:
+                delta_by_player[pid] += change1
+            for pid in team_2_ids:
+                delta_by_player[pid] += change2
+
+        result.matches.append(MatchProjection(
+            match_id=m.match_id,
+            stage_id=m.stage_id,
+            team_1_change=change1,
+            team_2_change=change2,
+            format_modifier=m.format_modifier,
+            hypothetical=m.hypothetical,
+        ))
+
+    for pid, delta in delta_by_player.items():
+        before = ratings_before.get(pid, 0.0)
+        result.players[pid] = PlayerProjection(
+            player_id=pid,
+            rating_before=float(before),
+            delta=delta,
+            rating_after=max(1, int(round(before + delta))),
+            matches=matches_by_player[pid],
+        )
+    return result
+
+
+def parse_sets(match_id: int, payload: Iterable[dict], only_tiebreak_mode: bool = False) -> Tuple[List[MatchSet], int]:
+    """Сеты гипотетического счёта (формат match_save_score_full) → (несохранённые MatchSet, победитель 1/2)."""
+    sets: List[MatchSet] = []
+    won = {1: 0, 2: 0}
+    try:
+        for i, s in enumerate(payload, start=1):
+            g1 = int(s.get("games_1") or 0)
+            g2 = int(s.get("games_2") or 0)
+            tb1 = int(s["tb_1"]) if s.get("tb_1") is not None else None
+            tb2 = int(s["tb_2"]) if s.get("tb_2") is not None else None
+            is_tb_only = bool(s.get("is_tiebreak_only") or False)
+            if is_tb_only:
+                if only_tiebreak_mode:
+                    g1, g2 = int(tb1 or 0), int(tb2 or 0)
+                else:
+                    # Чемпионский TB как 1:0/0:1
+                    g1, g2 = (1, 0) if int(tb1 or 0) > int(tb2 or 0) else (0, 1)
+                set_winner = 1 if (tb1 or 0) > (tb2 or 0) else 2
+            else:
+                set_winner = 1 if g1 >= g2 else 2
+            won[set_winner] += 1
+            sets.append(MatchSet(
+                match_id=match_id, index=int(s.get("index") or i),
+                games_1=g1, games_2=g2, tb_1=tb1, tb_2=tb2, is_tiebreak_only=is_tb_only,
+            ))
+    except (AttributeError, TypeError, ValueError):
+        raise SimulationError(f"Матч {match_id}: некорректный счёт")
+    if not sets:
+        raise SimulationError(f"Матч {match_id}: нужен хотя бы один сет")
+    if won[1] == won[2]:
+        # Как при сохранении счёта — по последнему сету
+        last = sets[-1]
+        winner = 1 if (last.games_1 > last.games_2) or ((last.tb_1 or 0) > (last.tb_2 or 0)) else 2
+    else:
+        winner = 1 if won[1] > won[2] else 2
+    return sets, winner
+
+
+def simulation_stages(tournament: Tournament) -> List[Tournament]:
+    """Турниры, которые обсчитываются вместе: все стадии многостадийного турнира или сам турнир."""
+    master = tournament.get_master_tournament()
+    stages = master.get_all_stages()
+    return stages if len(stages) > 1 else [tournament]
+
+
+def _only_tiebreak_mode(tournament: Tournament) -> bool:
+    # Как в match_save_score_full: формат из одного сета-тай-брейка хранит очки TB в геймах
+    set_format = getattr(tournament, "set_format", None)
+    return bool(
+        set_format is not None
+        and getattr(set_format, "allow_tiebreak_only_set", False)
+        and int(getattr(set_format, "max_sets", 1) or 1) == 1
+    )
+
+
+def _ratings_before(players: List[Player], master: Tournament) -> Dict[int, float]:
+    """Рейтинги на вход турнира, как их взял бы расчёт; у завершённого — рейтинг до него по истории."""
+    ratings: Dict[int, float] = {}
+    if master.status == Tournament.Status.COMPLETED and master.date:
+        ratings.update(rating_at([p.id for p in players], master.date, tournament_id=master.id, persist=False))
+    unrated: List[Player] = []
+    for p in players:
+        if p.id in ratings:
+            continue
+        if p.current_rating and p.current_rating > 0:
+            ratings[p.id] = float(p.current_rating)
+        else:
+            unrated.append(p)
+    if unrated:
+        initial = get_initial_bp_ratings(unrated, master, persist=False)
+        ratings.update((pid, float(rating)) for pid, rating in initial.items())
+    return ratings
+
+
+def simulate_tournament(
+    tournament: Tournament,
+    hypothetical: Optional[Dict[int, List[dict]]] = None,
+    k_factor: float = DEFAULT_K_FACTOR,
+) -> Tuple[SimulationResult, Dict[int, dict]]:
+    """Спроецировать рейтинг турнира с гипотетическими счетами.
+
+    hypothetical — {match_id: сеты в формате match_save_score_full}; они заменяют
+    счёт сыгранного матча или задают счёт несыгранного. Остальные завершённые
+    матчи берутся как есть. Возвращает (результат, {player_id: Player}).
+    """
+    hypothetical = hypothetical or {}
+    stages = simulation_stages(tournament)
+    master = stages[0]
+    stage_ids = [stage.id for stage in stages]
+    stage_order = {stage_id: index for index, stage_id in enumerate(stage_ids)}
+
+    rows = list(
+        Match.objects.filter(tournament_id__in=stage_ids)
+        .filter(Q(status=Match.Status.COMPLETED) | Q(id__in=list(hypothetical)))
+        .values_list(
+            "id", "tournament_id", "team_1_id", "team_2_id", "winner_id",
+            "team_1__player_1_id", "team_1__player_2_id", "team_2__player_1_id", "team_2__player_2_id",
+        )
+    )
+    unknown = set(hypothetical) - {row[0] for row in rows}
+    if unknown:
+        raise SimulationError(f"Матчи не найдены в турнире: {sorted(unknown)}")
+
+    out_of_competition = set(
+        TournamentEntry.objects.filter(tournament_id__in=stage_ids, is_out_of_competition=True)
+        .values_list("tournament_id", "team_id")
+    )
+    fmt_by_match = _load_format_modifiers([row[0] for row in rows if row[0] not in hypothetical])
+
+    matches: List[SimulatedMatch] = []
+    for match_id, stage_id, team_1_id, team_2_id, winner_id, t1p1, t1p2, t2p1, t2p2 in rows:
+        team_1 = (t1p1, t1p2) if team_1_id else None
+        team_2 = (t2p1, t2p2) if team_2_id else None
+        if match_id in hypothetical:
+            if not team_1_id or not team_2_id:
+                raise SimulationError(f"Матч {match_id}: в паре отсутствует команда")
+            sets, winner = parse_sets(match_id, hypothetical[match_id], _only_tiebreak_mode(stages[stage_order[stage_id]]))
+            fmt = _format_modifier_from_sets(match_id, sets)
+        else:
+            winner = 1 if winner_id and winner_id == team_1_id else (2 if winner_id else None)
+            fmt = fmt_by_match[match_id]
+        matches.append(SimulatedMatch(
+            match_id=match_id,
+            stage_id=stage_id,
+            team_1=team_1,
+            team_2=team_2,
+            winner=winner,
+            format_modifier=fmt,
+            out_of_competition=(stage_id, team_1_id) in out_of_competition or (stage_id, team_2_id) in out_of_competition,
+            hypothetical=match_id in hypothetical,
+        ))
+    matches.sort(key=lambda m: (stage_order[m.stage_id], m.match_id))
+
+    player_ids = {pid for m in matches for pid in _team_ids(m.team_1) + _team_ids(m.team_2)}
+    players = list(
+        Player.objects.filter(id__in=player_ids).only(
+            "id", "last_name", "first_name", "display_name", "current_rating", "btr_player_id"
+        )
+    )
+    ratings_before = _ratings_before(players, master)
+    stage_coefficients = {stage.id: float(getattr(stage, "rating_coefficient", 1.0)) for stage in stages}
+    result = simulate(matches, ratings_before, stage_coefficients, k_factor)
+    return result, {p.id: p for p in players}
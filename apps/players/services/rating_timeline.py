@@ -0,0 +1,181 @@
+"""
+Рейтинг игроков «на дату».
+
+Сетка плей-офф завершённого турнира, h2h («средний рейтинг команды до
+турнира») и стартовые рейтинги нуждаются в историческом рейтинге игрока.
+Источник — PlayerRatingDynamic; для каждого игрока он сворачивается в
+таймлайн RatingTimeline: отсортированные массивы (дата, турнир, до, после),
+по которым рейтинг на дату ищется двоичным поиском.
+
+Таймлайны хранятся в PlayerRatingTimeline (одна строка на игрока), так что
+rating_at() для тысяч игроков — один запрос по первичному ключу. Недостающие
+таймлайны строятся одним запросом к PlayerRatingDynamic (пустые — тоже
+хранятся). Кэш процесса не используется: сброс должен сразу действовать во
+всех воркерах gunicorn и Celery, а таблица для них общая.
+
+Изменение динамики сбрасывает таймлайны её игроков: одиночные сохранения —
+сигналом (apps/players/signals.py), пакетные записи и удаления — явным
+вызовом invalidate_rating_timelines / invalidate_tournament_rating_timelines.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+from apps.players.models import Player, PlayerRatingDynamic, PlayerRatingTimeline
+
+
+def _ordinal(value) -> int:
+    # Дата турнира у только что созданного экземпляра может быть строкой ISO
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return value.toordinal()
+
+
+@dataclass(frozen=True)
+class RatingTimeline:
+    """Рейтинг игрока по турнирам в хронологическом порядке."""
+
+    dates: Tuple[int, ...] = ()
+    tournaments: Tuple[Optional[int], ...] = ()
+    before: Tuple[float, ...] = ()
+    after: Tuple[float, ...] = ()
+
+    def at(self, on_date: date, tournament_id: Optional[int] = None) -> Optional[float]:
+        """Рейтинг на входе в день on_date (до турниров этого дня).
+
+        tournament_id — если у игрока есть запись этого турнира в тот же день,
+        берётся её «рейтинг до» (важно, когда в один день несколько турниров).
+        None — у игрока ещё не было рейтинга.
+        """
+        day = _ordinal(on_date)
+        lo = bisect_left(self.dates, day)
+        if tournament_id is not None:
+            for i in range(lo, bisect_right(self.dates, day, lo)):
+                if self.tournaments[i] == tournament_id:
+                    return self.before[i]
+        if lo < len(self.dates) and self.dates[lo] == day:
+            return self.before[lo]
+        if lo:
+            return self.after[lo - 1]
+        return None
+
+    def to_points(self) -> dict:
+        return {"d": list(self.dates), "t": list(self.tournaments), "b": list(self.before), "a": list(self.after)}
+
+    @classmethod
+    def from_points(cls, points: dict) -> "RatingTimeline":
+        return cls(
+            dates=tuple(points.get("d", ())),
+            tournaments=tuple(points.get("t", ())),
+            before=tuple(points.get("b", ())),
+            after=tuple(points.get("a", ())),
+        )
+
+
+EMPTY_TIMELINE = RatingTimeline()
+
+
+def build_rating_timelines(player_ids: Iterable[int]) -> Dict[int, RatingTimeline]:
+    """Таймлайны из PlayerRatingDynamic — один запрос (LEFT JOIN от игроков).
+
+    Игроки без динамики получают пустой таймлайн, несуществующие ID в результат не попадают.
+    """
+    columns: Dict[int, List[list]] = {}
+    rows = (
+        Player.objects.filter(id__in=list(player_ids))
+        .annotate(day=Coalesce("rating_dynamic__tournament_date", F("rating_dynamic__tournament__date")))
+        .order_by("id", "day", "rating_dynamic__id")
+        .values_list("id", "day", "rating_dynamic__tournament_id", "rating_dynamic__rating_before",
+                     "rating_dynamic__rating_after")
+    )
+    for player_id, day, tournament_id, before, after in rows:
+        dates, tournaments, befores, afters = columns.setdefault(player_id, [[], [], [], []])
+        if day is None:
+            continue
+        dates.append(day.toordinal())
+        tournaments.append(tournament_id)
+        befores.append(float(before))
+        afters.append(float(after))
+    return {
+        player_id: RatingTimeline(tuple(d), tuple(t), tuple(b), tuple(a))
+        for player_id, (d, t, b, a) in columns.items()
+    }
+
+
+def load_rating_timelines(player_ids: Iterable[int], persist: bool = True) -> Dict[int, RatingTimeline]:
+    """Таймлайны игроков: PlayerRatingTimeline → сборка из динамики.
+
+    Для каждого переданного игрока есть запись (без истории — EMPTY_TIMELINE).
+    persist=False — собранные таймлайны не сохраняются в БД (только чтение, например симуляция).
+    """
+    ids = {int(pid) for pid in player_ids if pid}
+    if not ids:
+        return {}
+
+    timelines: Dict[int, RatingTimeline] = {
+        row.player_id: RatingTimeline.from_points(row.points)
+        for row in PlayerRatingTimeline.objects.filter(player_id__in=ids)
+    }
+    unbuilt = ids - timelines.keys()
+    if unbuilt:
+        built = build_rating_timelines(unbuilt)
+        if persist:
+            PlayerRatingTimeline.objects.bulk_create(
+                [PlayerRatingTimeline(player_id=pid, points=timeline.to_points()) for pid, timeline in built.items()],
+                ignore_conflicts=True,
+            )
+        timelines.update(built)
+        # Несуществующие игроки — пустой таймлайн (не хранится)
+        timelines.update((pid, EMPTY_TIMELINE) for pid in unbuilt - built.keys())
+    return timelines
+
+
+def rating_at(
+    player_ids: Iterable[int],
+    on_date: date,
+    tournament_id: Optional[int] = None,
+    persist: bool = True,
+) -> Dict[int, float]:
+    """Рейтинг игроков на входе в день on_date: {player_id: рейтинг}.
+
+    Игроки без рейтинга на эту дату в результат не попадают.
+    tournament_id — см. RatingTimeline.at, persist — см. load_rating_timelines.
+    """
+    result: Dict[int, float] = {}
+    for pid, timeline in load_rating_timelines(player_ids, persist=persist).items():
+        rating = timeline.at(on_date, tournament_id)
+        if rating is not None:
+            result[pid] = rating
+    return result
+
+
+def invalidate_rating_timelines(player_ids: Optional[Iterable[int]] = None) -> None:
+    """Сбросить таймлайны игроков (None — всех, например после очистки истории рейтинга)."""
+    if player_ids is None:
+        def _drop():
+            PlayerRatingTimeline.objects.all().delete()
+    else:
+        ids = {int(pid) for pid in player_ids if pid}
+        if not ids:
+            return
+
+        def _drop():
+            PlayerRatingTimeline.objects.filter(player_id__in=ids).delete()
+
+    _drop()
+    # Повторно после коммита: параллельный запрос мог успеть сохранить таймлайн по старой динамике
+    transaction.on_commit(_drop)
+
+
+def invalidate_tournament_rating_timelines(tournament_ids: Iterable[int]) -> None:
+    """Сбросить таймлайны игроков с динамикой по турнирам (вызывать до удаления динамики)."""
+    invalidate_rating_timelines(
+        PlayerRatingDynamic.objects.filter(tournament_id__in=list(tournament_ids)).values_list("player_id", flat=True)
+    )
@@ -0,0 +1,301 @@
+"""
+Сводная статистика для дашборда (apps.players.api_stats.summary_stats).
+
+Вместо обхода всех завершённых матчей на каждый запрос статистика хранится
+в дневной сводке:
+- StatsDay        — посчитанные закрытые дни и число матчей в них;
+- PlayerDayStats  — матчи/победы/поражения/турниры игрока за день;
+- PlayerDayPair   — напарники и соперники игрока за день.
+
+Дни до сегодняшнего (по дате турнира) считаются один раз и дальше читаются
+агрегатами БД (SUM / COUNT DISTINCT по периоду). Сегодняшний и будущие дни
+не кэшируются и считаются «на лету» по своим матчам. Изменение матча или
+турнира сбрасывает его день (сигналы в apps/players/signals.py).
+"""
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from apps.matches.models import Match
+from apps.players.models import Player, PlayerDayPair, PlayerDayStats, StatsDay
+from apps.tournaments.models import Tournament
+
+MATCH_FIELDS = (
+    "team_1_id",
+    "team_2_id",
+    "winner_id",
+    "team_1__player_1_id",
+    "team_1__player_2_id",
+    "team_2__player_1_id",
+    "team_2__player_2_id",
+    "tournament_id",
+    "tournament__date",
+    "tournament__name",
+)
+
+PLAYER_COUNTERS = ("matches", "wins", "losses", "tournaments", "hard_matches", "medium_matches")
+
+# Оценка: winrate * (1 - exp(-matches/alpha))
+SCORE_ALPHA = 20.0
+
+
+def completed_matches_q() -> Q:
+    # Исключаем матчи с BYE (где одна из команд отсутствует)
+    return Q(status=Match.Status.COMPLETED) & Q(team_1__isnull=False) & Q(team_2__isnull=False)
+
+
+@dataclass
+class DayAggregate:
+    """Агрегаты по набору матчей: по игрокам и по парам игроков."""
+
+    matches: int = 0
+    players: Dict[int, Dict[str, int]] = field(default_factory=dict)
+    # (player, other) -> [partner_matches, opponent_matches]
+    pairs: Dict[Tuple[int, int], list] = field(default_factory=dict)
+    # player -> турниры (для подсчёта уникальных)
+    tournaments: Dict[int, Set[int]] = field(default_factory=dict)
+
+
+def aggregate_matches(rows: Iterable[tuple]) -> Dict[date, DayAggregate]:
+    """Разложить матчи (MATCH_FIELDS) по дням турниров."""
+    days: Dict[date, DayAggregate] = defaultdict(DayAggregate)
+    for team_1_id, team_2_id, winner_id, t1p1, t1p2, t2p1, t2p2, tournament_id, day, name in rows:
+        agg = days[day]
+        agg.matches += 1
+        upper_name = (name or "").upper()
+        is_hard = "HARD" in upper_name
+        is_medium = not is_hard and "MEDIUM" in upper_name
+        sides = (
+            ([pid for pid in (t1p1, t1p2) if pid], winner_id is not None and winner_id == team_1_id),
+            ([pid for pid in (t2p1, t2p2) if pid], winner_id is not None and winner_id == team_2_id),
+        )
+        for index, (side, won) in enumerate(sides):
+            other_side = sides[1 - index][0]
+            for pid in side:
+                counters = agg.players.get(pid)
+                if counters is None:
+                    counters = agg.players[pid] = dict.fromkeys(PLAYER_COUNTERS, 0)
+                counters["matches"] += 1
+                if winner_id:
+                    counters["wins" if won else "losses"] += 1
+                counters["hard_matches"] += int(is_hard)
+                counters["medium_matches"] += int(is_medium)
+                agg.tournaments.setdefault(pid, set()).add(tournament_id)
+                for other in side:
+                    if other != pid:
+                        agg.pairs.setdefault((pid, other), [0, 0])[0] += 1
+                for other in other_side:
+                    agg.pairs.setdefault((pid, other), [0, 0])[1] += 1
+    for agg in days.values():
+        for pid, counters in agg.players.items():
+            counters["tournaments"] = len(agg.tournaments[pid])
+    return days
+
+
+def invalidate_days(days: Iterable[Optional[date]]) -> None:
+    """Сбросить посчитанные дни — они пересчитаются при следующем запросе сводки.
+
+    Удаляются и строки игроков за эти дни: день, в котором турниров больше нет
+    (турнир удалён или перенесён), не пересчитывается и не должен попадать в сумму.
+    """
+    days = {day for day in days if day}
+    if days:
+        with transaction.atomic():
+            StatsDay.objects.filter(date__in=days).delete()
+            PlayerDayStats.objects.filter(date__in=days).delete()
+            PlayerDayPair.objects.filter(date__in=days).delete()
+
+
+def invalidate_tournament_days(tournament_ids: Iterable[Optional[int]]) -> None:
+    """Сбросить дни указанных турниров."""
+    ids = {tid for tid in tournament_ids if tid}
+    if ids:
+        invalidate_days(Tournament.objects.filter(id__in=ids).values_list("date", flat=True))
+
+
+def build_days(days: Iterable[date]) -> None:
+    """Посчитать и сохранить дневную сводку за указанные дни."""
+    days = sorted(set(days))
+    if not days:
+        return
+    rows = Match.objects.filter(completed_matches_q(), tournament__date__in=days).values_list(*MATCH_FIELDS)
+    aggregates = aggregate_matches(rows)
+    with transaction.atomic():
+        PlayerDayStats.objects.filter(date__in=days).delete()
+        PlayerDayPair.objects.filter(date__in=days).delete()
+        PlayerDayStats.objects.bulk_create(
+            [
+                PlayerDayStats(date=day, player_id=pid, **counters)
+                for day, agg in aggregates.items()
+                for pid, counters in agg.players.items()
+            ],
+            batch_size=2000,
+            ignore_conflicts=True,
+        )
+        PlayerDayPair.objects.bulk_create(
+            [
+                PlayerDayPair(date=day, player_id=pid, other_id=other, partner_matches=p, opponent_matches=o)
+                for day, agg in aggregates.items()
+                for (pid, other), (p, o) in agg.pairs.items()
+            ],
+            batch_size=2000,
+            ignore_conflicts=True,
+        )
+        StatsDay.objects.filter(date__in=days).delete()
+        StatsDay.objects.bulk_create(
+            [StatsDay(date=day, matches=aggregates[day].matches if day in aggregates else 0) for day in days],
+            ignore_conflicts=True,
+        )
+
+
+def ensure_days(d_from: Optional[date], d_to: date) -> None:
+    """Досчитать закрытые дни периода, которых ещё нет в сводке."""
+    tournament_days = Tournament.objects.filter(date__lte=d_to)
+    built = StatsDay.objects.filter(date__lte=d_to)
+    if d_from:
+        tournament_days = tournament_days.filter(date__gte=d_from)
+        built = built.filter(date__gte=d_from)
+    missing = (
+        set(tournament_days.order_by().values_list("date", flat=True).distinct())
+        - set(built.values_list("date", flat=True))
+    )
+    build_days(missing)
+
+
+def rebuild_all_days() -> int:
+    """Пересчитать сводку за все закрытые дни. Возвращает число дней."""
+    yesterday = timezone.localdate() - timedelta(days=1)
+    with transaction.atomic():
+        StatsDay.objects.all().delete()
+        PlayerDayStats.objects.all().delete()
+        PlayerDayPair.objects.all().delete()
+    days = set(Tournament.objects.filter(date__lte=yesterday).order_by().values_list("date", flat=True).distinct())
+    build_days(days)
+    return len(days)
+
+
+def _date_range(qs, d_from: Optional[date], d_to: Optional[date], field_name: str = "date"):
+    if d_from:
+        qs = qs.filter(**{f"{field_name}__gte": d_from})
+    if d_to:
+        qs = qs.filter(**{f"{field_name}__lte": d_to})
+    return qs
+
+
+def collect_period(d_from: Optional[date], d_to: Optional[date], today: Optional[date] = None) -> Dict[str, Any]:
+    """Агрегаты за период: {'matches', 'players': {pid: counters}}.
+
+    В counters игрока дополнительно unique_partners и unique_opponents.
+    """
+    today = today or timezone.localdate()
+    closed_to = min(d_to, today - timedelta(days=1)) if d_to else today - timedelta(days=1)
+    live_from = max(d_from, today) if d_from else today
+
+    players: Dict[int, Dict[str, int]] = {}
+    partners: Dict[int, int] = {}
+    opponents: Dict[int, int] = {}
+    total_matches = 0
+    has_closed = d_from is None or d_from <= closed_to
+
+    if has_closed:
+        ensure_days(d_from, closed_to)
+        total_matches = _date_range(StatsDay.objects, d_from, closed_to).aggregate(total=Sum("matches"))["total"] or 0
+        for row in (
+            _date_range(PlayerDayStats.objects, d_from, closed_to)
+            .values("player_id")
+            .annotate(**{name: Sum(name) for name in PLAYER_COUNTERS})
+        ):
+            players[row.pop("player_id")] = row
+        for row in (
+            _date_range(PlayerDayPair.objects, d_from, closed_to)
+            .values("player_id")
+            .annotate(
+                partners=Count("other_id", distinct=True, filter=Q(partner_matches__gt=0)),
+                opponents=Count("other_id", distinct=True, filter=Q(opponent_matches__gt=0)),
+            )
+        ):
+            partners[row["player_id"]] = row["partners"]
+            opponents[row["player_id"]] = row["opponents"]
+
+    if d_to is None or live_from <= d_to:
+        # Сегодняшний (и будущие) дни — по матчам, без кэша
+        live_rows = _date_range(
+            Match.objects.filter(completed_matches_q()), live_from, d_to, "tournament__date"
+        ).values_list(*MATCH_FIELDS)
+        live = aggregate_matches(live_rows)
+        live_pairs: Dict[Tuple[int, int], list] = {}
+        for agg in live.values():
+            total_matches += agg.matches
+            for pid, counters in agg.players.items():
+                target = players.setdefault(pid, dict.fromkeys(PLAYER_COUNTERS, 0))
+                for name in PLAYER_COUNTERS:
+                    target[name] += counters[name]
+            for key, (p, o) in agg.pairs.items():
+                pair = live_pairs.setdefault(key, [0, 0])
+                pair[0] += p
+                pair[1] += o
+        if live_pairs:
+            # Связи, уже учтённые в закрытых днях периода, второй раз не считаем
+            known: Set[Tuple[int, int, bool]] = set()
+            if has_closed:
+                live_players = {pid for pid, _ in live_pairs}
+                for pid, other, p, o in (
+                    _date_range(PlayerDayPair.objects, d_from, closed_to)
+                    .filter(player_id__in=live_players)
+                    .values_list("player_id", "other_id", "partner_matches", "opponent_matches")
+                ):
+                    if p:
+                        known.add((pid, other, True))
+                    if o:
+                        known.add((pid, other, False))
+            for (pid, other), (p, o) in live_pairs.items():
+                if p and (pid, other, True) not in known:
+                    known.add((pid, other, True))
+                    partners[pid] = partners.get(pid, 0) + 1
+                if o and (pid, other, False) not in known:
+                    known.add((pid, other, False))
+                    opponents[pid] = opponents.get(pid, 0) + 1
+
+    for pid, counters in players.items():
+        counters["unique_partners"] = partners.get(pid, 0)
+        counters["unique_opponents"] = opponents.get(pid, 0)
+    return {"matches": total_matches, "players": players}
+
+
+def player_rows(players: Dict[int, Dict[str, int]]) -> list:
+    """Строки таблиц дашборда по агрегатам игроков."""
+    names = {
+        p["id"]: p
+        for p in Player.objects.filter(id__in=players.keys()).values("id", "first_name", "last_name", "display_name")
+    }
+    rows = []
+    for pid, counters in players.items():
+        matches_cnt = counters["matches"]
+        wins_cnt = counters["wins"]
+        winrate = round(100.0 * wins_cnt / matches_cnt, 1) if matches_cnt > 0 else 0.0
+        # При малом числе матчей множитель маленький, при большом стремится к 1.
+        reliability = 1.0 - math.exp(-matches_cnt / SCORE_ALPHA) if matches_cnt > 0 else 0.0
+        p = names.get(pid, {})
+        rows.append({
+            'id': pid,
+            'first_name': p.get('first_name', ''),
+            'last_name': p.get('last_name', ''),
+            'display_name': p.get('display_name', ''),
+            'tournaments_count': counters["tournaments"],
+            'matches_count': matches_cnt,
+            'wins': wins_cnt,
+            'losses': counters["losses"],
+            'winrate': winrate,
+            'unique_partners': counters["unique_partners"],
+            'unique_opponents': counters["unique_opponents"],
+            'score': round(winrate * reliability, 2),
+        })
+    return rows
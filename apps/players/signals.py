@@ -0,0 +1,158 @@
+"""
+Сигналы приложения players:
+- поддержка индекса имён (PlayerNameKey) при сохранении и удалении игроков BP и BTR;
+- пересчёт графа связей игроков (PlayerPairStats) при изменении завершённых матчей и даты турнира
+  (удаления матчей пересчитывают граф явно, см. apps/players/services/pair_stats.py);
+- сброс дней дневной сводки статистики (StatsDay) при изменении матчей и турниров;
+- сброс индекса «рейтинг на дату» (PlayerRatingTimeline) при сохранении динамики рейтинга.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.btr.models import BtrPlayer
+from apps.matches.models import Match
+from apps.players.models import Player, PlayerNameKey, PlayerRatingDynamic
+from apps.teams.models import Team
+from apps.tournaments.models import Tournament
+from apps.players.services.name_index import index_names, remove_names
+from apps.players.services.pair_stats import match_player_ids, refresh_pair_stats
+from apps.players.services.rating_timeline import invalidate_rating_timelines
+from apps.players.services.summary_stats import invalidate_days, invalidate_tournament_days
+
+NAME_FIELDS = {"last_name", "first_name"}
+
+
+def _names_changed(instance, created, update_fields) -> bool:
+    """Изменилось ли имя при сохранении (сравнение с состоянием на момент загрузки, LoadedValuesMixin)."""
+    if update_fields is not None and not NAME_FIELDS & set(update_fields):
+        return False
+    loaded = getattr(instance, "_loaded_values", None)
+    if loaded is None:
+        loaded = instance._loaded_values = {}
+    before = tuple(loaded.get(field) for field in ("last_name", "first_name"))
+    known = all(field in loaded for field in NAME_FIELDS)
+    loaded.update(last_name=instance.last_name, first_name=instance.first_name)
+    # Экземпляр, созданный вручную (не загруженный из БД), переиндексируется всегда
+    return created or not known or before != (instance.last_name, instance.first_name)
+
+
+@receiver(post_save, sender=Player)
+def index_player_name(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    if raw or not _names_changed(instance, created, update_fields):
+        return
+    index_names(PlayerNameKey.Source.BP, [instance])
+
+
+@receiver(post_save, sender=BtrPlayer)
+def index_btr_player_name(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    if raw or not _names_changed(instance, created, update_fields):
+        return
+    index_names(PlayerNameKey.Source.BTR, [instance])
+
+
+@receiver(post_delete, sender=Player)
+def remove_player_name(sender, instance, **kwargs):
+    remove_names(PlayerNameKey.Source.BP, [instance.pk])
+
+
+@receiver(post_delete, sender=BtrPlayer)
+def remove_btr_player_name(sender, instance, **kwargs):
+    remove_names(PlayerNameKey.Source.BTR, [instance.pk])
+
+
+# Поля матча, от которых зависят рёбра графа
+PAIR_STATE_FIELDS = ("status", "winner_id", "team_1_id", "team_2_id")
+_PAIR_STATE_NAMES = {"status", "winner", "team_1", "team_2"}
+# Сохранение не затрагивает поля графа (например, обновление счёта live-матча)
+_PAIR_STATE_UNTOUCHED = object()
+
+
+def _pair_state(instance):
+    return tuple(getattr(instance, field) for field in PAIR_STATE_FIELDS)
+
+
+@receiver(pre_save, sender=Match)
+def remember_match_pair_state(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or not instance.pk:
+        before = None
+    elif update_fields is not None and not _PAIR_STATE_NAMES & set(update_fields):
+        before = _PAIR_STATE_UNTOUCHED
+    else:
+        # Состояние на момент загрузки (LoadedValuesMixin), запрос — только для экземпляров, созданных вручную
+        loaded = getattr(instance, "_loaded_values", None) or {}
+        if all(field in loaded for field in PAIR_STATE_FIELDS):
+            before = tuple(loaded[field] for field in PAIR_STATE_FIELDS)
+        else:
+            before = Match.objects.filter(pk=instance.pk).values_list(*PAIR_STATE_FIELDS).first()
+    instance._pair_state_before = before
+
+
+@receiver(post_save, sender=Match)
+def refresh_match_pair_stats(sender, instance, raw=False, **kwargs):
+    before = getattr(instance, "_pair_state_before", None)
+    if raw or before is _PAIR_STATE_UNTOUCHED:
+        return
+    after = _pair_state(instance)
+    loaded = getattr(instance, "_loaded_values", None)
+    if loaded is None:
+        loaded = instance._loaded_values = {}
+    loaded.update(zip(PAIR_STATE_FIELDS, after))
+
+    was_completed = bool(before) and before[0] == Match.Status.COMPLETED
+    if not was_completed and instance.status != Match.Status.COMPLETED:
+        return
+    if after == before:
+        return
+    team_ids = {team_id for team_id in (*(before or ())[2:], *after[2:]) if team_id}
+    refresh_pair_stats(
+        pid
+        for player_ids in Team.objects.filter(id__in=team_ids).values_list("player_1_id", "player_2_id")
+        for pid in player_ids
+    )
+    invalidate_tournament_days([instance.tournament_id])
+
+
+@receiver(pre_save, sender=Tournament)
+def remember_tournament_day(sender, instance, update_fields=None, raw=False, **kwargs):
+    before = None
+    if not raw and instance.pk:
+        if update_fields is not None and not {"date", "name"} & set(update_fields):
+            # Дата и название не сохраняются — день сводки не меняется
+            before = (instance.date, instance.name)
+        else:
+            # Состояние на момент загрузки (Tournament.from_db), запрос — только для экземпляров, созданных вручную
+            loaded = getattr(instance, "_loaded_values", None) or {}
+            if "date" in loaded and "name" in loaded:
+                before = (loaded["date"], loaded["name"])
+            else:
+                before = Tournament.objects.filter(pk=instance.pk).values_list("date", "name").first()
+    instance._stats_state_before = before
+
+
+@receiver(post_save, sender=Tournament)
+def invalidate_tournament_stats_day(sender, instance, raw=False, **kwargs):
+    # Дата и название (HARD/MEDIUM) турнира влияют на дневную сводку
+    before = getattr(instance, "_stats_state_before", None)
+    if raw or before is None or before == (instance.date, instance.name):
+        return
+    invalidate_days([before[0], instance.date])
+    if before[0] != instance.date:
+        # Даты последней встречи в рёбрах графа берутся из даты турнира
+        refresh_pair_stats(match_player_ids(Match.objects.filter(tournament_id=instance.pk)))
+    loaded = getattr(instance, "_loaded_values", None)
+    if loaded is not None:
+        loaded.update(date=instance.date, name=instance.name)
+
+
+@receiver(post_delete, sender=Tournament)
+def invalidate_deleted_tournament_stats_day(sender, instance, **kwargs):
+    invalidate_days([instance.date])
+
+
+# Пакетные записи (bulk_create/bulk_update) и удаления динамики сбрасывают таймлайны явно:
+# обработчик post_delete отключил бы быстрое удаление PlayerRatingDynamic одним запросом
+@receiver(post_save, sender=PlayerRatingDynamic)
+def invalidate_player_rating_timeline(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_rating_timelines([instance.player_id])
@@ -0,0 +1,54 @@
+from datetime import date
+
+from django.test import TestCase
+
+from apps.btr.models import BtrLatestRating, BtrPlayer
+from apps.players.models import Player
+from apps.players.services.btr_rating_mapper import (
+    calculate_bp_from_btr_value,
+    calculate_initial_bp_rating_from_btr,
+    calculate_initial_bp_ratings_from_btr,
+)
+from apps.players.services.initial_rating_service import get_initial_bp_ratings
+
+
+class BtrRatingMapperBatchTestCase(TestCase):
+    """Пакетный расчёт стартового BP рейтинга совпадает с поштучным"""
+
+    def setUp(self):
+        self.btr_ids = {}
+        ratings = {
+            1: {"men_double": 300, "men_mixed": 900},
+            2: {"women_double": 2000, "men_double": 50},
+            3: {"junior_male": 150},
+            4: {"men_double": 40, "junior_male": 150},
+            5: {},
+        }
+        for rni, categories in ratings.items():
+            player = BtrPlayer.objects.create(external_id=rni, rni=rni, last_name=f"Игрок{rni}")
+            self.btr_ids[rni] = player.id
+            for category, value in categories.items():
+                BtrLatestRating.objects.create(
+                    player=player, category=category, rating_date=date(2026, 1, 1), rating_value=value
+                )
+
+    def test_batch_matches_single(self):
+        ids = list(self.btr_ids.values()) + [999999]
+        with self.assertNumQueries(1):
+            batch = calculate_initial_bp_ratings_from_btr(ids)
+
+        self.assertEqual(batch, {btr_id: calculate_initial_bp_rating_from_btr(btr_id) for btr_id in ids})
+        self.assertEqual(batch[self.btr_ids[1]], calculate_bp_from_btr_value(300))
+        self.assertEqual(batch[self.btr_ids[2]], calculate_bp_from_btr_value(2000))
+        self.assertEqual(batch[self.btr_ids[3]], 800)
+        self.assertEqual(batch[self.btr_ids[4]], 1000)
+        self.assertEqual(batch[999999], 1000)
+
+    def test_initial_ratings_for_players(self):
+        linked = Player.objects.create(first_name="А", last_name="Б", btr_player_id=self.btr_ids[1])
+        unlinked = Player.objects.create(first_name="В", last_name="Г")
+
+        with self.assertNumQueries(1):
+            ratings = get_initial_bp_ratings([linked, unlinked])
+
+        self.assertEqual(ratings, {linked.id: calculate_bp_from_btr_value(300), unlinked.id: 1000})
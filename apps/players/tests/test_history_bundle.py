@@ -0,0 +1,68 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.players.models import PlayerRatingDynamic, PlayerRatingHistory
+from apps.tournaments.models import Tournament
+from apps.tournaments.tests.factories import make_match, make_pair_teams, make_players, make_round_robin
+
+
+class PlayerHistoryEndpointsTestCase(TestCase):
+    """История матчей игрока загружается фиксированным числом запросов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="viewer", password="x")
+        players = cls.a, cls.b, cls.c, cls.d = make_players(4, display_name=lambda i: f"И{i}")
+        cls.ab, cls.cd = make_pair_teams(players)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _add_matches(self, count):
+        for i in range(count):
+            tournament = make_round_robin(f"Турнир {Tournament.objects.count()}", date(2026, 1, 1))
+            match = make_match(tournament, self.ab, self.cd, self.ab, sets=[(6, 4)], group_index=1)
+            PlayerRatingHistory.objects.create(player=self.a, value=10, tournament=tournament, match=match)
+            for player, before in ((self.a, 1000), (self.b, 1100), (self.c, 900), (self.d, 950)):
+                PlayerRatingDynamic.objects.create(
+                    player=player, tournament=tournament, tournament_date=tournament.date,
+                    rating_before=before, rating_after=before, total_change=0, matches_count=1,
+                )
+
+    def _count_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_query_count_does_not_depend_on_history_size(self):
+        urls = [
+            reverse("rating_player_match_deltas", args=[self.a.id]),
+            reverse("rating_player_top_wins", args=[self.a.id]),
+            reverse("rating_h2h") + f"?a={self.a.id}&b={self.c.id}",
+        ]
+        self._add_matches(2)
+        small = [self._count_queries(url)[0] for url in urls]
+        self._add_matches(10)
+        large = [self._count_queries(url) for url in urls]
+        self.assertEqual([count for count, _ in large], small)
+
+        deltas = large[0][1]["tournaments"]
+        self.assertEqual(len(deltas), 12)
+        match = deltas[0]["matches"][0]
+        self.assertEqual(match["score"], "6:4")
+        self.assertEqual(match["partner"], "И1 Игрок1")
+        self.assertEqual(match["opponent"], "И2 Игрок2 vs И3 Игрок3")
+        self.assertEqual((match["team1_avg_before"], match["team2_avg_before"]), (1050, 925))
+
+        h2h = large[2][1]["matches"]
+        self.assertEqual(len(h2h), 12)
+        self.assertEqual(h2h[0]["delta_for_a"], 10)
@@ -0,0 +1,80 @@
+from django.test import SimpleTestCase, TestCase
+
+from apps.btr.models import BtrPlayer
+from apps.players.models import Player, PlayerNameKey
+from apps.players.services.name_index import (
+    find_name_candidates,
+    find_name_candidates_bulk,
+    name_tokens,
+    phonetic_code,
+)
+
+BTR = PlayerNameKey.Source.BTR
+BP = PlayerNameKey.Source.BP
+
+
+class NameNormalizationTestCase(SimpleTestCase):
+    def test_tokens_and_phonetics(self):
+        self.assertEqual(name_tokens("Семёнов", "Пётр"), ["семенов", "петр"])
+        self.assertEqual(name_tokens("Ivanov-Shchukin", "Andrey"), ["иванов", "щукин", "андрей"])
+        self.assertEqual(phonetic_code("алексеев"), phonetic_code("алексеив"))
+
+
+class NameIndexTestCase(TestCase):
+    """Индекс имён: обновление при сохранении и ранжированный поиск кандидатов"""
+
+    def setUp(self):
+        self.exact = BtrPlayer.objects.create(external_id=1, rni=1, last_name="Семёнов", first_name="Пётр")
+        self.phonetic = BtrPlayer.objects.create(external_id=2, rni=2, last_name="Алексеев", first_name="Иван")
+        self.typo = BtrPlayer.objects.create(external_id=3, rni=3, last_name="Константинопольский", first_name="Иван")
+        BtrPlayer.objects.create(external_id=4, rni=4, last_name="Сидоров", first_name="Олег")
+
+    def test_ranked_candidates(self):
+        with self.assertNumQueries(2):
+            candidates = find_name_candidates(BTR, "Семенов", "Петр")
+        self.assertEqual([(c.object_id, c.match) for c in candidates], [(self.exact.id, "exact")])
+
+        # Порядок слов не важен
+        self.assertEqual(find_name_candidates(BTR, "Петр", "Семенов")[0].object_id, self.exact.id)
+        self.assertEqual(
+            [(c.object_id, c.match) for c in find_name_candidates(BTR, "Алексеив", "Иван")][:1],
+            [(self.phonetic.id, "phonetic")],
+        )
+        typo = find_name_candidates(BTR, "Костантинопольский", "Иван")
+        self.assertEqual(typo[0].object_id, self.typo.id)
+        self.assertEqual(typo[0].match, "trigram")
+        self.assertGreater(typo[0].score, 0.5)
+        self.assertEqual(find_name_candidates(BTR, "Петров", "Николай"), [])
+
+    def test_bulk_matches_single_lookups(self):
+        names = {
+            1: ("Семенов", "Петр"),
+            2: ("Алексеив", "Иван"),
+            3: ("Костантинопольский", "Иван"),
+            4: ("Петров", "Николай"),
+            5: ("", None),
+        }
+        with self.assertNumQueries(2):
+            bulk = find_name_candidates_bulk(BTR, names, limit=5)
+        self.assertEqual(bulk, {ref: find_name_candidates(BTR, *name, limit=5) for ref, name in names.items()})
+
+    def test_index_follows_saves(self):
+        player = Player.objects.create(last_name="Иванов", first_name="Андрей")
+        self.assertEqual(find_name_candidates(BP, "Ivanov", "Andrey")[0].object_id, player.id)
+
+        player.last_name = "Смирнов"
+        player.save()
+        self.assertEqual(find_name_candidates(BP, "Смирнов", "Андрей")[0].object_id, player.id)
+        self.assertEqual(find_name_candidates(BP, "Иванов", "Андрей"), [])
+
+        # Сохранение без смены имени не переиндексирует (только UPDATE)
+        loaded = Player.objects.get(pk=player.pk)
+        loaded.city = "Москва"
+        with self.assertNumQueries(1):
+            loaded.save()
+        loaded.first_name = "Андрей Петрович"
+        loaded.save()
+        self.assertEqual(find_name_candidates(BP, "Смирнов", "Андрей Петрович")[0].match, "exact")
+
+        player.delete()
+        self.assertFalse(PlayerNameKey.objects.filter(source=BP).exists())
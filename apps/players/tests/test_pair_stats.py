@@ -0,0 +1,125 @@
+from datetime import date
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.matches.models import Match
+from apps.players.models import PlayerPairStats
+from apps.players.services.pair_stats import (
+    match_player_ids,
+    rebuild_pair_stats,
+    recommended_partner_ids,
+    refresh_pair_stats,
+)
+from apps.tournaments.tests.factories import (
+    CROSS_PAIRS,
+    make_match,
+    make_pair_teams,
+    make_players,
+    make_round_robin,
+)
+
+
+class PlayerPairStatsTestCase(TestCase):
+    """Граф связей игроков: пересчёт при изменении матчей и полная пересборка"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tournaments = [make_round_robin(f"Турнир {day}", date(2026, 1, day)) for day in (1, 2)]
+        players = cls.a, cls.b, cls.c, cls.d = make_players(4)
+        cls.ab, cls.cd, cls.ac, cls.bd = make_pair_teams(players, CROSS_PAIRS)
+
+    def _edge(self, player, other):
+        return PlayerPairStats.objects.get(player=player, other=other)
+
+    def test_incremental_updates_follow_matches(self):
+        first = make_match(self.tournaments[0], self.ab, self.cd, winner=self.ab)
+        scheduled = make_match(self.tournaments[1], self.ac, self.bd)
+
+        ab = self._edge(self.a, self.b)
+        self.assertEqual((ab.partner_matches, ab.partner_wins, ab.opponent_matches), (1, 1, 0))
+        ac = self._edge(self.a, self.c)
+        self.assertEqual((ac.partner_matches, ac.opponent_matches, ac.opponent_wins), (0, 1, 1))
+        self.assertEqual(self._edge(self.c, self.a).opponent_wins, 0)
+
+        scheduled.status = Match.Status.COMPLETED
+        scheduled.winner = self.bd
+        scheduled.save()
+        ac = self._edge(self.a, self.c)
+        self.assertEqual((ac.partner_matches, ac.partner_wins, ac.opponent_matches), (1, 0, 1))
+        self.assertEqual(ac.last_partner_date, date(2026, 1, 2))
+        self.assertEqual(recommended_partner_ids(self.a.id), [self.c.id, self.b.id])
+
+        # Смена победителя и откат результата пересчитывают рёбра
+        first.winner = self.cd
+        first.save()
+        self.assertEqual(self._edge(self.a, self.b).partner_wins, 0)
+        # Удаление идёт без сигналов: игроки собираются до удаления, граф пересчитывается один раз
+        affected = match_player_ids(Match.objects.filter(pk=first.pk))
+        first.delete()
+        refresh_pair_stats(affected)
+        ab = self._edge(self.a, self.b)
+        self.assertEqual((ab.partner_matches, ab.opponent_matches), (0, 1))
+        self.assertEqual(self._edge(self.c, self.d).partner_matches, 0)
+
+        expected = sorted(PlayerPairStats.objects.values_list(
+            "player_id", "other_id", "partner_matches", "partner_wins", "opponent_matches", "opponent_wins"
+        ))
+        rebuild_pair_stats()
+        self.assertEqual(sorted(PlayerPairStats.objects.values_list(
+            "player_id", "other_id", "partner_matches", "partner_wins", "opponent_matches", "opponent_wins"
+        )), expected)
+
+    def test_unchanged_save_does_not_recompute(self):
+        match = make_match(self.tournaments[0], self.ab, self.cd, winner=self.ab)
+        # Состояние берётся из экземпляра — только UPDATE
+        with self.assertNumQueries(1):
+            match.save()
+        loaded = Match.objects.get(pk=match.pk)
+        with self.assertNumQueries(1):
+            loaded.save()
+        # Обновление полей вне графа (счёт live-матча) не читает состояние
+        loaded.started_at = None
+        with self.assertNumQueries(1):
+            loaded.save(update_fields=["started_at"])
+
+    def test_tournament_date_change_refreshes_last_dates(self):
+        make_match(self.tournaments[0], self.ab, self.cd, winner=self.ab)
+        make_match(self.tournaments[1], self.ac, self.bd, winner=self.ac)
+        self.assertEqual(recommended_partner_ids(self.a.id), [self.c.id, self.b.id])
+
+        moved = self.tournaments[0]
+        moved.date = date(2026, 1, 3)
+        moved.save()
+        ab = self._edge(self.a, self.b)
+        self.assertEqual(ab.last_partner_date, date(2026, 1, 3))
+        self.assertEqual(self._edge(self.a, self.c).last_opponent_date, date(2026, 1, 3))
+        self.assertEqual(recommended_partner_ids(self.a.id), [self.b.id, self.c.id])
+
+    def test_tournament_removal_refreshes_edges(self):
+        make_match(self.tournaments[0], self.ab, self.cd, winner=self.ab)
+        make_match(self.tournaments[1], self.ac, self.bd, winner=self.ac)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="pairs", password="x"))
+        response = client.post(reverse("api_tournament_remove", args=[self.tournaments[0].id]))
+        self.assertEqual(response.status_code, 200)
+        ab = self._edge(self.a, self.b)
+        self.assertEqual((ab.partner_matches, ab.opponent_matches), (0, 1))
+        self.assertEqual(recommended_partner_ids(self.a.id), [self.c.id])
+
+    def test_player_merge_moves_edges_to_target(self):
+        duplicate = make_players(1, last_name="Дубль")[0]
+        (eb,) = make_pair_teams([duplicate, self.b])
+        make_match(self.tournaments[0], eb, self.cd, winner=eb)
+        self.assertEqual(self._edge(duplicate, self.b).partner_matches, 1)
+
+        call_command("players_merge", duplicate.id, self.a.id, stdout=StringIO())
+        ab = self._edge(self.a, self.b)
+        self.assertEqual((ab.partner_matches, ab.partner_wins), (1, 1))
+        self.assertEqual(self._edge(self.a, self.c).opponent_matches, 1)
+        self.assertEqual(recommended_partner_ids(self.a.id), [self.b.id])
@@ -0,0 +1,47 @@
+from django.test import TestCase
+
+from apps.players.models import Player, PlayerRatingDynamic, PlayerRatingHistory
+from apps.players.services.parallel_recompute import dependency_waves, recompute_tournaments_parallel
+from apps.players.services.rating_service import compute_ratings_for_tournament
+from apps.tournaments.models import Tournament
+from apps.tournaments.tests.factories import make_match, make_pair_teams, make_players, make_round_robin
+
+
+class ParallelRecomputeTestCase(TestCase):
+    """Волны зависимостей турниров и совпадение параллельного пересчёта с последовательным"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.players = make_players(8, current_rating=lambda i: 1000 + 25 * i)
+        teams = make_pair_teams(cls.players)
+        cls.tournaments = []
+        # Первые два турнира без общих игроков, третий зависит от обоих
+        for day, pairs in ((1, [(0, 1)]), (1, [(2, 3)]), (2, [(0, 2), (1, 3)])):
+            tournament = make_round_robin(f"Тест {len(cls.tournaments)}", f"2026-06-0{day}")
+            for a, b in pairs:
+                make_match(tournament, teams[a], teams[b], teams[b], sets=[(4, 6)])
+            cls.tournaments.append(tournament)
+
+    def snapshot(self):
+        return (
+            list(Player.objects.order_by("id").values_list("current_rating", flat=True)),
+            list(PlayerRatingHistory.objects.order_by("id").values_list("player_id", "tournament_id", "match_id", "value", "reason")),
+            list(PlayerRatingDynamic.objects.order_by("id").values_list("player_id", "tournament_id", "rating_before", "rating_after", "meta")),
+        )
+
+    def test_dependency_waves(self):
+        waves = dependency_waves([1, 2, 3, 4], {1: [10, 11], 2: [12], 3: [11, 12], 4: [13]})
+        self.assertEqual(waves, [[1, 2, 4], [3]])
+
+    def test_parallel_matches_serial(self):
+        for tournament in self.tournaments:
+            compute_ratings_for_tournament(tournament.id)
+        serial = self.snapshot()
+
+        PlayerRatingHistory.objects.all().delete()
+        PlayerRatingDynamic.objects.all().delete()
+        Player.objects.bulk_update(self.players, ["current_rating"])
+        result = recompute_tournaments_parallel(list(Tournament.objects.order_by("date", "id")), workers=2)
+        self.assertEqual((result.waves, result.errors), (2, {}))
+        self.assertEqual(result.processed, [t.id for t in self.tournaments])
+        self.assertEqual(self.snapshot(), serial)
@@ -0,0 +1,39 @@
+from django.test import TestCase
+
+from apps.players.models import Player
+from apps.players.services.player_search import RANK_PREFIX, RANK_SUBSTRING, RANK_TOKEN, search_players
+
+
+class PlayerSearchTestCase(TestCase):
+    """Общий поиск игроков: строка поиска и ранжирование"""
+
+    def setUp(self):
+        self.ivanov = Player.objects.create(last_name="Иванов", first_name="Пётр", city="Москва")
+        self.petrov = Player.objects.create(last_name="Петров", first_name="Иван", patronymic="Иванович")
+        self.kalinin = Player.objects.create(last_name="Калинин", first_name="Олег", city="Иваново")
+        Player.objects.create(last_name="Сидоров", first_name="Олег")
+
+    def test_search_text_maintained_on_save(self):
+        self.assertEqual(self.ivanov.search_text, " иванов петр петр москва")
+
+        self.ivanov.last_name = "Смирнов"
+        self.ivanov.save(update_fields=["last_name"])
+        self.ivanov.refresh_from_db()
+        self.assertEqual(self.ivanov.search_text, " смирнов петр петр москва")
+
+    def test_ranking(self):
+        with self.assertNumQueries(1):
+            players = search_players("Иван")
+        self.assertEqual(players, [self.ivanov, self.kalinin, self.petrov])
+        self.assertEqual(players[0].search_rank, RANK_PREFIX)
+        self.assertEqual(players[2].search_rank, RANK_TOKEN)
+
+        self.assertEqual(search_players("ванов"), [self.ivanov, self.kalinin, self.petrov])
+        self.assertEqual(search_players("ванов")[0].search_rank, RANK_SUBSTRING)
+
+    def test_word_order_yo_and_exclude(self):
+        # «Петров Иван Иванович» тоже подходит (префиксы слов), но ниже
+        self.assertEqual(search_players("петр иванов"), [self.ivanov, self.petrov])
+        self.assertEqual(search_players("Иванов Пётр")[0], self.ivanov)
+        self.assertEqual(search_players("иван", exclude_ids=[self.ivanov.id, self.kalinin.id]), [self.petrov])
+        self.assertEqual(search_players("  "), [])
@@ -0,0 +1,38 @@
+import json
+from pathlib import Path
+
+from django.test import TestCase
+
+from apps.players.services.rating_benchmark import (
+    BenchmarkConfig,
+    diff_snapshots,
+    generate_history,
+    reset_history,
+    run_recompute_history,
+    run_serial,
+    snapshot,
+)
+
+GOLDEN = Path(__file__).parent / "golden" / "rating_benchmark.json"
+# Параметры, с которыми записан эталон:
+# manage.py benchmark_rating --players 24 --tournaments 8 --multi-stage-every 4 --write-golden <GOLDEN>
+CONFIG = BenchmarkConfig(players=24, tournaments=8, multi_stage_every=4)
+
+
+class RatingBenchmarkTestCase(TestCase):
+    """Расчёт рейтинга на синтетической истории: эталон и лимиты запросов"""
+
+    def test_matches_golden_within_query_budgets(self):
+        golden = json.loads(GOLDEN.read_text(encoding="utf-8"))
+        history = generate_history(CONFIG)
+        initial_ratings = {p.id: p.current_rating for p in history.players}
+
+        stats = run_serial(history)
+        self.assertEqual(diff_snapshots(golden["serial"], snapshot(history)), [])
+        for item in stats.values():
+            self.assertTrue(item.calls)
+            self.assertFalse(item.over_budget, f"{item.name}: {item.max_queries} запросов")
+
+        reset_history(history, initial_ratings)
+        run_recompute_history(history)
+        self.assertEqual(diff_snapshots(golden["recompute_history"], snapshot(history)), [])
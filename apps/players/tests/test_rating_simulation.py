@@ -0,0 +1,62 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.matches.models import Match
+from apps.players.models import PlayerRatingDynamic, PlayerRatingTimeline
+from apps.players.services.rating_service import compute_ratings_for_tournament
+from apps.players.services.rating_simulation import simulate_tournament
+from apps.tournaments.models import SetFormat
+from apps.tournaments.tests.factories import make_match, make_pair_teams, make_players, make_round_robin
+
+
+class RatingSimulationTestCase(TestCase):
+    """Прогноз рейтинга совпадает с расчётом rating_service и ничего не пишет в БД"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tournament = make_round_robin(
+            date="2026-06-01", rating_coefficient=1.2, set_format=SetFormat.objects.create(name="Тест 3 сета")
+        )
+        players = make_players(6, current_rating=lambda i: 900 + 50 * i if i else 0)
+        a, b, c = make_pair_teams(players)
+        make_match(cls.tournament, a, b, b, sets=[(4, 6)])
+        make_match(cls.tournament, b, c, b, sets=[(6, 2), (6, 3)])
+        cls.pending = make_match(cls.tournament, a, c)
+
+    def test_matches_rating_service_without_writes(self):
+        with CaptureQueriesContext(connection) as ctx:
+            result, _ = simulate_tournament(self.tournament)
+        self.assertTrue(all(q["sql"].lstrip().upper().startswith("SELECT") for q in ctx.captured_queries))
+        self.assertFalse(PlayerRatingDynamic.objects.exists() or PlayerRatingTimeline.objects.exists())
+
+        compute_ratings_for_tournament(self.tournament.id)
+        expected = {
+            d.player_id: (d.rating_before, int(d.total_change), int(d.rating_after), d.matches_count)
+            for d in PlayerRatingDynamic.objects.filter(tournament=self.tournament)
+        }
+        self.assertEqual(
+            {p.player_id: (p.rating_before, p.delta, p.rating_after, p.matches) for p in result.players.values()},
+            expected,
+        )
+
+    def test_hypothetical_scores(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="admin", password="x", is_staff=True))
+        url = reverse("tournament-rating-simulation", args=[self.tournament.id])
+        results = [{"match_id": self.pending.id, "sets": [{"index": 1, "games_1": 6, "games_2": 0}]}]
+        data = client.post(url, {"results": results}, format="json").json()
+        self.assertTrue(data["ok"])
+        self.assertEqual(len(data["matches"]), 3)
+        projected = data["matches"][-1]
+        self.assertEqual((projected["match_id"], projected["hypothetical"]), (self.pending.id, True))
+        self.assertGreater(projected["team_1_change"], 0)
+        self.assertEqual(sum(p["matches"] for p in data["players"]), 12)
+
+        self.pending.refresh_from_db()
+        self.assertEqual((self.pending.status, self.pending.sets.count()), (Match.Status.SCHEDULED, 0))
+        bad = client.post(url, {"results": [{"match_id": 0, "sets": [{"games_1": 6}]}]}, format="json")
+        self.assertEqual(bad.status_code, 400)
@@ -0,0 +1,58 @@
+from datetime import date
+
+from django.test import TestCase
+
+from apps.players.models import PlayerRatingDynamic, PlayerRatingTimeline
+from apps.players.services.initial_rating_service import get_initial_bp_ratings
+from apps.players.services.rating_timeline import (
+    invalidate_tournament_rating_timelines,
+    rating_at,
+)
+from apps.tournaments.tests.factories import make_players, make_round_robin
+
+
+class RatingTimelineTestCase(TestCase):
+    """Рейтинг на дату: двоичный поиск по таймлайну, хранение и сброс при изменении динамики"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.may = make_round_robin("Май", date(2026, 5, 1))
+        cls.june_am = make_round_robin("Июнь утро", date(2026, 6, 1))
+        cls.june_pm = make_round_robin("Июнь вечер hard", date(2026, 6, 1))
+        cls.a, cls.b = make_players(2)
+        PlayerRatingDynamic.objects.bulk_create([
+            PlayerRatingDynamic(player=cls.a, tournament=t, tournament_date=t.date,
+                                rating_before=before, rating_after=after, total_change=after - before)
+            for t, before, after in ((cls.may, 1000, 1020), (cls.june_am, 1020, 1050), (cls.june_pm, 1050, 1040))
+        ])
+
+    def test_rating_at_date(self):
+        ids = [self.a.id, self.b.id]
+        self.assertEqual(rating_at(ids, date(2026, 4, 30)), {})
+        self.assertEqual(rating_at(ids, date(2026, 5, 1)), {self.a.id: 1000})
+        self.assertEqual(rating_at(ids, date(2026, 5, 20)), {self.a.id: 1020})
+        # Два турнира в один день: без турнира — рейтинг на начало дня, с турниром — до него
+        self.assertEqual(rating_at(ids, date(2026, 6, 1)), {self.a.id: 1020})
+        self.assertEqual(rating_at(ids, date(2026, 6, 1), tournament_id=self.june_pm.id), {self.a.id: 1050})
+        self.assertEqual(rating_at(ids, date(2027, 1, 1)), {self.a.id: 1040})
+
+        # Таймлайн сохранён: дальше один запрос без обращения к динамике
+        self.assertTrue(PlayerRatingTimeline.objects.filter(player=self.a).exists())
+        with self.assertNumQueries(1):
+            rating_at(ids, date(2027, 1, 1))
+
+    def test_timeline_follows_dynamics(self):
+        self.assertEqual(rating_at([self.a.id], date(2027, 1, 1)), {self.a.id: 1040})
+        # Одиночное сохранение — сигнал
+        dynamic = PlayerRatingDynamic.objects.get(player=self.a, tournament=self.june_pm)
+        dynamic.rating_after = 1090
+        dynamic.save()
+        self.assertEqual(rating_at([self.a.id], date(2027, 1, 1)), {self.a.id: 1090})
+        # Удаление — явный сброс
+        invalidate_tournament_rating_timelines([self.june_pm.id])
+        PlayerRatingDynamic.objects.filter(tournament=self.june_pm).delete()
+        self.assertEqual(rating_at([self.a.id], date(2027, 1, 1)), {self.a.id: 1050})
+
+    def test_initial_rating_uses_history_at_tournament_date(self):
+        ratings = get_initial_bp_ratings([self.a, self.b], self.june_pm)
+        self.assertEqual(ratings, {self.a.id: 1020, self.b.id: 1050})
@@ -0,0 +1,100 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.players.models import PlayerDayStats, StatsDay
+from apps.tournaments.tests.factories import (
+    CROSS_PAIRS,
+    make_match,
+    make_pair_teams,
+    make_players,
+    make_round_robin,
+)
+
+
+class SummaryStatsTestCase(TestCase):
+    """Сводка дашборда: закрытые дни из дневной сводки, сегодня — по матчам"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.localdate()
+
+        def tournament(name, days_ago):
+            return make_round_robin(name, cls.today - timedelta(days=days_ago))
+
+        cls.hard = tournament("Кубок HARD", 10)
+        cls.medium = tournament("Кубок MEDIUM", 5)
+        cls.live = tournament("Кубок дня", 0)
+        players = cls.a, cls.b, cls.c, cls.d = make_players(4)
+        ab, cd, ac, bd = make_pair_teams(players, CROSS_PAIRS)
+        cls.cd = cd
+        cls.first = make_match(cls.hard, ab, cd, ab, group_index=1)
+        make_match(cls.medium, ac, bd, bd, group_index=1)
+        make_match(cls.live, ab, cd, cd, group_index=1)
+
+    def _summary(self, **params):
+        response = self.client.get(reverse("stats_summary"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _player_row(self, data, player):
+        return next(row for row in data["tables"]["top_active"] if row["id"] == player.id)
+
+    def test_summary_over_rollup_and_live_day(self):
+        data = self._summary()
+        self.assertEqual(data["overall"]["matches"], 3)
+        self.assertEqual(data["overall"]["players_with_matches"], 4)
+        self.assertEqual(data["by_tournament_types"], {
+            "hard_tournaments": 1, "medium_tournaments": 1, "other_tournaments": 1, "proam_tournaments": 0,
+        })
+        self.assertEqual(data["players_distribution_by_types"]["both"], 4)
+        a = self._player_row(data, self.a)
+        self.assertEqual(
+            (a["matches_count"], a["wins"], a["losses"], a["tournaments_count"]), (3, 1, 2, 3)
+        )
+        self.assertEqual((a["unique_partners"], a["unique_opponents"]), (2, 3))
+        # Закрытые дни посчитаны, сегодняшний — нет
+        self.assertEqual(StatsDay.objects.count(), 2)
+
+        data = self._summary(**{"from": (self.today - timedelta(days=6)).isoformat()})
+        self.assertEqual(data["overall"]["matches"], 2)
+        a = self._player_row(data, self.a)
+        self.assertEqual((a["unique_partners"], a["unique_opponents"]), (2, 3))
+
+    def test_match_change_invalidates_day(self):
+        self._summary()
+        self.first.winner = self.cd
+        self.first.save()
+        self.assertEqual(StatsDay.objects.count(), 1)
+        self.assertEqual(self._player_row(self._summary(), self.a)["wins"], 0)
+
+    def test_deleted_or_moved_tournament_leaves_no_stale_day(self):
+        self._summary()
+        # Перенос на другой закрытый день: матч считается один раз
+        self.hard.date = self.today - timedelta(days=7)
+        self.hard.save()
+        data = self._summary()
+        self.assertEqual(data["overall"]["matches"], 3)
+        self.assertEqual(self._player_row(data, self.a)["matches_count"], 3)
+
+        # Удаление: строк игроков за опустевший день не остаётся
+        self.medium.delete()
+        data = self._summary()
+        self.assertEqual(data["overall"]["matches"], 2)
+        self.assertEqual(self._player_row(data, self.a)["matches_count"], 2)
+        self.assertFalse(PlayerDayStats.objects.filter(date=self.today - timedelta(days=5)).exists())
+
+    def test_player_merge_invalidates_days(self):
+        duplicate = make_players(1, last_name="Дубль")[0]
+        (eb,) = make_pair_teams([duplicate, self.b])
+        make_match(self.hard, eb, self.cd, eb, group_index=2)
+        self.assertEqual(self._player_row(self._summary(), self.a)["matches_count"], 3)
+
+        call_command("players_merge", duplicate.id, self.a.id, stdout=StringIO())
+        data = self._summary()
+        self.assertEqual(data["overall"]["matches"], 4)
+        self.assertEqual(self._player_row(data, self.a)["matches_count"], 4)
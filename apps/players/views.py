@@ -5,10 +5,10 @@ from django.http import JsonResponse
 from django.views.decorators.http import require_GET, require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.db import IntegrityError, connection, transaction
-from django.db.models import Q
 import json
 
 from apps.players.models import Player
+from apps.players.services import player_search
 from apps.players.services.initial_rating_service import get_initial_bp_rating
 
 
@@ -24,9 +24,7 @@ def search_players(request):
     if len(query) < 2:
         return JsonResponse({'players': []})
     
-    players = Player.objects.filter(
-        Q(first_name__icontains=query) | Q(last_name__icontains=query) | Q(display_name__icontains=query)
-    ).order_by('last_name', 'first_name')[:10]
+    players = player_search.search_players(query, limit=10)
     
     return JsonResponse({
         'players': [{
@@ -1,6 +1,6 @@
 from io import BytesIO
-from datetime import datetime, time, timedelta
-from typing import Any
+from datetime import time
+from typing import Any, Optional
 
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
@@ -15,11 +15,14 @@ from apps.accounts.permissions import IsTournamentCreatorOrAdmin, Role, _get_use
 
 from django.db import transaction
 from django.db.models import Max, Q
+from django.http import FileResponse, HttpResponse
+from django.shortcuts import get_object_or_404
 
 from .models import (
     Schedule,
     ScheduleCourt,
     ScheduleGlobalBreak,
+    ScheduleExportJob,
     ScheduleRun,
     ScheduleScope,
     ScheduleScopeCourt,
@@ -27,6 +30,25 @@ from .models import (
     ScheduleWave,
 )
 from .serializers import ScheduleSerializer
+from .services.exports import (
+    CONTENT_TYPES,
+    NUMBERS,
+    ExportArtifact,
+    ExportUnavailable,
+    download_filename,
+    export_now,
+    is_supported_format,
+    job_payload,
+    request_export,
+)
+from .services.render_model import ScheduleRenderModel, SlotView, build_render_model, planned_start_times
+from .services.pdf_render_pool import (
+    PdfOptions,
+    RenderError,
+    RenderPoolBusy,
+    RenderUnavailable,
+    render_pdf,
+)
 
 
 class ScheduleViewSet(viewsets.ModelViewSet):
@@ -623,194 +645,6 @@ class ScheduleViewSet(viewsets.ModelViewSet):
         schedule.refresh_from_db()
         return Response({"ok": True, "schedule": ScheduleSerializer(schedule).data})
 
-    def _compute_rr_row_by_team(self, slots_qs: Any) -> dict[tuple[int, int, int], int]:
-        rr_row_by_team: dict[tuple[int, int, int], int] = {}
-        try:
-            from apps.tournaments.models import TournamentEntry
-
-            t_ids: set[int] = set()
-            team_ids: set[int] = set()
-            for s in slots_qs:
-                if getattr(s, "slot_type", None) != "match":
-                    continue
-                m = getattr(s, "match", None)
-                if not m or not getattr(m, "tournament_id", None):
-                    continue
-                t_ids.add(int(m.tournament_id))
-                if getattr(m, "team_1_id", None):
-                    team_ids.add(int(m.team_1_id))
-                if getattr(m, "team_2_id", None):
-                    team_ids.add(int(m.team_2_id))
-
-            if t_ids and team_ids:
-                qs = TournamentEntry.objects.filter(tournament_id__in=list(t_ids), team_id__in=list(team_ids)).only(
-                    "tournament_id", "team_id", "group_index", "row_index"
-                )
-                for e in qs:
-                    gi = int(e.group_index) if e.group_index is not None else 0
-                    if gi <= 0 or e.row_index is None:
-                        continue
-                    rr_row_by_team[(int(e.tournament_id), gi, int(e.team_id))] = int(e.row_index)
-        except Exception:
-            rr_row_by_team = {}
-        return rr_row_by_team
-
-    def _run_top_label(self, run_obj: Any) -> str:
-        try:
-            mode = getattr(run_obj, "start_mode", "")
-            if mode == "then":
-                return "Затем"
-            if mode == "not_earlier":
-                t = getattr(run_obj, "not_earlier_time", None)
-                if t:
-                    return f"Не ранее {t.strftime('%H:%M')}"
-                return "Не ранее"
-            t = getattr(run_obj, "start_time", None)
-            if t:
-                return t.strftime("%H:%M")
-        except Exception:
-            pass
-        return ""
-
-    def _match_meta_label(self, m: Any, rr_row_by_team: dict[tuple[int, int, int], int]) -> str:
-        if not m:
-            return ""
-
-        def _schedule_prefix(match_obj: Any) -> str:
-            try:
-                t = getattr(match_obj, "tournament", None)
-                if not t:
-                    return ""
-                val = str(getattr(t, "name_for_schedule", "") or "").strip()
-                if not val:
-                    tid = getattr(t, "id", None)
-                    if tid is not None:
-                        val = f"#{tid}"
-                if len(val) > 10:
-                    val = val[:10]
-                return val
-            except Exception:
-                return ""
-
-        gi = getattr(m, "group_index", None)
-
-        def _is_proam_rr(match_obj: Any) -> bool:
-            try:
-                t = getattr(match_obj, "tournament", None)
-                if not t:
-                    return False
-                if getattr(t, "system", None) != Tournament.System.ROUND_ROBIN:
-                    return False
-                name = str(getattr(t, "name", "") or "").lower()
-                return ("proam" in name) or ("проам" in name)
-            except Exception:
-                return False
-
-        def _group_letter(i: Any) -> str:
-            try:
-                n = int(i)
-            except Exception:
-                return ""
-            letters = [
-                "А",
-                "Б",
-                "В",
-                "Г",
-                "Д",
-                "Е",
-                "Ж",
-                "З",
-                "И",
-                "Й",
-                "К",
-                "Л",
-                "М",
-                "Н",
-                "О",
-                "П",
-                "Р",
-                "С",
-                "Т",
-                "У",
-                "Ф",
-                "Х",
-                "Ц",
-                "Ч",
-                "Ш",
-                "Щ",
-                "Э",
-                "Ю",
-                "Я",
-            ]
-            if n <= 0:
-                return ""
-            if n <= len(letters):
-                return letters[n - 1]
-            return str(n)
-
-        if gi is None:
-            group = ""
-        else:
-            group = f"гр.{_group_letter(gi)}" if _is_proam_rr(m) else f"гр.{gi}"
-
-        try:
-            system = getattr(getattr(m, "tournament", None), "system", "")
-        except Exception:
-            system = ""
-
-        prefix = _schedule_prefix(m)
-
-        if system == "knockout":
-            rn = str(getattr(m, "round_name", "") or "").strip()
-            if rn:
-                return " ".join([p for p in [prefix, rn] if p])
-            ri = getattr(m, "round_index", None)
-            base = f"Раунд {ri}".strip() if ri is not None else ""
-            return " ".join([p for p in [prefix, base] if p])
-
-        if system == "round_robin":
-            rn = str(getattr(m, "round_name", "") or "").strip()
-            if rn and "гр." in rn and "•" in rn:
-                return " ".join([p for p in [prefix, rn] if p])
-            try:
-                gi_int = int(gi) if gi is not None else 0
-                t_id = int(getattr(m, "tournament_id", 0) or 0)
-                a_id = int(getattr(m, "team_1_id", 0) or 0)
-                b_id = int(getattr(m, "team_2_id", 0) or 0)
-                r1 = rr_row_by_team.get((t_id, gi_int, a_id))
-                r2 = rr_row_by_team.get((t_id, gi_int, b_id))
-                pair = f"{r1}-{r2}" if (r1 is not None and r2 is not None) else ""
-                base = " • ".join([p for p in [group, pair] if p])
-                return " ".join([p for p in [prefix, base] if p])
-            except Exception:
-                return " ".join([p for p in [prefix, group] if p])
-
-        if system == "king":
-            def _raw_team_label(team: Any) -> str:
-                if not team:
-                    return ""
-                return str(
-                    getattr(team, "display_name", None)
-                    or getattr(team, "full_name", None)
-                    or getattr(team, "name", None)
-                    or ""
-                ).strip()
-
-            def _normalize_pair(text: str) -> str:
-                return str(text or "").replace(" ", "").replace("/", "+").upper()
-
-            a = _normalize_pair(_raw_team_label(getattr(m, "team_1", None)))
-            b = _normalize_pair(_raw_team_label(getattr(m, "team_2", None)))
-            vs = f"{a} vs {b}" if a and b else ""
-            rn = str(getattr(m, "round_name", "") or "").strip()
-            mid = getattr(m, "id", None)
-            fallback = f"Матч {mid}" if mid is not None else ""
-            meta = vs or rn or fallback
-            base = " • ".join([p for p in [group, meta] if p])
-            return " ".join([p for p in [prefix, base] if p])
-
-        return " ".join([p for p in [prefix, group] if p])
-
     def destroy(self, request, *args, **kwargs):
         schedule: Schedule = self.get_object()
         self._ensure_can_manage_schedule(request, schedule)
@@ -1122,153 +956,44 @@ class ScheduleViewSet(viewsets.ModelViewSet):
             )
         return Response({"ok": True, "matches": items})
 
-    @action(detail=True, methods=["get"], url_path="export/pdf", permission_classes=[IsAuthenticated])
-    def export_pdf(self, request, pk=None):
-        schedule: Schedule = self.get_object()
-        self._ensure_can_manage_schedule(request, schedule)
-
-        # Prefer HTML/CSS -> PDF rendering via headless Chromium (maximally identical to browser).
-        # If Playwright/Chromium is unavailable on the server, fall back to legacy ReportLab renderer.
+    def _build_pdf(self, schedule: Schedule, model: Optional[ScheduleRenderModel] = None) -> ExportArtifact:
+        # Prefer HTML/CSS -> PDF rendering via the warm headless Chromium pool (maximally identical to browser).
+        # Legacy ReportLab renderer is used only if Playwright/Chromium is unavailable on the server;
+        # a crashed browser is recycled by the pool instead.
+        model = model or build_render_model(schedule)
+        courts = model.courts
+        title = model.title
         try:
-            from playwright.sync_api import sync_playwright
-
-            courts = list(schedule.courts.all().order_by("index"))
             dense_mode = len(courts) >= 9
-            runs = list(schedule.runs.all().order_by("index"))
-            slots_qs = schedule.slots.select_related(
-                "run",
-                "court",
-                "match",
-                "match__tournament",
-                "match__team_1",
-                "match__team_2",
-            )
-            slots_map: dict[tuple[int, int], Any] = {}
-            for s in slots_qs:
-                slots_map[(s.run_id, s.court_id)] = s
-
-            rr_row_by_team = self._compute_rr_row_by_team(slots_qs)
-
-            tournament_names = []
-            for scope in schedule.scopes.select_related("tournament").all():
-                if scope.tournament and scope.tournament.name:
-                    tournament_names.append(str(scope.tournament.name))
-            title = " + ".join(tournament_names) if tournament_names else "Расписание"
 
             def esc(v: Any) -> str:
                 import html
 
                 return html.escape("" if v is None else str(v))
 
-            def fmt_date(d: Any) -> str:
-                try:
-                    return d.strftime("%d.%m.%Y") if d else ""
-                except Exception:
-                    return str(d or "")
-
-            def _raw_team_label(team: Any) -> str:
-                if not team:
-                    return ""
-                return (
-                    getattr(team, "display_name", None)
-                    or getattr(team, "name", None)
-                    or str(team)
-                )
-
-            def _split_players(label: str) -> list[tuple[str, str]]:
-                import re
-
-                s = (label or "").strip()
-                if not s or s.upper() == "TBD":
-                    return []
-
-                parts = [p.strip() for p in re.split(r"\s*/\s*", s) if p.strip()]
-                out: list[tuple[str, str]] = []
-                for p in parts:
-                    tokens = [t for t in p.split() if t]
-                    if not tokens:
-                        continue
-                    surname = tokens[0]
-                    initial = ""
-                    if len(tokens) >= 2 and tokens[1]:
-                        initial = tokens[1][0].upper()
-                    out.append((surname, initial))
-                return out
-
-            def _players_unique_key(surname: str, initial: str) -> str:
-                return f"{surname}|{initial}" if initial else surname
-
-            surname_to_keys: dict[str, set[str]] = {}
-            for s in slots_qs:
-                if getattr(s, "slot_type", None) != "match":
-                    continue
-                m = getattr(s, "match", None)
-                if not m:
-                    continue
-                for team in [getattr(m, "team_1", None), getattr(m, "team_2", None)]:
-                    raw = _raw_team_label(team)
-                    for (sn, ini) in _split_players(raw):
-                        surname_to_keys.setdefault(sn, set()).add(_players_unique_key(sn, ini))
-
-            def team_label(team: Any) -> str:
-                if not team:
-                    return "TBD"
-
-                raw = _raw_team_label(team)
-                if not raw:
-                    return "TBD"
-
-                players = _split_players(raw)
-                if not players:
-                    return raw
-
-                labels: list[str] = []
-                for (sn, ini) in players:
-                    if len(surname_to_keys.get(sn, set())) > 1 and ini:
-                        labels.append(f"{sn} {ini}.")
-                    else:
-                        labels.append(sn)
-                return "\n".join(labels)
-
-            def run_top_label(run_obj: Any) -> str:
-                return self._run_top_label(run_obj)
-
-            def match_meta_label(m: Any) -> str:
-                return self._match_meta_label(m, rr_row_by_team)
-
-            def slot_class(slot: Any) -> str:
-                try:
-                    if slot and slot.match and slot.match.status == Match.Status.LIVE:
-                        return " cellLive"
-                    if slot and slot.match and slot.match.status == Match.Status.COMPLETED:
-                        return " cellCompleted"
-                except Exception:
-                    pass
+            def slot_class(slot: Optional[SlotView]) -> str:
+                if slot and slot.match_status == Match.Status.LIVE:
+                    return " cellLive"
+                if slot and slot.match_status == Match.Status.COMPLETED:
+                    return " cellCompleted"
                 return ""
 
-            def slot_html(run_obj: Any, slot: Any) -> str:
+            def slot_html(slot: Optional[SlotView]) -> str:
                 if not slot:
                     return ""
-                if getattr(slot, "slot_type", None) == "text":
-                    return f'<div class="cellText">{esc(getattr(slot, "text_title", "") or "")}</div>'
-                if getattr(slot, "slot_type", None) == "match" and getattr(slot, "match_id", None):
-                    if getattr(slot, "override_title", None):
+                if slot.slot_type == "text":
+                    return f'<div class="cellText">{esc(slot.text_title)}</div>'
+                if slot.slot_type == "match" and slot.match_id:
+                    if slot.override_title:
                         return f'<div class="cellText">{esc(slot.override_title)}</div>'
-                    m = getattr(slot, "match", None)
-                    if not m:
+                    if not slot.has_match:
                         return f'<div class="cellText">Матч #{esc(slot.match_id)}</div>'
-                    t0 = str(getattr(slot, "override_subtitle", None) or "").strip() or run_top_label(run_obj)
-                    meta = match_meta_label(m)
-                    t1 = team_label(getattr(m, "team_1", None))
-                    t2 = team_label(getattr(m, "team_2", None))
-                    t1_lines = [ln for ln in str(t1).split("\n") if ln]
-                    t2_lines = [ln for ln in str(t2).split("\n") if ln]
-                    t1_html = "".join([f'<div class="player">{esc(ln)}</div>' for ln in t1_lines])
-                    t2_html = "".join([f'<div class="player">{esc(ln)}</div>' for ln in t2_lines])
+                    t1_html = "".join([f'<div class="player">{esc(ln)}</div>' for ln in slot.team_1.short if ln])
+                    t2_html = "".join([f'<div class="player">{esc(ln)}</div>' for ln in slot.team_2.short if ln])
                     return (
                         '<div class="matchTile">'
-                        + (f'<div class="matchTop">{esc(t0)}</div>' if t0 else '')
-                        + (f'<div class="matchMeta">{esc(meta)}</div>' if meta else '')
+                        + (f'<div class="matchTop">{esc(slot.top)}</div>' if slot.top else '')
+                        + (f'<div class="matchMeta">{esc(slot.meta)}</div>' if slot.meta else '')
                         + f'<div class="teamBlock">{t1_html}</div>'
                         '<div class="vs">против</div>'
                         f'<div class="teamBlock">{t2_html}</div>'
@@ -1290,7 +1015,7 @@ class ScheduleViewSet(viewsets.ModelViewSet):
             )
 
             body_rows: list[str] = []
-            for r in runs:
+            for r in model.runs:
                 left = (
                     f"<td class=\"runCol\">"
                     f"<div class=\"runTitle\">Запуск {esc(r.index)}</div>"
@@ -1303,8 +1028,8 @@ class ScheduleViewSet(viewsets.ModelViewSet):
                 )
                 cells = []
                 for c in courts:
-                    slot = slots_map.get((r.id, c.id))
-                    cells.append(f"<td class=\"cell{slot_class(slot)}\">{slot_html(r, slot)}</td>")
+                    slot = model.cell(r, c)
+                    cells.append(f"<td class=\"cell{slot_class(slot)}\">{slot_html(slot)}</td>")
                 body_rows.append("<tr>" + left + "".join(cells) + "</tr>")
 
             html_doc = f"""<!doctype html>
@@ -1370,7 +1095,7 @@ class ScheduleViewSet(viewsets.ModelViewSet):
       <div class="h1">Расписание</div>
       <div class="h2">{esc(title)}</div>
     </div>
-    <div class=\"date\">{esc(fmt_date(schedule.date))}</div>
+    <div class=\"date\">{esc(model.date_text)}</div>
   </div>
 
   <table>
@@ -1387,20 +1112,9 @@ class ScheduleViewSet(viewsets.ModelViewSet):
 </body>
 </html>"""
 
-            with sync_playwright() as p:
-                browser = p.chromium.launch()
-                page = browser.new_page(viewport={"width": 900, "height": 1400})
-                page.set_content(html_doc, wait_until="load")
-                page.emulate_media(media="screen")
-                pdf_bytes = page.pdf(format="A4", landscape=False, print_background=True)
-                browser.close()
-
-            from django.http import HttpResponse
-
-            resp = HttpResponse(pdf_bytes, content_type="application/pdf")
-            resp["Content-Disposition"] = f'attachment; filename="schedule_{schedule.id}.pdf"'
-            return resp
-        except Exception:
+            pdf_bytes = render_pdf(html_doc, PdfOptions(format="A4", landscape=False, viewport=(900, 1400)))
+            return ExportArtifact(pdf_bytes, CONTENT_TYPES["pdf"], f"schedule_{schedule.id}.pdf")
+        except RenderUnavailable:
             pass
 
         try:
@@ -1410,42 +1124,11 @@ class ScheduleViewSet(viewsets.ModelViewSet):
             from reportlab.pdfbase.ttfonts import TTFont
             from reportlab.pdfgen.canvas import Canvas
         except Exception:
-            return Response(
-                {
-                    "ok": False,
-                    "error": "pdf_export_unavailable",
-                    "detail": "PDF export is unavailable on this server (missing dependency: reportlab or playwright)",
-                },
-                status=status.HTTP_501_NOT_IMPLEMENTED,
+            raise ExportUnavailable(
+                "pdf_export_unavailable",
+                "PDF export is unavailable on this server (missing dependency: reportlab or playwright)",
             )
 
-        # Подготовим данные (все runs/courts + mapping слотов)
-        courts = list(schedule.courts.all().order_by("index"))
-        runs = list(schedule.runs.all().order_by("index"))
-        slots_qs = schedule.slots.select_related("run", "court", "match", "match__tournament", "match__team_1", "match__team_2")
-        slots_map: dict[tuple[int, int], Any] = {}
-        for s in slots_qs:
-            slots_map[(s.run_id, s.court_id)] = s
-
-        breaks = list(schedule.global_breaks.all().order_by("position"))
-        breaks_by_pos: dict[int, list[Any]] = {}
-        for br in breaks:
-            breaks_by_pos.setdefault(int(br.position), []).append(br)
-
-        tournament_names = []
-        for scope in schedule.scopes.select_related("tournament").all():
-            if scope.tournament and scope.tournament.name:
-                tournament_names.append(str(scope.tournament.name))
-        title = " + ".join(tournament_names) if tournament_names else "Расписание"
-
-        rr_row_by_team = self._compute_rr_row_by_team(slots_qs)
-
-        def run_top_label(run_obj: Any) -> str:
-            return self._run_top_label(run_obj)
-
-        def match_meta_label(m: Any) -> str:
-            return self._match_meta_label(m, rr_row_by_team)
-
         # --- PDF canvas ---
         buf = BytesIO()
         page_size = landscape(A4)
@@ -1511,11 +1194,7 @@ class ScheduleViewSet(viewsets.ModelViewSet):
             c.drawString(margin_x, page_h - margin_y - 18, "Расписание")
             c.setFont(font_name, 11)
             c.drawString(margin_x, page_h - margin_y - 36, f"{title}")
-            try:
-                date_text = schedule.date.strftime("%d.%m.%Y") if getattr(schedule, "date", None) else ""
-            except Exception:
-                date_text = str(getattr(schedule, "date", "") or "")
-            c.drawRightString(page_w - margin_x, page_h - margin_y - 18, date_text)
+            c.drawRightString(page_w - margin_x, page_h - margin_y - 18, model.date_text)
 
         def draw_table_header(courts_subset: list[Any], x0: float, y0: float, col_w: float):
             # фон
@@ -1542,39 +1221,31 @@ class ScheduleViewSet(viewsets.ModelViewSet):
             c.setStrokeColor(colors.HexColor("#D1D5DB"))
             c.line(x0, y0 - col_header_h, x0 + run_col_w + col_w * len(courts_subset), y0 - col_header_h)
 
-        def slot_text(run_obj: Any, slot: Any) -> str:
+        def slot_text(slot: Optional[SlotView]) -> str:
             if not slot:
                 return ""
             if slot.slot_type == "text":
-                return (slot.text_title or "")[:40]
+                return slot.text_title[:40]
             if slot.slot_type == "match" and slot.match_id:
                 # основной текст: override_title или display team names
                 if slot.override_title:
-                    return str(slot.override_title)[:40]
-                m = slot.match
-                if not m:
+                    return slot.override_title[:40]
+                if not slot.has_match:
                     return f"Матч #{slot.match_id}"
-                top = str(getattr(slot, "override_subtitle", None) or "").strip() or run_top_label(run_obj)
-                meta = match_meta_label(m)
-                t1 = getattr(m.team_1, "display_name", None) or getattr(m.team_1, "name", None) or str(m.team_1) if m.team_1 else "TBD"
-                t2 = getattr(m.team_2, "display_name", None) or getattr(m.team_2, "name", None) or str(m.team_2) if m.team_2 else "TBD"
                 lines: list[str] = []
-                if top:
-                    lines.append(top)
-                if meta:
-                    lines.append(meta)
-                lines.extend([str(t1), "против", str(t2)])
+                if slot.top:
+                    lines.append(slot.top)
+                if slot.meta:
+                    lines.append(slot.meta)
+                lines.extend([slot.team_1.full, "против", slot.team_2.full])
                 return "\n".join(lines)
             return ""
 
-        def slot_status_color(slot: Any):
-            try:
-                if slot and slot.match and slot.match.status == Match.Status.LIVE:
-                    return colors.HexColor("#D1FAE5")
-                if slot and slot.match and slot.match.status == Match.Status.COMPLETED:
-                    return colors.HexColor("#E5E7EB")
-            except Exception:
-                pass
+        def slot_status_color(slot: Optional[SlotView]):
+            if slot and slot.match_status == Match.Status.LIVE:
+                return colors.HexColor("#D1FAE5")
+            if slot and slot.match_status == Match.Status.COMPLETED:
+                return colors.HexColor("#E5E7EB")
             return None
 
         def draw_run_row(courts_subset: list[Any], run_obj: Any, x0: float, y_top: float, col_w: float):
@@ -1596,7 +1267,7 @@ class ScheduleViewSet(viewsets.ModelViewSet):
             # ячейки
             for idx, court in enumerate(courts_subset):
                 cx = x0 + run_col_w + idx * col_w
-                slot = slots_map.get((run_obj.id, court.id))
+                slot = model.cell(run_obj, court)
 
                 fill = slot_status_color(slot)
                 if fill is not None:
@@ -1604,7 +1275,7 @@ class ScheduleViewSet(viewsets.ModelViewSet):
                     c.rect(cx, y_top - run_row_h, col_w, run_row_h, fill=1, stroke=0)
 
                 c.setFillColor(colors.black)
-                txt = slot_text(run_obj, slot)
+                txt = slot_text(slot)
                 if txt:
                     lines = [ln.strip() for ln in str(txt).split("\n") if ln.strip()]
                     # вертикальное размещение ближе к центру ячейки
@@ -1645,67 +1316,29 @@ class ScheduleViewSet(viewsets.ModelViewSet):
             draw_table_header(courts_subset, margin_x, y, col_w)
             y -= col_header_h
 
-            # Печатаем с разбиением по высоте
-            # В position 0 допускаем паузу "перед первым запуском"
-            run_index_to_obj = {r.index: r for r in runs}
-
-            current_run_idx = 1
-            while current_run_idx <= len(runs):
-                # Паузы перед запуском current_run_idx
-                for br in breaks_by_pos.get(current_run_idx - 1, []):
-                    if y - break_row_h < table_bottom_y:
-                        c.showPage()
-                        draw_page_header()
-                        y = table_top_y
-                        draw_table_header(courts_subset, margin_x, y, col_w)
-                        y -= col_header_h
-                    draw_break_row(courts_subset, br, margin_x, y, col_w)
-                    y -= break_row_h
-
-                run_obj = run_index_to_obj.get(current_run_idx)
-                if run_obj is None:
-                    current_run_idx += 1
-                    continue
-
-                if y - run_row_h < table_bottom_y:
+            # Паузы с position N печатаются перед запуском N+1, position 0 — перед первым запуском
+            for kind, item in model.rows():
+                row_h = run_row_h if kind == "run" else break_row_h
+                if y - row_h < table_bottom_y:
                     c.showPage()
                     draw_page_header()
                     y = table_top_y
                     draw_table_header(courts_subset, margin_x, y, col_w)
                     y -= col_header_h
-
-                draw_run_row(courts_subset, run_obj, margin_x, y, col_w)
-                y -= run_row_h
-                current_run_idx += 1
-
-            # Паузы после последнего запуска — position == len(runs)
-            for br in breaks_by_pos.get(len(runs), []):
-                if y - break_row_h < table_bottom_y:
-                    c.showPage()
-                    draw_page_header()
-                    y = table_top_y
-                    draw_table_header(courts_subset, margin_x, y, col_w)
-                    y -= col_header_h
-                draw_break_row(courts_subset, br, margin_x, y, col_w)
-                y -= break_row_h
+                if kind == "run":
+                    draw_run_row(courts_subset, item, margin_x, y, col_w)
+                else:
+                    draw_break_row(courts_subset, item, margin_x, y, col_w)
+                y -= row_h
 
             c.showPage()
 
         c.save()
         pdf = buf.getvalue()
         buf.close()
+        return ExportArtifact(pdf, CONTENT_TYPES["pdf"], f"schedule_{schedule.id}.pdf")
 
-        from django.http import HttpResponse
-
-        resp = HttpResponse(pdf, content_type="application/pdf")
-        resp["Content-Disposition"] = f'attachment; filename="schedule_{schedule.id}.pdf"'
-        return resp
-
-    @action(detail=True, methods=["get"], url_path="export/docx", permission_classes=[IsAuthenticated])
-    def export_docx(self, request, pk=None):
-        schedule: Schedule = self.get_object()
-        self._ensure_can_manage_schedule(request, schedule)
-
+    def _build_docx(self, schedule: Schedule, model: Optional[ScheduleRenderModel] = None) -> ExportArtifact:
         try:
             from docx import Document
             from docx.enum.section import WD_ORIENT
@@ -1713,47 +1346,14 @@ class ScheduleViewSet(viewsets.ModelViewSet):
             from docx.enum.text import WD_ALIGN_PARAGRAPH
             from docx.shared import Inches, Pt
         except Exception:
-            return Response(
-                {
-                    "ok": False,
-                    "error": "docx_export_unavailable",
-                    "detail": "DOCX export is unavailable on this server (missing dependency: python-docx)",
-                },
-                status=status.HTTP_501_NOT_IMPLEMENTED,
+            raise ExportUnavailable(
+                "docx_export_unavailable",
+                "DOCX export is unavailable on this server (missing dependency: python-docx)",
             )
 
-        courts = list(schedule.courts.all().order_by("index"))
-        runs = list(schedule.runs.all().order_by("index"))
-        slots_qs = schedule.slots.select_related(
-            "run",
-            "court",
-            "match",
-            "match__tournament",
-            "match__team_1",
-            "match__team_2",
-        )
-        slots_map: dict[tuple[int, int], Any] = {}
-        for s in slots_qs:
-            slots_map[(s.run_id, s.court_id)] = s
-
-        breaks = list(schedule.global_breaks.all().order_by("position"))
-        breaks_by_pos: dict[int, list[Any]] = {}
-        for br in breaks:
-            breaks_by_pos.setdefault(int(br.position), []).append(br)
-
-        tournament_names = []
-        for scope in schedule.scopes.select_related("tournament").all():
-            if scope.tournament and scope.tournament.name:
-                tournament_names.append(str(scope.tournament.name))
-        title = " + ".join(tournament_names) if tournament_names else "Расписание"
-
-        rr_row_by_team = self._compute_rr_row_by_team(slots_qs)
-
-        def run_top_label(run_obj: Any) -> str:
-            return self._run_top_label(run_obj)
-
-        def match_meta_label(m: Any) -> str:
-            return self._match_meta_label(m, rr_row_by_team)
+        model = model or build_render_model(schedule)
+        courts = model.courts
+        title = model.title
 
         def split_courts_evenly(items: list[Any], max_per_page: int = 10) -> list[list[Any]]:
             n = len(items)
@@ -1770,90 +1370,25 @@ class ScheduleViewSet(viewsets.ModelViewSet):
                 i += per
             return chunks
 
-        def _raw_team_label(team: Any) -> str:
-            if not team:
-                return ""
-            return getattr(team, "display_name", None) or getattr(team, "name", None) or str(team)
-
-        def _split_players(label: str) -> list[tuple[str, str]]:
-            import re
-
-            s = (label or "").strip()
-            if not s or s.upper() == "TBD":
-                return []
-
-            parts = [p.strip() for p in re.split(r"\s*/\s*", s) if p.strip()]
-            out: list[tuple[str, str]] = []
-            for p in parts:
-                tokens = [t for t in p.split() if t]
-                if not tokens:
-                    continue
-                surname = tokens[0]
-                initial = ""
-                if len(tokens) >= 2 and tokens[1]:
-                    initial = tokens[1][0].upper()
-                out.append((surname, initial))
-            return out
-
-        def _players_unique_key(surname: str, initial: str) -> str:
-            return f"{surname}|{initial}" if initial else surname
-
-        surname_to_keys: dict[str, set[str]] = {}
-        for s in slots_qs:
-            if getattr(s, "slot_type", None) != "match":
-                continue
-            m = getattr(s, "match", None)
-            if not m:
-                continue
-            for team in [getattr(m, "team_1", None), getattr(m, "team_2", None)]:
-                raw = _raw_team_label(team)
-                for (sn, ini) in _split_players(raw):
-                    surname_to_keys.setdefault(sn, set()).add(_players_unique_key(sn, ini))
-
-        def team_label(team: Any) -> list[str]:
-            if not team:
-                return ["TBD"]
-
-            raw = _raw_team_label(team)
-            if not raw:
-                return ["TBD"]
-
-            players = _split_players(raw)
-            if not players:
-                return [raw]
-
-            labels: list[str] = []
-            for (sn, ini) in players:
-                if len(surname_to_keys.get(sn, set())) > 1 and ini:
-                    labels.append(f"{sn} {ini}.")
-                else:
-                    labels.append(sn)
-            return labels
-
-        def slot_cell_lines(run_obj: Any, slot: Any) -> list[str]:
+        def slot_cell_lines(slot: Optional[SlotView]) -> list[str]:
             if not slot:
                 return []
-            if getattr(slot, "slot_type", None) == "text":
-                t = str(getattr(slot, "override_title", None) or getattr(slot, "text_title", None) or "").strip()
+            if slot.slot_type == "text":
+                t = (slot.override_title or slot.text_title).strip()
                 return [t] if t else []
-            if getattr(slot, "slot_type", None) == "match" and getattr(slot, "match_id", None):
-                if getattr(slot, "override_title", None):
-                    return [str(slot.override_title)]
-                m = getattr(slot, "match", None)
-                if not m:
+            if slot.slot_type == "match" and slot.match_id:
+                if slot.override_title:
+                    return [slot.override_title]
+                if not slot.has_match:
                     return [f"Матч #{slot.match_id}"]
-                top = str(getattr(slot, "override_subtitle", None) or "").strip() or run_top_label(run_obj)
-                meta = match_meta_label(m)
-                a = team_label(getattr(m, "team_1", None))
-                b = team_label(getattr(m, "team_2", None))
                 lines: list[str] = []
-                if top:
-                    lines.append(top)
-                if meta:
-                    lines.append(meta)
-                lines.extend([ln for ln in a if ln])
+                if slot.top:
+                    lines.append(slot.top)
+                if slot.meta:
+                    lines.append(slot.meta)
+                lines.extend([ln for ln in slot.team_1.short if ln])
                 lines.append("против")
-                lines.extend([ln for ln in b if ln])
+                lines.extend([ln for ln in slot.team_2.short if ln])
                 return lines
             return []
 
@@ -1887,11 +1422,7 @@ class ScheduleViewSet(viewsets.ModelViewSet):
                 p2.runs[0].font.size = Pt(10)
             except Exception:
                 pass
-            try:
-                date_text = schedule.date.strftime("%d.%m.%Y") if getattr(schedule, "date", None) else ""
-            except Exception:
-                date_text = str(getattr(schedule, "date", "") or "")
-            p3 = doc.add_paragraph(date_text)
+            p3 = doc.add_paragraph(model.date_text)
             try:
                 p3.runs[0].font.size = Pt(10)
             except Exception:
@@ -1927,8 +1458,7 @@ class ScheduleViewSet(viewsets.ModelViewSet):
                     row_cells[0].text += f"\nПлан: {run_obj.start_time.strftime('%H:%M')}"
 
                 for j, cobj in enumerate(courts_subset, start=1):
-                    slot = slots_map.get((run_obj.id, cobj.id))
-                    lines = slot_cell_lines(run_obj, slot)
+                    lines = slot_cell_lines(model.cell(run_obj, cobj))
                     row_cells[j].text = "\n".join([str(x) for x in lines if str(x).strip()]) if lines else ""
                     try:
                         row_cells[j].vertical_alignment = WD_ALIGN_VERTICAL.CENTER
@@ -1960,110 +1490,43 @@ class ScheduleViewSet(viewsets.ModelViewSet):
                     except Exception:
                         pass
 
-            run_index_to_obj = {int(r.index): r for r in runs}
-            current_run_idx = 1
-            while current_run_idx <= len(runs):
-                for br in breaks_by_pos.get(current_run_idx - 1, []):
-                    add_break_row(br)
-                run_obj = run_index_to_obj.get(current_run_idx)
-                if run_obj is not None:
-                    add_run_row(run_obj)
-                current_run_idx += 1
-
-            for br in breaks_by_pos.get(len(runs), []):
-                add_break_row(br)
+            for kind, item in model.rows():
+                if kind == "run":
+                    add_run_row(item)
+                else:
+                    add_break_row(item)
 
             doc.add_paragraph("")
 
         buf = BytesIO()
         doc.save(buf)
-        buf.seek(0)
-
-        from django.http import HttpResponse
-
-        resp = HttpResponse(
-            buf.getvalue(),
-            content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        )
-        resp["Content-Disposition"] = f'attachment; filename="schedule_{schedule.id}.docx"'
-        return resp
-
-    @action(detail=True, methods=["get"], url_path="export/xlsx", permission_classes=[IsAuthenticated])
-    def export_xlsx(self, request, pk=None):
-        schedule: Schedule = self.get_object()
-        self._ensure_can_manage_schedule(request, schedule)
+        return ExportArtifact(buf.getvalue(), CONTENT_TYPES["docx"], f"schedule_{schedule.id}.docx")
 
+    def _build_xlsx(self, schedule: Schedule, model: Optional[ScheduleRenderModel] = None) -> ExportArtifact:
         try:
             from openpyxl import Workbook
             from openpyxl.styles import Alignment, Font, PatternFill
         except Exception:
-            return Response(
-                {
-                    "ok": False,
-                    "error": "xlsx_export_unavailable",
-                    "detail": "XLSX export is unavailable on this server (missing dependency: openpyxl)",
-                },
-                status=status.HTTP_501_NOT_IMPLEMENTED,
+            raise ExportUnavailable(
+                "xlsx_export_unavailable",
+                "XLSX export is unavailable on this server (missing dependency: openpyxl)",
             )
 
-        courts = list(schedule.courts.all().order_by("index"))
-        runs = list(schedule.runs.all().order_by("index"))
-        slots_qs = schedule.slots.select_related(
-            "run",
-            "court",
-            "match",
-            "match__tournament",
-            "match__team_1",
-            "match__team_2",
-        )
-        slots_map: dict[tuple[int, int], Any] = {}
-        for s in slots_qs:
-            slots_map[(s.run_id, s.court_id)] = s
-
-        breaks = list(schedule.global_breaks.all().order_by("position"))
-        breaks_by_pos: dict[int, list[Any]] = {}
-        for br in breaks:
-            breaks_by_pos.setdefault(int(br.position), []).append(br)
-
-        rr_row_by_team = self._compute_rr_row_by_team(slots_qs)
+        model = model or build_render_model(schedule)
+        courts = model.courts
 
-        tournament_names = []
-        for scope in schedule.scopes.select_related("tournament").all():
-            if scope.tournament and scope.tournament.name:
-                tournament_names.append(str(scope.tournament.name))
-        title = " + ".join(tournament_names) if tournament_names else "Расписание"
-
-        def run_top_label(run_obj: Any) -> str:
-            return self._run_top_label(run_obj)
-
-        def match_meta_label(m: Any) -> str:
-            return self._match_meta_label(m, rr_row_by_team)
-
-        def slot_cell_text(run_obj: Any, slot: Any) -> str:
+        def slot_cell_text(slot: Optional[SlotView]) -> str:
             if not slot:
                 return ""
-            if getattr(slot, "slot_type", None) == "text":
-                return str(getattr(slot, "override_title", None) or getattr(slot, "text_title", None) or "").strip()
-            if getattr(slot, "slot_type", None) == "match" and getattr(slot, "match_id", None):
-                if getattr(slot, "override_title", None):
-                    return str(slot.override_title)
-                m = getattr(slot, "match", None)
-                if not m:
-                    return f"Матч #{getattr(slot, 'match_id', '')}".strip()
-                top = str(getattr(slot, "override_subtitle", None) or "").strip() or run_top_label(run_obj)
-                meta = match_meta_label(m)
-                t1 = (
-                    getattr(getattr(m, "team_1", None), "display_name", None)
-                    or getattr(getattr(m, "team_1", None), "name", None)
-                    or str(getattr(m, "team_1", None) or "TBD")
-                )
-                t2 = (
-                    getattr(getattr(m, "team_2", None), "display_name", None)
-                    or getattr(getattr(m, "team_2", None), "name", None)
-                    or str(getattr(m, "team_2", None) or "TBD")
-                )
-                parts = [p for p in [top, meta, t1, "против", t2] if str(p).strip()]
-                return "\n".join([str(p) for p in parts])
+            if slot.slot_type == "text":
+                return (slot.override_title or slot.text_title).strip()
+            if slot.slot_type == "match" and slot.match_id:
+                if slot.override_title:
+                    return slot.override_title
+                if not slot.has_match:
+                    return f"Матч #{slot.match_id}"
+                parts = [p for p in [slot.top, slot.meta, slot.team_1.full, "против", slot.team_2.full] if p.strip()]
+                return "\n".join(parts)
             return ""
 
         wb = Workbook()
@@ -2077,11 +1540,8 @@ class ScheduleViewSet(viewsets.ModelViewSet):
 
         ws["A1"] = "Расписание"
         ws["A1"].font = Font(bold=True, size=14)
-        ws["A2"] = title
-        try:
-            ws["A3"] = schedule.date.strftime("%d.%m.%Y") if getattr(schedule, "date", None) else ""
-        except Exception:
-            ws["A3"] = str(getattr(schedule, "date", "") or "")
+        ws["A2"] = model.title
+        ws["A3"] = model.date_text
 
         row = 5
         ws.cell(row=row, column=1, value="Запуск").font = Font(bold=True)
@@ -2096,12 +1556,10 @@ class ScheduleViewSet(viewsets.ModelViewSet):
             cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
 
         row += 1
-        run_index_to_obj = {int(r.index): r for r in runs}
-        current_run_idx = 1
-        while current_run_idx <= len(runs):
-            for br in breaks_by_pos.get(current_run_idx - 1, []):
-                t = br.time.strftime("%H:%M") if getattr(br, "time", None) else ""
-                msg = f"{t} — {br.text}".strip(" —")
+        for kind, item in model.rows():
+            if kind == "break":
+                t = item.time.strftime("%H:%M") if item.time else ""
+                msg = f"{t} — {item.text}".strip(" —")
                 ws.cell(row=row, column=1, value="")
                 if courts:
                     ws.cell(row=row, column=2, value=msg)
@@ -2110,45 +1568,23 @@ class ScheduleViewSet(viewsets.ModelViewSet):
                 ws.cell(row=row, column=2).fill = break_fill
                 ws.cell(row=row, column=2).alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
                 row += 1
-
-            run_obj = run_index_to_obj.get(current_run_idx)
-            if run_obj is None:
-                current_run_idx += 1
                 continue
 
-            left = f"Запуск {run_obj.index}"
-            if getattr(run_obj, "start_time", None):
-                left += f"\nПлан: {run_obj.start_time.strftime('%H:%M')}"
+            left = f"Запуск {item.index}"
+            if item.start_time:
+                left += f"\nПлан: {item.start_time.strftime('%H:%M')}"
             ws.cell(row=row, column=1, value=left).alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
 
             for i, cobj in enumerate(courts, start=2):
-                slot = slots_map.get((run_obj.id, cobj.id))
-                txt = slot_cell_text(run_obj, slot)
-                c = ws.cell(row=row, column=i, value=txt)
+                slot = model.cell(item, cobj)
+                c = ws.cell(row=row, column=i, value=slot_cell_text(slot))
                 c.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-                try:
-                    if slot and slot.match and slot.match.status == Match.Status.LIVE:
-                        c.fill = live_fill
-                    elif slot and slot.match and slot.match.status == Match.Status.COMPLETED:
-                        c.fill = completed_fill
-                except Exception:
-                    pass
+                if slot and slot.match_status == Match.Status.LIVE:
+                    c.fill = live_fill
+                elif slot and slot.match_status == Match.Status.COMPLETED:
+                    c.fill = completed_fill
 
             row += 1
-            current_run_idx += 1
-
-        for br in breaks_by_pos.get(len(runs), []):
-            t = br.time.strftime("%H:%M") if getattr(br, "time", None) else ""
-            msg = f"{t} — {br.text}".strip(" —")
-            ws.cell(row=row, column=1, value="")
-            if courts:
-                ws.cell(row=row, column=2, value=msg)
-                if len(courts) >= 2:
-                    ws.merge_cells(start_row=row, start_column=2, end_row=row, end_column=1 + len(courts))
-            ws.cell(row=row, column=2).fill = break_fill
-            ws.cell(row=row, column=2).alignment = Alignment(horizontal="left", vertical="center", wrap_text=True)
-            row += 1
 
         # Column widths (best-effort)
         ws.column_dimensions["A"].width = 18
@@ -2159,29 +1595,110 @@ class ScheduleViewSet(viewsets.ModelViewSet):
 
         buf = BytesIO()
         wb.save(buf)
-        buf.seek(0)
+        return ExportArtifact(buf.getvalue(), CONTENT_TYPES["xlsx"], f"schedule_{schedule.id}.xlsx")
 
-        from django.http import HttpResponse
+    def _export_response(self, request, fmt: str):
+        """Синхронная выгрузка: готовый файл текущей версии из кэша, иначе сборка в запросе."""
+        schedule: Schedule = self.get_object()
+        self._ensure_can_manage_schedule(request, schedule)
+        try:
+            artifact = export_now(schedule, fmt, request.user)
+        except ExportUnavailable as exc:
+            return Response(
+                {"ok": False, "error": exc.error, "detail": exc.detail},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        except RenderPoolBusy:
+            return Response(
+                {"ok": False, "error": "pdf_render_busy", "detail": "PDF renderer is busy, try again later"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        except RenderError as exc:
+            return Response(
+                {"ok": False, "error": "pdf_render_failed", "detail": str(exc)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
 
-        resp = HttpResponse(
-            buf.getvalue(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
-        resp["Content-Disposition"] = f'attachment; filename="schedule_{schedule.id}.xlsx"'
+        resp = HttpResponse(artifact.content, content_type=artifact.content_type)
+        resp["Content-Disposition"] = f'attachment; filename="{artifact.filename}"'
         return resp
 
+    @action(detail=True, methods=["get"], url_path="export/pdf", permission_classes=[IsAuthenticated])
+    def export_pdf(self, request, pk=None):
+        return self._export_response(request, "pdf")
+
+    @action(detail=True, methods=["get"], url_path="export/docx", permission_classes=[IsAuthenticated])
+    def export_docx(self, request, pk=None):
+        return self._export_response(request, "docx")
+
+    @action(detail=True, methods=["get"], url_path="export/xlsx", permission_classes=[IsAuthenticated])
+    def export_xlsx(self, request, pk=None):
+        return self._export_response(request, "xlsx")
+
     @action(detail=True, methods=["get"], url_path="export/numbers", permission_classes=[IsAuthenticated])
     def export_numbers(self, request, pk=None):
         """Экспорт для Numbers (iPad/macOS): отдаём XLSX, который Numbers открывает и редактирует."""
-        # Переиспользуем XLSX-экспорт, но с другим именем файла.
+        # Тот же файл, что и XLSX-экспорт (из кэша выгрузок), но с другим именем.
+        return self._export_response(request, NUMBERS)
+
+    @action(detail=True, methods=["post"], url_path="exports", permission_classes=[IsAuthenticated])
+    def exports_create(self, request, pk=None):
+        """Поставить выгрузку в очередь (или вернуть готовую). Body: {format: pdf|docx|xlsx|numbers}."""
         schedule: Schedule = self.get_object()
         self._ensure_can_manage_schedule(request, schedule)
-        resp = self.export_xlsx(request, pk=pk)
-        try:
-            resp["Content-Disposition"] = f'attachment; filename="schedule_{schedule.id}_numbers.xlsx"'
-        except Exception:
-            pass
-        return resp
+        fmt = str(request.data.get("format") or "").strip().lower()
+        if not is_supported_format(fmt):
+            return Response({"ok": False, "error": "bad_format"}, status=status.HTTP_400_BAD_REQUEST)
+
+        job, _ = request_export(schedule, fmt, request.user)
+        code = status.HTTP_200_OK if job.status == ScheduleExportJob.Status.DONE else status.HTTP_202_ACCEPTED
+        return Response({"ok": True, "job": job_payload(job, fmt)}, status=code)
+
+    def _get_export_job(self, request, job_id) -> ScheduleExportJob:
+        job = get_object_or_404(ScheduleExportJob.objects.select_related("schedule"), pk=job_id)
+        self._ensure_can_manage_schedule(request, job.schedule)
+        return job
+
+    @staticmethod
+    def _export_variant(request, job: ScheduleExportJob) -> str:
+        if request.query_params.get("variant") == NUMBERS and job.format == ScheduleExportJob.Format.XLSX:
+            return NUMBERS
+        return job.format
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"exports/(?P<job_id>[0-9]+)",
+        url_name="export-job",
+        permission_classes=[IsAuthenticated],
+    )
+    def export_job(self, request, job_id=None):
+        """Статус выгрузки (для опроса клиентом)."""
+        job = self._get_export_job(request, job_id)
+        return Response({"ok": True, "job": job_payload(job, self._export_variant(request, job))})
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"exports/(?P<job_id>[0-9]+)/download",
+        url_name="export-job-download",
+        permission_classes=[IsAuthenticated],
+    )
+    def export_job_download(self, request, job_id=None):
+        """Скачать готовый файл выгрузки."""
+        job = self._get_export_job(request, job_id)
+        fmt = self._export_variant(request, job)
+        if job.status != ScheduleExportJob.Status.DONE or not job.file:
+            return Response(
+                {"ok": False, "error": "export_not_ready", "job": job_payload(job, fmt)},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return FileResponse(
+            job.file.open("rb"),
+            as_attachment=True,
+            filename=download_filename(job.schedule_id, fmt),
+            content_type=job.content_type or None,
+        )
 
     @action(detail=True, methods=["get"], url_path="planned_times", permission_classes=[AllowAny])
     def planned_times(self, request, pk=None):
@@ -2193,36 +1710,8 @@ class ScheduleViewSet(viewsets.ModelViewSet):
         if not runs:
             return Response({"ok": True, "runs": []})
 
-        def base_start_time() -> time:
-            court = schedule.courts.order_by("index").first()
-            if court and court.first_start_time:
-                return court.first_start_time
-            first = runs[0]
-            if first.start_time:
-                return first.start_time
-            return time(10, 0)
-
-        t0 = base_start_time()
-        current_dt = datetime.combine(schedule.date, t0)
-
-        items = []
-        for r in runs:
-            if r.start_mode == "fixed" and r.start_time:
-                current_dt = datetime.combine(schedule.date, r.start_time)
-            elif r.start_mode == "not_earlier" and r.not_earlier_time:
-                candidate = datetime.combine(schedule.date, r.not_earlier_time)
-                if candidate > current_dt:
-                    current_dt = candidate
-            # then: используем текущее current_dt
-
-            items.append(
-                {
-                    "index": r.index,
-                    "planned_start_time": current_dt.time().strftime("%H:%M"),
-                }
-            )
-
-            current_dt = current_dt + timedelta(minutes=duration)
+        planned = planned_start_times(schedule, runs, list(schedule.courts.order_by("index")[:1]))
+        items = [{"index": r.index, "planned_start_time": planned[r.index]} for r in runs]
 
         return Response({"ok": True, "runs": items, "match_duration_minutes": duration})
 
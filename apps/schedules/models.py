@@ -120,3 +120,41 @@ class ScheduleScopeCourt(models.Model):
 
     class Meta:
         unique_together = ("scope", "court")
+
+
+class ScheduleExportJob(models.Model):
+    """Фоновая выгрузка расписания в файл; готовый файл переиспользуется, пока расписание не изменилось."""
+
+    class Format(models.TextChoices):
+        PDF = "pdf", "pdf"
+        DOCX = "docx", "docx"
+        XLSX = "xlsx", "xlsx"
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "pending"
+        RUNNING = "running", "running"
+        DONE = "done", "done"
+        FAILED = "failed", "failed"
+
+    schedule = models.ForeignKey(Schedule, on_delete=models.CASCADE, related_name="export_jobs")
+    format = models.CharField(max_length=8, choices=Format.choices)
+    # Версия содержимого расписания (apps/schedules/services/exports.py: schedule_content_version)
+    content_version = models.CharField(max_length=64)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    file = models.FileField(upload_to="schedule_exports/", blank=True)
+    content_type = models.CharField(max_length=128, blank=True, default="")
+    error = models.CharField(max_length=64, blank=True, default="")
+    error_detail = models.TextField(blank=True, default="")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("schedule", "format", "content_version")
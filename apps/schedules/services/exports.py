@@ -0,0 +1,282 @@
+"""
+Выгрузка расписаний в PDF/DOCX/XLSX фоновыми задачами с кэшем готовых файлов.
+
+Документ собирается в Celery-задаче (apps/schedules/tasks.py), а не в
+gunicorn-воркере. Задача ключуется тройкой (расписание, формат, версия
+содержимого): версия — хэш всего, что попадает в документ (корты, запуски,
+слоты, перерывы, матчи, турниры, команды и игроки, строки групп). Пока
+расписание не изменилось, повторная выгрузка отдаёт уже готовый файл из
+MEDIA_ROOT/schedule_exports/.
+
+Numbers — тот же XLSX с другим именем файла, отдельный файл для него не строится.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from django.core.files.base import ContentFile
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.matches.models import Match
+from apps.schedules.models import Schedule, ScheduleExportJob
+from apps.schedules.services.render_model import get_render_model
+from apps.teams.models import Team
+from apps.tournaments.models import Tournament, TournamentEntry
+from sandmatch import jobs
+
+logger = logging.getLogger(__name__)
+
+# Увеличить при изменении вёрстки документов — старые файлы перестанут переиспользоваться
+EXPORT_WRITER_VERSION = 1
+
+# Срок, после которого задача выгрузки считается потерянной (sandmatch.jobs.is_stale)
+STALE_AFTER = timedelta(minutes=10)
+
+NUMBERS = "numbers"
+
+CONTENT_TYPES = {
+    ScheduleExportJob.Format.PDF: "application/pdf",
+    ScheduleExportJob.Format.DOCX: "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ScheduleExportJob.Format.XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Методы ScheduleViewSet, собирающие документ: (schedule, ScheduleRenderModel) -> ExportArtifact
+BUILDERS = {
+    ScheduleExportJob.Format.PDF: "_build_pdf",
+    ScheduleExportJob.Format.DOCX: "_build_docx",
+    ScheduleExportJob.Format.XLSX: "_build_xlsx",
+}
+
+
+class ExportUnavailable(Exception):
+    """Формат не поддерживается на сервере (нет библиотеки)"""
+
+    def __init__(self, error: str, detail: str):
+        super().__init__(detail)
+        self.error = error
+        self.detail = detail
+
+
+@dataclass
+class ExportArtifact:
+    content: bytes
+    content_type: str
+    filename: str
+
+
+def artifact_format(fmt: str) -> str:
+    """Формат файла для запрошенной выгрузки (numbers -> xlsx)"""
+    return ScheduleExportJob.Format.XLSX if fmt == NUMBERS else fmt
+
+
+def is_supported_format(fmt: str) -> bool:
+    return fmt == NUMBERS or fmt in ScheduleExportJob.Format.values
+
+
+def download_filename(schedule_id: int, fmt: str) -> str:
+    if fmt == NUMBERS:
+        return f"schedule_{schedule_id}_numbers.xlsx"
+    return f"schedule_{schedule_id}.{fmt}"
+
+
+def schedule_content_version(schedule: Schedule) -> str:
+    """Хэш содержимого расписания для ключа кэша выгрузок — фиксированное число запросов."""
+    slots = list(
+        schedule.slots.order_by("id").values_list(
+            "id", "run_id", "court_id", "slot_type", "match_id",
+            "text_title", "text_subtitle", "override_title", "override_subtitle",
+        )
+    )
+    match_ids = {row[4] for row in slots if row[4]}
+    matches = list(Match.objects.filter(id__in=match_ids).order_by("id").values())
+    tournament_ids = {m["tournament_id"] for m in matches}
+    team_ids = {m[key] for m in matches for key in ("team_1_id", "team_2_id") if m[key]}
+    snapshot = {
+        "writer": EXPORT_WRITER_VERSION,
+        "schedule": [schedule.id, schedule.date, schedule.match_duration_minutes, schedule.is_draft],
+        "waves": list(schedule.waves.order_by("id").values_list("id", "order", "start_mode", "start_time", "earliest_time")),
+        "scopes": list(
+            schedule.scopes.order_by("id").values_list("id", "wave_id", "tournament_id", "order", "start_mode", "start_time")
+        ),
+        "courts": list(schedule.courts.order_by("id").values_list("id", "index", "name", "first_start_time")),
+        "runs": list(
+            schedule.runs.order_by("id").values_list("id", "index", "start_mode", "start_time", "not_earlier_time")
+        ),
+        "breaks": list(schedule.global_breaks.order_by("id").values_list("id", "position", "time", "text")),
+        "slots": slots,
+        "matches": matches,
+        "tournaments": list(
+            Tournament.objects.filter(id__in=tournament_ids).order_by("id").values_list(
+                "id", "name", "name_for_schedule", "system", "date", "parent_tournament_id"
+            )
+        ),
+        "teams": list(
+            Team.objects.filter(id__in=team_ids).order_by("id").values_list(
+                "id",
+                "player_1__last_name", "player_1__first_name", "player_1__display_name",
+                "player_2__last_name", "player_2__first_name", "player_2__display_name",
+            )
+        ),
+        "entries": list(
+            TournamentEntry.objects.filter(tournament_id__in=tournament_ids, team_id__in=team_ids)
+            .order_by("id")
+            .values_list("tournament_id", "team_id", "group_index", "row_index")
+        ),
+    }
+    payload = json.dumps(snapshot, default=str, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_artifact(schedule: Schedule, fmt: str, content_version: Optional[str] = None) -> ExportArtifact:
+    """Собрать документ синхронно (в задаче или в запросе).
+
+    Модель отрисовки общая для всех форматов: при известной версии содержимого она берётся
+    из кэша, и выгрузка того же расписания в другой формат не читает базу заново.
+    """
+    from apps.schedules.api_views import ScheduleViewSet
+
+    model = get_render_model(schedule, content_version)
+    return getattr(ScheduleViewSet(), BUILDERS[artifact_format(fmt)])(schedule, model)
+
+
+def _enqueue(job: ScheduleExportJob) -> None:
+    from apps.schedules.tasks import build_schedule_export
+
+    # Брокер недоступен: клиент увидит ошибку queue_unavailable и сможет выгрузить синхронно
+    jobs.enqueue_on_commit(job, build_schedule_export.delay)
+
+
+def request_export(schedule: Schedule, fmt: str, user=None) -> Tuple[ScheduleExportJob, bool]:
+    """Найти готовую/выполняющуюся выгрузку текущей версии или поставить новую в очередь.
+
+    Возвращает (job, queued): queued — задача поставлена в очередь этим вызовом.
+    """
+    fmt = artifact_format(fmt)
+    version = schedule_content_version(schedule)
+    job, created = ScheduleExportJob.objects.get_or_create(
+        schedule=schedule,
+        format=fmt,
+        content_version=version,
+        defaults={"created_by": user if getattr(user, "is_authenticated", False) else None},
+    )
+    if created:
+        _enqueue(job)
+        return job, True
+    active = (ScheduleExportJob.Status.PENDING, ScheduleExportJob.Status.RUNNING)
+    retry = job.status == ScheduleExportJob.Status.FAILED or (
+        job.status in active and jobs.is_stale(job, STALE_AFTER)
+    )
+    if retry:
+        # Повтор упавшей или потерянной задачи: сбрасываем в очередь только если статус не сменился
+        requeued = ScheduleExportJob.objects.filter(id=job.id, status=job.status).update(
+            status=ScheduleExportJob.Status.PENDING,
+            created_at=timezone.now(),
+            started_at=None,
+            error="",
+            error_detail="",
+        )
+        job.refresh_from_db()
+        if requeued:
+            _enqueue(job)
+            return job, True
+    return job, False
+
+
+def _store(job: ScheduleExportJob, artifact: ExportArtifact) -> None:
+    ext = artifact_format(job.format)
+    job.file.save(
+        f"schedule_{job.schedule_id}_{job.content_version[:16]}.{ext}", ContentFile(artifact.content), save=False
+    )
+    job.content_type = artifact.content_type
+    job.status = ScheduleExportJob.Status.DONE
+    job.error = ""
+    job.error_detail = ""
+    job.finished_at = timezone.now()
+    job.save()
+    drop_outdated(job)
+
+
+def drop_outdated(job: ScheduleExportJob) -> None:
+    """Удалить выгрузки прошлых версий того же расписания и формата (вместе с файлами)"""
+    for old in ScheduleExportJob.objects.filter(schedule_id=job.schedule_id, format=job.format).exclude(
+        content_version=job.content_version
+    ).exclude(status=ScheduleExportJob.Status.RUNNING):
+        old.delete()
+
+
+def run_export_job(job_id: int) -> Optional[ScheduleExportJob]:
+    """Выполнить выгрузку (тело Celery-задачи). Задачу, уже взятую другим воркером, пропускаем."""
+    claimed = jobs.claim(ScheduleExportJob, job_id)
+    job = ScheduleExportJob.objects.select_related("schedule").filter(id=job_id).first()
+    if not claimed or job is None:
+        return job
+    started = timezone.now()
+    try:
+        artifact = build_artifact(job.schedule, job.format, job.content_version)
+    except ExportUnavailable as exc:
+        jobs.mark_failed(job, exc.error, exc.detail)
+    except Exception as exc:
+        logger.exception("Ошибка выгрузки расписания %s в %s", job.schedule_id, job.format)
+        jobs.mark_failed(job, "export_failed", str(exc))
+    else:
+        _store(job, artifact)
+        logger.info(
+            "Выгрузка расписания %s в %s готова за %.2f с (%s байт)",
+            job.schedule_id, job.format, (timezone.now() - started).total_seconds(), len(artifact.content),
+        )
+    return job
+
+
+def export_now(schedule: Schedule, fmt: str, user=None) -> ExportArtifact:
+    """Синхронная выгрузка для старых эндпоинтов export/<format>/: готовый файл из кэша или сборка с сохранением.
+
+    Ошибки сборки (ExportUnavailable, ошибки рендеринга PDF) пробрасываются вызывающему.
+    """
+    version = schedule_content_version(schedule)
+    fmt_file = artifact_format(fmt)
+    job = ScheduleExportJob.objects.filter(
+        schedule=schedule, format=fmt_file, content_version=version, status=ScheduleExportJob.Status.DONE
+    ).first()
+    if job is not None and job.file:
+        try:
+            with job.file.open("rb") as fh:
+                content = fh.read()
+            return ExportArtifact(content, job.content_type, download_filename(schedule.id, fmt))
+        except OSError:
+            logger.warning("Файл выгрузки %s не найден, собираем заново", job.file.name)
+    artifact = build_artifact(schedule, fmt_file, version)
+    job, _ = ScheduleExportJob.objects.get_or_create(
+        schedule=schedule,
+        format=fmt_file,
+        content_version=version,
+        defaults={
+            "status": ScheduleExportJob.Status.RUNNING,
+            "started_at": timezone.now(),
+            "created_by": user if getattr(user, "is_authenticated", False) else None,
+        },
+    )
+    if job.status != ScheduleExportJob.Status.DONE or not job.file:
+        _store(job, artifact)
+    return ExportArtifact(artifact.content, artifact.content_type, download_filename(schedule.id, fmt))
+
+
+def job_payload(job: ScheduleExportJob, fmt: Optional[str] = None) -> dict:
+    """Статус выгрузки для API"""
+    fmt = fmt or job.format
+    data = {
+        **jobs.job_payload(job),
+        "schedule_id": job.schedule_id,
+        "format": fmt,
+        "content_version": job.content_version,
+        "download_url": None,
+    }
+    if job.status == ScheduleExportJob.Status.DONE:
+        suffix = f"?variant={NUMBERS}" if fmt == NUMBERS else ""
+        data["download_url"] = reverse("schedule-export-job-download", args=[job.id]) + suffix
+    return data
@@ -0,0 +1,391 @@
+"""
+Пул прогретых headless-Chromium для рендеринга HTML -> PDF.
+
+Раньше каждый экспорт запускал Playwright и новый Chromium, а после рендера
+закрывал его — секунды на старт браузера на каждый PDF. Пул держит в
+процессе `size` воркеров; у каждого свой Playwright, браузер, контекст и
+переиспользуемая страница (sync API Playwright привязан к потоку, в котором
+создан, поэтому браузер живёт в потоке воркера).
+
+- submit/render_pdf ставит HTML в общую очередь и ждёт воркера не дольше
+  queue_timeout; при переполнении очереди или таймауте — RenderPoolBusy;
+- после падения рендера (краш браузера, таймаут страницы) воркер закрывает
+  браузер, поднимает новый и повторяет задачу один раз;
+- контекст пересоздаётся каждые max_renders_per_context рендеров, чтобы
+  не копить память;
+- если Chromium не удаётся запустить (нет Playwright или браузера) —
+  RenderUnavailable: вызывающий код может перейти на запасной рендерер.
+
+Метрики (очередь, ожидание, время рендера, перезапуски) — в RenderMetrics.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait as wait_futures
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from django.conf import settings
+
+from sandmatch.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм, секунды (рендер PDF заметно дольше апдейта бота)
+RENDER_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+# Через сколько секунд после неудачного запуска Chromium пробовать снова
+LAUNCH_RETRY_INTERVAL = 60.0
+
+
+class RenderError(Exception):
+    """Рендер не удался и после перезапуска браузера"""
+
+
+class RenderPoolBusy(RenderError):
+    """Очередь переполнена или свободный воркер не дождался за queue_timeout"""
+
+
+class RenderUnavailable(RenderError):
+    """Chromium недоступен на сервере (нет Playwright или браузер не запускается)"""
+
+
+@dataclass(frozen=True)
+class PdfOptions:
+    format: str = "A4"
+    landscape: bool = False
+    viewport: Tuple[int, int] = (900, 1400)
+    media: str = "screen"
+    print_background: bool = True
+
+
+class RenderMetrics:
+    """Счётчики и гистограммы пула рендеринга"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.submitted = 0
+        self.rendered = 0
+        self.failed = 0
+        self.rejected = 0
+        self.retries = 0
+        self.browser_launches = 0
+        self.browser_recycles = 0
+        self.queue_depth = 0
+        self.queue_depth_max = 0
+        self.queue_wait = Histogram(RENDER_BUCKETS)
+        self.render_time = Histogram(RENDER_BUCKETS)
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def observe(self, histogram: Histogram, seconds: float) -> None:
+        with self._lock:
+            histogram.observe(seconds)
+
+    def set_queue_depth(self, depth: int) -> None:
+        with self._lock:
+            self.queue_depth = depth
+            if depth > self.queue_depth_max:
+                self.queue_depth_max = depth
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "rendered": self.rendered,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "retries": self.retries,
+                "browser_launches": self.browser_launches,
+                "browser_recycles": self.browser_recycles,
+                "queue_depth": self.queue_depth,
+                "queue_depth_max": self.queue_depth_max,
+                "queue_wait_p50": self.queue_wait.quantile(0.5),
+                "queue_wait_p95": self.queue_wait.quantile(0.95),
+                "render_time_p50": self.render_time.quantile(0.5),
+                "render_time_p95": self.render_time.quantile(0.95),
+                "render_time_avg": round(self.render_time.sum / self.render_time.count, 4)
+                if self.render_time.count else 0.0,
+            }
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            lines = []
+            for name, value in (
+                ("pdf_render_submitted_total", self.submitted),
+                ("pdf_render_rendered_total", self.rendered),
+                ("pdf_render_failed_total", self.failed),
+                ("pdf_render_rejected_total", self.rejected),
+                ("pdf_render_retries_total", self.retries),
+                ("pdf_render_browser_launches_total", self.browser_launches),
+                ("pdf_render_browser_recycles_total", self.browser_recycles),
+            ):
+                lines += [f"# TYPE {name} counter", f"{name} {value}"]
+            lines += [
+                "# TYPE pdf_render_queue_depth gauge",
+                f"pdf_render_queue_depth {self.queue_depth}",
+                "# TYPE pdf_render_queue_wait_seconds histogram",
+                *self.queue_wait.render("pdf_render_queue_wait_seconds"),
+                "# TYPE pdf_render_time_seconds histogram",
+                *self.render_time.render("pdf_render_time_seconds"),
+            ]
+            return "\n".join(lines) + "\n"
+
+
+class ChromiumSession:
+    """Playwright + браузер + контекст + страница одного воркера"""
+
+    def __init__(self, render_timeout: float):
+        from playwright.sync_api import sync_playwright
+
+        self.render_timeout_ms = int(render_timeout * 1000)
+        self._playwright = sync_playwright().start()
+        try:
+            self._browser = self._playwright.chromium.launch()
+        except Exception:
+            self._playwright.stop()
+            raise
+        self._context = None
+        self._page = None
+        self._viewport = None
+        self.renders = 0
+
+    def is_alive(self) -> bool:
+        return self._browser.is_connected()
+
+    def reset_context(self) -> None:
+        if self._context is not None:
+            try:
+                self._context.close()
+            except Exception:
+                pass
+        self._context = self._page = self._viewport = None
+        self.renders = 0
+
+    def render(self, html: str, options: PdfOptions) -> bytes:
+        if self._page is None or self._viewport != options.viewport:
+            self.reset_context()
+            width, height = options.viewport
+            self._context = self._browser.new_context(viewport={"width": width, "height": height})
+            self._page = self._context.new_page()
+            self._page.set_default_timeout(self.render_timeout_ms)
+            self._viewport = options.viewport
+        self._page.set_content(html, wait_until="load")
+        self._page.emulate_media(media=options.media)
+        pdf = self._page.pdf(
+            format=options.format, landscape=options.landscape, print_background=options.print_background
+        )
+        self.renders += 1
+        return pdf
+
+    def close(self) -> None:
+        self.reset_context()
+        for closer in (self._browser.close, self._playwright.stop):
+            try:
+                closer()
+            except Exception:
+                pass
+
+
+@dataclass
+class _Job:
+    html: str
+    options: PdfOptions
+    future: Future
+    enqueued_at: float
+
+
+class ChromiumRenderPool:
+    """Потоки-воркеры с прогретыми браузерами и общей очередью задач"""
+
+    def __init__(
+        self,
+        size: int = 2,
+        queue_timeout: float = 20.0,
+        render_timeout: float = 30.0,
+        max_pending: int = 32,
+        max_renders_per_context: int = 200,
+        metrics: Optional[RenderMetrics] = None,
+        session_factory: Optional[Callable[[], ChromiumSession]] = None,
+    ):
+        if size < 1:
+            raise ValueError("size должно быть >= 1")
+        self.size = size
+        self.queue_timeout = queue_timeout
+        self.render_timeout = render_timeout
+        self.max_renders_per_context = max_renders_per_context
+        self.metrics = metrics or RenderMetrics()
+        self.session_factory = session_factory or (lambda: ChromiumSession(render_timeout))
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue(maxsize=max_pending)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        # Ошибка запуска браузера: LAUNCH_RETRY_INTERVAL секунд новые задачи сразу получают RenderUnavailable
+        self._launch_error: Optional[BaseException] = None
+        self._launch_failed_at = 0.0
+        self._pid: Optional[int] = None
+
+    def start(self) -> None:
+        with self._lock:
+            # После fork (gunicorn) потоки родителя в дочернем процессе не работают
+            if self._threads and self._pid == os.getpid():
+                return
+            self._threads = [
+                threading.Thread(target=self._worker, name=f"pdf-render-worker-{index}", daemon=True)
+                for index in range(self.size)
+            ]
+            self._pid = os.getpid()
+            for thread in self._threads:
+                thread.start()
+        logger.info("Пул рендеринга PDF запущен: воркеров %s", self.size)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for thread in threads:
+            thread.join(timeout)
+
+    def submit(self, html: str, options: Optional[PdfOptions] = None) -> Future:
+        """Поставить HTML в очередь; RenderPoolBusy, если очередь заполнена"""
+        if self._launch_error is not None and time.monotonic() - self._launch_failed_at < LAUNCH_RETRY_INTERVAL:
+            raise RenderUnavailable(str(self._launch_error)) from self._launch_error
+        self.start()
+        job = _Job(html=html, options=options or PdfOptions(), future=Future(), enqueued_at=time.perf_counter())
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self.metrics.incr("rejected")
+            raise RenderPoolBusy("Очередь рендеринга PDF заполнена")
+        self.metrics.incr("submitted")
+        self.metrics.set_queue_depth(self._queue.qsize())
+        return job.future
+
+    def render_pdf(self, html: str, options: Optional[PdfOptions] = None) -> bytes:
+        """Отрендерить HTML в PDF, дождавшись свободного воркера"""
+        future = self.submit(html, options)
+        done, _ = wait_futures([future], timeout=self.queue_timeout)
+        if not done and future.cancel():
+            # Воркер так и не взял задачу — отменяем, чтобы он её пропустил
+            self.metrics.incr("rejected")
+            raise RenderPoolBusy(f"Нет свободного воркера за {self.queue_timeout} с")
+        try:
+            # Рендер с одним повтором после перезапуска браузера
+            return future.result(timeout=self.render_timeout * 2 + 5)
+        except FutureTimeoutError:
+            raise RenderError("Превышено время рендеринга PDF")
+
+    def _launch(self) -> Optional[ChromiumSession]:
+        try:
+            session = self.session_factory()
+        except Exception as exc:
+            self._launch_error = exc
+            self._launch_failed_at = time.monotonic()
+            logger.exception("Не удалось запустить Chromium для рендеринга PDF")
+            return None
+        self._launch_error = None
+        self.metrics.incr("browser_launches")
+        return session
+
+    def _recycle(self, session: Optional[ChromiumSession]) -> Optional[ChromiumSession]:
+        if session is not None:
+            session.close()
+        self.metrics.incr("browser_recycles")
+        return self._launch()
+
+    def _worker(self) -> None:
+        session = self._launch()
+        while True:
+            job = self._queue.get()
+            self.metrics.set_queue_depth(self._queue.qsize())
+            if job is None:
+                break
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            self.metrics.observe(self.metrics.queue_wait, time.perf_counter() - job.enqueued_at)
+            if session is None:
+                session = self._launch()
+            if session is None:
+                self.metrics.incr("failed")
+                job.future.set_exception(RenderUnavailable(str(self._launch_error)))
+                continue
+            if session.renders >= self.max_renders_per_context:
+                session.reset_context()
+            session = self._run(session, job)
+        if session is not None:
+            session.close()
+
+    def _run(self, session: ChromiumSession, job: _Job) -> Optional[ChromiumSession]:
+        """Выполнить задачу; вернуть сессию для следующих задач (после краша — новую)"""
+        for attempt in (1, 2):
+            started = time.perf_counter()
+            try:
+                pdf = session.render(job.html, job.options)
+            except Exception as exc:
+                logger.warning(
+                    "Рендер PDF упал (попытка %s, браузер жив: %s): %s",
+                    attempt, self._alive(session), exc,
+                )
+                session = self._recycle(session)
+                if attempt == 1 and session is not None:
+                    self.metrics.incr("retries")
+                    continue
+                self.metrics.incr("failed")
+                if session is None:
+                    job.future.set_exception(RenderUnavailable(str(self._launch_error)))
+                else:
+                    job.future.set_exception(RenderError(str(exc)))
+                return session
+            self.metrics.observe(self.metrics.render_time, time.perf_counter() - started)
+            self.metrics.incr("rendered")
+            job.future.set_result(pdf)
+            return session
+
+    @staticmethod
+    def _alive(session: ChromiumSession) -> bool:
+        try:
+            return session.is_alive()
+        except Exception:
+            return False
+
+
+_pool: Optional[ChromiumRenderPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> ChromiumRenderPool:
+    """Общий пул процесса (создаётся при первом обращении)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            try:
+                import playwright.sync_api  # noqa: F401
+            except ImportError as exc:
+                raise RenderUnavailable("Playwright не установлен") from exc
+            _pool = ChromiumRenderPool(
+                size=settings.PDF_RENDER_POOL_SIZE,
+                queue_timeout=settings.PDF_RENDER_QUEUE_TIMEOUT,
+                render_timeout=settings.PDF_RENDER_TIMEOUT,
+                max_pending=settings.PDF_RENDER_MAX_PENDING,
+                max_renders_per_context=settings.PDF_RENDER_CONTEXT_MAX_RENDERS,
+            )
+            atexit.register(_pool.stop)
+        return _pool
+
+
+def render_pdf(html: str, options: Optional[PdfOptions] = None) -> bytes:
+    """Отрендерить HTML в PDF через общий пул"""
+    return get_render_pool().render_pdf(html, options)
@@ -0,0 +1,476 @@
+"""
+Модель отрисовки расписания — общая для всех форматов выгрузки.
+
+Раньше каждый писатель (HTML->PDF, ReportLab, DOCX, XLSX) сам перечитывал
+корты, запуски, слоты и перерывы, заново считал строки групп и подписи, а
+имя каждой команды добиралось отдельными запросами к игрокам. Теперь
+ScheduleRenderModel строится один раз фиксированным числом запросов и
+содержит сетку запусков x кортов с готовыми подписями, перерывы по позициям
+и плановое время запусков; писатели только раскладывают её по своему формату.
+
+Модель состоит из простых значений и кэшируется по версии содержимого
+расписания (apps/schedules/services/exports.py: schedule_content_version).
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from typing import Any, Iterator, Optional, Union
+
+from django.core.cache import cache
+
+from apps.schedules.models import Schedule
+from apps.tournaments.models import Tournament, TournamentEntry
+
+# Время жизни модели в кэше, секунды
+RENDER_MODEL_CACHE_TTL = 10 * 60
+
+TBD = "TBD"
+
+
+def compute_rr_row_by_team(slots_qs: Any) -> dict[tuple[int, int, int], int]:
+    """Номер строки команды в группе кругового турнира: (tournament_id, group_index, team_id) -> row_index."""
+    rr_row_by_team: dict[tuple[int, int, int], int] = {}
+    try:
+        t_ids: set[int] = set()
+        team_ids: set[int] = set()
+        for s in slots_qs:
+            if getattr(s, "slot_type", None) != "match":
+                continue
+            m = getattr(s, "match", None)
+            if not m or not getattr(m, "tournament_id", None):
+                continue
+            t_ids.add(int(m.tournament_id))
+            if getattr(m, "team_1_id", None):
+                team_ids.add(int(m.team_1_id))
+            if getattr(m, "team_2_id", None):
+                team_ids.add(int(m.team_2_id))
+
+        if t_ids and team_ids:
+            qs = TournamentEntry.objects.filter(tournament_id__in=list(t_ids), team_id__in=list(team_ids)).only(
+                "tournament_id", "team_id", "group_index", "row_index"
+            )
+            for e in qs:
+                gi = int(e.group_index) if e.group_index is not None else 0
+                if gi <= 0 or e.row_index is None:
+                    continue
+                rr_row_by_team[(int(e.tournament_id), gi, int(e.team_id))] = int(e.row_index)
+    except Exception:
+        rr_row_by_team = {}
+    return rr_row_by_team
+
+
+def run_top_label(run_obj: Any) -> str:
+    """Верхняя строка плитки матча: время старта или режим запуска."""
+    try:
+        mode = getattr(run_obj, "start_mode", "")
+        if mode == "then":
+            return "Затем"
+        if mode == "not_earlier":
+            t = getattr(run_obj, "not_earlier_time", None)
+            if t:
+                return f"Не ранее {t.strftime('%H:%M')}"
+            return "Не ранее"
+        t = getattr(run_obj, "start_time", None)
+        if t:
+            return t.strftime("%H:%M")
+    except Exception:
+        pass
+    return ""
+
+
+def match_meta_label(m: Any, rr_row_by_team: dict[tuple[int, int, int], int]) -> str:
+    """Подпись матча: турнир, группа/раунд, номера строк пар."""
+    if not m:
+        return ""
+
+    def _schedule_prefix(match_obj: Any) -> str:
+        try:
+            t = getattr(match_obj, "tournament", None)
+            if not t:
+                return ""
+            val = str(getattr(t, "name_for_schedule", "") or "").strip()
+            if not val:
+                tid = getattr(t, "id", None)
+                if tid is not None:
+                    val = f"#{tid}"
+            if len(val) > 10:
+                val = val[:10]
+            return val
+        except Exception:
+            return ""
+
+    gi = getattr(m, "group_index", None)
+
+    def _is_proam_rr(match_obj: Any) -> bool:
+        try:
+            t = getattr(match_obj, "tournament", None)
+            if not t:
+                return False
+            if getattr(t, "system", None) != Tournament.System.ROUND_ROBIN:
+                return False
+            name = str(getattr(t, "name", "") or "").lower()
+            return ("proam" in name) or ("проам" in name)
+        except Exception:
+            return False
+
+    def _group_letter(i: Any) -> str:
+        try:
+            n = int(i)
+        except Exception:
+            return ""
+        letters = [
+            "А",
+            "Б",
+            "В",
+            "Г",
+            "Д",
+            "Е",
+            "Ж",
+            "З",
+            "И",
+            "Й",
+            "К",
+            "Л",
+            "М",
+            "Н",
+            "О",
+            "П",
+            "Р",
+            "С",
+            "Т",
+            "У",
+            "Ф",
+            "Х",
+            "Ц",
+            "Ч",
+            "Ш",
+            "Щ",
+            "Э",
+            "Ю",
+            "Я",
+        ]
+        if n <= 0:
+            return ""
+        if n <= len(letters):
+            return letters[n - 1]
+        return str(n)
+
+    if gi is None:
+        group = ""
+    else:
+        group = f"гр.{_group_letter(gi)}" if _is_proam_rr(m) else f"гр.{gi}"
+
+    try:
+        system = getattr(getattr(m, "tournament", None), "system", "")
+    except Exception:
+        system = ""
+
+    prefix = _schedule_prefix(m)
+
+    if system == "knockout":
+        rn = str(getattr(m, "round_name", "") or "").strip()
+        if rn:
+            return " ".join([p for p in [prefix, rn] if p])
+        ri = getattr(m, "round_index", None)
+        base = f"Раунд {ri}".strip() if ri is not None else ""
+        return " ".join([p for p in [prefix, base] if p])
+
+    if system == "round_robin":
+        rn = str(getattr(m, "round_name", "") or "").strip()
+        if rn and "гр." in rn and "•" in rn:
+            return " ".join([p for p in [prefix, rn] if p])
+        try:
+            gi_int = int(gi) if gi is not None else 0
+            t_id = int(getattr(m, "tournament_id", 0) or 0)
+            a_id = int(getattr(m, "team_1_id", 0) or 0)
+            b_id = int(getattr(m, "team_2_id", 0) or 0)
+            r1 = rr_row_by_team.get((t_id, gi_int, a_id))
+            r2 = rr_row_by_team.get((t_id, gi_int, b_id))
+            pair = f"{r1}-{r2}" if (r1 is not None and r2 is not None) else ""
+            base = " • ".join([p for p in [group, pair] if p])
+            return " ".join([p for p in [prefix, base] if p])
+        except Exception:
+            return " ".join([p for p in [prefix, group] if p])
+
+    if system == "king":
+        def _raw_team_label(team: Any) -> str:
+            if not team:
+                return ""
+            return str(
+                getattr(team, "display_name", None)
+                or getattr(team, "full_name", None)
+                or getattr(team, "name", None)
+                or ""
+            ).strip()
+
+        def _normalize_pair(text: str) -> str:
+            return str(text or "").replace(" ", "").replace("/", "+").upper()
+
+        a = _normalize_pair(_raw_team_label(getattr(m, "team_1", None)))
+        b = _normalize_pair(_raw_team_label(getattr(m, "team_2", None)))
+        vs = f"{a} vs {b}" if a and b else ""
+        rn = str(getattr(m, "round_name", "") or "").strip()
+        mid = getattr(m, "id", None)
+        fallback = f"Матч {mid}" if mid is not None else ""
+        meta = vs or rn or fallback
+        base = " • ".join([p for p in [group, meta] if p])
+        return " ".join([p for p in [prefix, base] if p])
+
+    return " ".join([p for p in [prefix, group] if p])
+
+
+def planned_start_times(schedule: Schedule, runs: list[Any], courts: list[Any]) -> dict[int, str]:
+    """Плановое время начала запусков: {run.index: "HH:MM"}.
+
+    Старт — время первого корта, иначе фиксированное время первого запуска, иначе 10:00;
+    каждый следующий запуск — через match_duration_minutes (fixed/not_earlier сдвигают время).
+    """
+    if not runs:
+        return {}
+    duration = int(getattr(schedule, "match_duration_minutes", 40) or 40)
+
+    first_court = courts[0] if courts else None
+    if first_court and first_court.first_start_time:
+        t0 = first_court.first_start_time
+    elif runs[0].start_time:
+        t0 = runs[0].start_time
+    else:
+        t0 = time(10, 0)
+    current_dt = datetime.combine(schedule.date, t0)
+
+    planned: dict[int, str] = {}
+    for r in runs:
+        if r.start_mode == "fixed" and r.start_time:
+            current_dt = datetime.combine(schedule.date, r.start_time)
+        elif r.start_mode == "not_earlier" and r.not_earlier_time:
+            candidate = datetime.combine(schedule.date, r.not_earlier_time)
+            if candidate > current_dt:
+                current_dt = candidate
+        # then: используем текущее current_dt
+        planned[r.index] = current_dt.time().strftime("%H:%M")
+        current_dt = current_dt + timedelta(minutes=duration)
+    return planned
+
+
+def _split_players(label: str) -> list[tuple[str, str]]:
+    """«Фамилия Имя / Фамилия Имя» -> [(фамилия, инициал), ...]"""
+    s = (label or "").strip()
+    if not s or s.upper() == TBD:
+        return []
+
+    parts = [p.strip() for p in re.split(r"\s*/\s*", s) if p.strip()]
+    out: list[tuple[str, str]] = []
+    for p in parts:
+        tokens = [t for t in p.split() if t]
+        if not tokens:
+            continue
+        surname = tokens[0]
+        initial = ""
+        if len(tokens) >= 2 and tokens[1]:
+            initial = tokens[1][0].upper()
+        out.append((surname, initial))
+    return out
+
+
+def _players_unique_key(surname: str, initial: str) -> str:
+    return f"{surname}|{initial}" if initial else surname
+
+
+@dataclass
+class TeamLabel:
+    # Полное имя пары, как str(Team): «Фамилия Имя / Фамилия Имя»; TBD — команды нет
+    full: str = TBD
+    # Короткая подпись по строкам: фамилии, с инициалом, если фамилия в расписании не уникальна
+    short: list[str] = field(default_factory=lambda: [TBD])
+
+
+@dataclass
+class CourtView:
+    id: int
+    index: int
+    name: str
+    first_start_time: Optional[time]
+
+
+@dataclass
+class RunView:
+    id: int
+    index: int
+    start_mode: str
+    start_time: Optional[time]
+    not_earlier_time: Optional[time]
+    # Верхняя строка плитки матча (run_top_label) и плановое время начала запуска
+    top_label: str
+    planned_start: str
+
+
+@dataclass
+class BreakView:
+    position: int
+    time: Optional[time]
+    text: str
+
+
+@dataclass
+class SlotView:
+    slot_type: str
+    match_id: Optional[int]
+    text_title: str
+    override_title: str
+    override_subtitle: str
+    # Матч загружен (слот может ссылаться на удалённый матч)
+    has_match: bool = False
+    match_status: str = ""
+    # Верхняя строка (override_subtitle или подпись запуска) и подпись матча
+    top: str = ""
+    meta: str = ""
+    team_1: TeamLabel = field(default_factory=TeamLabel)
+    team_2: TeamLabel = field(default_factory=TeamLabel)
+
+
+@dataclass
+class ScheduleRenderModel:
+    schedule_id: int
+    date: Optional[date]
+    title: str
+    courts: list[CourtView]
+    runs: list[RunView]
+    breaks_by_pos: dict[int, list[BreakView]]
+    # (run_id, court_id) -> слот
+    cells: dict[tuple[int, int], SlotView]
+    rr_row_by_team: dict[tuple[int, int, int], int]
+
+    @property
+    def date_text(self) -> str:
+        try:
+            return self.date.strftime("%d.%m.%Y") if self.date else ""
+        except Exception:
+            return str(self.date or "")
+
+    def cell(self, run: RunView, court: CourtView) -> Optional[SlotView]:
+        return self.cells.get((run.id, court.id))
+
+    def rows(self) -> Iterator[tuple[str, Union[RunView, BreakView]]]:
+        """Строки таблицы по порядку: ("break", перерыв) и ("run", запуск).
+
+        Перерыв с позицией N стоит перед запуском N+1, позиция len(runs) — после последнего.
+        """
+        run_by_index = {int(r.index): r for r in self.runs}
+        for current in range(1, len(self.runs) + 1):
+            for br in self.breaks_by_pos.get(current - 1, []):
+                yield "break", br
+            run = run_by_index.get(current)
+            if run is not None:
+                yield "run", run
+        for br in self.breaks_by_pos.get(len(self.runs), []):
+            yield "break", br
+
+
+def _team_full(team: Any) -> str:
+    if not team:
+        return ""
+    return getattr(team, "display_name", None) or getattr(team, "name", None) or str(team)
+
+
+def build_render_model(schedule: Schedule) -> ScheduleRenderModel:
+    """Собрать модель — 6 запросов независимо от размера расписания."""
+    courts = list(schedule.courts.all().order_by("index"))
+    runs = list(schedule.runs.all().order_by("index"))
+    slots = list(
+        schedule.slots.select_related(
+            "match",
+            "match__tournament",
+            "match__team_1__player_1",
+            "match__team_1__player_2",
+            "match__team_2__player_1",
+            "match__team_2__player_2",
+        )
+    )
+    breaks = list(schedule.global_breaks.all().order_by("position"))
+    tournament_names = [
+        str(scope.tournament.name)
+        for scope in schedule.scopes.select_related("tournament").all()
+        if scope.tournament and scope.tournament.name
+    ]
+    rr_row_by_team = compute_rr_row_by_team(slots)
+
+    surname_to_keys: dict[str, set[str]] = {}
+    for s in slots:
+        if s.slot_type != "match" or not s.match:
+            continue
+        for team in (s.match.team_1, s.match.team_2):
+            for sn, ini in _split_players(_team_full(team)):
+                surname_to_keys.setdefault(sn, set()).add(_players_unique_key(sn, ini))
+
+    def team_label(team: Any) -> TeamLabel:
+        raw = _team_full(team)
+        if not team or not raw:
+            return TeamLabel()
+        players = _split_players(raw)
+        if not players:
+            return TeamLabel(full=raw, short=[raw])
+        short = [f"{sn} {ini}." if len(surname_to_keys.get(sn, set())) > 1 and ini else sn for sn, ini in players]
+        return TeamLabel(full=raw, short=short)
+
+    planned = planned_start_times(schedule, runs, courts)
+    run_views = {
+        r.id: RunView(
+            id=r.id,
+            index=r.index,
+            start_mode=r.start_mode,
+            start_time=r.start_time,
+            not_earlier_time=r.not_earlier_time,
+            top_label=run_top_label(r),
+            planned_start=planned.get(r.index, ""),
+        )
+        for r in runs
+    }
+
+    cells: dict[tuple[int, int], SlotView] = {}
+    for s in slots:
+        view = SlotView(
+            slot_type=s.slot_type or "",
+            match_id=s.match_id,
+            text_title=s.text_title or "",
+            override_title=s.override_title or "",
+            override_subtitle=s.override_subtitle or "",
+        )
+        m = s.match
+        if m is not None:
+            run = run_views.get(s.run_id)
+            view.has_match = True
+            view.match_status = m.status or ""
+            view.top = view.override_subtitle.strip() or (run.top_label if run else "")
+            view.meta = match_meta_label(m, rr_row_by_team)
+            view.team_1 = team_label(m.team_1)
+            view.team_2 = team_label(m.team_2)
+        cells[(s.run_id, s.court_id)] = view
+
+    breaks_by_pos: dict[int, list[BreakView]] = {}
+    for br in breaks:
+        breaks_by_pos.setdefault(int(br.position), []).append(BreakView(br.position, br.time, br.text))
+
+    return ScheduleRenderModel(
+        schedule_id=schedule.id,
+        date=schedule.date,
+        title=" + ".join(tournament_names) if tournament_names else "Расписание",
+        courts=[CourtView(c.id, c.index, c.name, c.first_start_time) for c in courts],
+        runs=list(run_views.values()),
+        breaks_by_pos=breaks_by_pos,
+        cells=cells,
+        rr_row_by_team=rr_row_by_team,
+    )
+
+
+def get_render_model(schedule: Schedule, content_version: Optional[str] = None) -> ScheduleRenderModel:
+    """Модель из кэша по версии содержимого (если версия известна), иначе — построить."""
+    if not content_version:
+        return build_render_model(schedule)
+    key = f"schedules:render_model:{schedule.id}:{content_version}"
+    model = cache.get(key)
+    if model is None:
+        model = build_render_model(schedule)
+        cache.set(key, model, RENDER_MODEL_CACHE_TTL)
+    return model
@@ -0,0 +1,14 @@
+"""
+Сигналы расписаний: удаление файлов выгрузок вместе с записями.
+"""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from apps.schedules.models import ScheduleExportJob
+
+
+@receiver(post_delete, sender=ScheduleExportJob)
+def delete_export_file(sender, instance, **kwargs):
+    # Срабатывает и при каскадном удалении расписания
+    if instance.file:
+        instance.file.delete(save=False)
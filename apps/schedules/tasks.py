@@ -0,0 +1,18 @@
+"""
+Celery задачи расписаний
+"""
+from celery import shared_task
+
+
+@shared_task
+def build_schedule_export(job_id):
+    """
+    Собрать файл выгрузки расписания (apps/schedules/services/exports.py)
+
+    Args:
+        job_id: ID ScheduleExportJob
+    """
+    from apps.schedules.services.exports import run_export_job
+
+    job = run_export_job(job_id)
+    return job.status if job is not None else None
@@ -0,0 +1,195 @@
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, time as dt_time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.schedules.api_views import ScheduleViewSet
+from apps.schedules.models import Schedule, ScheduleCourt, ScheduleExportJob, ScheduleRun, ScheduleSlot
+from apps.schedules.services.exports import run_export_job
+from apps.schedules.services.render_model import build_render_model
+from apps.schedules.services.pdf_render_pool import (
+    ChromiumRenderPool,
+    RenderMetrics,
+    RenderPoolBusy,
+    RenderUnavailable,
+)
+from apps.tournaments.tests.factories import make_match, make_pair_teams, make_players, make_round_robin
+
+
+class ChromiumRenderPoolTestCase(SimpleTestCase):
+    """Пул рендеринга PDF: прогретые сессии, перезапуск после краша, очередь с таймаутом"""
+
+    class _Session:
+        launched = 0
+
+        def __init__(self, crash_on=(), gate=None):
+            type(self).launched += 1
+            self.crash_on = crash_on
+            self.gate = gate
+            self.renders = 0
+            self.closed = False
+
+        def is_alive(self):
+            return not self.closed
+
+        def reset_context(self):
+            self.renders = 0
+
+        def render(self, html, options):
+            if self.gate is not None:
+                self.gate.wait(5)
+            if html in self.crash_on:
+                self.closed = True
+                raise RuntimeError("Target closed")
+            self.renders += 1
+            return f"%PDF {html}".encode()
+
+        def close(self):
+            self.closed = True
+
+    def setUp(self):
+        self._Session.launched = 0
+
+    def _pool(self, factory, **kwargs):
+        pool = ChromiumRenderPool(metrics=RenderMetrics(), session_factory=factory, **kwargs)
+        self.addCleanup(pool.stop)
+        return pool
+
+    def test_sessions_are_reused(self):
+        pool = self._pool(self._Session, size=2)
+        for index in range(6):
+            self.assertEqual(pool.render_pdf(f"<p>{index}</p>"), f"%PDF <p>{index}</p>".encode())
+        self.assertEqual(self._Session.launched, 2)
+        snapshot = pool.metrics.snapshot()
+        self.assertEqual((snapshot["rendered"], snapshot["failed"]), (6, 0))
+        self.assertIn("pdf_render_time_seconds_count 6", pool.metrics.render_prometheus())
+
+    def test_crashed_browser_is_recycled_and_job_retried(self):
+        crashes = iter([True, False])
+        pool = self._pool(lambda: self._Session(crash_on={"boom"} if next(crashes, False) else ()), size=1)
+        self.assertEqual(pool.render_pdf("boom"), b"%PDF boom")
+        self.assertEqual(pool.render_pdf("ok"), b"%PDF ok")
+        snapshot = pool.metrics.snapshot()
+        self.assertEqual((snapshot["retries"], snapshot["browser_recycles"], snapshot["rendered"]), (1, 1, 2))
+
+    def test_queue_timeout_and_overflow(self):
+        gate = threading.Event()
+        pool = self._pool(lambda: self._Session(gate=gate), size=1, queue_timeout=0.05, max_pending=1)
+        blocked = pool.submit("first")
+        # Ждём, пока воркер возьмёт первую задачу, чтобы очередь освободилась
+        while not blocked.running():
+            time.sleep(0.001)
+        with self.assertRaises(RenderPoolBusy):
+            pool.render_pdf("second")
+        # Отменённая задача ещё занимает место в очереди — новая не помещается
+        with self.assertRaises(RenderPoolBusy):
+            pool.submit("third")
+        gate.set()
+        self.assertEqual(blocked.result(5), b"%PDF first")
+        self.assertEqual(pool.metrics.snapshot()["rejected"], 2)
+
+    def test_launch_failure_reports_unavailable(self):
+        def factory():
+            raise FileNotFoundError("chromium")
+
+        pool = self._pool(factory, size=1)
+        with self.assertRaises(RenderUnavailable):
+            pool.render_pdf("x")
+        with self.assertRaises(RenderUnavailable):
+            pool.submit("y")
+
+
+class ScheduleExportJobsTestCase(TestCase):
+    """Фоновые выгрузки расписания: кэш файла по версии содержимого"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="organizer", password="x", is_staff=True)
+        tournament = make_round_robin("Кубок", date(2026, 6, 1))
+        match = make_match(tournament, *make_pair_teams(make_players(4)), group_index=1)
+        cls.schedule = Schedule.objects.create(date=date(2026, 6, 1), created_by=cls.user)
+        court = ScheduleCourt.objects.create(schedule=cls.schedule, index=1, name="Корт 1")
+        run = ScheduleRun.objects.create(schedule=cls.schedule, index=1, start_time=dt_time(10, 0))
+        cls.slot = ScheduleSlot.objects.create(
+            schedule=cls.schedule, run=run, court=court, slot_type=ScheduleSlot.SlotType.MATCH, match=match
+        )
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _request(self, fmt):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post(
+                reverse("schedule-exports-create", args=[self.schedule.id]), {"format": fmt}, format="json"
+            )
+        return response, len(callbacks)
+
+    def test_job_is_reused_until_schedule_changes(self):
+        response, queued = self._request("xlsx")
+        self.assertEqual((response.status_code, queued), (202, 1))
+        job_id = response.json()["job"]["id"]
+        # Воркер Celery
+        self.assertEqual(run_export_job(job_id).status, ScheduleExportJob.Status.DONE)
+
+        status_url = reverse("schedule-export-job", args=[job_id])
+        self.assertEqual(self.client.get(status_url).json()["job"]["status"], "done")
+        download = self.client.get(reverse("schedule-export-job-download", args=[job_id]))
+        self.assertEqual(download.status_code, 200)
+        self.assertTrue(b"".join(download.streaming_content).startswith(b"PK"))
+
+        # Numbers — тот же готовый файл, без новой задачи
+        response, queued = self._request("numbers")
+        self.assertEqual((response.status_code, queued, response.json()["job"]["id"]), (200, 0, job_id))
+        download = self.client.get(response.json()["job"]["download_url"])
+        self.assertIn("schedule_%s_numbers.xlsx" % self.schedule.id, download["Content-Disposition"])
+
+        old_file = ScheduleExportJob.objects.get(id=job_id).file
+        self.slot.override_title = "Финал"
+        self.slot.save()
+        response, queued = self._request("xlsx")
+        self.assertEqual((response.status_code, queued), (202, 1))
+        run_export_job(response.json()["job"]["id"])
+        self.assertFalse(ScheduleExportJob.objects.filter(id=job_id).exists())
+        self.assertFalse(old_file.storage.exists(old_file.name))
+
+    def test_sync_endpoint_serves_cached_file(self):
+        url = reverse("schedule-export-docx", args=[self.schedule.id])
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        with mock.patch.object(ScheduleViewSet, "_build_docx", side_effect=AssertionError("rebuilt")):
+            second = self.client.get(url)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(ScheduleExportJob.objects.filter(status=ScheduleExportJob.Status.DONE).count(), 1)
+
+    def test_render_model_query_count_does_not_depend_on_size(self):
+        with self.assertNumQueries(6):
+            model = build_render_model(self.schedule)
+        cell = model.cell(model.runs[0], model.courts[0])
+        self.assertEqual(cell.team_1.full, "Игрок0 Тест / Игрок1 Тест")
+        self.assertEqual(cell.team_1.short, ["Игрок0", "Игрок1"])
+        self.assertEqual(cell.top, "10:00")
+
+        court = ScheduleCourt.objects.create(schedule=self.schedule, index=2, name="Корт 2")
+        players = make_players(2, last_name="Игрок0", first_name=lambda i: ("Анна", "Борис")[i])
+        match = make_match(self.slot.match.tournament, *make_pair_teams(players), group_index=1)
+        ScheduleSlot.objects.create(
+            schedule=self.schedule, run=self.slot.run, court=court, slot_type=ScheduleSlot.SlotType.MATCH, match=match
+        )
+        with self.assertNumQueries(6):
+            model = build_render_model(self.schedule)
+        # Однофамильцы различаются инициалом, пустая сторона — TBD
+        self.assertEqual(model.cell(model.runs[0], model.courts[0]).team_1.short, ["Игрок0 Т.", "Игрок1"])
+        self.assertEqual(model.cell(model.runs[0], model.courts[1]).team_2.short, ["TBD"])
@@ -10,6 +10,7 @@ from rest_framework.response import Response
 from apps.tournaments.models import Tournament, TournamentEntry
 from apps.teams.models import Team
 from apps.players.models import Player
+from apps.players.services import pair_stats, player_search
 
 from .models import LinkCode, TelegramUser
 from .serializers import LinkCodeSerializer, TelegramUserSerializer
@@ -21,6 +22,9 @@ from .api_serializers import (
 )
 from .authentication import TelegramWebAppAuthentication
 
+# Сколько игроков отдаём в подсказке поиска напарника
+SEARCH_PLAYERS_LIMIT = 50
+
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -861,7 +865,6 @@ def search_players(request, tournament_id):
     
     GET /api/mini-app/tournaments/{id}/search-players/?q=Иванов
     """
-    from django.db.models import Q
     from apps.tournaments.registration_models import TournamentRegistration
     
     # Аутентификация
@@ -881,23 +884,18 @@ def search_players(request, tournament_id):
     except Tournament.DoesNotExist:
         return Response({'error': 'Турнир не найден'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Базовый запрос по ФИО (ищем среди всех игроков, не только Telegram-пользователей)
-    players_qs = Player.objects.filter(
-        Q(first_name__icontains=query) |
-        Q(last_name__icontains=query) |
-        Q(patronymic__icontains=query)
+    # Поиск по всем игрокам (не только Telegram-пользователям), без текущего игрока
+    # (чтобы он не выбирал сам себя)
+    players = player_search.search_players(
+        query,
+        limit=SEARCH_PLAYERS_LIMIT,
+        exclude_ids=[telegram_user.player_id] if telegram_user and telegram_user.player_id else (),
     )
     
-    # Исключаем текущего игрока из результатов (чтобы он не выбирал сам себя)
-    if telegram_user and telegram_user.player_id:
-        players_qs = players_qs.exclude(id=telegram_user.player_id)
-    
-    players_qs = players_qs.order_by('last_name', 'first_name')
-    
     # Помечаем, зарегистрирован ли игрок уже в СФОРМИРОВАННОЙ ПАРЕ на этот турнир
     # (основной или резервный список). Игроки в статусе LOOKING_FOR_PARTNER
     # остаются доступными для выбора напарника.
-    candidate_ids = list(players_qs.values_list('id', flat=True))
+    candidate_ids = [player.id for player in players]
     base_qs = TournamentRegistration.objects.filter(
         tournament=tournament,
         status__in=[
@@ -918,7 +916,7 @@ def search_players(request, tournament_id):
         return "РПТТ"
 
     result = []
-    for player in players_qs:
+    for player in players:
         rating = getattr(player, 'current_rating', None)
         rating_bp = int(rating) if rating is not None else None
         vr = get_player_visible_rating(tournament, player)
@@ -943,9 +941,7 @@ def recent_partners(request, tournament_id):
     
     GET /api/mini-app/tournaments/{id}/recent_partners/
     """
-    from django.db.models import Q
     from apps.tournaments.registration_models import TournamentRegistration
-    from collections import Counter
     
     # Аутентификация
     auth = TelegramWebAppAuthentication()
@@ -963,52 +959,11 @@ def recent_partners(request, tournament_id):
     except (Tournament.DoesNotExist, Player.DoesNotExist):
         return Response({'players': []})
     
-    # Собираем всех напарников по командам Team
-    teams_with_partner = list(
-        Team.objects.filter(
-            (Q(player_1=current_player, player_2__isnull=False)) |
-            (Q(player_2=current_player, player_1__isnull=False))
-        ).order_by('-id')
-    )
-    
-    counter = Counter()
-    recent_ids = []
-    
-    for team in teams_with_partner:
-        if team.player_1_id == current_player.id and team.player_2_id:
-            partner_id = team.player_2_id
-        elif team.player_2_id == current_player.id and team.player_1_id:
-            partner_id = team.player_1_id
-        else:
-            continue
-        
-        counter[partner_id] += 1
-        
-        # Формируем список последних напарников (до 3 уникальных)
-        if partner_id not in recent_ids:
-            recent_ids.append(partner_id)
-    
-    if not counter:
+    # 3 последних напарника + самые частые до 5 — из графа связей игроков
+    top_ids = pair_stats.recommended_partner_ids(current_player.id)
+    if not top_ids:
         return Response({'players': []})
     
-    # Формируем итоговый список: 3 последних уникальных + заполнение до 5 из наиболее частых
-    merged_ids = []
-    
-    # Добавляем последних 3 уникальных напарников
-    for pid in recent_ids[:3]:
-        if pid not in merged_ids:
-            merged_ids.append(pid)
-    
-    # Дополняем из наиболее частых напарников (исключая уже добавленных)
-    # Берём всех частых по порядку убывания частоты и добавляем, пока не наберём 5
-    for pid, _cnt in counter.most_common():
-        if pid not in merged_ids:
-            merged_ids.append(pid)
-            if len(merged_ids) >= 5:
-                break
-    
-    top_ids = merged_ids[:5]
-    
     players_qs = Player.objects.filter(id__in=top_ids)
     players_list = sorted(players_qs, key=lambda p: str(p))
     
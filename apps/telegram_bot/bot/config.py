@@ -12,7 +12,23 @@ class BotConfig:
     webhook_url: str = ""
     webhook_path: str = "/api/telegram/webhook/"
     use_webhook: bool = False
+    webhook_secret: str = ""
+    metrics_path: str = "/api/telegram/metrics/"
+    # Токен доступа к метрикам (Authorization: Bearer ...); пустой — метрики не отдаются
+    metrics_token: str = ""
     web_app_url: str = ""
+    # Пул обработки апдейтов
+    workers: int = 8
+    max_pending: int = 1000
+    metrics_log_interval: int = 60
+    
+    @property
+    def webhook_full_url(self) -> str:
+        """Публичный URL webhook: TELEGRAM_WEBHOOK_URL (полный или базовый) + webhook_path"""
+        url = self.webhook_url.rstrip("/")
+        if not url or url.endswith(self.webhook_path.rstrip("/")):
+            return self.webhook_url
+        return url + self.webhook_path
     
     @classmethod
     def from_env(cls):
@@ -21,5 +37,12 @@ class BotConfig:
             token=os.getenv("TELEGRAM_BOT_TOKEN", ""),
             webhook_url=os.getenv("TELEGRAM_WEBHOOK_URL", ""),
             use_webhook=os.getenv("TELEGRAM_USE_WEBHOOK", "false").lower() == "true",
+            webhook_path=os.getenv("TELEGRAM_WEBHOOK_PATH", "/api/telegram/webhook/"),
+            webhook_secret=os.getenv("TELEGRAM_WEBHOOK_SECRET", ""),
+            metrics_path=os.getenv("TELEGRAM_METRICS_PATH", "/api/telegram/metrics/"),
+            metrics_token=os.getenv("TELEGRAM_METRICS_TOKEN", ""),
             web_app_url=os.getenv("WEB_APP_URL", "https://beachplay.ru"),
+            workers=int(os.getenv("TELEGRAM_BOT_WORKERS", "8")),
+            max_pending=int(os.getenv("TELEGRAM_BOT_MAX_PENDING", "1000")),
+            metrics_log_interval=int(os.getenv("TELEGRAM_BOT_METRICS_INTERVAL", "60")),
         )
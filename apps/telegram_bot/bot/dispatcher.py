@@ -5,6 +5,7 @@ from aiogram import Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 
 from .config import BotConfig
+from .metrics import setup_handler_metrics
 
 
 def setup_dispatcher(config: BotConfig) -> Dispatcher:
@@ -32,6 +33,9 @@ def setup_dispatcher(config: BotConfig) -> Dispatcher:
     dp.include_router(tournaments.router)
     dp.include_router(registration.router)
     
+    # Латентность обработчиков для метрик пула
+    setup_handler_metrics(dp)
+    
     # Будет добавлено позже:
     # from .handlers import pairs, rating
     # dp.include_router(pairs.router)
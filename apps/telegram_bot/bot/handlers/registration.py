@@ -17,6 +17,7 @@ from .tournaments import (
     register_with_partner_tournament,
     search_players_by_name,
     get_registration_status,
+    get_registration_statuses,
     leave_pair_tournament,
     cancel_registration_tournament,
     get_user_tournaments
@@ -594,9 +595,13 @@ async def cmd_my_registration(message: Message):
     
     await message.answer(f"{hbold('📝 Мои регистрации')}\n")
     
+    # Детальная информация о регистрациях — одним запросом на все турниры
+    reg_statuses = await get_registration_statuses(
+        [t.id for t in created_tournaments], telegram_user.player_id
+    )
+    
     for tournament in created_tournaments:
-        # Получаем детальную информацию о регистрации
-        reg_status = await get_registration_status(tournament.id, telegram_user.player_id)
+        reg_status = reg_statuses.get(tournament.id)
         
         if not reg_status:
             continue
@@ -762,8 +767,8 @@ async def callback_cmd_tournaments(callback: CallbackQuery):
         get_registration_tournaments,
         get_completed_tournaments,
         format_tournament_info,
-        check_registration,
-        get_tournament_winner,
+        get_registered_tournament_ids,
+        get_tournament_winners,
         get_total_tournaments_count,
     )
     from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
@@ -792,6 +797,12 @@ async def callback_cmd_tournaments(callback: CallbackQuery):
         await callback.message.answer("Нет доступных турниров")
         return
     
+    # Победители и регистрации подгружаются одним запросом на весь список
+    winners = await get_tournament_winners([t.id for t in live_tournaments + completed_tournaments])
+    registered_ids = await get_registered_tournament_ids(
+        [t.id for t in registration_tournaments], player_id
+    )
+    
     # Активные турниры
     if live_tournaments:
         await callback.message.answer(f"{hbold('🏆 Активные турниры')}")
@@ -815,9 +826,8 @@ async def callback_cmd_tournaments(callback: CallbackQuery):
                 ]
             ])
 
-            winner = await get_tournament_winner(tournament.id)
             await callback.message.answer(
-                format_tournament_info(tournament, winner=winner),
+                format_tournament_info(tournament, winner=winners.get(tournament.id)),
                 reply_markup=keyboard
             )
     
@@ -825,9 +835,7 @@ async def callback_cmd_tournaments(callback: CallbackQuery):
     if registration_tournaments:
         await callback.message.answer(f"{hbold('📝 Турниры для регистрации')}")
         for tournament in registration_tournaments:
-            is_registered = False
-            if player_id:
-                is_registered = await check_registration(tournament.id, player_id)
+            is_registered = tournament.id in registered_ids
             
             keyboard_buttons = []
             
@@ -885,9 +893,8 @@ async def callback_cmd_tournaments(callback: CallbackQuery):
                 ]
             ])
 
-            winner = await get_tournament_winner(tournament.id)
             await callback.message.answer(
-                format_tournament_info(tournament, winner=winner),
+                format_tournament_info(tournament, winner=winners.get(tournament.id)),
                 reply_markup=keyboard
             )
     
@@ -927,8 +934,8 @@ async def callback_cmd_mytournaments(callback: CallbackQuery):
         get_telegram_user,
         get_user_tournaments,
         format_tournament_info,
-        get_user_place,
-        get_tournament_winner,
+        get_user_places,
+        get_tournament_winners,
     )
     from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
     
@@ -1048,6 +1055,11 @@ async def callback_cmd_mytournaments(callback: CallbackQuery):
     
     # Завершенные турниры (completed) - только с лимитом
     if completed_tournaments:
+        # Места и победители — одним запросом на все завершённые турниры
+        completed_ids = [t.id for t in completed_tournaments]
+        user_places = await get_user_places(completed_ids, telegram_user.player_id)
+        winners = await get_tournament_winners(completed_ids)
+
         await callback.message.answer(f"{hbold('✅ Завершенные турниры')}")
         for tournament in completed_tournaments:
             keyboard = InlineKeyboardMarkup(inline_keyboard=[
@@ -1070,11 +1082,13 @@ async def callback_cmd_mytournaments(callback: CallbackQuery):
             ])
 
             # Для завершённых турниров показываем и твое место, и победителя
-            user_place = await get_user_place(tournament.id, telegram_user.player_id)
-            winner = await get_tournament_winner(tournament.id)
-
             await callback.message.answer(
-                format_tournament_info(tournament, is_registered=True, place=user_place, winner=winner),
+                format_tournament_info(
+                    tournament,
+                    is_registered=True,
+                    place=user_places.get(tournament.id),
+                    winner=winners.get(tournament.id),
+                ),
                 reply_markup=keyboard
             )
 
@@ -1134,8 +1148,12 @@ async def callback_cmd_myregistration(callback: CallbackQuery):
     
     await callback.message.answer(f"{hbold('📝 Мои регистрации')}\n")
     
+    reg_statuses = await get_registration_statuses(
+        [t.id for t in created_tournaments], telegram_user.player_id
+    )
+    
     for tournament in created_tournaments:
-        reg_status = await get_registration_status(tournament.id, telegram_user.player_id)
+        reg_status = reg_statuses.get(tournament.id)
         
         if not reg_status:
             continue
@@ -1353,7 +1371,12 @@ async def callback_cmd_register(callback: CallbackQuery):
     await callback.answer()
     await callback.message.delete()
     
-    from .tournaments import get_telegram_user, get_registration_tournaments, format_tournament_info, check_registration
+    from .tournaments import (
+        get_telegram_user,
+        get_registration_tournaments,
+        format_tournament_info,
+        get_registered_tournament_ids,
+    )
     from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
     
     telegram_user = await get_telegram_user(callback.from_user.id)
@@ -1385,10 +1408,12 @@ async def callback_cmd_register(callback: CallbackQuery):
     
     await callback.message.answer(f"{hbold('✍️ Турниры для регистрации')}")
     
+    registered_ids = await get_registered_tournament_ids(
+        [t.id for t in registration_tournaments], player_id
+    )
+    
     for tournament in registration_tournaments:
-        is_registered = False
-        if player_id:
-            is_registered = await check_registration(tournament.id, player_id)
+        is_registered = tournament.id in registered_ids
         
         keyboard_buttons = []
         
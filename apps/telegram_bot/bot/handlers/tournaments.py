@@ -21,90 +21,77 @@ WEB_APP_URL = os.getenv('WEB_APP_URL', 'https://beachplay.ru')
 BOT_USERNAME = getattr(django_settings, 'TELEGRAM_BOT_USERNAME', 'beachplay_bot')
 
 
-@sync_to_async
-def get_telegram_user(telegram_id):
+# Чтение из БД выполняется через нативный async ORM Django (aget/afirst/aexists/
+# acount и async for), без переключения в поток sync_to_async на каждый вызов.
+# Операции записи идут через RegistrationService, который использует
+# transaction.atomic и сигналы, поэтому они выполняются одним переходом
+# sync_to_async на всю операцию.
+
+
+async def get_telegram_user(telegram_id):
     """Получение Telegram пользователя"""
     try:
-        return TelegramUser.objects.select_related('user', 'player').get(telegram_id=telegram_id)
+        return await TelegramUser.objects.select_related('user', 'player').aget(telegram_id=telegram_id)
     except TelegramUser.DoesNotExist:
         return None
 
 
-@sync_to_async
-def get_live_tournaments():
-    """Получение турниров в процессе (live), отсортированных по алфавиту"""
-    return list(
-        Tournament.objects.filter(
-            status='active',
-            parent_tournament__isnull=True,
-        ).annotate(
-            participants_count=Count('entries')
-        ).order_by('name')[:10]
+def _tournaments_with_participants():
+    """Корневые турниры с количеством участников"""
+    return Tournament.objects.filter(
+        parent_tournament__isnull=True,
+    ).annotate(
+        participants_count=Count('entries')
     )
 
 
-@sync_to_async
-def get_registration_tournaments():
+async def get_live_tournaments():
+    """Получение турниров в процессе (live), отсортированных по алфавиту"""
+    qs = _tournaments_with_participants().filter(status='active').order_by('name')[:10]
+    return [t async for t in qs]
+
+
+async def get_registration_tournaments():
     """Получение турниров для регистрации, отсортированных по дате и времени (ближайший первым)"""
-    return list(
-        Tournament.objects.filter(
-            status='created',
-            parent_tournament__isnull=True,
-        ).annotate(
-            participants_count=Count('entries')
-        ).order_by('date', 'start_time', 'created_at')[:10]
-    )
+    qs = _tournaments_with_participants().filter(
+        status='created',
+    ).order_by('date', 'start_time', 'created_at')[:10]
+    return [t async for t in qs]
 
 
-@sync_to_async
-def get_completed_tournaments(limit=5):
+async def get_completed_tournaments(limit=5):
     """Получение завершенных турниров"""
-    return list(
-        Tournament.objects.filter(
-            status='completed',
-            parent_tournament__isnull=True,
-        ).annotate(
-            participants_count=Count('entries')
-        ).order_by('-date', '-created_at')[:limit]
-    )
+    qs = _tournaments_with_participants().filter(
+        status='completed',
+    ).order_by('-date', '-created_at')[:limit]
+    return [t async for t in qs]
 
 
-@sync_to_async
-def get_user_tournaments(player_id):
+async def get_user_tournaments(player_id):
     """Получение турниров пользователя через Team и TournamentEntry (как в мини-аппе)"""
     if not player_id:
         return []
     
-    # Находим команды игрока (как в мини-аппе)
+    # Находим команды игрока (как в мини-аппе); подзапросы выполняются внутри SQL
     team_ids = Team.objects.filter(
         Q(player_1_id=player_id) | Q(player_2_id=player_id)
-    ).values_list('id', flat=True)
+    ).values('id')
     
     # Находим турниры через участников
     tournament_ids = TournamentEntry.objects.filter(
         team_id__in=team_ids
-    ).values_list('tournament_id', flat=True).distinct()
+    ).values('tournament_id')
+    
+    user_tournaments = _tournaments_with_participants().filter(id__in=tournament_ids)
     
     # Получаем турниры по статусам
-    active_tournaments = list(
-        Tournament.objects.filter(
-            id__in=tournament_ids,
-            status='active',
-            parent_tournament__isnull=True,
-        ).annotate(
-            participants_count=Count('entries')
-        ).order_by('-date', '-created_at')
-    )
+    active_tournaments = [
+        t async for t in user_tournaments.filter(status='active').order_by('-date', '-created_at')
+    ]
     
-    created_tournaments = list(
-        Tournament.objects.filter(
-            id__in=tournament_ids,
-            status='created',
-            parent_tournament__isnull=True,
-        ).annotate(
-            participants_count=Count('entries')
-        ).order_by('date', 'created_at')
-    )
+    created_tournaments = [
+        t async for t in user_tournaments.filter(status='created').order_by('date', 'created_at')
+    ]
     
     # Считаем сколько осталось места для completed
     active_count = len(active_tournaments)
@@ -117,36 +104,55 @@ def get_user_tournaments(player_id):
     else:
         completed_limit = 1
     
-    completed_tournaments = list(
-        Tournament.objects.filter(
-            id__in=tournament_ids,
+    completed_tournaments = [
+        t async for t in user_tournaments.filter(
             status='completed',
-            parent_tournament__isnull=True,
-        ).annotate(
-            participants_count=Count('entries')
         ).order_by('-date', '-created_at')[:completed_limit]
-    )
+    ]
     
     # Объединяем: active + created + completed
     return active_tournaments + created_tournaments + completed_tournaments
 
 
-@sync_to_async
-def check_registration(tournament_id, player_id):
+async def check_registration(tournament_id, player_id):
     """Проверка регистрации игрока на турнир через TournamentRegistration"""
     if not player_id:
         return False
     
     from apps.tournaments.registration_models import TournamentRegistration
     
-    return TournamentRegistration.objects.filter(
+    return await TournamentRegistration.objects.filter(
         tournament_id=tournament_id,
         player_id=player_id
-    ).exists()
+    ).aexists()
 
 
-@sync_to_async
-def get_registration_status(tournament_id, player_id):
+async def get_registered_tournament_ids(tournament_ids, player_id) -> set:
+    """ID турниров из списка, на которые зарегистрирован игрок (одним запросом)"""
+    if not player_id or not tournament_ids:
+        return set()
+    
+    from apps.tournaments.registration_models import TournamentRegistration
+    
+    qs = TournamentRegistration.objects.filter(
+        tournament_id__in=list(tournament_ids),
+        player_id=player_id,
+    ).values_list('tournament_id', flat=True)
+    return {tid async for tid in qs}
+
+
+def _registration_status_dict(reg):
+    return {
+        'id': reg.id,
+        'status': reg.status,
+        'partner': reg.partner,
+        'team': reg.team,
+        'registration_order': reg.registration_order,
+        'registered_at': reg.registered_at
+    }
+
+
+async def get_registration_status(tournament_id, player_id):
     """Получение детальной информации о регистрации игрока"""
     if not player_id:
         return None
@@ -154,35 +160,40 @@ def get_registration_status(tournament_id, player_id):
     from apps.tournaments.registration_models import TournamentRegistration
     
     try:
-        reg = TournamentRegistration.objects.select_related('partner', 'team').get(
+        reg = await TournamentRegistration.objects.select_related('partner', 'team').aget(
             tournament_id=tournament_id,
             player_id=player_id
         )
-        return {
-            'id': reg.id,
-            'status': reg.status,
-            'partner': reg.partner,
-            'team': reg.team,
-            'registration_order': reg.registration_order,
-            'registered_at': reg.registered_at
-        }
     except TournamentRegistration.DoesNotExist:
         return None
+    return _registration_status_dict(reg)
+
+
+async def get_registration_statuses(tournament_ids, player_id) -> dict:
+    """Регистрации игрока по списку турниров: {tournament_id: статус как в get_registration_status}"""
+    if not player_id or not tournament_ids:
+        return {}
+    
+    from apps.tournaments.registration_models import TournamentRegistration
+    
+    qs = TournamentRegistration.objects.select_related('partner', 'team').filter(
+        tournament_id__in=list(tournament_ids),
+        player_id=player_id,
+    )
+    return {reg.tournament_id: _registration_status_dict(reg) async for reg in qs}
 
 
-@sync_to_async
-def get_tournament(tournament_id):
+async def get_tournament(tournament_id):
     """Получение турнира по ID"""
     try:
-        return Tournament.objects.annotate(
+        return await Tournament.objects.annotate(
             participants_count=Count('entries')
-        ).get(id=tournament_id)
+        ).aget(id=tournament_id)
     except Tournament.DoesNotExist:
         return None
 
 
-@sync_to_async
-def search_players_by_name(query, exclude_player_id=None, tournament_id=None):
+async def search_players_by_name(query, exclude_player_id=None, tournament_id=None):
     """Поиск игроков по ФИО, исключая уже зарегистрированных на турнир"""
     from apps.players.models import Player
     from apps.tournaments.registration_models import TournamentRegistration
@@ -210,133 +221,112 @@ def search_players_by_name(query, exclude_player_id=None, tournament_id=None):
 
         players = players.exclude(id__in=busy_player_ids)
     
-    return list(players.order_by('last_name', 'first_name')[:10])
+    return [p async for p in players.order_by('last_name', 'first_name')[:10]]
 
 
-@sync_to_async
-def register_single_tournament(tournament_id, player_id):
+async def register_single_tournament(tournament_id, player_id):
     """Регистрация на индивидуальный турнир через RegistrationService"""
     from apps.tournaments.services import RegistrationService
     from apps.players.models import Player
     
-    tournament = Tournament.objects.get(id=tournament_id)
-    player = Player.objects.get(id=player_id)
+    tournament = await Tournament.objects.aget(id=tournament_id)
+    player = await Player.objects.aget(id=player_id)
     
-    registration = RegistrationService.register_single(tournament, player)
-    return registration
+    return await sync_to_async(RegistrationService.register_single)(tournament, player)
 
 
-@sync_to_async
-def register_looking_for_partner_tournament(tournament_id, player_id):
+async def register_looking_for_partner_tournament(tournament_id, player_id):
     """Регистрация в режиме 'Ищу пару' через RegistrationService"""
     from apps.tournaments.services import RegistrationService
     from apps.players.models import Player
     
-    tournament = Tournament.objects.get(id=tournament_id)
-    player = Player.objects.get(id=player_id)
+    tournament = await Tournament.objects.aget(id=tournament_id)
+    player = await Player.objects.aget(id=player_id)
     
-    registration = RegistrationService.register_looking_for_partner(tournament, player)
-    return registration
+    return await sync_to_async(RegistrationService.register_looking_for_partner)(tournament, player)
 
 
-@sync_to_async
-def register_with_partner_tournament(tournament_id, player_id, partner_id):
+async def register_with_partner_tournament(tournament_id, player_id, partner_id):
     """Регистрация с напарником через RegistrationService"""
     from apps.tournaments.services import RegistrationService
     from apps.players.models import Player
-    from apps.telegram_bot.models import TelegramUser
     
-    tournament = Tournament.objects.get(id=tournament_id)
-    player = Player.objects.get(id=player_id)
-    partner = Player.objects.get(id=partner_id)
+    tournament = await Tournament.objects.aget(id=tournament_id)
+    players = {p.id: p async for p in Player.objects.filter(id__in=[player_id, partner_id])}
+    if player_id not in players or partner_id not in players:
+        raise Player.DoesNotExist('Игрок не найден')
     
-    registration = RegistrationService.register_with_partner(tournament, player, partner, notify_partner=True)
+    registration = await sync_to_async(RegistrationService.register_with_partner)(
+        tournament, players[player_id], players[partner_id], notify_partner=True
+    )
     
     # Проверяем, есть ли у напарника связь с Telegram
-    partner_has_telegram = TelegramUser.objects.filter(player_id=partner_id).exists()
+    partner_has_telegram = await TelegramUser.objects.filter(player_id=partner_id).aexists()
     
     return registration, partner_has_telegram
 
 
-@sync_to_async
-def leave_pair_tournament(tournament_id, player_id):
+async def leave_pair_tournament(tournament_id, player_id):
     """Выход из пары через RegistrationService"""
     from apps.tournaments.services import RegistrationService
     from apps.tournaments.registration_models import TournamentRegistration
     
-    registration = TournamentRegistration.objects.get(
+    registration = await TournamentRegistration.objects.aget(
         tournament_id=tournament_id,
         player_id=player_id
     )
     
-    RegistrationService.leave_pair(registration)
+    await sync_to_async(RegistrationService.leave_pair)(registration)
 
 
-@sync_to_async
-def cancel_registration_tournament(tournament_id, player_id):
+async def cancel_registration_tournament(tournament_id, player_id):
     """Полная отмена регистрации через RegistrationService"""
     from apps.tournaments.services import RegistrationService
     from apps.tournaments.registration_models import TournamentRegistration
     
-    registration = TournamentRegistration.objects.get(
+    registration = await TournamentRegistration.objects.aget(
         tournament_id=tournament_id,
         player_id=player_id
     )
     
-    RegistrationService.cancel_registration(registration)
+    await sync_to_async(RegistrationService.cancel_registration)(registration)
 
 
-@sync_to_async
-def get_user_place(tournament_id: int, player_id: int) -> str | None:
+def _format_place(placement) -> str:
+    if placement.place_from == placement.place_to:
+        return str(placement.place_from)
+    return f"{placement.place_from}–{placement.place_to}"
+
+
+async def get_user_place(tournament_id: int, player_id: int) -> str | None:
     """Получить место игрока в завершённом турнире.
 
     Возвращает строку с местом (например, "1" или "1–3"), либо None,
     если место не найдено.
     """
-    if not player_id:
-        return None
-
-    # Находим все записи участника в турнире
-    entries = TournamentEntry.objects.filter(
-        tournament_id=tournament_id,
-        team__isnull=False,
-    ).filter(
-        Q(team__player_1_id=player_id) | Q(team__player_2_id=player_id)
-    )
-
-    if not entries.exists():
-        return None
-
-    placement = (
-        TournamentPlacement.objects
-        .filter(tournament_id=tournament_id, entry__in=entries)
-        .order_by('place_from')
-        .first()
-    )
-    if not placement:
-        return None
-
-    if placement.place_from == placement.place_to:
-        return str(placement.place_from)
-    return f"{placement.place_from}–{placement.place_to}"
+    places = await get_user_places([tournament_id], player_id)
+    return places.get(tournament_id)
 
 
-@sync_to_async
-def get_tournament_winner(tournament_id: int) -> str | None:
-    """Получить победителя турнира по TournamentPlacement.
+async def get_user_places(tournament_ids, player_id) -> dict:
+    """Места игрока по списку турниров одним запросом: {tournament_id: "1" | "1–3"}"""
+    if not player_id or not tournament_ids:
+        return {}
 
-    Возвращает имя игрока или пары, либо None если данных нет.
-    """
     placements = (
         TournamentPlacement.objects
-        .filter(tournament_id=tournament_id, place_from=1)
-        .select_related("entry__team__player_1", "entry__team__player_2")
-        .order_by("place_from")
+        .filter(tournament_id__in=list(tournament_ids), entry__team__isnull=False)
+        .filter(Q(entry__team__player_1_id=player_id) | Q(entry__team__player_2_id=player_id))
+        .order_by('tournament_id', 'place_from')
+        .only('tournament_id', 'place_from', 'place_to')
     )
-    if not placements.exists():
-        return None
+    places = {}
+    async for placement in placements:
+        places.setdefault(placement.tournament_id, _format_place(placement))
+    return places
 
-    placement = placements.first()
+
+def _format_winner(placement) -> str | None:
     entry = placement.entry
     if not entry or not entry.team:
         return None
@@ -360,10 +350,41 @@ def get_tournament_winner(tournament_id: int) -> str | None:
     return None
 
 
-@sync_to_async
-def get_total_tournaments_count() -> int:
+async def get_tournament_winner(tournament_id: int) -> str | None:
+    """Получить победителя турнира по TournamentPlacement.
+
+    Возвращает имя игрока или пары, либо None если данных нет.
+    """
+    winners = await get_tournament_winners([tournament_id])
+    return winners.get(tournament_id)
+
+
+async def get_tournament_winners(tournament_ids) -> dict:
+    """Победители по списку турниров одним запросом: {tournament_id: имя игрока или пары}"""
+    if not tournament_ids:
+        return {}
+
+    placements = (
+        TournamentPlacement.objects
+        .filter(tournament_id__in=list(tournament_ids), place_from=1)
+        .select_related("entry__team__player_1", "entry__team__player_2")
+        .order_by("tournament_id", "id")
+    )
+    winners = {}
+    seen = set()
+    async for placement in placements:
+        if placement.tournament_id in seen:
+            continue
+        seen.add(placement.tournament_id)
+        winner = _format_winner(placement)
+        if winner:
+            winners[placement.tournament_id] = winner
+    return winners
+
+
+async def get_total_tournaments_count() -> int:
     """Общее количество турниров в системе (для текста 'Всего в истории N турниров')."""
-    return Tournament.objects.count()
+    return await Tournament.objects.acount()
 
 
 def format_tournament_info(tournament, is_registered: bool = False, place: str | None = None, winner: str | None = None):
@@ -466,6 +487,12 @@ async def cmd_tournaments(message: Message):
         await message.answer("Нет доступных турниров")
         return
     
+    # Победители и регистрации подгружаются одним запросом на весь список
+    winners = await get_tournament_winners([t.id for t in live_tournaments])
+    registered_ids = await get_registered_tournament_ids(
+        [t.id for t in registration_tournaments], player_id
+    )
+    
     # Активные турниры
     if live_tournaments:
         await message.answer(f"{hbold('🏆 Активные турниры')}")
@@ -488,9 +515,8 @@ async def cmd_tournaments(message: Message):
                     )
                 ]
             ])
-            winner = await get_tournament_winner(tournament.id)
             await message.answer(
-                format_tournament_info(tournament, winner=winner),
+                format_tournament_info(tournament, winner=winners.get(tournament.id)),
                 reply_markup=keyboard
             )
     
@@ -498,9 +524,7 @@ async def cmd_tournaments(message: Message):
     if registration_tournaments:
         await message.answer(f"{hbold('📝 Турниры для регистрации')}")
         for tournament in registration_tournaments:
-            is_registered = False
-            if player_id:
-                is_registered = await check_registration(tournament.id, player_id)
+            is_registered = tournament.id in registered_ids
             
             keyboard_buttons = []
             
@@ -0,0 +1,125 @@
+"""
+Метрики обработки апдейтов бота: глубина очереди, ожидание в очереди,
+гистограммы латентности по обработчикам.
+
+Экспортируются в текстовом формате Prometheus (webhook-режим отдаёт их по
+TELEGRAM_METRICS_PATH, polling-режим периодически пишет сводку в лог).
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject
+
+from sandmatch.metrics import DEFAULT_BUCKETS, Histogram  # noqa: F401
+
+
+class BotMetrics:
+    """Счётчики и гистограммы пула обработки апдейтов"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.updates_received = 0
+        self.updates_processed = 0
+        self.updates_failed = 0
+        self.queue_depth = 0
+        self.queue_depth_max = 0
+        self.active_chats = 0
+        self.queue_wait = Histogram()
+        self.update_latency = Histogram()
+        self.handlers: Dict[str, Histogram] = {}
+
+    def set_queue_depth(self, depth: int, active_chats: int) -> None:
+        self.queue_depth = depth
+        self.active_chats = active_chats
+        if depth > self.queue_depth_max:
+            self.queue_depth_max = depth
+
+    def observe_handler(self, name: str, seconds: float) -> None:
+        histogram = self.handlers.get(name)
+        if histogram is None:
+            histogram = self.handlers[name] = Histogram()
+        histogram.observe(seconds)
+
+    def render_prometheus(self) -> str:
+        lines = [
+            '# TYPE bot_updates_received_total counter',
+            f'bot_updates_received_total {self.updates_received}',
+            '# TYPE bot_updates_processed_total counter',
+            f'bot_updates_processed_total {self.updates_processed}',
+            '# TYPE bot_updates_failed_total counter',
+            f'bot_updates_failed_total {self.updates_failed}',
+            '# TYPE bot_queue_depth gauge',
+            f'bot_queue_depth {self.queue_depth}',
+            '# TYPE bot_queue_depth_max gauge',
+            f'bot_queue_depth_max {self.queue_depth_max}',
+            '# TYPE bot_active_chats gauge',
+            f'bot_active_chats {self.active_chats}',
+            '# TYPE bot_queue_wait_seconds histogram',
+            *self.queue_wait.render('bot_queue_wait_seconds'),
+            '# TYPE bot_update_latency_seconds histogram',
+            *self.update_latency.render('bot_update_latency_seconds'),
+            '# TYPE bot_handler_latency_seconds histogram',
+        ]
+        for name in sorted(self.handlers):
+            lines.extend(self.handlers[name].render('bot_handler_latency_seconds', f'handler="{name}"'))
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> str:
+        """Короткая сводка для лога"""
+        slowest = sorted(
+            self.handlers.items(), key=lambda item: item[1].quantile(0.95), reverse=True
+        )[:3]
+        slowest_text = ', '.join(
+            f'{name} p95≤{hist.quantile(0.95)}s (n={hist.count})' for name, hist in slowest
+        )
+        return (
+            f'апдейтов: {self.updates_processed}/{self.updates_received}, ошибок: {self.updates_failed}, '
+            f'очередь: {self.queue_depth} (макс. {self.queue_depth_max}), '
+            f'ожидание p95≤{self.queue_wait.quantile(0.95)}s; медленные: {slowest_text or "—"}'
+        )
+
+
+bot_metrics = BotMetrics()
+
+
+def _handler_name(data: Dict[str, Any]) -> str:
+    handler = data.get('handler')
+    callback = getattr(handler, 'callback', None)
+    if callback is None:
+        return 'unknown'
+    module = getattr(callback, '__module__', '') or ''
+    return f"{module.rsplit('.', 1)[-1]}.{getattr(callback, '__qualname__', repr(callback))}"
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware: латентность каждого сработавшего обработчика"""
+
+    def __init__(self, metrics: Optional[BotMetrics] = None):
+        self.metrics = metrics or bot_metrics
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.metrics.observe_handler(_handler_name(data), time.perf_counter() - started)
+
+
+def setup_handler_metrics(dp: Dispatcher, metrics: Optional[BotMetrics] = None) -> None:
+    """Подключить замер латентности ко всем типам событий (кроме update/error).
+
+    Inner middleware диспетчера применяются и к обработчикам вложенных роутеров.
+    """
+    middleware = HandlerMetricsMiddleware(metrics)
+    for name, observer in dp.observers.items():
+        if name in ('update', 'error'):
+            continue
+        observer.middleware(middleware)
@@ -0,0 +1,140 @@
+"""
+Жизненный цикл бота: Bot + Dispatcher + пул обработки апдейтов.
+
+Используется в обоих режимах: long polling (run_bot) и webhook (ASGI-приложение).
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.enums import ParseMode
+from aiogram.types import Update
+from aiogram.utils.backoff import Backoff, BackoffConfig
+
+from .config import BotConfig
+from .dispatcher import setup_dispatcher
+from .metrics import BotMetrics, bot_metrics
+from .update_pool import UpdateWorkerPool
+
+logger = logging.getLogger(__name__)
+
+# Long polling: таймаут getUpdates (с) и паузы между повторами при ошибках сети
+POLLING_TIMEOUT = 30
+POLLING_BACKOFF = BackoffConfig(min_delay=1.0, max_delay=5.0, factor=1.3, jitter=0.1)
+
+
+class BotRuntime:
+    """Запущенный бот с пулом воркеров"""
+
+    def __init__(self, config: BotConfig, metrics: Optional[BotMetrics] = None):
+        self.config = config
+        self.metrics = metrics or bot_metrics
+        self.bot: Optional[Bot] = None
+        self.dp: Optional[Dispatcher] = None
+        self.pool: Optional[UpdateWorkerPool] = None
+        self._metrics_task: Optional[asyncio.Task] = None
+
+    @property
+    def started(self) -> bool:
+        return self.pool is not None
+
+    async def start(self) -> None:
+        if self.started:
+            return
+        self.bot = Bot(
+            token=self.config.token,
+            default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+        )
+        self.dp = setup_dispatcher(self.config)
+        pool = UpdateWorkerPool(
+            self.dp,
+            self.bot,
+            workers=self.config.workers,
+            max_pending=self.config.max_pending,
+            metrics=self.metrics,
+        )
+        await self.dp.emit_startup(bot=self.bot)
+        await pool.start()
+        self.pool = pool
+        if self.config.metrics_log_interval > 0:
+            self._metrics_task = asyncio.create_task(self._log_metrics())
+
+    async def stop(self) -> None:
+        if not self.started:
+            return
+        if self._metrics_task:
+            self._metrics_task.cancel()
+            self._metrics_task = None
+        await self.pool.stop(drain=True)
+        self.pool = None
+        try:
+            await self.dp.emit_shutdown(bot=self.bot)
+        finally:
+            await self.bot.session.close()
+
+    async def submit(self, update: Update) -> None:
+        await self.pool.submit(update)
+
+    async def feed_webhook(self, payload: Dict[str, Any]) -> None:
+        """Принять тело webhook-запроса Telegram и поставить апдейт в очередь"""
+        update = Update.model_validate(payload, context={"bot": self.bot})
+        await self.submit(update)
+
+    async def setup_webhook(self) -> None:
+        url = self.config.webhook_full_url
+        if not url:
+            logger.warning("TELEGRAM_WEBHOOK_URL не задан, webhook не зарегистрирован")
+            return
+        await self.bot.set_webhook(
+            url=url,
+            secret_token=self.config.webhook_secret or None,
+            allowed_updates=self.dp.resolve_used_update_types(),
+            max_connections=max(self.config.workers, 1),
+        )
+        logger.info("Webhook зарегистрирован: %s", url)
+
+    async def run_polling(self) -> None:
+        """Long polling: апдейты читаются и раздаются воркерам пула.
+
+        Следующая порция запрашивается только после постановки текущих апдейтов
+        в очередь, поэтому при заполненной очереди polling притормаживает.
+        Ошибки сети не останавливают polling: запрос повторяется с backoff.
+        """
+        await self.bot.delete_webhook(drop_pending_updates=True)
+        allowed_updates = self.dp.resolve_used_update_types()
+        backoff = Backoff(config=POLLING_BACKOFF)
+        request_timeout = None
+        if self.bot.session.timeout:
+            # Ответ на long polling приходит не раньше POLLING_TIMEOUT
+            request_timeout = int(self.bot.session.timeout + POLLING_TIMEOUT)
+        offset = None
+        failed = False
+        while True:
+            try:
+                updates = await self.bot.get_updates(
+                    offset=offset,
+                    timeout=POLLING_TIMEOUT,
+                    allowed_updates=allowed_updates,
+                    request_timeout=request_timeout,
+                )
+            except Exception as e:
+                failed = True
+                logger.error("Не удалось получить апдейты (%s: %s), повтор через %.1f с", type(e).__name__, e, backoff.next_delay)
+                await backoff.asleep()
+                continue
+            if failed:
+                logger.info("Соединение с Telegram восстановлено")
+                backoff.reset()
+                failed = False
+            for update in updates:
+                await self.submit(update)
+                # Апдейты с update_id < offset подтверждаются и больше не приходят
+                offset = update.update_id + 1
+
+    async def _log_metrics(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.metrics_log_interval)
+            if self.metrics.updates_received:
+                logger.info("Метрики бота: %s", self.metrics.summary())
@@ -0,0 +1,147 @@
+"""
+Пул воркеров для конкурентной обработки апдейтов Telegram.
+
+Апдейты разных чатов обрабатываются параллельно (до `workers` одновременно),
+апдейты одного чата — строго по очереди в порядке поступления: для каждого
+чата ведётся своя очередь, и в работе у воркеров одновременно находится не
+более одного апдейта этого чата. После каждого апдейта чат возвращается в
+конец общей очереди готовых чатов, поэтому активный пользователь не занимает
+воркер надолго.
+
+Общее число ожидающих апдейтов ограничено `max_pending`: при переполнении
+submit() ждёт освобождения места (backpressure для polling/webhook).
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Hashable, List, Optional, Tuple
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from .metrics import BotMetrics, bot_metrics
+
+logger = logging.getLogger(__name__)
+
+
+def update_chat_key(update: Update) -> Hashable:
+    """Ключ упорядочивания апдейта: чат, иначе пользователь, иначе сам апдейт"""
+    event = update.event
+    chat = getattr(event, 'chat', None)
+    if chat is None:
+        message = getattr(event, 'message', None)
+        chat = getattr(message, 'chat', None)
+    if chat is not None:
+        return ('chat', chat.id)
+    user = getattr(event, 'from_user', None)
+    if user is not None:
+        return ('user', user.id)
+    return ('update', update.update_id)
+
+
+class UpdateWorkerPool:
+    """Пул asyncio-воркеров с сохранением порядка апдейтов внутри чата"""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        workers: int = 8,
+        max_pending: int = 1000,
+        metrics: Optional[BotMetrics] = None,
+    ):
+        if workers < 1:
+            raise ValueError('workers должно быть >= 1')
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.workers = workers
+        self.max_pending = max_pending
+        self.metrics = metrics or bot_metrics
+        self._pending: Dict[Hashable, Deque[Tuple[Update, float]]] = {}
+        self._pending_count = 0
+        self._ready: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def pending(self) -> int:
+        return self._pending_count
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f'bot-update-worker-{index}')
+            for index in range(self.workers)
+        ]
+        logger.info('Пул обработки апдейтов запущен: воркеров %s, лимит очереди %s', self.workers, self.max_pending)
+
+    async def submit(self, update: Update) -> None:
+        """Поставить апдейт в очередь; ждёт, если очередь заполнена"""
+        if not self._tasks:
+            raise RuntimeError('Пул не запущен')
+        await self._slots.acquire()
+        self.metrics.updates_received += 1
+        key = update_chat_key(update)
+        item = (update, time.perf_counter())
+        queue = self._pending.get(key)
+        if queue is None:
+            self._pending[key] = deque([item])
+            self._ready.put_nowait(key)
+        else:
+            queue.append(item)
+        self._pending_count += 1
+        self._report_depth()
+
+    async def join(self) -> None:
+        """Дождаться обработки всех поставленных апдейтов"""
+        if self._ready is not None:
+            await self._ready.join()
+
+    async def stop(self, drain: bool = True) -> None:
+        if not self._tasks:
+            return
+        if drain:
+            await self.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info('Пул обработки апдейтов остановлен')
+
+    def _report_depth(self) -> None:
+        self.metrics.set_queue_depth(self._pending_count, len(self._pending))
+
+    async def _worker(self) -> None:
+        while True:
+            key = await self._ready.get()
+            queue = self._pending[key]
+            update, enqueued_at = queue.popleft()
+            try:
+                await self._process(update, enqueued_at)
+            finally:
+                self._pending_count -= 1
+                if queue:
+                    # Следующий апдейт этого чата — в конец очереди готовых
+                    self._ready.put_nowait(key)
+                else:
+                    del self._pending[key]
+                self._report_depth()
+                self._slots.release()
+                self._ready.task_done()
+
+    async def _process(self, update: Update, enqueued_at: float) -> None:
+        started = time.perf_counter()
+        self.metrics.queue_wait.observe(started - enqueued_at)
+        try:
+            await self.dispatcher.feed_update(self.bot, update)
+        except Exception:
+            self.metrics.updates_failed += 1
+            logger.exception('Ошибка обработки апдейта %s', update.update_id)
+        else:
+            self.metrics.updates_processed += 1
+        finally:
+            self.metrics.update_latency.observe(time.perf_counter() - started)
@@ -0,0 +1,143 @@
+"""
+Приём webhook Telegram: ASGI-приложение отдельного процесса бота.
+
+TelegramWebhookApp разбирает запросы на webhook_path и ставит апдейты в пул
+воркеров бота (ответ 200 отдаётся сразу после постановки в очередь);
+metrics_path отдаёт метрики пула в формате Prometheus по токену
+TELEGRAM_METRICS_TOKEN (заголовок Authorization: Bearer ...), без токена
+метрики не отдаются. Остальные запросы уходят во вложенное приложение
+(если передано) или получают 404. Бот запускается на событии
+lifespan.startup (или при первом webhook-запросе, если сервер не шлёт lifespan).
+
+Бот, регистрация webhook и порядок апдейтов внутри чата живут в одном
+процессе, поэтому приложение запускается только командой
+python manage.py run_bot --webhook (один процесс uvicorn) и не встраивается
+в ASGI/WSGI-приложение сайта с несколькими воркерами.
+"""
+import asyncio
+import hmac
+import json
+import logging
+from typing import Optional
+
+from .config import BotConfig
+from .runtime import BotRuntime
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = b'x-telegram-bot-api-secret-token'
+AUTHORIZATION_HEADER = b'authorization'
+
+
+class TelegramWebhookApp:
+    """ASGI-приложение: webhook и метрики бота (+ вложенное приложение для остальных путей)"""
+
+    def __init__(self, app=None, config: Optional[BotConfig] = None, runtime: Optional[BotRuntime] = None):
+        self.app = app
+        self.config = config or BotConfig.from_env()
+        self.runtime = runtime or BotRuntime(self.config)
+        self._start_lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] == 'http':
+            path = scope.get('path', '')
+            if path == self.config.webhook_path:
+                await self._webhook(scope, receive, send)
+                return
+            if self.config.metrics_path and path == self.config.metrics_path:
+                await self._metrics(scope, send)
+                return
+        if self.app is None:
+            if scope['type'] == 'http':
+                await _respond(send, 404, b'')
+            return
+        await self.app(scope, receive, send)
+
+    async def _ensure_started(self, register_webhook: bool = False) -> None:
+        async with self._start_lock:
+            if self.runtime.started:
+                return
+            await self.runtime.start()
+            if register_webhook:
+                await self.runtime.setup_webhook()
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self._ensure_started(register_webhook=True)
+                except Exception as e:
+                    logger.exception('Не удалось запустить бота')
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.runtime.stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _webhook(self, scope, receive, send) -> None:
+        if scope.get('method') != 'POST':
+            await _respond(send, 405, b'')
+            return
+        if self.config.webhook_secret:
+            headers = dict(scope.get('headers') or [])
+            provided = headers.get(SECRET_HEADER, b'')
+            if not hmac.compare_digest(provided, self.config.webhook_secret.encode('utf-8')):
+                await _respond(send, 403, b'')
+                return
+
+        body = await _read_body(receive)
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            await _respond(send, 400, b'')
+            return
+
+        await self._ensure_started()
+        try:
+            await self.runtime.feed_webhook(payload)
+        except Exception:
+            logger.exception('Некорректный апдейт Telegram')
+            await _respond(send, 400, b'')
+            return
+        await _respond(send, 200, b'')
+
+    async def _metrics(self, scope, send) -> None:
+        token = self.config.metrics_token
+        headers = dict(scope.get('headers') or [])
+        provided = headers.get(AUTHORIZATION_HEADER, b'').decode('latin-1')
+        if not token or not hmac.compare_digest(provided, f'Bearer {token}'):
+            await _respond(send, 404, b'')
+            return
+        await _respond(
+            send,
+            200,
+            self.runtime.metrics.render_prometheus().encode('utf-8'),
+            content_type=b'text/plain; version=0.0.4; charset=utf-8',
+        )
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def _respond(send, status: int, body: bytes, content_type: bytes = b'application/json') -> None:
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
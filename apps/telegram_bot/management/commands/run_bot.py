@@ -4,13 +4,10 @@ Management команда для запуска Telegram бота
 import asyncio
 import logging
 
-from django.core.management.base import BaseCommand
-from aiogram import Bot
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
+from django.core.management.base import BaseCommand, CommandError
 
 from apps.telegram_bot.bot.config import BotConfig
-from apps.telegram_bot.bot.dispatcher import setup_dispatcher
+from apps.telegram_bot.bot.runtime import BotRuntime
 
 # Настройка логирования
 logging.basicConfig(
@@ -29,6 +26,27 @@ class Command(BaseCommand):
             action='store_true',
             help='Использовать webhook вместо long polling'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Количество воркеров обработки апдейтов (TELEGRAM_BOT_WORKERS, по умолчанию 8)'
+        )
+        parser.add_argument(
+            '--max-pending',
+            type=int,
+            help='Лимит апдейтов в очереди (TELEGRAM_BOT_MAX_PENDING, по умолчанию 1000)'
+        )
+        parser.add_argument(
+            '--host',
+            default='0.0.0.0',
+            help='Адрес ASGI-сервера в webhook-режиме'
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8080,
+            help='Порт ASGI-сервера в webhook-режиме'
+        )
 
     def handle(self, *args, **options):
         """Запуск бота"""
@@ -40,46 +58,65 @@ class Command(BaseCommand):
             )
             return
         
+        if options.get('workers'):
+            config.workers = options['workers']
+        if options.get('max_pending'):
+            config.max_pending = options['max_pending']
+        
         use_webhook = options.get('webhook', False) or config.use_webhook
         
         if use_webhook:
-            self.stdout.write(
-                self.style.WARNING('Webhook режим пока не реализован. Используйте long polling.')
-            )
+            self.serve_webhook(config, options['host'], options['port'])
             return
         
-        self.stdout.write(self.style.SUCCESS('Запуск бота в режиме long polling...'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Запуск бота в режиме long polling (воркеров: {config.workers})...'
+        ))
         
         # Запускаем бота
         asyncio.run(self.start_bot(config))
     
+    def serve_webhook(self, config: BotConfig, host: str, port: int):
+        """Webhook-режим: отдельный процесс uvicorn с приёмом апдейтов бота.
+
+        Запускается ровно один процесс: он один регистрирует webhook, а порядок
+        апдейтов внутри чата обеспечивает пул воркеров этого процесса. Сайт
+        (gunicorn) webhook не обслуживает — прокси направляет на этот процесс
+        только webhook_path и metrics_path.
+        """
+        try:
+            import uvicorn
+        except ImportError as e:
+            raise CommandError('Для webhook-режима нужен uvicorn (pip install uvicorn)') from e
+        
+        from apps.telegram_bot.bot.webhook import TelegramWebhookApp
+        
+        app = TelegramWebhookApp(config=config)
+        self.stdout.write(self.style.SUCCESS(
+            f'Запуск бота в режиме webhook на {host}:{port}{config.webhook_path} '
+            f'(воркеров: {config.workers})...'
+        ))
+        uvicorn.run(app, host=host, port=port, workers=1, lifespan='on', log_level='info')
+    
     async def start_bot(self, config: BotConfig):
         """Асинхронный запуск бота"""
-        # Создаём бота
-        bot = Bot(
-            token=config.token,
-            default=DefaultBotProperties(parse_mode=ParseMode.HTML)
-        )
-        
-        # Настраиваем диспетчер
-        dp = setup_dispatcher(config)
+        runtime = BotRuntime(config)
         
         try:
+            await runtime.start()
+            
             # Получаем информацию о боте
-            bot_info = await bot.get_me()
+            bot_info = await runtime.bot.get_me()
             logger.info(f"Бот запущен: @{bot_info.username}")
             self.stdout.write(
                 self.style.SUCCESS(f'✅ Бот @{bot_info.username} успешно запущен!')
             )
             
-            # Удаляем webhook если был установлен
-            await bot.delete_webhook(drop_pending_updates=True)
-            
-            # Запускаем polling
-            await dp.start_polling(bot)
+            # Запускаем polling (webhook удаляется внутри)
+            await runtime.run_polling()
             
         except Exception as e:
             logger.error(f"Ошибка при запуске бота: {e}")
             self.stderr.write(self.style.ERROR(f'❌ Ошибка: {e}'))
         finally:
-            await bot.session.close()
+            await runtime.stop()
@@ -1,3 +1,4 @@
 from .notifications import NotificationService
+from .recipients import RecipientResolver
 
-__all__ = ['NotificationService']
+__all__ = ['NotificationService', 'RecipientResolver']
@@ -3,7 +3,7 @@
 """
 import os
 import logging
-from typing import List, Optional
+from typing import List
 from datetime import datetime, timedelta
 
 from aiogram import Bot
@@ -13,6 +13,7 @@ from aiogram.utils.markdown import hbold
 from asgiref.sync import sync_to_async
 
 from apps.telegram_bot.models import TelegramUser, NotificationLog
+from apps.telegram_bot.services.recipients import RecipientResolver
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +31,8 @@ class NotificationService:
             default=DefaultBotProperties(parse_mode=ParseMode.HTML)
         )
         self.web_app_url = os.getenv('WEB_APP_URL', 'https://beachplay.ru')
+        # Получатели кэшируются на время жизни сервиса (одна Celery-задача)
+        self.recipients = RecipientResolver()
     
     async def send_notification(
         self,
@@ -143,8 +146,10 @@ class NotificationService:
         Returns:
             количество отправленных уведомлений
         """
-        # Получаем участников турнира
-        users = await self._get_tournament_participants(tournament)
+        # Получаем участников турнира (с включённым напоминанием о старте)
+        users = await self.recipients.atournament_recipients(
+            tournament.id, opt_in='notify_tournament_start'
+        )
         
         time_text = f"{hours_before} часов" if hours_before > 1 else "1 час"
         
@@ -173,15 +178,14 @@ class NotificationService:
         
         sent_count = 0
         for user in users:
-            if user.notify_tournament_start:
-                success = await self.send_notification(
-                    telegram_user=user,
-                    message=message,
-                    notification_type=f"tournament_reminder_{int(hours_before)}h",
-                    tournament=tournament
-                )
-                if success:
-                    sent_count += 1
+            success = await self.send_notification(
+                telegram_user=user,
+                message=message,
+                notification_type=f"tournament_reminder_{int(hours_before)}h",
+                tournament=tournament
+            )
+            if success:
+                sent_count += 1
         
         return sent_count
     
@@ -195,16 +199,18 @@ class NotificationService:
         Returns:
             количество отправленных уведомлений
         """
-        # Получаем игроков из команд
-        users = await self._get_match_participants(match)
+        # Получаем игроков из команд (с включённым уведомлением о результате)
+        users = await self.recipients.ateam_recipients(
+            [match.team_1_id, match.team_2_id], opt_in='notify_match_result'
+        )
         
         message = (
             f"✅ {hbold('Результат матча')}\n\n"
             f"{hbold(match.tournament.name)}\n"
         )
         
-        if match.team1 and match.team2:
-            message += f"\n{match.team1} vs {match.team2}\n"
+        if match.team_1 and match.team_2:
+            message += f"\n{match.team_1} vs {match.team_2}\n"
         
         if match.score:
             message += f"Счёт: {hbold(match.score)}\n"
@@ -213,15 +219,14 @@ class NotificationService:
         
         sent_count = 0
         for user in users:
-            if user.notify_match_result:
-                success = await self.send_notification(
-                    telegram_user=user,
-                    message=message,
-                    notification_type='match_result',
-                    tournament=match.tournament
-                )
-                if success:
-                    sent_count += 1
+            success = await self.send_notification(
+                telegram_user=user,
+                message=message,
+                notification_type='match_result',
+                tournament=match.tournament
+            )
+            if success:
+                sent_count += 1
         
         return sent_count
     
@@ -239,65 +244,6 @@ class NotificationService:
         
         return [sub.telegram_user for sub in subscriptions]
     
-    @sync_to_async
-    def _get_tournament_participants(self, tournament) -> List[TelegramUser]:
-        """Получение участников турнира"""
-        from apps.tournaments.models import TournamentEntry
-        from apps.teams.models import Team
-        from django.db.models import Q
-        
-        # Получаем команды турнира
-        entries = TournamentEntry.objects.filter(
-            tournament=tournament
-        ).select_related('team')
-        
-        team_ids = [entry.team_id for entry in entries]
-        
-        # Получаем игроков из команд
-        teams = Team.objects.filter(id__in=team_ids)
-        player_ids = set()
-        for team in teams:
-            if team.player_1_id:
-                player_ids.add(team.player_1_id)
-            if team.player_2_id:
-                player_ids.add(team.player_2_id)
-        
-        # Получаем TelegramUser по player_id
-        return list(
-            TelegramUser.objects.filter(
-                player_id__in=player_ids,
-                notifications_enabled=True,
-                is_blocked=False
-            )
-        )
-    
-    @sync_to_async
-    def _get_match_participants(self, match) -> List[TelegramUser]:
-        """Получение участников матча"""
-        from django.db.models import Q
-        
-        player_ids = set()
-        
-        if match.team1:
-            if match.team1.player_1_id:
-                player_ids.add(match.team1.player_1_id)
-            if match.team1.player_2_id:
-                player_ids.add(match.team1.player_2_id)
-        
-        if match.team2:
-            if match.team2.player_1_id:
-                player_ids.add(match.team2.player_1_id)
-            if match.team2.player_2_id:
-                player_ids.add(match.team2.player_2_id)
-        
-        return list(
-            TelegramUser.objects.filter(
-                player_id__in=player_ids,
-                notifications_enabled=True,
-                is_blocked=False
-            )
-        )
-    
     @sync_to_async
     def _log_notification(
         self,
@@ -333,7 +279,7 @@ class NotificationService:
             количество отправленных уведомлений
         """
         # Получаем TelegramUser получателя
-        user = await self._get_telegram_user_by_player(invitation.receiver_id)
+        user = await self.recipients.aplayer_recipient(invitation.receiver_id)
         if not user:
             return 0
         
@@ -371,7 +317,7 @@ class NotificationService:
             количество отправленных уведомлений
         """
         # Получаем TelegramUser отправителя
-        user = await self._get_telegram_user_by_player(invitation.sender_id)
+        user = await self.recipients.aplayer_recipient(invitation.sender_id)
         if not user:
             return 0
         
@@ -406,7 +352,7 @@ class NotificationService:
             return 0
         
         # Получаем TelegramUser напарника
-        user = await self._get_telegram_user_by_player(registration.partner_id)
+        user = await self.recipients.aplayer_recipient(registration.partner_id)
         if not user:
             return 0
         
@@ -458,7 +404,7 @@ class NotificationService:
         if registration.partner_id:
             player_ids.append(registration.partner_id)
         
-        users = await self._get_telegram_users_by_players(player_ids)
+        users = await self.recipients.aplayer_recipients(player_ids)
         
         status_text = {
             'main_list': 'основной состав',
@@ -498,29 +444,6 @@ class NotificationService:
         
         return sent_count
     
-    @sync_to_async
-    def _get_telegram_user_by_player(self, player_id: int) -> Optional[TelegramUser]:
-        """Получение TelegramUser по player_id"""
-        try:
-            return TelegramUser.objects.get(
-                player_id=player_id,
-                notifications_enabled=True,
-                is_blocked=False
-            )
-        except TelegramUser.DoesNotExist:
-            return None
-    
-    @sync_to_async
-    def _get_telegram_users_by_players(self, player_ids: List[int]) -> List[TelegramUser]:
-        """Получение TelegramUser по списку player_id"""
-        return list(
-            TelegramUser.objects.filter(
-                player_id__in=player_ids,
-                notifications_enabled=True,
-                is_blocked=False
-            )
-        )
-    
     async def close(self):
         """Закрытие сессии бота"""
         await self.bot.session.close()
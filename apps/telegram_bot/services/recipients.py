@@ -0,0 +1,109 @@
+"""
+Резолвер получателей уведомлений: турнир/матч/игроки → TelegramUser
+"""
+from typing import Dict, Iterable, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+
+from apps.telegram_bot.models import TelegramUser
+
+
+class RecipientResolver:
+    """
+    Получение TelegramUser для уведомлений одним запросом с кэшем.
+
+    Учитываются только пользователи со связанным игроком, включёнными
+    уведомлениями и не заблокировавшие бота. Индивидуальные настройки
+    (notify_tournament_start, notify_match_result и т.п.) применяются к
+    закэшированному результату через параметр opt_in, поэтому один и тот же
+    набор получателей переиспользуется всеми методами уведомлений в рамках задачи.
+    """
+
+    def __init__(self):
+        self._users_by_player: Dict[int, Optional[TelegramUser]] = {}
+        self._tournament_users: Dict[int, List[TelegramUser]] = {}
+
+    @staticmethod
+    def _base_queryset():
+        return TelegramUser.objects.filter(
+            player__isnull=False,
+            notifications_enabled=True,
+            is_blocked=False,
+        )
+
+    @staticmethod
+    def _filter_opt_in(users: Iterable[TelegramUser], opt_in: Optional[str]) -> List[TelegramUser]:
+        if not opt_in:
+            return list(users)
+        return [user for user in users if getattr(user, opt_in)]
+
+    def _remember(self, users: Iterable[TelegramUser]) -> None:
+        for user in users:
+            self._users_by_player[user.player_id] = user
+
+    def tournament_recipients(self, tournament_id: int, opt_in: Optional[str] = None) -> List[TelegramUser]:
+        """Получатели среди участников турнира (игроки команд из TournamentEntry)"""
+        users = self._tournament_users.get(tournament_id)
+        if users is None:
+            from apps.teams.models import Team
+
+            teams = Team.objects.filter(tournament_entries__tournament_id=tournament_id)
+            users = list(
+                self._base_queryset()
+                .filter(
+                    Q(player_id__in=teams.values('player_1_id'))
+                    | Q(player_id__in=teams.values('player_2_id'))
+                )
+                .order_by('id')
+            )
+            self._tournament_users[tournament_id] = users
+            self._remember(users)
+        return self._filter_opt_in(users, opt_in)
+
+    def team_recipients(self, team_ids: Iterable[Optional[int]], opt_in: Optional[str] = None) -> List[TelegramUser]:
+        """Получатели среди игроков указанных команд"""
+        from apps.teams.models import Team
+
+        team_ids = [team_id for team_id in team_ids if team_id]
+        if not team_ids:
+            return []
+        teams = Team.objects.filter(id__in=team_ids)
+        users = list(
+            self._base_queryset()
+            .filter(
+                Q(player_id__in=teams.values('player_1_id'))
+                | Q(player_id__in=teams.values('player_2_id'))
+            )
+            .order_by('id')
+        )
+        self._remember(users)
+        return self._filter_opt_in(users, opt_in)
+
+    def player_recipients(self, player_ids: Iterable[Optional[int]], opt_in: Optional[str] = None) -> List[TelegramUser]:
+        """Получатели по списку player_id (отсутствующие в кэше загружаются одним запросом)"""
+        player_ids = list(dict.fromkeys(pid for pid in player_ids if pid))
+        missing = [pid for pid in player_ids if pid not in self._users_by_player]
+        if missing:
+            found = {user.player_id: user for user in self._base_queryset().filter(player_id__in=missing)}
+            for pid in missing:
+                self._users_by_player[pid] = found.get(pid)
+        users = [self._users_by_player[pid] for pid in player_ids if self._users_by_player[pid]]
+        return self._filter_opt_in(users, opt_in)
+
+    def player_recipient(self, player_id: Optional[int], opt_in: Optional[str] = None) -> Optional[TelegramUser]:
+        """Получатель по одному player_id"""
+        users = self.player_recipients([player_id], opt_in)
+        return users[0] if users else None
+
+    async def atournament_recipients(self, tournament_id: int, opt_in: Optional[str] = None) -> List[TelegramUser]:
+        return await sync_to_async(self.tournament_recipients)(tournament_id, opt_in)
+
+    async def ateam_recipients(self, team_ids, opt_in: Optional[str] = None) -> List[TelegramUser]:
+        return await sync_to_async(self.team_recipients)(team_ids, opt_in)
+
+    async def aplayer_recipients(self, player_ids, opt_in: Optional[str] = None) -> List[TelegramUser]:
+        return await sync_to_async(self.player_recipients)(player_ids, opt_in)
+
+    async def aplayer_recipient(self, player_id, opt_in: Optional[str] = None) -> Optional[TelegramUser]:
+        return await sync_to_async(self.player_recipient)(player_id, opt_in)
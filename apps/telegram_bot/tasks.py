@@ -84,7 +84,7 @@ def send_match_result_notification(match_id):
     from apps.telegram_bot.services import NotificationService
     
     try:
-        match = Match.objects.select_related('tournament', 'team1', 'team2').get(id=match_id)
+        match = Match.objects.select_related('tournament', 'team_1', 'team_2').get(id=match_id)
         
         # Создаём сервис и отправляем уведомления
         service = NotificationService()
@@ -1,3 +1,175 @@
-from django.test import TestCase
+import asyncio
+import datetime
 
-# Create your tests here.
+from aiogram.types import Chat, Message, Update
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase
+
+from apps.telegram_bot.bot.config import BotConfig
+from apps.telegram_bot.bot.handlers import tournaments as tournament_handlers
+from apps.telegram_bot.bot.metrics import BotMetrics
+from apps.telegram_bot.bot.update_pool import UpdateWorkerPool
+from apps.telegram_bot.bot.webhook import TelegramWebhookApp
+from apps.telegram_bot.models import TelegramUser
+from apps.telegram_bot.services.recipients import RecipientResolver
+from apps.tournaments.models import Tournament, TournamentEntry, TournamentPlacement
+from apps.tournaments.tests.factories import make_pair_teams, make_players, make_round_robin
+
+
+class RecipientResolverTestCase(TestCase):
+    """Получатели уведомлений турнира разрешаются одним запросом и кэшируются"""
+
+    @classmethod
+    def setUpTestData(cls):
+        tournament = make_round_robin("Уведомления")
+        cls.tournament = tournament
+        players = make_players(4)
+        teams = make_pair_teams(players)
+        TournamentEntry.objects.bulk_create([TournamentEntry(tournament=tournament, team=t) for t in teams])
+        cls.users = TelegramUser.objects.bulk_create(
+            [
+                TelegramUser(telegram_id=1, player=players[0]),
+                TelegramUser(telegram_id=2, player=players[1], notify_tournament_start=False),
+                TelegramUser(telegram_id=3, player=players[2], is_blocked=True),
+                TelegramUser(telegram_id=4, player=players[3], notifications_enabled=False),
+            ]
+        )
+
+    def test_tournament_recipients_single_query_and_cached(self):
+        resolver = RecipientResolver()
+
+        with self.assertNumQueries(1):
+            users = resolver.tournament_recipients(self.tournament.id)
+            starting = resolver.tournament_recipients(self.tournament.id, opt_in='notify_tournament_start')
+            partner = resolver.player_recipient(self.users[1].player_id)
+
+        self.assertEqual({u.telegram_id for u in users}, {1, 2})
+        self.assertEqual([u.telegram_id for u in starting], [1])
+        self.assertEqual(partner.telegram_id, 2)
+
+    def test_player_recipients_skip_disabled(self):
+        resolver = RecipientResolver()
+
+        users = resolver.player_recipients([u.player_id for u in self.users])
+
+        self.assertEqual([u.telegram_id for u in users], [1, 2])
+
+
+class BotTournamentQueriesTestCase(TestCase):
+    """Пакетные async-запросы обработчиков бота по списку турниров"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tournaments = [make_round_robin(f"Турнир {i}", status=Tournament.Status.COMPLETED) for i in range(3)]
+        players = make_players(4)
+        cls.player = players[0]
+        teams = make_pair_teams(players)
+        for index, tournament in enumerate(cls.tournaments[:2]):
+            first, second = TournamentEntry.objects.bulk_create(
+                [TournamentEntry(tournament=tournament, team=team) for team in teams]
+            )
+            # В первом турнире побеждает команда игрока, во втором — соперники
+            winner, loser = (first, second) if index == 0 else (second, first)
+            TournamentPlacement.objects.bulk_create([
+                TournamentPlacement(tournament=tournament, entry=winner, place_from=1, place_to=1),
+                TournamentPlacement(tournament=tournament, entry=loser, place_from=2, place_to=2),
+            ])
+
+    def test_winners_and_places_in_one_query_each(self):
+        ids = [t.id for t in self.tournaments]
+
+        with self.assertNumQueries(2):
+            winners = async_to_sync(tournament_handlers.get_tournament_winners)(ids)
+            places = async_to_sync(tournament_handlers.get_user_places)(ids, self.player.id)
+
+        self.assertEqual(winners, {
+            ids[0]: "Игрок0 Тест / Игрок1 Тест",
+            ids[1]: "Игрок2 Тест / Игрок3 Тест",
+        })
+        self.assertEqual(places, {ids[0]: "1", ids[1]: "2"})
+        self.assertEqual(async_to_sync(tournament_handlers.get_user_place)(ids[1], self.player.id), "2")
+
+
+class UpdateWorkerPoolTestCase(SimpleTestCase):
+    """Пул воркеров: чаты обрабатываются параллельно, апдейты одного чата — по порядку"""
+
+    class _Dispatcher:
+        def __init__(self):
+            self.log = []
+            self.running = 0
+            self.max_running = 0
+
+        async def feed_update(self, bot, update):
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            await asyncio.sleep(0.01)
+            self.log.append((update.message.chat.id, update.update_id))
+            self.running -= 1
+
+    @staticmethod
+    def _update(update_id, chat_id):
+        return Update(
+            update_id=update_id,
+            message=Message(
+                message_id=update_id,
+                date=datetime.datetime(2026, 1, 1),
+                chat=Chat(id=chat_id, type='private'),
+                text='/start',
+            ),
+        )
+
+    def test_per_chat_order_and_concurrency(self):
+        dispatcher = self._Dispatcher()
+        metrics = BotMetrics()
+
+        async def scenario():
+            pool = UpdateWorkerPool(dispatcher, bot=None, workers=4, max_pending=3, metrics=metrics)
+            await pool.start()
+            for update_id in range(12):
+                await pool.submit(self._update(update_id, chat_id=update_id % 3))
+            await pool.stop(drain=True)
+
+        async_to_sync(scenario)()
+
+        for chat_id in range(3):
+            ids = [update_id for chat, update_id in dispatcher.log if chat == chat_id]
+            self.assertEqual(ids, sorted(ids))
+            self.assertEqual(len(ids), 4)
+        self.assertGreater(dispatcher.max_running, 1)
+        self.assertLessEqual(dispatcher.max_running, 3)
+        self.assertEqual(metrics.updates_processed, 12)
+        self.assertLessEqual(metrics.queue_depth_max, 3)
+        self.assertEqual(metrics.queue_depth, 0)
+        self.assertIn('bot_queue_wait_seconds_count 12', metrics.render_prometheus())
+
+
+class WebhookMetricsAccessTestCase(SimpleTestCase):
+    """Метрики webhook-процесса отдаются только по токену"""
+
+    class _Runtime:
+        metrics = BotMetrics()
+
+    def _get(self, path, token=None, authorization=None):
+        config = BotConfig(token='test', metrics_token=token or '')
+        app = TelegramWebhookApp(config=config, runtime=self._Runtime())
+        headers = [(b'authorization', authorization.encode())] if authorization else []
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            sent.append(message)
+
+        async_to_sync(app)({'type': 'http', 'method': 'GET', 'path': path, 'headers': headers}, receive, send)
+        return sent[0]['status'], sent[1]['body']
+
+    def test_metrics_require_token(self):
+        path = BotConfig.metrics_path
+        self.assertEqual(self._get(path)[0], 404)
+        self.assertEqual(self._get(path, token='secret', authorization='Bearer wrong')[0], 404)
+        status, body = self._get(path, token='secret', authorization='Bearer secret')
+        self.assertEqual(status, 200)
+        self.assertIn(b'bot_queue_depth', body)
+        # Остальные пути отдельный процесс бота не обслуживает
+        self.assertEqual(self._get('/api/tournaments/', token='secret')[0], 404)
@@ -25,13 +25,17 @@ import logging
 from typing import Optional
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from .models import Tournament, TournamentEntry, SetFormat, Ruleset, KnockoutBracket, DrawPosition, SchedulePattern, TournamentPlacement, TournamentAnnouncementSettings
-from apps.players.services import rating_service
-from apps.players.services.initial_rating_service import get_initial_bp_rating
-from apps.players.services.btr_rating_mapper import suggest_initial_bp_rating
+from .models import Tournament, TournamentEntry, SetFormat, Ruleset, KnockoutBracket, DrawPosition, SchedulePattern, TournamentPlacement, TournamentAnnouncementSettings, TournamentCompletionJob
+from apps.players.services.initial_rating_service import get_initial_bp_ratings
+from apps.players.services.btr_rating_mapper import calculate_initial_bp_ratings_from_btr
+from apps.players.services.name_index import NameCandidate, find_name_candidates_bulk
+from apps.players.services.pair_stats import match_player_ids, recommended_partner_ids, refresh_pair_stats
+from apps.players.services.player_search import search_players
+from apps.players.services.rating_timeline import invalidate_rating_timelines, rating_at
+from apps.players.services.summary_stats import invalidate_tournament_days
 from apps.teams.models import Team
 from apps.matches.models import Match, MatchSet
-from apps.players.models import Player, PlayerRatingDynamic
+from apps.players.models import Player, PlayerNameKey
 from apps.btr.models import BtrPlayer
 from .serializers import (
     TournamentSerializer,
@@ -52,7 +56,14 @@ from apps.tournaments.services.knockout import (
     seed_participants,
     advance_winner,
 )
+from apps.tournaments.services import participants as participants_service
 from apps.tournaments.services.placements import recalc_tournament_placements
+from apps.tournaments.services.completion import (
+    IncompleteMatchesError,
+    complete_tournament,
+    job_payload as completion_job_payload,
+    request_completion,
+)
 from apps.tournaments.services.round_robin import (
     generate_matches_for_group,
     persist_generated_matches,
@@ -342,6 +353,8 @@ class TournamentViewSet(viewsets.ModelViewSet):
             "create_stage",
             "update_stage_settings",
             "complete_master",
+            "completion_job",
+            "rating_simulation",
             "schedule_generate",
         }:
             return [IsTournamentCreatorOrAdmin()]
@@ -972,7 +985,9 @@ class TournamentViewSet(viewsets.ModelViewSet):
         """
 
         tournament = self.get_object()
+        affected_players = match_player_ids(Match.objects.filter(tournament=tournament))
         tournament.delete()
+        refresh_pair_stats(affected_players)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     # === МНОГОСТАДИЙНЫЕ ТУРНИРЫ ===
@@ -1157,6 +1172,15 @@ class TournamentViewSet(viewsets.ModelViewSet):
         master = tournament if tournament.parent_tournament_id is None else tournament.get_master_tournament()
         effective_is_rating_calc = bool(master.is_rating_calc)
 
+        if request.data.get("background"):
+            # Большие многостадийные турниры: завершение в фоне, клиент опрашивает completion_job
+            try:
+                job, _ = request_completion(tournament, force=force, user=request.user)
+            except IncompleteMatchesError as e:
+                return Response({"ok": False, "error": str(e)}, status=400)
+            code = status.HTTP_200_OK if job.status == TournamentCompletionJob.Status.DONE else status.HTTP_202_ACCEPTED
+            return Response({"ok": True, "job": completion_job_payload(job)}, status=code)
+
         try:
             MultiStageService.complete_master_tournament(int(pk), force=force)
             return Response(
@@ -1174,6 +1198,76 @@ class TournamentViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({"ok": False, "error": str(e)}, status=500)
 
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"completion_jobs/(?P<job_id>[0-9]+)",
+        url_name="completion-job",
+    )
+    def completion_job(self, request, job_id=None):
+        """GET /tournaments/completion_jobs/{job_id}/ — статус фонового завершения (для опроса клиентом)."""
+        job = get_object_or_404(TournamentCompletionJob.objects.select_related("tournament"), pk=job_id)
+        self.check_object_permissions(request, job.tournament)
+        return Response({"ok": True, "job": completion_job_payload(job)})
+
+    @action(detail=True, methods=["post"], url_path="rating_simulation", url_name="rating-simulation")
+    def rating_simulation(self, request, pk=None):
+        """POST /tournaments/{id}/rating_simulation/ — прогноз изменения рейтинга («что, если»).
+
+        Ожидает JSON: { results: [ {match_id, sets: [...как в match_save_score_full]} ] }.
+        Гипотетические счета заменяют результаты матчей (или задают счёт несыгранных),
+        остальные завершённые матчи учитываются как есть. Ничего не сохраняется.
+        """
+        from apps.players.services.rating_simulation import SimulationError, simulate_tournament
+
+        tournament: Tournament = self.get_object()
+        results = request.data.get("results") or []
+        if not isinstance(results, list):
+            return Response({"ok": False, "error": "results должен быть массивом"}, status=400)
+        hypothetical = {}
+        try:
+            for item in results:
+                sets_payload = item.get("sets")
+                if not isinstance(sets_payload, list) or not sets_payload:
+                    return Response({"ok": False, "error": "Для каждого матча нужны match_id и непустой массив sets"}, status=400)
+                hypothetical[int(item["match_id"])] = sets_payload
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return Response({"ok": False, "error": "Для каждого матча нужны match_id и непустой массив sets"}, status=400)
+
+        try:
+            result, players = simulate_tournament(tournament, hypothetical)
+        except SimulationError as e:
+            return Response({"ok": False, "error": str(e)}, status=400)
+
+        master = tournament.get_master_tournament()
+        rating_calc = bool(tournament.is_rating_calc) and bool(master.is_rating_calc)
+        return Response({
+            "ok": True,
+            "rating_calc": rating_calc,
+            "players": [
+                {
+                    "player_id": p.player_id,
+                    "name": str(players[p.player_id]) if p.player_id in players else None,
+                    "rating_before": round(p.rating_before, 1),
+                    "delta": p.delta,
+                    "rating_after": p.rating_after,
+                    "matches": p.matches,
+                }
+                for p in sorted(result.players.values(), key=lambda p: (-p.delta, p.player_id))
+            ],
+            "matches": [
+                {
+                    "match_id": m.match_id,
+                    "stage_id": m.stage_id,
+                    "team_1_change": m.team_1_change,
+                    "team_2_change": m.team_2_change,
+                    "format_modifier": m.format_modifier,
+                    "hypothetical": m.hypothetical,
+                }
+                for m in result.matches
+            ],
+        })
+
     @method_decorator(csrf_exempt)
     @action(detail=True, methods=["post"], url_path="edit_settings", permission_classes=[IsAuthenticated])
     def edit_settings(self, request, pk=None):
@@ -1437,7 +1531,11 @@ class TournamentViewSet(viewsets.ModelViewSet):
                                 group_index=None,
                                 row_index=None
                             )
+                            affected_players = match_player_ids(Match.objects.filter(tournament=tournament))
                             Match.objects.filter(tournament=tournament).delete()
+                            refresh_pair_stats(affected_players)
+                            if affected_players:
+                                invalidate_tournament_days([tournament.id])
                             DrawPosition.objects.filter(bracket__tournament=tournament).delete()
                             KnockoutBracket.objects.filter(tournament=tournament).delete()
                             
@@ -1510,22 +1608,19 @@ class TournamentViewSet(viewsets.ModelViewSet):
         tournament = self.get_object()
         participants_data = request.data.get("participants", [])
 
-        # Очищаем текущие записи
-        TournamentEntry.objects.filter(tournament=tournament).delete()
-
-        # Добавляем новые команды по team_id
-        for participant_data in participants_data:
-            team_id = participant_data.get("team_id")
-            group_index = participant_data.get("group", 1)
-            row_index = participant_data.get("row", 1)
-
-            if team_id:
-                TournamentEntry.objects.create(
-                    tournament=tournament,
-                    team_id=team_id,
-                    group_index=group_index,
-                    row_index=row_index,
+        # Заменяем состав одним пакетом: новые команды по team_id,
+        # синхронизация с регистрациями выполняется одним проходом
+        participants_service.replace_entries(
+            tournament,
+            [
+                (
+                    participant_data.get("team_id"),
+                    participant_data.get("group", 1),
+                    participant_data.get("row", 1),
                 )
+                for participant_data in participants_data
+            ],
+        )
 
         return Response({"status": "success"})
 
@@ -1809,13 +1904,20 @@ class TournamentViewSet(viewsets.ModelViewSet):
 
         rounds_info = calculate_rounds_structure(bracket.size, bracket.has_third_place)
 
-        # Для завершённых турниров используем рейтинг ДО турнира (PlayerRatingDynamic.rating_before),
+        # Для завершённых турниров используем рейтинг ДО турнира (индекс «рейтинг на дату»),
         # для всех остальных — текущий рейтинг игрока (Player.current_rating).
         use_before_rating = tournament.status == Tournament.Status.COMPLETED
         before_map: dict[int, float] = {}
         if use_before_rating:
-            dyn_qs = PlayerRatingDynamic.objects.filter(tournament_id=tournament.id)
-            before_map = {int(d.player_id): float(d.rating_before) for d in dyn_qs}
+            # Динамика стадии записана на головной турнир
+            master = tournament.get_master_tournament()
+            player_ids = {
+                pid
+                for row in tournament.entries.values_list("team__player_1_id", "team__player_2_id")
+                for pid in row
+                if pid
+            }
+            before_map = rating_at(player_ids, master.date, tournament_id=master.id)
 
         def _player_base_rating(p: Player) -> float:
             pid = getattr(p, "id", None)
@@ -2003,22 +2105,23 @@ class TournamentViewSet(viewsets.ModelViewSet):
     # --- СТАРТОВЫЕ РЕЙТИНГИ УЧАСТНИКОВ ТУРНИРА ---
 
     @staticmethod
-    def _normalize_name(last_name: str, first_name: str) -> str:
-        """Нормализует имя и фамилию для сравнения (как в link_bp_btr_players)."""
-
-        return f"{(last_name or '').strip().lower()}_{(first_name or '').strip().lower()}"
+    def _btr_candidates(players) -> dict[int, list[tuple[BtrPlayer, NameCandidate]]]:
+        """Кандидаты BTR для линковки BP ↔ BTR по индексу имён (ранжированные).
 
-    def _build_btr_index(self) -> dict[str, list[BtrPlayer]]:
-        """Создать индекс BTR-игроков по нормализованному ФИО.
-
-        Используется для подсказок по линковке BP ↔ BTR в модалке стартовых рейтингов.
+        Используется для подсказок в модалке стартовых рейтингов. Число запросов
+        не зависит от числа игроков.
         """
 
-        index: dict[str, list[BtrPlayer]] = {}
-        for bp in BtrPlayer.objects.all().only("id", "first_name", "last_name", "rni", "city", "birth_date"):
-            key = self._normalize_name(bp.last_name, bp.first_name)
-            index.setdefault(key, []).append(bp)
-        return index
+        matches = find_name_candidates_bulk(
+            PlayerNameKey.Source.BTR, {p.id: (p.last_name, p.first_name) for p in players}, limit=5
+        )
+        btr_players = BtrPlayer.objects.only("id", "first_name", "last_name", "rni", "city", "birth_date").in_bulk(
+            [c.object_id for candidates in matches.values() for c in candidates]
+        )
+        return {
+            pid: [(btr_players[c.object_id], c) for c in candidates if c.object_id in btr_players]
+            for pid, candidates in matches.items()
+        }
 
     @action(
         detail=True,
@@ -2074,40 +2177,35 @@ class TournamentViewSet(viewsets.ModelViewSet):
 
         zero_players = [p for p in players_map.values() if int(getattr(p, "current_rating", 0) or 0) == 0]
 
-        # Индекс BTR-игроков для поиска кандидатов
-        btr_index = self._build_btr_index()
+        # Кандидаты BTR по сходству ФИО (индекс имён)
+        candidates_by_player = self._btr_candidates(
+            [p for p in zero_players if not getattr(p, "btr_player_id", None)]
+        )
+
+        # Рекомендуемые BP рейтинги кандидатов и базовые стартовые рейтинги — пакетно
+        suggested_by_btr = calculate_initial_bp_ratings_from_btr(
+            bp.id for candidates in candidates_by_player.values() for bp, _ in candidates
+        )
+        default_ratings = get_initial_bp_ratings(zero_players, tournament)
 
         result_players: list[dict] = []
         for p in zero_players:
-            # Кандидаты BTR по совпадению ФИО
             btr_candidates_payload: list[dict] = []
-            if not getattr(p, "btr_player_id", None):
-                key = self._normalize_name(getattr(p, "last_name", ""), getattr(p, "first_name", ""))
-                candidates = btr_index.get(key, [])
-                for bp in candidates:
-                    # Используем suggest_initial_bp_rating для получения рекомендуемого BP рейтинга
-                    try:
-                        s = suggest_initial_bp_rating(bp.id)
-                        suggested_from_btr = int(s.get("suggested_rating", 1000))
-                    except Exception:
-                        suggested_from_btr = 1000
-
-                    btr_candidates_payload.append(
-                        {
-                            "id": bp.id,
-                            "full_name": f"{bp.last_name} {bp.first_name}".strip(),
-                            "rni": bp.rni,
-                            "city": bp.city or "",
-                            "birth_date": str(bp.birth_date) if bp.birth_date else None,
-                            "suggested_rating_from_btr": suggested_from_btr,
-                        }
-                    )
+            for bp, match in candidates_by_player.get(p.id, []):
+                btr_candidates_payload.append(
+                    {
+                        "id": bp.id,
+                        "full_name": f"{bp.last_name} {bp.first_name}".strip(),
+                        "rni": bp.rni,
+                        "city": bp.city or "",
+                        "birth_date": str(bp.birth_date) if bp.birth_date else None,
+                        "suggested_rating_from_btr": suggested_by_btr[bp.id],
+                        "match_score": match.score,
+                        "exact_match": match.match == "exact",
+                    }
+                )
 
-            # Базовый стартовый рейтинг по текущей логике сервиса
-            try:
-                default_rating = int(get_initial_bp_rating(p, tournament))
-            except Exception:
-                default_rating = 1000
+            default_rating = default_ratings[p.id]
 
             result_players.append(
                 {
@@ -2189,36 +2287,47 @@ class TournamentViewSet(viewsets.ModelViewSet):
             if getattr(team, "player_2_id", None):
                 allowed_player_ids.add(int(team.player_2_id))
 
-        updated_count = 0
+        # Разбираем элементы запроса (последний элемент для игрока побеждает)
+        requested: dict[int, tuple] = {}
+        for raw in items:
+            try:
+                pid = int(raw.get("player_id"))
+                rating_val = int(raw.get("rating"))
+            except Exception:
+                continue
+            if pid in allowed_player_ids:
+                requested[pid] = (rating_val, raw.get("link_btr_player_id"))
 
-        with transaction.atomic():
-            for raw in items:
-                try:
-                    pid = int(raw.get("player_id"))
-                    rating_val = int(raw.get("rating"))
-                except Exception:
-                    continue
+        link_ids: set[int] = set()
+        for _, link_btr_id in requested.values():
+            try:
+                link_ids.add(int(link_btr_id))
+            except (ValueError, TypeError):
+                pass
 
-                if pid not in allowed_player_ids:
-                    continue
+        with transaction.atomic():
+            players = list(Player.objects.select_for_update().filter(id__in=list(requested)))
+            btr_players = BtrPlayer.objects.in_bulk(list(link_ids))
 
+            linked: list[Player] = []
+            unlinked: list[Player] = []
+            for player in players:
+                rating_val, link_btr_id = requested[player.id]
                 try:
-                    player = Player.objects.select_for_update().get(id=pid)
-                except Player.DoesNotExist:
-                    continue
-
-                link_btr_id = raw.get("link_btr_player_id")
-                if link_btr_id is not None:
-                    try:
-                        btr_obj = BtrPlayer.objects.get(id=int(link_btr_id))
-                    except (BtrPlayer.DoesNotExist, ValueError, TypeError):
-                        btr_obj = None
-                    if btr_obj is not None:
-                        player.btr_player = btr_obj
+                    btr_obj = btr_players.get(int(link_btr_id)) if link_btr_id is not None else None
+                except (ValueError, TypeError):
+                    btr_obj = None
+                if btr_obj is not None:
+                    player.btr_player = btr_obj
 
                 player.current_rating = rating_val
-                player.save(update_fields=["current_rating", "btr_player"] if getattr(player, "btr_player_id", None) else ["current_rating"])
-                updated_count += 1
+                (linked if getattr(player, "btr_player_id", None) else unlinked).append(player)
+
+            if linked:
+                Player.objects.bulk_update(linked, ["current_rating", "btr_player"])
+            if unlinked:
+                Player.objects.bulk_update(unlinked, ["current_rating"])
+            updated_count = len(players)
 
         return Response({"ok": True, "updated": updated_count})
 
@@ -2570,42 +2679,13 @@ class TournamentViewSet(viewsets.ModelViewSet):
         if len(query) < 2:
             return Response({"players": []})
 
-        tokens = [t for t in query.split() if t]
-        players_qs = Player.objects.select_related("btr_player")
-
-        if len(tokens) == 1:
-            q0 = tokens[0]
-            players_qs = players_qs.filter(
-                Q(first_name__icontains=q0)
-                | Q(last_name__icontains=q0)
-                | Q(patronymic__icontains=q0)
-            )
-        else:
-            a = tokens[0]
-            b = tokens[1]
-            name_q = (
-                Q(last_name__istartswith=a, first_name__istartswith=b)
-                | Q(first_name__istartswith=a, last_name__istartswith=b)
-                | Q(last_name__istartswith=a, patronymic__istartswith=b)
-                | Q(first_name__istartswith=a, patronymic__istartswith=b)
-                | Q(patronymic__istartswith=a, first_name__istartswith=b)
-                | Q(patronymic__istartswith=a, last_name__istartswith=b)
-            )
-            rest = tokens[2:]
-            for tkn in rest:
-                name_q &= (
-                    Q(first_name__icontains=tkn)
-                    | Q(last_name__icontains=tkn)
-                    | Q(patronymic__icontains=tkn)
-                )
-            players_qs = players_qs.filter(name_q)
-
         # Исключаем текущего игрока из результатов (чтобы он не выбирал сам себя)
         current_player = self._get_current_player(request, tournament)
-        if current_player:
-            players_qs = players_qs.exclude(id=current_player.id)
-
-        players_qs = players_qs.order_by("last_name", "first_name")
+        players = search_players(
+            query,
+            queryset=Player.objects.select_related("btr_player"),
+            exclude_ids=[current_player.id] if current_player else (),
+        )
 
         # помечаем, зарегистрирован ли игрок уже в СФОРМИРОВАННОЙ ПАРЕ на этот турнир
         # (основной или резервный список). Игроки в статусе LOOKING_FOR_PARTNER
@@ -2614,7 +2694,7 @@ class TournamentViewSet(viewsets.ModelViewSet):
         # Важно: пары, созданные организатором через TournamentEntry, могут иметь
         # только одного игрока в поле player и второго в поле partner, поэтому
         # учитываем оба поля.
-        candidate_ids = list(players_qs.values_list("id", flat=True))
+        candidate_ids = [p.id for p in players]
         base_qs = TournamentRegistration.objects.filter(
             tournament=tournament,
             status__in=[
@@ -2635,7 +2715,7 @@ class TournamentViewSet(viewsets.ModelViewSet):
             return "РПТТ"
 
         players_payload = []
-        for p in list(players_qs[:20]):
+        for p in players:
             rating = getattr(p, "current_rating", None)
             rating_bp = int(rating) if rating is not None else None
             vr = get_player_visible_rating(tournament, p)
@@ -2672,73 +2752,11 @@ class TournamentViewSet(viewsets.ModelViewSet):
         if not current_player:
             return Response({"players": []})
 
-        # Собираем всех напарников по командам Team
-        from apps.teams.models import Team
-
-        # команды, где текущий игрок в player_1
-        qs1 = (
-            Team.objects.filter(player_1=current_player, player_2__isnull=False)
-            .values("player_2")
-        )
-        # команды, где текущий игрок в player_2
-        qs2 = (
-            Team.objects.filter(player_2=current_player, player_1__isnull=False)
-            .values("player_1")
-        )
-
-        # агрегируем в питоне, т.к. напарник хранится в разных полях
-        from collections import Counter
-
-        counter: Counter[int] = Counter()
-        recent_ids: list[int] = []
-
-        # Сначала собираем все пары с сохранением порядка (по id команды как приближению к "последним")
-        teams_with_partner = list(
-            Team.objects.filter(
-                (Q(player_1=current_player, player_2__isnull=False))
-                | (Q(player_2=current_player, player_1__isnull=False))
-            )
-            .order_by("-id")
-        )
-
-        for team in teams_with_partner:
-            if team.player_1_id == current_player.id and team.player_2_id:
-                partner_id = team.player_2_id
-            elif team.player_2_id == current_player.id and team.player_1_id:
-                partner_id = team.player_1_id
-            else:
-                continue
-
-            counter[partner_id] += 1
-
-            # формируем список последних напарников (до 3 уникальных)
-            if partner_id not in recent_ids:
-                recent_ids.append(partner_id)
-                if len(recent_ids) >= 3:
-                    # продолжаем считать counter, но новые recent_ids не добавляем
-                    pass
-
-        if not counter:
+        # 3 последних напарника + самые частые до 5 — из графа связей игроков
+        top_ids = recommended_partner_ids(current_player.id)
+        if not top_ids:
             return Response({"players": []})
 
-        # Формируем итоговый список: 3 последних уникальных + заполнение до 5 из наиболее частых
-        merged_ids: list[int] = []
-        
-        # Добавляем последних 3 уникальных напарников
-        for pid in recent_ids[:3]:
-            if pid not in merged_ids:
-                merged_ids.append(pid)
-        
-        # Дополняем из наиболее частых напарников (исключая уже добавленных)
-        # Берём всех частых по порядку убывания частоты и добавляем, пока не наберём 5
-        for pid, _cnt in counter.most_common():
-            if pid not in merged_ids:
-                merged_ids.append(pid)
-                if len(merged_ids) >= 5:
-                    break
-
-        top_ids = merged_ids[:5]
-
         players_qs = Player.objects.filter(id__in=top_ids)
 
         # Финальный список: сортируем по ФИО
@@ -2835,6 +2853,8 @@ class TournamentViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=["post"], url_path="remove", permission_classes=[AllowAny], authentication_classes=[])
     def remove(self, request, pk=None):
         tournament = self.get_object()
+        # Рёбра графа игроков пересчитываются один раз после удаления матчей
+        affected_players = match_player_ids(Match.objects.filter(tournament=tournament))
         
         # Правильный порядок удаления для олимпийских турниров:
         # 1. tournaments_drawposition
@@ -2875,9 +2895,11 @@ class TournamentViewSet(viewsets.ModelViewSet):
                 
                 # 8. Удаляем турнир
                 tournament.delete()
+                refresh_pair_stats(affected_players)
         else:
             # Для круговых турниров стандартное каскадное удаление работает
             tournament.delete()
+            refresh_pair_stats(affected_players)
         
         return Response({"ok": True})
 
@@ -4766,27 +4788,15 @@ class TournamentViewSet(viewsets.ModelViewSet):
                     team = Team.objects.create(player_1=player)
                 # Для круговой системы, King и Knockout в статусе created участники добавляются БЕЗ позиции
                 if tournament.system in [Tournament.System.ROUND_ROBIN, Tournament.System.KING, Tournament.System.KNOCKOUT] and tournament.status == Tournament.Status.CREATED:
-                    entry = TournamentEntry.objects.create(
-                        tournament=tournament,
-                        team=team,
-                        group_index=None,
-                        row_index=None,
-                        is_out_of_competition=False
-                    )
+                    group_index, row_index = None, None
                 else:
                     # Для других систем или статусов - найти первый свободный row_index
-                    used_positions = set(tournament.entries.values_list('row_index', flat=True))
-                    row_index = 1
+                    used_positions = {e.row_index for e in existing_entries}
+                    group_index, row_index = 1, 1
                     while row_index in used_positions:
                         row_index += 1
-                    
-                    entry = TournamentEntry.objects.create(
-                        tournament=tournament,
-                        team=team,
-                        group_index=1,
-                        row_index=row_index,
-                        is_out_of_competition=False
-                    )
+                
+                (entry,) = participants_service.bulk_add_entries(tournament, [(team.id, group_index, row_index)])
                 
                 return Response({
                     'ok': True,
@@ -5260,7 +5270,6 @@ class TournamentViewSet(viewsets.ModelViewSet):
                 for idx, entry in enumerate(sorted_entries):
                     entry.group_index = 1
                     entry.row_index = idx + 1  # 1-based индексация (1, 2, 3...)
-                    entry.save(update_fields=['group_index', 'row_index'])
             else:
                 # Несколько групп - распределяем отрезками
                 segment_size = groups_count
@@ -5280,7 +5289,6 @@ class TournamentViewSet(viewsets.ModelViewSet):
                         for i, entry in enumerate(segment):
                             entry.group_index = available_groups[i]
                             entry.row_index = row_idx + 1  # 1-based индексация (1, 2, 3...)
-                            entry.save(update_fields=['group_index', 'row_index'])
                     else:
                         # Для остальных отрезков - случайный порядок групп
                         random.shuffle(available_groups)
@@ -5289,7 +5297,11 @@ class TournamentViewSet(viewsets.ModelViewSet):
                             if i < len(available_groups):
                                 entry.group_index = available_groups[i]
                                 entry.row_index = row_idx + 1  # 1-based индексация (1, 2, 3...)
-                                entry.save(update_fields=['group_index', 'row_index'])
+            
+            # Сохраняем все позиции одним пакетом
+            participants_service.bulk_update_positions(
+                [entry for entry in sorted_entries if entry.group_index is not None]
+            )
             
             return Response({'ok': True, 'seeded_count': len(sorted_entries)})
             
@@ -5443,45 +5455,7 @@ class PlayerSearchView(APIView):
         if not query:
             return Response({"players": []})
 
-        tokens = [t for t in query.split() if t]
-
-        qs = Player.objects.all().select_related("btr_player")
-
-        if len(tokens) == 1:
-            q0 = tokens[0]
-            qs = qs.filter(
-                Q(first_name__icontains=q0)
-                | Q(last_name__icontains=q0)
-                | Q(patronymic__icontains=q0)
-                | Q(display_name__icontains=q0)
-                | Q(city__icontains=q0)
-            )
-        else:
-            a = tokens[0]
-            b = tokens[1]
-
-            name_q = (
-                Q(last_name__istartswith=a, first_name__istartswith=b)
-                | Q(first_name__istartswith=a, last_name__istartswith=b)
-                | Q(last_name__istartswith=a, patronymic__istartswith=b)
-                | Q(first_name__istartswith=a, patronymic__istartswith=b)
-                | Q(patronymic__istartswith=a, first_name__istartswith=b)
-                | Q(patronymic__istartswith=a, last_name__istartswith=b)
-            )
-
-            # Если токенов больше 2, добавим AND-ограничения по оставшимся токенам
-            rest = tokens[2:]
-            for tkn in rest:
-                name_q &= (
-                    Q(first_name__icontains=tkn)
-                    | Q(last_name__icontains=tkn)
-                    | Q(patronymic__icontains=tkn)
-                    | Q(display_name__icontains=tkn)
-                    | Q(city__icontains=tkn)
-                )
-            qs = qs.filter(name_q)
-
-        players = list(qs.order_by("last_name", "first_name").all()[:limit])
+        players = search_players(query, limit=limit, queryset=Player.objects.select_related("btr_player"))
 
         payload = []
         for p in players:
@@ -5758,88 +5732,24 @@ def rulesets_list(request):
 def tournament_complete(request, pk: int):
     """Завершить турнир и выполнить расчёт рейтинга по его матчам.
 
-    Логика:
+    Логика (этапы CompletionPipeline, apps/tournaments/services/completion.py), в одной транзакции:
     0. Проверить все ли матчи завершены. Если есть незавершенные - вернуть предупреждение.
-    1. Установить начальные рейтинги игрокам с рейтингом=0 или NULL.
-    2. Проверить нужно ли считать рейтинг (is_rating_calc).
-    3. Рассчитать рейтинг с учетом is_out_of_competition.
-    4. Завершить турнир.
+    1. Установить начальные рейтинги игрокам с рейтингом=0 или NULL (если считается рейтинг).
+    2. Рассчитать рейтинг с учетом is_out_of_competition (если is_rating_calc).
+    3. Завершить турнир и пересчитать места.
+    4. Сбросить дни дневной сводки статистики.
     """
-    logger = logging.getLogger(__name__)
     t = get_object_or_404(Tournament, pk=pk)
-    
-    from apps.players.models import PlayerRatingDynamic, Player
-    from apps.matches.models import Match
-    from apps.players.services.initial_rating_service import get_initial_bp_rating
-    effective_is_rating_calc = bool(t.is_rating_calc)
-    if t.parent_tournament_id:
-        effective_is_rating_calc = effective_is_rating_calc and bool(t.get_master_tournament().is_rating_calc)
-    
-    # Если турнир уже завершен, удаляем старые данные рейтинга для пересчета
-    if t.status == Tournament.Status.COMPLETED:
-        # Удаляем старые записи рейтинга для пересчета
-        PlayerRatingDynamic.objects.filter(tournament_id=t.id).delete()
-        from apps.players.models import PlayerRatingHistory
-        PlayerRatingHistory.objects.filter(tournament_id=t.id).delete()
-    
-    # 0. Проверка незавершенных матчей
-    total_matches = Match.objects.filter(tournament_id=t.id).count()
-    completed_matches = Match.objects.filter(tournament_id=t.id, status=Match.Status.COMPLETED).count()
-    
-    # Если есть незавершенные матчи, проверяем параметр force
-    if completed_matches < total_matches:
-        force = request.data.get('force', False)
-        if not force:
-            return Response({
-                "ok": False,
-                "error": "incomplete_matches",
-                "message": "Пока ещё не все матчи в турнире сыграны. Вы всё равно хотите завершить турнир?",
-                "completed": completed_matches,
-                "total": total_matches
-            }, status=400)
-    
-    with transaction.atomic():
-        # 1. Установить начальные рейтинги игрокам с рейтингом=0 или NULL
-        # только если для турнира реально включён обсчёт рейтинга.
-        if effective_is_rating_calc:
-            # Соберём всех игроков, участвовавших в турнире (из всех матчей)
-            all_matches = Match.objects.filter(tournament_id=t.id).select_related('team_1', 'team_2')
-            player_ids: set[int] = set()
-            for m in all_matches:
-                for pid in [getattr(m.team_1, 'player_1_id', None), getattr(m.team_1, 'player_2_id', None),
-                            getattr(m.team_2, 'player_1_id', None), getattr(m.team_2, 'player_2_id', None)]:
-                    if pid:
-                        player_ids.add(pid)
-
-            # Установим начальные рейтинги для игроков с рейтингом 0 или NULL
-            if player_ids:
-                players_to_update = Player.objects.filter(
-                    id__in=player_ids
-                ).filter(
-                    Q(current_rating__isnull=True) | Q(current_rating=0)
-                )
-
-                for player in players_to_update:
-                    initial_rating = get_initial_bp_rating(player, t)
-                    player.current_rating = initial_rating
-                    player.save(update_fields=['current_rating'])
-
-        # 2. Проверить нужно ли считать рейтинг для этого турнира
-        if effective_is_rating_calc:
-            # 3. Выполним расчёт рейтинга по турниру с учетом is_out_of_competition
-            rating_service.compute_ratings_for_tournament(t.id)
-        
-        # 4. Переведём турнир в статус COMPLETED
-        t.status = Tournament.Status.COMPLETED
-        t.save(update_fields=["status"])
-
-        # 5. Пересчитаем и сохраним места турнира
-        try:
-            recalc_tournament_placements(t)
-        except Exception:
-            # Ошибки пересчёта мест не должны ломать завершение турнира
-            pass
-    
+    try:
+        complete_tournament(t, force=bool(request.data.get('force', False)))
+    except IncompleteMatchesError as e:
+        return Response({
+            "ok": False,
+            "error": "incomplete_matches",
+            "message": str(e),
+            "completed": e.completed,
+            "total": e.total
+        }, status=400)
     return Response({"ok": True})
 
 
@@ -5900,6 +5810,7 @@ def tournament_rollback_complete(request, pk: int):
             # Удаляем историю для всех стадий
             PlayerRatingHistory.objects.filter(tournament_id__in=stage_ids).delete()
             # Удаляем агрегат по головному турниру
+            invalidate_rating_timelines(row["player_id"] for row in changes)
             dyn_qs.delete()
 
         # Удаляем места (placements) если они были сохранены
@@ -5935,7 +5846,9 @@ def tournament_rollback_complete(request, pk: int):
 @permission_classes([IsAuthenticated])
 def tournament_remove(request, pk: int):
     t = get_object_or_404(Tournament, pk=pk)
+    affected_players = match_player_ids(Match.objects.filter(tournament=t))
     t.delete()
+    refresh_pair_stats(affected_players)
     return Response({"ok": True})
 
 
@@ -34,6 +34,7 @@ class Command(BaseCommand):
             raise CommandError("Откат возможен только для турнира в статусе COMPLETED")
 
         from apps.players.models import Player, PlayerRatingDynamic, PlayerRatingHistory
+        from apps.players.services.rating_timeline import invalidate_rating_timelines
 
         # Определяем master и стадии
         master = t if t.is_master() else t.get_master_tournament()
@@ -74,6 +75,7 @@ class Command(BaseCommand):
 
         if not dry_run:
             hist_qs.delete()
+            invalidate_rating_timelines(affected_players)
             dyn_qs.delete()
 
             # placements
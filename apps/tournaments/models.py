@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
 
+from sandmatch.model_state import LoadedValuesMixin
+
 # Импортируем модели регистрации
 from .registration_models import TournamentRegistration, PairInvitation
 
@@ -234,7 +237,7 @@ class SetFormat(models.Model):
         return self.name
 
 
-class Tournament(models.Model):
+class Tournament(LoadedValuesMixin, models.Model):
     class Status(models.TextChoices):
         CREATED = "created", "Создан"
         ACTIVE = "active", "Активен"
@@ -719,3 +722,42 @@ class TournamentAnnouncementSettings(models.Model):
     
     def __str__(self) -> str:
         return f"Анонсы для {self.tournament}"
+
+
+class TournamentCompletionJob(models.Model):
+    """Фоновое завершение турнира (apps/tournaments/services/completion.py).
+
+    stage — текущий этап конвейера, timings — длительность завершённых этапов в секундах.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "В очереди"
+        RUNNING = "running", "Выполняется"
+        DONE = "done", "Готово"
+        FAILED = "failed", "Ошибка"
+
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name="completion_jobs")
+    force = models.BooleanField(default=False)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    stage = models.CharField(max_length=32, blank=True, default="")
+    timings = models.JSONField(default=dict, blank=True)
+    error = models.CharField(max_length=64, blank=True, default="")
+    error_detail = models.TextField(blank=True, default="")
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Завершение турнира"
+        verbose_name_plural = "Завершения турниров"
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"Завершение {self.tournament} ({self.status})"
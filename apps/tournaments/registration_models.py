@@ -4,8 +4,10 @@
 from django.db import models
 from django.core.exceptions import ValidationError
 
+from sandmatch.model_state import LoadedValuesMixin
 
-class TournamentRegistration(models.Model):
+
+class TournamentRegistration(LoadedValuesMixin, models.Model):
     """
     Регистрация игрока на турнир.
     
@@ -1,7 +1,7 @@
 """
 Сервис для расчета коэффициента турнира на основе среднего рейтинга участников и их количества.
 """
-from typing import Optional
+from typing import Dict, Iterable, Optional, Tuple
 
 
 def calculate_tournament_coefficient(
@@ -67,6 +67,50 @@ def calculate_tournament_coefficient(
     return base_coefficient
 
 
+def get_tournaments_participant_stats(tournament_ids: Iterable[int]) -> Dict[int, Tuple[Optional[float], int]]:
+    """
+    Средний рейтинг и количество участников для набора турниров — одним запросом.
+    
+    Средний рейтинг считается по уникальным игрокам всех команд турнира
+    (игрок из двух пар учитывается один раз), количество участников — по записям
+    TournamentEntry (командам/парам).
+    
+    Args:
+        tournament_ids: ID турниров
+        
+    Returns:
+        {tournament_id: (средний рейтинг или None, если нет участников, количество участников)}
+    """
+    from apps.tournaments.models import TournamentEntry
+    
+    ids = set(tournament_ids)
+    if not ids:
+        return {}
+    ratings_by_tournament: Dict[int, Dict[int, Optional[int]]] = {tournament_id: {} for tournament_id in ids}
+    counts: Dict[int, int] = dict.fromkeys(ids, 0)
+    
+    rows = TournamentEntry.objects.filter(tournament_id__in=ids).values_list(
+        'tournament_id',
+        'team__player_1_id', 'team__player_1__current_rating',
+        'team__player_2_id', 'team__player_2__current_rating',
+    )
+    for tournament_id, player_1_id, rating_1, player_2_id, rating_2 in rows:
+        counts[tournament_id] += 1
+        ratings = ratings_by_tournament[tournament_id]
+        if player_1_id:
+            ratings[player_1_id] = rating_1
+        if player_2_id:
+            ratings[player_2_id] = rating_2
+    
+    stats = {}
+    for tournament_id in ids:
+        # Как Avg: игроки без рейтинга не учитываются
+        ratings = [r for r in ratings_by_tournament[tournament_id].values() if r is not None]
+        avg_rating = sum(ratings) / len(ratings) if ratings else None
+        stats[tournament_id] = (avg_rating, counts[tournament_id])
+    return stats
+
+
 def get_tournament_avg_rating(tournament_id: int) -> Optional[float]:
     """
     Рассчитывает средний рейтинг участников турнира.
@@ -77,32 +121,56 @@ def get_tournament_avg_rating(tournament_id: int) -> Optional[float]:
     Returns:
         Средний рейтинг участников или None, если нет участников
     """
-    from apps.tournaments.models import Tournament, TournamentEntry
-    from apps.players.models import Player
-    from django.db.models import Avg, Q
+    return get_tournaments_participant_stats([tournament_id])[tournament_id][0]
+
+
+def recalculate_tournament_coefficients(tournaments: Iterable, save: bool = True) -> Dict[int, float]:
+    """
+    Пакетно рассчитывает коэффициенты турниров.
     
-    tournament = Tournament.objects.get(id=tournament_id)
+    Средний рейтинг и количество участников всех турниров берутся одним запросом
+    (get_tournaments_participant_stats), изменившиеся коэффициенты сохраняются
+    одним bulk_update — пересчёт всего архива проходит за один проход.
     
-    # Получаем всех игроков, участвующих в турнире
-    entries = TournamentEntry.objects.filter(tournament=tournament).select_related('team')
+    Args:
+        tournaments: Турниры (QuerySet или список Tournament)
+        save: Сохранять ли изменившиеся коэффициенты (False — только рассчитать)
+        
+    Returns:
+        {tournament_id: рассчитанный коэффициент}
+    """
+    from apps.tournaments.models import Tournament
     
-    player_ids = set()
-    for entry in entries:
-        team = entry.team
-        if team.player_1_id:
-            player_ids.add(team.player_1_id)
-        if team.player_2_id:
-            player_ids.add(team.player_2_id)
+    tournaments = list(tournaments)
+    stats = get_tournaments_participant_stats(t.id for t in tournaments)
     
-    if not player_ids:
-        return None
+    coefficients = {}
+    changed = []
+    for tournament in tournaments:
+        avg_rating, participants_count = stats[tournament.id]
+        
+        # Если нет участников или рейтингов, используем дефолтный коэффициент
+        if avg_rating is None or avg_rating == 0:
+            avg_rating = 1000.0  # Дефолтный средний рейтинг
+        
+        # Проверяем наличие призового фонда
+        has_prize_fund = bool(tournament.prize_fund and tournament.prize_fund.strip())
+        
+        coefficient = calculate_tournament_coefficient(
+            avg_rating=avg_rating,
+            participants_count=participants_count,
+            has_prize_fund=has_prize_fund
+        )
+        coefficients[tournament.id] = coefficient
+        
+        if save and tournament.rating_coefficient != coefficient:
+            tournament.rating_coefficient = coefficient
+            changed.append(tournament)
     
-    # Рассчитываем средний рейтинг
-    avg_data = Player.objects.filter(id__in=player_ids).aggregate(
-        avg_rating=Avg('current_rating')
-    )
+    if changed:
+        Tournament.objects.bulk_update(changed, ['rating_coefficient'], batch_size=500)
     
-    return avg_data.get('avg_rating')
+    return coefficients
 
 
 def auto_calculate_tournament_coefficient(tournament_id: int) -> float:
@@ -115,32 +183,7 @@ def auto_calculate_tournament_coefficient(tournament_id: int) -> float:
     Returns:
         Рассчитанный коэффициент
     """
-    from apps.tournaments.models import Tournament, TournamentEntry
+    from apps.tournaments.models import Tournament
     
     tournament = Tournament.objects.get(id=tournament_id)
-    
-    # Получаем средний рейтинг участников
-    avg_rating = get_tournament_avg_rating(tournament_id)
-    
-    # Если нет участников или рейтингов, используем дефолтный коэффициент
-    if avg_rating is None or avg_rating == 0:
-        avg_rating = 1000.0  # Дефолтный средний рейтинг
-    
-    # Получаем количество участников (команд/пар)
-    participants_count = TournamentEntry.objects.filter(tournament=tournament).count()
-    
-    # Проверяем наличие призового фонда
-    has_prize_fund = bool(tournament.prize_fund and tournament.prize_fund.strip())
-    
-    # Рассчитываем коэффициент
-    coefficient = calculate_tournament_coefficient(
-        avg_rating=avg_rating,
-        participants_count=participants_count,
-        has_prize_fund=has_prize_fund
-    )
-    
-    # Сохраняем коэффициент в турнир
-    tournament.rating_coefficient = coefficient
-    tournament.save(update_fields=['rating_coefficient'])
-    
-    return coefficient
+    return recalculate_tournament_coefficients([tournament])[tournament.id]
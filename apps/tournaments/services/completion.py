@@ -0,0 +1,326 @@
+"""
+Завершение турнира — конвейер с явными этапами в одной транзакции.
+
+Этапы:
+1. validate     — проверка несыгранных матчей (один агрегирующий запрос);
+2. seed_ratings — стартовые рейтинги игрокам без рейтинга (пакетно: get_initial_bp_ratings + bulk_update);
+3. ratings      — расчёт рейтинга по предзагруженным матчам, сетам и участникам (rating_service);
+4. placements   — статус COMPLETED и места по всем стадиям;
+5. caches       — сброс дней дневной сводки статистики турнира.
+
+Каждый этап замеряется и пишется в лог. Ошибка любого этапа откатывает всё
+завершение — места больше не «глотаются» молча. Для больших многостадийных
+турниров конвейер запускается фоновой задачей (TournamentCompletionJob,
+apps/tournaments/tasks.py), статус которой опрашивает UI. Текущий этап задача
+пишет отдельным соединением с БД (StageProgressWriter): транзакция конвейера
+ещё не зафиксирована, а опрос уже видит этап.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.matches.models import Match, MatchSet
+from apps.players.models import Player, PlayerRatingDynamic, PlayerRatingHistory
+from apps.players.services import rating_service
+from apps.players.services.initial_rating_service import get_initial_bp_ratings
+from apps.players.services.rating_timeline import invalidate_tournament_rating_timelines
+from apps.players.services.summary_stats import invalidate_tournament_days
+from apps.tournaments.models import Tournament, TournamentCompletionJob
+from apps.tournaments.services.placements import recalc_tournament_placements
+from sandmatch import jobs
+
+logger = logging.getLogger(__name__)
+
+STAGE_VALIDATE = "validate"
+STAGE_SEED_RATINGS = "seed_ratings"
+STAGE_RATINGS = "ratings"
+STAGE_PLACEMENTS = "placements"
+STAGE_CACHES = "caches"
+
+# Срок, после которого задача завершения считается потерянной (sandmatch.jobs.is_stale)
+STALE_AFTER = timedelta(minutes=30)
+
+INCOMPLETE_MESSAGE = "Пока ещё не все матчи в турнире сыграны. Вы всё равно хотите завершить турнир?"
+
+
+class IncompleteMatchesError(ValueError):
+    """Есть несыгранные матчи, а завершение без force"""
+
+    def __init__(self, completed: int, total: int):
+        super().__init__(INCOMPLETE_MESSAGE)
+        self.completed = completed
+        self.total = total
+
+
+@dataclass
+class CompletionResult:
+    tournament_id: int
+    rating_calculated: bool
+    seeded_players: int = 0
+    placements: int = 0
+    # этап -> длительность, секунды
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+class CompletionPipeline:
+    """Завершение одного турнира (master=False) или мастер-турнира со всеми стадиями (master=True).
+
+    Одиночный режим повторяет tournament_complete: рейтинг по матчам самого турнира
+    (для стадии — только если обсчёт включён и у мастера). Режим мастера повторяет
+    complete_master_tournament: единый расчёт по всем стадиям с агрегатом на мастер.
+    """
+
+    def __init__(
+        self,
+        tournament: Tournament,
+        *,
+        master: bool = False,
+        force: bool = False,
+        on_stage: Optional[Callable[[str], None]] = None,
+    ):
+        self.master = master
+        self.force = force
+        self.on_stage = on_stage
+        if master:
+            self.tournament = tournament if tournament.is_master() else tournament.get_master_tournament()
+            self.stages: List[Tournament] = self.tournament.get_all_stages()
+            self.rating_calc = bool(self.tournament.is_rating_calc)
+        else:
+            self.tournament = tournament
+            self.stages = [tournament]
+            self.rating_calc = bool(tournament.is_rating_calc)
+            if tournament.parent_tournament_id:
+                self.rating_calc = self.rating_calc and bool(tournament.get_master_tournament().is_rating_calc)
+        self.stage_ids = [t.id for t in self.stages]
+        self.result = CompletionResult(tournament_id=self.tournament.id, rating_calculated=self.rating_calc)
+
+    def run(self) -> CompletionResult:
+        started = time.perf_counter()
+        with transaction.atomic():
+            self._stage(STAGE_VALIDATE, self.validate)
+            if self.rating_calc:
+                self._stage(STAGE_SEED_RATINGS, self.seed_ratings)
+                self._stage(STAGE_RATINGS, self.compute_ratings)
+            self._stage(STAGE_PLACEMENTS, self.complete_and_place)
+            self._stage(STAGE_CACHES, self.invalidate_caches)
+        logger.info(
+            "[complete] Турнир #%s завершён за %.3f с: %s",
+            self.tournament.id,
+            time.perf_counter() - started,
+            ", ".join(f"{name}={seconds:.3f}" for name, seconds in self.result.timings.items()),
+        )
+        return self.result
+
+    def _stage(self, name: str, fn: Callable[[], None]) -> None:
+        if self.on_stage is not None:
+            self.on_stage(name)
+        started = time.perf_counter()
+        try:
+            fn()
+        except Exception:
+            logger.exception("[complete] Турнир #%s: ошибка на этапе %s", self.tournament.id, name)
+            raise
+        elapsed = time.perf_counter() - started
+        self.result.timings[name] = round(elapsed, 4)
+        logger.info("[complete] Турнир #%s: этап %s — %.3f с", self.tournament.id, name, elapsed)
+
+    def match_counts(self) -> Tuple[int, int]:
+        """(сыграно, всего) — одним запросом.
+
+        Одиночный турнир: сыгранный = COMPLETED. Мастер: не отменённый матч считается
+        сыгранным, если есть победитель или счёт.
+        """
+        qs = Match.objects.filter(tournament_id__in=self.stage_ids)
+        if self.master:
+            qs = qs.exclude(status="cancelled")
+            played = Q(winner__isnull=False) | Q(has_sets=True)
+            qs = qs.annotate(has_sets=Exists(MatchSet.objects.filter(match_id=OuterRef("pk"))))
+        else:
+            played = Q(status=Match.Status.COMPLETED)
+        counts = qs.aggregate(total=Count("id"), completed=Count("id", filter=played))
+        return counts["completed"], counts["total"]
+
+    def validate(self) -> None:
+        completed, total = self.match_counts()
+        if completed < total and not self.force:
+            raise IncompleteMatchesError(completed, total)
+        if not self.master and self.tournament.status == Tournament.Status.COMPLETED:
+            # Повторное завершение: удаляем старые записи рейтинга для пересчета
+            invalidate_tournament_rating_timelines([self.tournament.id])
+            PlayerRatingDynamic.objects.filter(tournament_id=self.tournament.id).delete()
+            PlayerRatingHistory.objects.filter(tournament_id=self.tournament.id).delete()
+
+    def seed_ratings(self) -> None:
+        player_ids = set()
+        for row in Match.objects.filter(tournament_id__in=self.stage_ids).values_list(
+            "team_1__player_1_id", "team_1__player_2_id", "team_2__player_1_id", "team_2__player_2_id"
+        ):
+            player_ids.update(pid for pid in row if pid)
+        if not player_ids:
+            return
+        players = list(
+            Player.objects.filter(id__in=player_ids).filter(Q(current_rating__isnull=True) | Q(current_rating=0))
+        )
+        if not players:
+            return
+        initial_ratings = get_initial_bp_ratings(players, self.tournament)
+        for player in players:
+            player.current_rating = initial_ratings[player.id]
+        Player.objects.bulk_update(players, ["current_rating"])
+        self.result.seeded_players = len(players)
+
+    def compute_ratings(self) -> None:
+        if self.master:
+            rating_service.compute_ratings_for_multi_stage_tournament(self.tournament.id, self.stage_ids)
+        else:
+            rating_service.compute_ratings_for_tournament(self.tournament.id)
+
+    def complete_and_place(self) -> None:
+        for stage in self.stages:
+            if stage.status != Tournament.Status.COMPLETED:
+                stage.status = Tournament.Status.COMPLETED
+                stage.save(update_fields=["status"])
+            self.result.placements += recalc_tournament_placements(stage)
+
+    def invalidate_caches(self) -> None:
+        invalidate_tournament_days(self.stage_ids)
+
+
+def complete_tournament(tournament: Tournament, force: bool = False) -> CompletionResult:
+    """Завершить один турнир (POST /tournaments/<id>/complete/)."""
+    return CompletionPipeline(tournament, force=force).run()
+
+
+def complete_master(tournament: Tournament, force: bool = False) -> CompletionResult:
+    """Завершить мастер-турнир со всеми стадиями."""
+    return CompletionPipeline(tournament, master=True, force=force).run()
+
+
+def request_completion(tournament: Tournament, force: bool = False, user=None) -> Tuple[TournamentCompletionJob, bool]:
+    """Поставить завершение мастер-турнира в очередь или вернуть уже выполняющееся.
+
+    Несыгранные матчи проверяются сразу (IncompleteMatchesError), чтобы UI мог спросить про force.
+    Возвращает (job, queued).
+    """
+    from apps.tournaments.tasks import complete_tournament_job
+
+    pipeline = CompletionPipeline(tournament, master=True, force=force)
+    completed, total = pipeline.match_counts()
+    if completed < total and not force:
+        raise IncompleteMatchesError(completed, total)
+
+    active = (
+        TournamentCompletionJob.objects.filter(
+            tournament=pipeline.tournament,
+            status__in=[TournamentCompletionJob.Status.PENDING, TournamentCompletionJob.Status.RUNNING],
+        )
+        .order_by("-created_at")
+        .first()
+    )
+    if active is not None and not jobs.is_stale(active, STALE_AFTER):
+        return active, False
+
+    job = TournamentCompletionJob.objects.create(
+        tournament=pipeline.tournament,
+        force=force,
+        created_by=user if getattr(user, "is_authenticated", False) else None,
+    )
+    jobs.enqueue_on_commit(job, complete_tournament_job.delay)
+    return job, True
+
+
+class StageProgressWriter:
+    """Запись текущего этапа задачи отдельным соединением с БД (автокоммит).
+
+    Основное соединение держит транзакцию конвейера, и её изменения не видны до
+    фиксации; отдельное соединение сразу фиксирует этап, поэтому опрос статуса
+    видит прогресс. SQLite не допускает второго пишущего соединения при открытой
+    транзакции — там этап виден только по завершении. Ошибка записи прогресса
+    не прерывает завершение.
+    """
+
+    def __init__(self, job_id: int, alias: str = DEFAULT_DB_ALIAS):
+        self.job_id = job_id
+        self.alias = alias
+        self._connection = None
+        self._disabled = False
+
+    def __call__(self, stage: str) -> None:
+        if self._disabled:
+            return
+        try:
+            if self._connection is None:
+                self._connection = connections.create_connection(self.alias)
+                if self._connection.vendor == "sqlite":
+                    self._disabled = True
+                    return
+            ops = self._connection.ops
+            with self._connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {ops.quote_name(TournamentCompletionJob._meta.db_table)} "
+                    f"SET {ops.quote_name('stage')} = %s WHERE {ops.quote_name('id')} = %s",
+                    [stage, self.job_id],
+                )
+        except Exception:
+            logger.warning("[complete] Задача #%s: не удалось записать этап %s", self.job_id, stage, exc_info=True)
+            self._disabled = True
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def run_completion_job(job_id: int) -> Optional[TournamentCompletionJob]:
+    """Выполнить завершение (тело Celery-задачи). Задачу, уже взятую другим воркером, пропускаем."""
+    claimed = jobs.claim(TournamentCompletionJob, job_id)
+    job = TournamentCompletionJob.objects.select_related("tournament").filter(id=job_id).first()
+    if not claimed or job is None:
+        return job
+
+    progress = StageProgressWriter(job.id)
+
+    def on_stage(name: str) -> None:
+        job.stage = name
+        progress(name)
+
+    pipeline = CompletionPipeline(job.tournament, master=True, force=job.force, on_stage=on_stage)
+    try:
+        result = pipeline.run()
+    except IncompleteMatchesError as exc:
+        _fail(job, pipeline, "incomplete_matches", str(exc))
+    except Exception as exc:
+        _fail(job, pipeline, "completion_failed", str(exc))
+    else:
+        job.status = TournamentCompletionJob.Status.DONE
+        job.timings = result.timings
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "stage", "timings", "finished_at"])
+    finally:
+        progress.close()
+    return job
+
+
+def _fail(job: TournamentCompletionJob, pipeline: CompletionPipeline, error: str, detail: str) -> None:
+    job.timings = pipeline.result.timings
+    jobs.mark_failed(job, error, detail, update_fields=["stage", "timings"])
+
+
+def job_payload(job: TournamentCompletionJob) -> dict:
+    """Статус завершения для API (опрос клиентом)"""
+    return {
+        **jobs.job_payload(job),
+        "tournament_id": job.tournament_id,
+        "stage": job.stage or None,
+        "timings": job.timings or {},
+        "status_url": reverse("tournament-completion-job", args=[job.id]),
+    }
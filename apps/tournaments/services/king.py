@@ -6,6 +6,8 @@ from django.db import transaction
 from apps.tournaments.models import Tournament, SchedulePattern, TournamentEntry
 from apps.teams.models import Team
 from apps.matches.models import Match, MatchSet
+from apps.players.services.pair_stats import match_player_ids, refresh_pair_stats
+from apps.players.services.summary_stats import invalidate_tournament_days
 
 
 class KingMatchGenerator:
@@ -424,7 +426,11 @@ def persist_king_matches(tournament: Tournament, generated: List[Dict[str, Any]]
         to_delete_qs = existing_qs
 
     if to_delete_qs.exists():
+        affected_players = match_player_ids(to_delete_qs)
         MatchSet.objects.filter(match__in=to_delete_qs).delete()
         to_delete_qs.delete()
+        refresh_pair_stats(affected_players)
+        if affected_players:
+            invalidate_tournament_days([tournament.id])
 
     return created
@@ -5,6 +5,8 @@ from typing import Iterable, Optional
 
 from django.db import transaction
 
+from apps.matches.models import Match
+from apps.players.services.pair_stats import match_player_ids, refresh_pair_stats
 from apps.tournaments.models import Tournament, TournamentEntry
 
 
@@ -225,7 +227,9 @@ class MultiStageService:
         if not stage.can_delete_stage():
             raise ValueError("Можно удалить только последнюю стадию в статусе CREATED")
 
+        affected_players = match_player_ids(Match.objects.filter(tournament=stage))
         stage.delete()
+        refresh_pair_stats(affected_players)
 
     @staticmethod
     @transaction.atomic
@@ -270,48 +274,14 @@ class MultiStageService:
         return stage
 
     @staticmethod
-    @transaction.atomic
     def complete_master_tournament(master_tournament_id: int, force: bool = False) -> None:
         """Завершает мастер-турнир и считает рейтинг по всем стадиям.
 
-        Если force=False, проверяет наличие незавершенных матчей во всех стадиях.
+        Если force=False, проверяет наличие незавершенных матчей во всех стадиях
+        (IncompleteMatchesError — подкласс ValueError).
         Если force=True, завершает все стадии независимо от статуса матчей.
+        Этапы и их замеры — apps/tournaments/services/completion.py.
         """
-        from apps.matches.models import Match
-
-        master = Tournament.objects.get(id=master_tournament_id)
-        if not master.is_master():
-            master = master.get_master_tournament()
+        from apps.tournaments.services.completion import complete_master
 
-        all_stages = master.get_all_stages()
-        effective_is_rating_calc = bool(master.is_rating_calc)
-
-        # Если force=False, проверяем незавершенные матчи
-        if not force:
-            incomplete_matches = []
-            for stage in all_stages:
-                matches = Match.objects.filter(tournament=stage).exclude(status='cancelled')
-                for match in matches:
-                    has_winner = match.winner_id is not None
-                    has_score = match.sets.exists()
-                    if not has_winner and not has_score:
-                        incomplete_matches.append(match)
-            
-            if incomplete_matches:
-                raise ValueError(f"Пока ещё не все матчи в турнире сыграны. Вы всё равно хотите завершить турнир?")
-
-        # Расчёт рейтинга для многостадийного турнира
-        try:
-            from apps.players.services.rating_service import compute_ratings_for_multi_stage_tournament
-        except ImportError:
-            compute_ratings_for_multi_stage_tournament = None
-
-        if effective_is_rating_calc and compute_ratings_for_multi_stage_tournament is not None:
-            stage_ids = [s.id for s in all_stages]
-            compute_ratings_for_multi_stage_tournament(master.id, stage_ids)
-
-        # Помечаем все стадии как завершенные
-        for stage in all_stages:
-            if stage.status != Tournament.Status.COMPLETED:
-                stage.status = Tournament.Status.COMPLETED
-                stage.save(update_fields=["status"])
+        complete_master(Tournament.objects.get(id=master_tournament_id), force=force)
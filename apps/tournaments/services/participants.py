@@ -0,0 +1,141 @@
+"""
+Пакетные операции с участниками турнира (TournamentEntry).
+
+Записи пишутся через bulk_create/bulk_update, сигналы синхронизации с
+TournamentRegistration на время операции отключаются, а синхронизация
+выполняется одним проходом в конце
+(RegistrationService.sync_tournament_entries_to_registrations).
+"""
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from django.db import transaction
+
+from apps.tournaments.models import Tournament, TournamentEntry
+from apps.tournaments.registration_models import TournamentRegistration
+from apps.tournaments.services.registration_service import RegistrationService
+
+# (team_id, group_index, row_index)
+EntryRow = Tuple[int, Optional[int], Optional[int]]
+
+
+def _dedupe_rows(rows: Iterable[EntryRow]) -> List[EntryRow]:
+    """Оставить по одной строке на команду (первая позиция побеждает)."""
+    seen = set()
+    result: List[EntryRow] = []
+    for team_id, group_index, row_index in rows:
+        if not team_id or team_id in seen:
+            continue
+        seen.add(team_id)
+        result.append((team_id, group_index, row_index))
+    return result
+
+
+@transaction.atomic
+def bulk_add_entries(tournament: Tournament, rows: Iterable[EntryRow]) -> List[TournamentEntry]:
+    """Добавить команды в турнир одним INSERT и синхронизировать регистрации.
+
+    Команды, уже участвующие в турнире, пропускаются.
+    Возвращает созданные записи в порядке rows.
+    """
+    rows = _dedupe_rows(rows)
+    existing = set(
+        TournamentEntry.objects.filter(
+            tournament=tournament, team_id__in=[team_id for team_id, _, _ in rows]
+        ).values_list("team_id", flat=True)
+    )
+    new_entries = [
+        TournamentEntry(
+            tournament=tournament,
+            team_id=team_id,
+            group_index=group_index,
+            row_index=row_index,
+            is_out_of_competition=False,
+        )
+        for team_id, group_index, row_index in rows
+        if team_id not in existing
+    ]
+    if not new_entries:
+        return []
+
+    with RegistrationService.suppress_entry_sync():
+        created = TournamentEntry.objects.bulk_create(new_entries)
+
+    RegistrationService.sync_tournament_entries_to_registrations(
+        tournament, [entry.team_id for entry in created]
+    )
+    return created
+
+
+@transaction.atomic
+def replace_entries(tournament: Tournament, rows: Iterable[EntryRow]) -> None:
+    """Заменить состав турнира на переданный список команд с позициями.
+
+    Оставшиеся команды сохраняют свои TournamentEntry (и регистрации),
+    выбывшие удаляются вместе с регистрациями основного состава/резерва,
+    новые создаются одним bulk_create.
+    """
+    rows = _dedupe_rows(rows)
+    wanted = {team_id: (group_index, row_index) for team_id, group_index, row_index in rows}
+    existing = {
+        entry.team_id: entry
+        for entry in TournamentEntry.objects.select_for_update().filter(tournament=tournament)
+    }
+    removed_team_ids = [team_id for team_id in existing if team_id not in wanted]
+
+    with RegistrationService.suppress_entry_sync():
+        if removed_team_ids:
+            TournamentRegistration.objects.filter(
+                tournament=tournament,
+                team_id__in=removed_team_ids,
+                status__in=[
+                    TournamentRegistration.Status.MAIN_LIST,
+                    TournamentRegistration.Status.RESERVE_LIST,
+                ],
+            ).delete()
+            TournamentEntry.objects.filter(
+                tournament=tournament, team_id__in=removed_team_ids
+            ).delete()
+
+        kept = []
+        for team_id, entry in existing.items():
+            if team_id in wanted:
+                entry.group_index, entry.row_index = wanted[team_id]
+                kept.append(entry)
+        bulk_update_positions(kept)
+
+        created = TournamentEntry.objects.bulk_create(
+            [
+                TournamentEntry(
+                    tournament=tournament,
+                    team_id=team_id,
+                    group_index=group_index,
+                    row_index=row_index,
+                    is_out_of_competition=False,
+                )
+                for team_id, group_index, row_index in rows
+                if team_id not in existing
+            ]
+        )
+
+    RegistrationService.sync_tournament_entries_to_registrations(
+        tournament,
+        [entry.team_id for entry in created],
+        roster_changed=bool(removed_team_ids),
+    )
+
+
+@transaction.atomic
+def bulk_update_positions(entries: Sequence[TournamentEntry]) -> None:
+    """Сохранить group_index/row_index для набора записей одного турнира.
+
+    Сначала позиции обнуляются, затем выставляются одним bulk_update —
+    так перестановки не нарушают уникальность (tournament, group_index, row_index).
+    """
+    if not entries:
+        return
+    TournamentEntry.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+        group_index=None, row_index=None
+    )
+    TournamentEntry.objects.bulk_update(entries, ["group_index", "row_index"])
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from collections import defaultdict
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from django.db import transaction
 
@@ -202,8 +202,17 @@ def _recalc_king_placements(tournament: Tournament) -> None:
         _create_placements(tournament, entries_with_places)
 
 
+def _first_entry_by_team(tournament: Tournament) -> Dict[int, TournamentEntry]:
+    """team_id -> первая (по id) запись участника турнира — одним запросом."""
+    entry_by_team: Dict[int, TournamentEntry] = {}
+    for e in TournamentEntry.objects.filter(tournament=tournament).order_by("-id"):
+        entry_by_team[e.team_id] = e
+    return entry_by_team
+
+
 def _collect_knockout_results_for_bracket(
     bracket: KnockoutBracket,
+    entry_by_team: Optional[Dict[int, TournamentEntry]] = None,
 ) -> Dict[int, PlacementRange]:
     """Возвращает словарь entry_id -> диапазон мест для одной сетки.
 
@@ -222,6 +231,8 @@ def _collect_knockout_results_for_bracket(
 
     if not matches:
         return {}
+    if entry_by_team is None:
+        entry_by_team = _first_entry_by_team(bracket.tournament)
 
     # Группируем матчи по раундам
     rounds: Dict[int, List[Match]] = defaultdict(list)
@@ -249,13 +260,7 @@ def _collect_knockout_results_for_bracket(
     if final_match:
         if final_match.winner_id:
             # Победитель финала → 1-е место
-            winner_entry = (
-                TournamentEntry.objects.filter(
-                    tournament=bracket.tournament, team_id=final_match.winner_id
-                )
-                .order_by("id")
-                .first()
-            )
+            winner_entry = entry_by_team.get(final_match.winner_id)
             if winner_entry:
                 entry_places[winner_entry.id] = PlacementRange(1, 1)
 
@@ -266,13 +271,7 @@ def _collect_knockout_results_for_bracket(
                 else final_match.team_2_id
             )
             if loser_team_id:
-                loser_entry = (
-                    TournamentEntry.objects.filter(
-                        tournament=bracket.tournament, team_id=loser_team_id
-                    )
-                    .order_by("id")
-                    .first()
-                )
+                loser_entry = entry_by_team.get(loser_team_id)
                 if loser_entry:
                     entry_places[loser_entry.id] = PlacementRange(2, 2)
         else:
@@ -297,25 +296,13 @@ def _collect_knockout_results_for_bracket(
             if unique_finalists:
                 # Первый финалист → 1-е место, второй (если есть) → 2-е место
                 first_tid = unique_finalists[0]
-                first_entry = (
-                    TournamentEntry.objects.filter(
-                        tournament=bracket.tournament, team_id=first_tid
-                    )
-                    .order_by("id")
-                    .first()
-                )
+                first_entry = entry_by_team.get(first_tid)
                 if first_entry:
                     entry_places[first_entry.id] = PlacementRange(1, 1)
 
                 if len(unique_finalists) > 1:
                     second_tid = unique_finalists[1]
-                    second_entry = (
-                        TournamentEntry.objects.filter(
-                            tournament=bracket.tournament, team_id=second_tid
-                        )
-                        .order_by("id")
-                        .first()
-                    )
+                    second_entry = entry_by_team.get(second_tid)
                     if second_entry:
                         entry_places[second_entry.id] = PlacementRange(2, 2)
 
@@ -333,13 +320,7 @@ def _collect_knockout_results_for_bracket(
             ),
         ]:
             if team_id:
-                e = (
-                    TournamentEntry.objects.filter(
-                        tournament=bracket.tournament, team_id=team_id
-                    )
-                    .order_by("id")
-                    .first()
-                )
+                e = entry_by_team.get(team_id)
                 if e and e.id not in entry_places:
                     entry_places[e.id] = PlacementRange(place, place)
     else:
@@ -354,13 +335,7 @@ def _collect_knockout_results_for_bracket(
             )
             if not loser_team_id:
                 continue
-            e = (
-                TournamentEntry.objects.filter(
-                    tournament=bracket.tournament, team_id=loser_team_id
-                )
-                .order_by("id")
-                .first()
-            )
+            e = entry_by_team.get(loser_team_id)
             if e and e.id not in entry_places:
                 entry_places[e.id] = PlacementRange(3, 3)
 
@@ -389,13 +364,7 @@ def _collect_knockout_results_for_bracket(
         place_from = current_max_place - count + 1
         place_to = current_max_place
         for team_id in losers:
-            e = (
-                TournamentEntry.objects.filter(
-                    tournament=bracket.tournament, team_id=team_id
-                )
-                .order_by("id")
-                .first()
-            )
+            e = entry_by_team.get(team_id)
             if e and e.id not in entry_places:
                 entry_places[e.id] = PlacementRange(place_from, place_to)
         current_max_place -= count
@@ -420,17 +389,15 @@ def recalc_tournament_placements(tournament: Tournament) -> int:
         _recalc_king_placements(tournament)
     elif tournament.system == Tournament.System.KNOCKOUT:
         all_places: Dict[int, PlacementRange] = {}
+        entry_by_team = _first_entry_by_team(tournament)
         for bracket in tournament.knockout_brackets.all():
-            per_bracket = _collect_knockout_results_for_bracket(bracket)
+            per_bracket = _collect_knockout_results_for_bracket(bracket, entry_by_team)
             all_places.update(per_bracket)
 
-        entries_with_places: List[Tuple[TournamentEntry, PlacementRange]] = []
-        for entry_id, pr in all_places.items():
-            try:
-                entry = TournamentEntry.objects.get(id=entry_id, tournament=tournament)
-            except TournamentEntry.DoesNotExist:
-                continue
-            entries_with_places.append((entry, pr))
+        entries_by_id = {e.id: e for e in entry_by_team.values()}
+        entries_with_places: List[Tuple[TournamentEntry, PlacementRange]] = [
+            (entries_by_id[entry_id], pr) for entry_id, pr in all_places.items() if entry_id in entries_by_id
+        ]
 
         _create_placements(tournament, entries_with_places)
     else:
@@ -69,21 +69,27 @@ def get_player_visible_rating(tournament: Tournament, player: Optional[Player])
     if not category:
         return VisibleRatingResult(rating=0, place=None)
 
-    from apps.btr.models import BtrRatingSnapshot
+    from apps.btr.models import BtrLatestRating, BtrRatingSnapshot
 
     valid_since = _btr_valid_since(tournament)
-    snapshot = (
-        BtrRatingSnapshot.objects.filter(
-            player=btr_player,
-            category=category,
-            rating_date__gte=valid_since,
-            rating_date__lte=tournament.date,
+    valid_until = tournament.date or date.today()
+
+    # Обычно нужен текущий рейтинг — одна индексированная выборка из BtrLatestRating
+    snapshot = BtrLatestRating.objects.filter(player=btr_player, category=category).first()
+    if snapshot and snapshot.rating_date > valid_until:
+        # Прошедший турнир: последний снимок на дату турнира ищем в истории
+        snapshot = (
+            BtrRatingSnapshot.objects.filter(
+                player=btr_player,
+                category=category,
+                rating_date__gte=valid_since,
+                rating_date__lte=valid_until,
+            )
+            .order_by("-rating_date")
+            .first()
         )
-        .order_by("-rating_date")
-        .first()
-    )
 
-    if not snapshot:
+    if not snapshot or snapshot.rating_date < valid_since:
         return VisibleRatingResult(rating=0, place=None)
 
     return VisibleRatingResult(rating=int(snapshot.rating_value or 0), place=snapshot.rank)
@@ -8,7 +8,8 @@
 - Синхронизация с TournamentEntry
 - Переиспользование существующих команд из teams.Team
 """
-from typing import Optional, Tuple
+from contextlib import contextmanager
+from typing import Iterable, Optional, Tuple
 from django.db import transaction, models
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -24,6 +25,10 @@ from apps.players.models import Player
 # Контекстная переменная для transaction_id (работает с async/sync)
 _transaction_id_context: ContextVar[Optional[str]] = ContextVar('transaction_id', default=None)
 
+# Контекстная переменная: сигналы синхронизации TournamentEntry ↔ TournamentRegistration
+# отключены (пакетные операции выполняют синхронизацию сами, одним проходом)
+_entry_sync_suppressed: ContextVar[bool] = ContextVar('entry_sync_suppressed', default=False)
+
 
 class RegistrationService:
     """Сервис для управления регистрацией на турниры"""
@@ -32,7 +37,83 @@ class RegistrationService:
     def _mark_skip_announcement(instance):
         """Пометить экземпляр для пропуска анонса в сигнале"""
         instance._skip_announcement = True
+
+    @staticmethod
+    @contextmanager
+    def suppress_entry_sync():
+        """
+        Отключить сигналы синхронизации TournamentEntry ↔ TournamentRegistration.
+
+        Внутри блока обработчики post_save/post_delete не выполняют синхронизацию,
+        пересчёт очереди и анонсы. Вызывающий код обязан сам выполнить
+        sync_tournament_entries_to_registrations() после пакетной операции.
+        """
+        token = _entry_sync_suppressed.set(True)
+        try:
+            yield
+        finally:
+            _entry_sync_suppressed.reset(token)
+
+    @staticmethod
+    def is_entry_sync_suppressed() -> bool:
+        """Отключена ли синхронизация в сигналах (см. suppress_entry_sync)"""
+        return _entry_sync_suppressed.get()
     
+    @staticmethod
+    def _check_roster_change(tournament_id: int, source: str) -> bool:
+        """
+        Поставить в очередь анонс об изменении состава, если состав действительно изменился.
+
+        Хеш состава (все регистрации турнира со статусами) сравнивается с
+        сохранённым в TournamentAnnouncementSettings.roster_hash; при изменении
+        хеш обновляется, а анонс roster_change отправляется после фиксации
+        транзакции. Повторные проверки без изменения состава ничего не отправляют.
+
+        Returns:
+            True, если анонс поставлен в очередь
+        """
+        import hashlib
+        import logging
+        from apps.tournaments.models import TournamentAnnouncementSettings
+        logger = logging.getLogger(__name__)
+
+        settings = TournamentAnnouncementSettings.objects.filter(tournament_id=tournament_id).first()
+        if settings is None:
+            return False
+        if not settings.send_on_roster_change:
+            logger.info(f"[ROSTER_CHANGE] Триггер roster_change отключен ({source})")
+            return False
+
+        # Вычисляем новый хеш общего состава (все регистрации турнира)
+        roster_items = []
+        for team_id, player_id, status_code in (
+            TournamentRegistration.objects.filter(tournament_id=tournament_id)
+            .order_by('id')
+            .values_list('team_id', 'player_id', 'status')
+        ):
+            if team_id:
+                roster_items.append(f"team_{team_id}_{status_code}")
+            elif player_id:
+                roster_items.append(f"player_{player_id}_{status_code}")
+        new_hash = hashlib.md5("|".join(roster_items).encode()).hexdigest()
+
+        logger.info(f"[ROSTER_CHANGE] ({source}) Старый хеш: {settings.roster_hash}, новый хеш: {new_hash}")
+
+        # Если хеш не изменился, не шлём повторный анонс
+        if settings.roster_hash == new_hash:
+            logger.info(f"[ROSTER_CHANGE] ({source}) Хеш не изменился, анонс не отправляем")
+            return False
+
+        settings.roster_hash = new_hash
+        settings.save(update_fields=['roster_hash', 'updated_at'])
+
+        logger.info(f"[ROSTER_CHANGE] ({source}) Хеш изменился, отправляем анонс")
+        from apps.telegram_bot.tasks import send_tournament_announcement_to_chat
+        transaction.on_commit(
+            lambda: send_tournament_announcement_to_chat.delay(tournament_id, 'roster_change')
+        )
+        return True
+
     @staticmethod
     def _get_or_create_team(player1: Player, player2: Player) -> Team:
         """
@@ -63,92 +144,144 @@ class RegistrationService:
         """
         Пересчитать статусы всех регистраций (основной состав / резерв).
         Вызывается при изменении planned_participants или при изменении регистраций.
+
+        Пересчёт выполняется пакетно за фиксированное число запросов:
+        блокировка турнира и регистраций (SELECT ... FOR UPDATE), не более двух
+        UPDATE для перевода команд между основным составом и резервом и пакетная
+        синхронизация TournamentEntry. Сигналы post_save при этом не вызываются,
+        поэтому при переводе команд проверка анонса об изменении состава
+        выполняется здесь, один раз на пересчёт.
         """
-        # Получаем все регистрации основного и резервного списка
-        registrations = TournamentRegistration.objects.filter(
-            tournament=tournament,
-            status__in=[
-                TournamentRegistration.Status.MAIN_LIST,
-                TournamentRegistration.Status.RESERVE_LIST,
-            ],
-        ).order_by('registration_order', 'registered_at')
+        Status = TournamentRegistration.Status
 
-        max_teams = tournament.planned_participants or 0
+        with transaction.atomic():
+            # Блокируем строку турнира: параллельные пересчёты для одного турнира
+            # выполняются последовательно и видят актуальный planned_participants.
+            planned_participants = (
+                Tournament.objects.select_for_update()
+                .filter(pk=tournament.pk)
+                .values_list('planned_participants', flat=True)
+                .first()
+            )
+            max_teams = planned_participants or 0
 
-        # Работает по КОМАНДАМ, а не по отдельным строкам регистрации.
-        # Важный инвариант: если основной список уже заполнен (есть max_teams
-        # команд со статусом MAIN_LIST), формирование новых пар не должно
-        # вытеснять существующие команды в резерв только из-за более раннего
-        # registration_order (например, когда игрок давно был в LOOKING_FOR_PARTNER).
-
-        # Шаг 1. Собираем команды в порядке регистрации.
-        teams_ordered: list[int] = []
-        team_current_status: dict[int, str] = {}
-
-        for reg in registrations:
-            team_id = reg.team_id or reg.id  # подстраховка на случай отсутствия team
-
-            if team_id not in team_current_status:
-                team_current_status[team_id] = reg.status
-                teams_ordered.append(team_id)
-
-        # Делим команды на текущие MAIN и RESERVE в порядке регистрации.
-        main_teams: list[int] = [tid for tid in teams_ordered if team_current_status[tid] == TournamentRegistration.Status.MAIN_LIST]
-        reserve_teams: list[int] = [tid for tid in teams_ordered if team_current_status[tid] == TournamentRegistration.Status.RESERVE_LIST]
-
-        # Шаг 2. Определяем желаемый статус для каждой команды.
-        desired_team_status: dict[int, str] = {}
-
-        # Если текущих MAIN больше, чем лимит, оставляем в MAIN только
-        # самые ранние по очереди, остальные отправляем в резерв.
-        if len(main_teams) > max_teams:
-            keep_main = set(main_teams[:max_teams])
-            for tid in main_teams:
-                desired_team_status[tid] = (
-                    TournamentRegistration.Status.MAIN_LIST
-                    if tid in keep_main
-                    else TournamentRegistration.Status.RESERVE_LIST
+            # Получаем все регистрации основного и резервного списка
+            registrations = list(
+                TournamentRegistration.objects.select_for_update()
+                .filter(
+                    tournament_id=tournament.pk,
+                    status__in=[Status.MAIN_LIST, Status.RESERVE_LIST],
                 )
-        else:
-            # Иначе все текущие MAIN остаются MAIN.
-            for tid in main_teams:
-                desired_team_status[tid] = TournamentRegistration.Status.MAIN_LIST
-
-            # Считаем, сколько слотов в основном списке ещё свободно.
-            remaining_slots = max_teams - len(main_teams)
-
-            # Заполняем оставшиеся слоты резервными командами по очереди.
-            for tid in reserve_teams:
-                if remaining_slots > 0:
-                    desired_team_status[tid] = TournamentRegistration.Status.MAIN_LIST
-                    remaining_slots -= 1
-                else:
-                    desired_team_status[tid] = TournamentRegistration.Status.RESERVE_LIST
+                .order_by('registration_order', 'registered_at')
+                .values_list('id', 'team_id', 'status')
+            )
+
+            # Работает по КОМАНДАМ, а не по отдельным строкам регистрации.
+            # Важный инвариант: если основной список уже заполнен (есть max_teams
+            # команд со статусом MAIN_LIST), формирование новых пар не должно
+            # вытеснять существующие команды в резерв только из-за более раннего
+            # registration_order (например, когда игрок давно был в LOOKING_FOR_PARTNER).
 
-        # На всякий случай для команд без явного решения сохраняем текущий статус.
-        for tid in teams_ordered:
-            if tid not in desired_team_status:
-                desired_team_status[tid] = team_current_status.get(tid, TournamentRegistration.Status.RESERVE_LIST)
+            # Шаг 1. Собираем команды в порядке регистрации.
+            teams_ordered: list[int] = []
+            team_current_status: dict[int, str] = {}
 
-        # Шаг 3. Применяем изменения к записям регистрации.
-        for reg in registrations:
-            team_id = reg.team_id or reg.id
-            new_status = desired_team_status.get(team_id, reg.status)
+            for reg_id, team_id, status in registrations:
+                team_key = team_id or reg_id  # подстраховка на случай отсутствия team
 
-            if reg.status != new_status:
-                old_status = reg.status
-                reg.status = new_status
+                if team_key not in team_current_status:
+                    team_current_status[team_key] = status
+                    teams_ordered.append(team_key)
+
+            # Делим команды на текущие MAIN и RESERVE в порядке регистрации.
+            main_teams = [tid for tid in teams_ordered if team_current_status[tid] == Status.MAIN_LIST]
+            reserve_teams = [tid for tid in teams_ordered if team_current_status[tid] == Status.RESERVE_LIST]
+
+            # Шаг 2. Определяем желаемый статус для каждой команды.
+            # Если текущих MAIN больше, чем лимит, оставляем в MAIN только самые
+            # ранние по очереди, остальные отправляем в резерв. Иначе все текущие
+            # MAIN остаются, а свободные слоты заполняются резервом по очереди.
+            if len(main_teams) > max_teams:
+                main_set = set(main_teams[:max_teams])
+            else:
+                main_set = set(main_teams) | set(reserve_teams[:max_teams - len(main_teams)])
 
-                # Устанавливаем флаг для избежания рекурсии в сигналах
-                reg._skip_recalculation = True
-                reg.save(update_fields=['status', 'updated_at'])
+            # Шаг 3. Делим регистрации на повышаемые и понижаемые.
+            promote_ids: list[int] = []
+            demote_ids: list[int] = []
+            for reg_id, team_id, status in registrations:
+                in_main = (team_id or reg_id) in main_set
+                if in_main and status != Status.MAIN_LIST:
+                    promote_ids.append(reg_id)
+                elif not in_main and status != Status.RESERVE_LIST:
+                    demote_ids.append(reg_id)
 
-                # Синхронизируем с TournamentEntry
-                RegistrationService._sync_to_tournament_entry(reg)
+            if not promote_ids and not demote_ids:
+                return
+
+            # Шаг 4. Применяем изменения пакетными UPDATE (без сигналов post_save).
+            now = timezone.now()
+            if promote_ids:
+                TournamentRegistration.objects.filter(id__in=promote_ids).update(
+                    status=Status.MAIN_LIST, updated_at=now
+                )
+            if demote_ids:
+                TournamentRegistration.objects.filter(id__in=demote_ids).update(
+                    status=Status.RESERVE_LIST, updated_at=now
+                )
+
+            # Синхронизируем с TournamentEntry: обе группы остаются участниками.
+            RegistrationService._bulk_sync_tournament_entries(
+                tournament.pk,
+                {team_id for _, team_id, _ in registrations if team_id},
+            )
 
-                # Отправляем уведомление об изменении статуса
-                from apps.telegram_bot.tasks import send_status_changed_notification
-                send_status_changed_notification.delay(reg.id, old_status, new_status)
+            # Отправляем уведомления об изменении статуса после фиксации транзакции
+            from apps.telegram_bot.tasks import send_status_changed_notification
+
+            changes = [(reg_id, Status.RESERVE_LIST, Status.MAIN_LIST) for reg_id in promote_ids]
+            changes += [(reg_id, Status.MAIN_LIST, Status.RESERVE_LIST) for reg_id in demote_ids]
+
+            def _notify():
+                for reg_id, old_status, new_status in changes:
+                    send_status_changed_notification.delay(reg_id, old_status, new_status)
+
+            transaction.on_commit(_notify)
+
+            RegistrationService._check_roster_change(tournament.pk, 'recalculate')
+
+    @staticmethod
+    def _bulk_sync_tournament_entries(tournament_id: int, team_ids):
+        """
+        Пакетно создать недостающие TournamentEntry для команд основного состава и резерва.
+
+        Выполняет один SELECT и не более одного INSERT; bulk_create не вызывает
+        сигналы post_save, поэтому повторной синхронизации в регистрации не происходит.
+        """
+        team_ids = set(team_ids)
+        if not team_ids:
+            return
+
+        existing = set(
+            TournamentEntry.objects.filter(
+                tournament_id=tournament_id, team_id__in=team_ids
+            ).values_list('team_id', flat=True)
+        )
+        missing = team_ids - existing
+        if missing:
+            TournamentEntry.objects.bulk_create(
+                [
+                    TournamentEntry(
+                        tournament_id=tournament_id,
+                        team_id=team_id,
+                        is_out_of_competition=False,
+                        group_index=None,
+                        row_index=None,
+                    )
+                    for team_id in sorted(missing)
+                ],
+                ignore_conflicts=True,
+            )
     
     @staticmethod
     def _sync_to_tournament_entry(registration: TournamentRegistration):
@@ -801,16 +934,16 @@ class RegistrationService:
         RegistrationService._recalculate_registration_statuses(tournament)
         
         # Синхронизируем с TournamentEntry
-        registrations = TournamentRegistration.objects.filter(
+        team_ids = TournamentRegistration.objects.filter(
             tournament=tournament,
+            team__isnull=False,
             status__in=[
                 TournamentRegistration.Status.MAIN_LIST,
                 TournamentRegistration.Status.RESERVE_LIST
             ]
-        )
+        ).values_list('team_id', flat=True)
         
-        for reg in registrations:
-            RegistrationService._sync_to_tournament_entry(reg)
+        RegistrationService._bulk_sync_tournament_entries(tournament.pk, team_ids)
     
     @staticmethod
     @transaction.atomic
@@ -876,3 +1009,98 @@ class RegistrationService:
         )
         
         logger.info(f"[SYNC_TO_REG] Регистрация создана (ID: {reg.id}), статус: {reg.status}")
+
+    @staticmethod
+    @transaction.atomic
+    def sync_tournament_entries_to_registrations(
+        tournament: Tournament,
+        team_ids: Optional[Iterable[int]] = None,
+        roster_changed: bool = False,
+    ) -> int:
+        """
+        Пакетная синхронизация TournamentEntry → TournamentRegistration.
+
+        Аналог sync_tournament_entry_to_registration для набора записей: создаёт
+        недостающие регистрации одним bulk_create (порядок очереди сохраняется),
+        затем один раз пересчитывает основной состав/резерв и ставит в очередь
+        не более одного анонса об изменении состава (если изменился хеш состава).
+
+        Args:
+            tournament: Турнир
+            team_ids: Команды, добавленные в турнир (в порядке добавления).
+                Если не указаны — проверяются все TournamentEntry турнира.
+            roster_changed: Состав изменился и без создания новых регистраций
+                (например, команды были удалены)
+
+        Returns:
+            Количество созданных регистраций
+        """
+        entries = TournamentEntry.objects.filter(tournament=tournament).order_by('id')
+        if team_ids is not None:
+            team_ids = list(dict.fromkeys(team_ids))
+            entries = entries.filter(team_id__in=team_ids)
+        teams = {
+            team_id: (player_1_id, player_2_id)
+            for team_id, player_1_id, player_2_id in entries.values_list(
+                'team_id', 'team__player_1_id', 'team__player_2_id'
+            )
+        }
+        ordered_team_ids = [tid for tid in (team_ids or teams) if tid in teams]
+
+        registered_team_ids = set(
+            TournamentRegistration.objects.filter(
+                tournament=tournament, team_id__in=ordered_team_ids
+            ).values_list('team_id', flat=True)
+        )
+        missing_team_ids = [tid for tid in ordered_team_ids if tid not in registered_team_ids]
+
+        created = []
+        if missing_team_ids:
+            # Считаем команды основного списка, а не отдельных игроков
+            current_main_count = TournamentRegistration.objects.filter(
+                tournament=tournament,
+                status=TournamentRegistration.Status.MAIN_LIST
+            ).values('team').distinct().count()
+            max_order = (
+                TournamentRegistration.objects
+                .filter(tournament=tournament)
+                .aggregate(models.Max('registration_order'))
+                .get('registration_order__max')
+                or 0
+            )
+            max_teams = tournament.planned_participants or 0
+
+            new_registrations = []
+            for offset, team_id in enumerate(missing_team_ids, start=1):
+                player_1_id, player_2_id = teams[team_id]
+                if current_main_count < max_teams:
+                    status = TournamentRegistration.Status.MAIN_LIST
+                    current_main_count += 1
+                else:
+                    status = TournamentRegistration.Status.RESERVE_LIST
+                # player указывает на player_1, partner на player_2 (если есть)
+                new_registrations.append(
+                    TournamentRegistration(
+                        tournament=tournament,
+                        player_id=player_1_id,
+                        partner_id=player_2_id,
+                        team_id=team_id,
+                        status=status,
+                        registration_order=max_order + offset,
+                    )
+                )
+
+            # Игрок может уже иметь регистрацию другого типа (например, "ищет пару") —
+            # такие конфликты пропускаем, не ломая пакетную операцию.
+            created = TournamentRegistration.objects.bulk_create(
+                new_registrations, ignore_conflicts=True
+            )
+
+        if created or roster_changed or registered_team_ids:
+            RegistrationService._recalculate_registration_statuses(tournament)
+
+        if created or roster_changed:
+            # Анонс об изменении состава ОДИН РАЗ после пакетной операции (с учётом хеша состава)
+            RegistrationService._check_roster_change(tournament.id, 'bulk')
+
+        return len(created)
@@ -7,6 +7,8 @@ import json
 from django.db import transaction
 
 from apps.matches.models import Match, MatchSet
+from apps.players.services.pair_stats import match_player_ids, refresh_pair_stats
+from apps.players.services.summary_stats import invalidate_tournament_days
 from apps.tournaments.models import SchedulePattern, Tournament, TournamentEntry
 
 
@@ -372,7 +374,11 @@ def persist_generated_matches(tournament: Tournament, matches: Iterable[Generate
         to_delete_qs = existing_qs
 
     if to_delete_qs.exists():
+        affected_players = match_player_ids(to_delete_qs)
         MatchSet.objects.filter(match__in=to_delete_qs).delete()
         to_delete_qs.delete()
+        refresh_pair_stats(affected_players)
+        if affected_players:
+            invalidate_tournament_days([tournament.id])
 
     return created
@@ -9,15 +9,56 @@ from apps.tournaments.models import TournamentEntry, Tournament
 from apps.tournaments.registration_models import TournamentRegistration
 from apps.tournaments.services.registration_service import RegistrationService
 
+# Поля TournamentEntry, изменение которых не влияет на регистрации
+_ENTRY_POSITION_FIELDS = frozenset({'group_index', 'row_index'})
+
+_NOT_LOADED = object()
+
+
+def _get_old_value(instance, attname, update_fields=None):
+    """
+    Значение поля до сохранения.
+
+    Берётся из состояния, запомненного при загрузке экземпляра (from_db).
+    Если поле не входит в update_fields, в БД оно не изменится — старым
+    считается текущее значение. Повторный запрос к БД выполняется, только
+    если экземпляр создан вручную (не загружен из БД).
+    """
+    if update_fields is not None and instance._meta.get_field(attname).name not in update_fields:
+        return getattr(instance, attname)
+
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is not None and attname in loaded:
+        return loaded[attname]
+
+    return _NOT_LOADED
+
+
+def _remember_loaded_values(instance, *attnames):
+    """Обновить запомненное состояние после сохранения"""
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is None:
+        loaded = instance._loaded_values = {}
+    for attname in attnames:
+        loaded[attname] = getattr(instance, attname)
+
 
 @receiver(post_save, sender=TournamentEntry)
-def sync_tournament_entry_created(sender, instance, created, **kwargs):
+def sync_tournament_entry_created(sender, instance, created, update_fields=None, **kwargs):
     """
     Синхронизировать TournamentEntry с TournamentRegistration при создании/обновлении.
     """
     import logging
     logger = logging.getLogger(__name__)
     
+    # Пакетные операции синхронизируют регистрации сами (одним проходом)
+    if RegistrationService.is_entry_sync_suppressed():
+        return
+
+    # Перестановка по позициям таблицы не меняет состав участников
+    if not created and update_fields and set(update_fields) <= _ENTRY_POSITION_FIELDS:
+        return
+    
     logger.info(f"[ENTRY_SYNC] Сигнал вызван для TournamentEntry {instance.id}, created: {created}, team: {instance.team}")
     
     if created or instance.team:
@@ -41,7 +82,10 @@ def sync_tournament_entry_deleted(sender, instance, **kwargs):
     """
     from apps.tournaments.registration_models import TournamentRegistration
 
-    if instance.team:
+    if RegistrationService.is_entry_sync_suppressed():
+        return
+
+    if instance.team_id:
         TournamentRegistration.objects.filter(
             tournament=instance.tournament,
             team=instance.team,
@@ -53,16 +97,19 @@ def sync_tournament_entry_deleted(sender, instance, **kwargs):
 
 
 @receiver(pre_save, sender=Tournament)
-def track_planned_participants_change(sender, instance, **kwargs):
+def track_planned_participants_change(sender, instance, update_fields=None, **kwargs):
     """
     Отслеживаем изменение planned_participants для последующего пересчёта статусов.
     """
     if instance.pk:
-        try:
-            old_instance = Tournament.objects.get(pk=instance.pk)
-            instance._old_planned_participants = old_instance.planned_participants
-        except Tournament.DoesNotExist:
-            instance._old_planned_participants = None
+        old_value = _get_old_value(instance, 'planned_participants', update_fields)
+        if old_value is _NOT_LOADED:
+            old_value = (
+                Tournament.objects.filter(pk=instance.pk)
+                .values_list('planned_participants', flat=True)
+                .first()
+            )
+        instance._old_planned_participants = old_value
     else:
         instance._old_planned_participants = None
 
@@ -80,27 +127,33 @@ def recalculate_on_planned_participants_change(sender, instance, created, **kwar
         if old_value != new_value:
             RegistrationService._recalculate_registration_statuses(instance)
 
+    _remember_loaded_values(instance, 'planned_participants')
+
 
 # ============================================================================
 # Сигналы для TournamentRegistration
 # ============================================================================
 
 @receiver(pre_save, sender=TournamentRegistration)
-def track_registration_status_change(sender, instance, **kwargs):
+def track_registration_status_change(sender, instance, update_fields=None, **kwargs):
     """
     Отслеживаем изменение статуса регистрации для последующей синхронизации.
     """
     if instance.pk:
-        try:
-            old_instance = TournamentRegistration.objects.get(pk=instance.pk)
-            instance._old_status = old_instance.status
-            instance._old_team = old_instance.team
-        except TournamentRegistration.DoesNotExist:
-            instance._old_status = None
-            instance._old_team = None
+        old_status = _get_old_value(instance, 'status', update_fields)
+        old_team_id = _get_old_value(instance, 'team_id', update_fields)
+        if old_status is _NOT_LOADED or old_team_id is _NOT_LOADED:
+            old_status, old_team_id = (
+                TournamentRegistration.objects.filter(pk=instance.pk)
+                .values_list('status', 'team_id')
+                .first()
+                or (None, None)
+            )
+        instance._old_status = old_status
+        instance._old_team_id = old_team_id
     else:
         instance._old_status = None
-        instance._old_team = None
+        instance._old_team_id = None
 
 
 @receiver(post_save, sender=TournamentRegistration)
@@ -113,12 +166,17 @@ def sync_registration_to_entry(sender, instance, created, **kwargs):
     - Если статус looking_for_partner или invited → удалить TournamentEntry
     - При изменении статуса → пересчитать очередь
     """
+    old_status = getattr(instance, '_old_status', None)
+    old_team_id = getattr(instance, '_old_team_id', None)
+    _remember_loaded_values(instance, 'status', 'team_id')
+
     # Избегаем рекурсии - если это вызов из пересчёта, не пересчитываем снова
     if getattr(instance, '_skip_recalculation', False):
         return
-    
-    old_status = getattr(instance, '_old_status', None)
-    old_team = getattr(instance, '_old_team', None)
+
+    # Пакетные операции синхронизируют регистрации сами (одним проходом)
+    if RegistrationService.is_entry_sync_suppressed():
+        return
     
     # Синхронизируем с TournamentEntry
     RegistrationService._sync_to_tournament_entry(instance)
@@ -133,7 +191,7 @@ def sync_registration_to_entry(sender, instance, created, **kwargs):
             TournamentRegistration.Status.RESERVE_LIST
         ]) or
         (not created and old_status != instance.status) or
-        (not created and old_team != instance.team and instance.team is not None)
+        (not created and old_team_id != instance.team_id and instance.team_id is not None)
     )
     
     if should_recalculate:
@@ -153,6 +211,10 @@ def recalculate_on_registration_deleted(sender, instance, **kwargs):
     
     logger.info(f"[ROSTER_CHANGE] Сигнал post_delete вызван для регистрации {instance.id}, статус был: {instance.status}")
     
+    # Пакетные операции сами пересчитывают очередь и отправляют анонс
+    if RegistrationService.is_entry_sync_suppressed():
+        return
+    
     # Пропускаем анонс, если установлен флаг _skip_announcement (для парных операций)
     skip_announcement = getattr(instance, '_skip_announcement', False)
     if skip_announcement:
@@ -177,51 +239,7 @@ def recalculate_on_registration_deleted(sender, instance, **kwargs):
         return
     
     try:
-        from apps.tournaments.models import TournamentAnnouncementSettings
-        settings = tournament.announcement_settings
-
-        if not settings.send_on_roster_change:
-            logger.info("[ROSTER_CHANGE] Триггер roster_change отключен (post_delete)")
-            return
-
-        # Вычисляем новый хеш общего состава (все регистрации турнира)
-        import hashlib
-        all_regs = TournamentRegistration.objects.filter(
-            tournament=tournament
-        ).select_related('player', 'partner', 'team').order_by('id')
-
-        roster_items = []
-        for reg in all_regs:
-            status_code = reg.status
-            if reg.team:
-                roster_items.append(f"team_{reg.team_id}_{status_code}")
-            elif reg.player:
-                roster_items.append(f"player_{reg.player_id}_{status_code}")
-
-        roster_string = "|".join(roster_items)
-        new_hash = hashlib.md5(roster_string.encode()).hexdigest()
-
-        logger.info(f"[ROSTER_CHANGE] (post_delete) Старый хеш: {settings.roster_hash}, новый хеш: {new_hash}")
-
-        if settings.roster_hash == new_hash:
-            logger.info("[ROSTER_CHANGE] (post_delete) Хеш не изменился, анонс не отправляем")
-            return
-
-        settings.roster_hash = new_hash
-        settings.save(update_fields=['roster_hash', 'updated_at'])
-
-        logger.info("[ROSTER_CHANGE] (post_delete) Хеш изменился, отправляем анонс")
-        
-        # Захватываем переменную для lambda
-        tournament_id = tournament.id
-        
-        from apps.telegram_bot.tasks import send_tournament_announcement_to_chat
-        transaction.on_commit(
-            lambda: send_tournament_announcement_to_chat.delay(
-                tournament_id, 
-                'roster_change'
-            )
-        )
+        RegistrationService._check_roster_change(tournament.id, 'post_delete')
     except Exception as e:
         logger.error(f"[ROSTER_CHANGE] Ошибка при отправке анонса после удаления: {e}", exc_info=True)
 
@@ -248,65 +266,16 @@ def check_roster_change_for_announcement(sender, instance, created, **kwargs):
     logger = logging.getLogger(__name__)
     
     # Пропускаем анонс, если установлен флаг _skip_announcement (для парных операций)
-    if getattr(instance, '_skip_announcement', False):
+    # или идёт пакетная операция (она отправит один анонс сама)
+    if getattr(instance, '_skip_announcement', False) or RegistrationService.is_entry_sync_suppressed():
         logger.info(f"[ROSTER_CHANGE] (post_save) Пропускаем анонс для instance.id={instance.id} (флаг _skip_announcement)")
         return
     
     logger.info(f"[ROSTER_CHANGE] Сигнал post_save вызван для регистрации {instance.id}, статус: {instance.status}, created: {created}")
     
-    # Проверяем наличие настроек анонсов
     try:
-        from apps.tournaments.models import TournamentAnnouncementSettings
-        from apps.tournaments.services.registration_service import RegistrationService
-        
-        settings = instance.tournament.announcement_settings
-        
-        logger.info(f"[ROSTER_CHANGE] Настройки найдены для турнира {instance.tournament.id}, send_on_roster_change: {settings.send_on_roster_change}")
-        
-        if not settings.send_on_roster_change:
-            logger.info(f"[ROSTER_CHANGE] Триггер roster_change отключен")
-            return
-
-        # Вычисляем новый хеш общего состава (все регистрации турнира)
-        import hashlib
-        all_regs = TournamentRegistration.objects.filter(
-            tournament=instance.tournament
-        ).select_related('player', 'partner', 'team').order_by('id')
-
-        roster_items = []
-        for reg in all_regs:
-            status_code = reg.status
-            if reg.team:
-                roster_items.append(f"team_{reg.team_id}_{status_code}")
-            elif reg.player:
-                roster_items.append(f"player_{reg.player_id}_{status_code}")
-
-        roster_string = "|".join(roster_items)
-        new_hash = hashlib.md5(roster_string.encode()).hexdigest()
-
-        logger.info(f"[ROSTER_CHANGE] (post_save) Старый хеш: {settings.roster_hash}, новый хеш: {new_hash}")
-
-        # Если хеш не изменился, не шлём повторный анонс
-        if settings.roster_hash == new_hash:
-            logger.info(f"[ROSTER_CHANGE] (post_save) Хеш не изменился, анонс не отправляем")
-            return
-
-        settings.roster_hash = new_hash
-        settings.save(update_fields=['roster_hash', 'updated_at'])
-
-        logger.info(f"[ROSTER_CHANGE] (post_save) Хеш изменился, отправляем анонс")
-        
-        # Отправляем анонс асинхронно
-        from apps.telegram_bot.tasks import send_tournament_announcement_to_chat
-        tournament_id = instance.tournament.id
-        transaction.on_commit(
-            lambda: send_tournament_announcement_to_chat.delay(
-                tournament_id, 
-                'roster_change'
-            )
-        )
-        logger.info(f"[ROSTER_CHANGE] Задача отправки анонса поставлена в очередь")
-    
+        if RegistrationService._check_roster_change(instance.tournament_id, 'post_save'):
+            logger.info(f"[ROSTER_CHANGE] Задача отправки анонса поставлена в очередь")
     except Exception as e:
         # Не ломаем основной процесс регистрации при ошибках анонсов
         logger.error(f"[ROSTER_CHANGE] Ошибка в сигнале check_roster_change_for_announcement: {e}", exc_info=True)
@@ -0,0 +1,18 @@
+"""
+Celery задачи турниров
+"""
+from celery import shared_task
+
+
+@shared_task
+def complete_tournament_job(job_id):
+    """
+    Завершить мастер-турнир в фоне (apps/tournaments/services/completion.py)
+
+    Args:
+        job_id: ID TournamentCompletionJob
+    """
+    from apps.tournaments.services.completion import run_completion_job
+
+    job = run_completion_job(job_id)
+    return job.status if job is not None else None
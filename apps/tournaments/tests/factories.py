@@ -0,0 +1,68 @@
+"""
+Общие заготовки тестов: круговой турнир с форматом «1 сет» и пустым регламентом,
+игроки «Игрок{i} Тест», парные команды и матчи с сетами.
+"""
+from typing import Iterable, Optional, Sequence, Tuple
+
+from apps.matches.models import Match, MatchSet
+from apps.players.models import Player
+from apps.teams.models import Team
+from apps.tournaments.models import Ruleset, SetFormat, Tournament
+
+# Пары ab/cd/ac/bd для четырёх игроков: каждый играет с каждым и вместе, и против
+CROSS_PAIRS = ((0, 1), (2, 3), (0, 2), (1, 3))
+
+
+def round_robin_fields() -> dict:
+    """Поля system/set_format/ruleset кругового турнира для Tournament.objects.create(**...)."""
+    return dict(
+        system=Tournament.System.ROUND_ROBIN,
+        set_format=SetFormat.objects.get_or_create(name="Тест 1 сет")[0],
+        ruleset=Ruleset.objects.get_or_create(name="Тест регламент", defaults={"ordering_priority": []})[0],
+    )
+
+
+def make_round_robin(name: str = "Тест", date="2026-01-01", **fields) -> Tournament:
+    """Круговой турнир; любые поля переопределяются через fields."""
+    return Tournament.objects.create(**{**round_robin_fields(), "name": name, "date": date, **fields})
+
+
+def make_players(n: int, **fields) -> list[Player]:
+    """n игроков «Игрок{i} Тест» одним запросом; значение-функция в fields вызывается с индексом игрока."""
+    return Player.objects.bulk_create([
+        Player(**{
+            "last_name": f"Игрок{i}",
+            "first_name": "Тест",
+            **{key: value(i) if callable(value) else value for key, value in fields.items()},
+        })
+        for i in range(n)
+    ])
+
+
+def make_pair_teams(
+    players: Sequence[Player],
+    pairs: Optional[Iterable[Tuple[int, int]]] = None,
+) -> list[Team]:
+    """Парные команды по индексам игроков; по умолчанию — соседние (0, 1), (2, 3), ..."""
+    if pairs is None:
+        pairs = [(i, i + 1) for i in range(0, len(players) - 1, 2)]
+    return Team.objects.bulk_create([Team(player_1=players[a], player_2=players[b]) for a, b in pairs])
+
+
+def make_match(
+    tournament: Tournament,
+    team_1: Team,
+    team_2: Optional[Team] = None,
+    winner: Optional[Team] = None,
+    sets: Iterable[Tuple[int, int]] = (),
+    **fields,
+) -> Match:
+    """Матч турнира; с победителем — завершённый. sets — счёт (games_1, games_2) по сетам."""
+    if winner is not None:
+        fields.setdefault("status", Match.Status.COMPLETED)
+    match = Match.objects.create(tournament=tournament, team_1=team_1, team_2=team_2, winner=winner, **fields)
+    MatchSet.objects.bulk_create([
+        MatchSet(match=match, index=index, games_1=games_1, games_2=games_2)
+        for index, (games_1, games_2) in enumerate(sets, start=1)
+    ])
+    return match
@@ -2,7 +2,15 @@
 Тесты для расчета коэффициента турнира.
 """
 from django.test import TestCase
-from apps.tournaments.services.coefficient_calculator import calculate_tournament_coefficient
+from apps.teams.models import Team
+from apps.tournaments.models import Tournament, TournamentEntry
+from apps.tournaments.services.coefficient_calculator import (
+    auto_calculate_tournament_coefficient,
+    calculate_tournament_coefficient,
+    get_tournaments_participant_stats,
+    recalculate_tournament_coefficients,
+)
+from apps.tournaments.tests.factories import make_players, round_robin_fields
 
 
 class TournamentCoefficientTestCase(TestCase):
@@ -171,3 +179,40 @@ class TournamentCoefficientTestCase(TestCase):
         # Элитный всероссийский турнир с призами (1400 = строка >1200, 40 участников = столбец >24)
         coef4 = calculate_tournament_coefficient(avg_rating=1400, participants_count=40, has_prize_fund=True)
         self.assertAlmostEqual(coef4, 1.6, places=5)  # 1.4 + 0.2
+
+
+class BatchTournamentCoefficientTestCase(TestCase):
+    """Пакетный пересчет коэффициентов: один запрос на статистику и один bulk_update"""
+
+    @classmethod
+    def setUpTestData(cls):
+        common = dict(date="2026-06-01", **round_robin_fields())
+        cls.strong = Tournament.objects.create(name="Сильный", prize_fund="10000", **common)
+        cls.weak = Tournament.objects.create(name="Слабый", **common)
+        cls.empty = Tournament.objects.create(name="Пустой", rating_coefficient=0.5, **common)
+        players = make_players(4, current_rating=lambda i: (1300, 1100, 700, 0)[i])
+        # Игрок2 играет в обоих турнирах, в сильном — без пары
+        for tournament, pairs in (
+            (cls.strong, [(0, 1), (2, None)]),
+            (cls.weak, [(2, 3)]),
+        ):
+            for p1, p2 in pairs:
+                team = Team.objects.create(player_1=players[p1], player_2=players[p2] if p2 is not None else None)
+                TournamentEntry.objects.create(tournament=tournament, team=team)
+
+    def test_batch_matches_single_calculation(self):
+        with self.assertNumQueries(1):
+            stats = get_tournaments_participant_stats([self.strong.id, self.weak.id, self.empty.id])
+        self.assertEqual(stats, {self.strong.id: (3100 / 3, 2), self.weak.id: (350.0, 1), self.empty.id: (None, 0)})
+
+        tournaments = Tournament.objects.filter(id__in=[self.strong.id, self.weak.id, self.empty.id])
+        with self.assertNumQueries(3):  # турниры, статистика, bulk_update
+            coefficients = recalculate_tournament_coefficients(tournaments)
+        self.assertEqual(coefficients[self.weak.id], 0.6)
+        self.assertEqual(coefficients[self.empty.id], 0.8)  # нет участников — рейтинг 1000
+        self.assertAlmostEqual(coefficients[self.strong.id], 1.0)  # 0.8 + призовой фонд
+
+        saved = dict(Tournament.objects.values_list("id", "rating_coefficient"))
+        for tournament_id, coefficient in coefficients.items():
+            self.assertEqual(saved[tournament_id], coefficient)
+            self.assertEqual(auto_calculate_tournament_coefficient(tournament_id), coefficient)
@@ -0,0 +1,93 @@
+"""
+Тесты конвейера завершения турнира.
+"""
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.players.models import PlayerRatingDynamic, PlayerRatingHistory
+from apps.tournaments.models import Tournament, TournamentCompletionJob
+from apps.tournaments.services import completion
+from apps.tournaments.services.completion import IncompleteMatchesError, request_completion, run_completion_job
+from apps.tournaments.tests.factories import make_match, make_pair_teams, make_players, make_round_robin
+
+
+class CompletionPipelineTestCase(TestCase):
+    """Этапы завершения, фоновая задача мастер-турнира и откат при ошибке этапа"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="admin", password="x", is_staff=True, is_superuser=True)
+        cls.master = make_round_robin("Мастер", "2026-06-01")
+        cls.stage = make_round_robin("Финал", "2026-06-01", parent_tournament=cls.master, stage_order=1)
+        cls.players = make_players(4, current_rating=lambda i: 1000 if i else 0)
+        team_1, team_2 = make_pair_teams(cls.players)
+        for tournament in (cls.master, cls.stage):
+            make_match(tournament, team_1, team_2, team_1, sets=[(6, 3)])
+        cls.pending = make_match(cls.stage, team_2, team_1)
+
+    def test_background_master_completion(self):
+        with self.assertRaises(IncompleteMatchesError):
+            request_completion(self.stage)
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            job, queued = request_completion(self.stage, force=True, user=self.user)
+        self.assertEqual((job.tournament_id, queued, len(callbacks)), (self.master.id, True, 1))
+        # Повторный запрос, пока задача не выполнена, возвращает ту же задачу
+        self.assertEqual(request_completion(self.master, force=True), (job, False))
+
+        job = run_completion_job(job.id)
+        self.assertEqual(job.status, TournamentCompletionJob.Status.DONE)
+        self.assertEqual(
+            list(job.timings), [completion.STAGE_VALIDATE, completion.STAGE_SEED_RATINGS, completion.STAGE_RATINGS,
+                                completion.STAGE_PLACEMENTS, completion.STAGE_CACHES],
+        )
+        self.assertEqual(
+            set(Tournament.objects.filter(id__in=[self.master.id, self.stage.id]).values_list("status", flat=True)),
+            {Tournament.Status.COMPLETED},
+        )
+        self.assertEqual(PlayerRatingDynamic.objects.filter(tournament=self.master).count(), 4)
+        self.assertEqual(PlayerRatingHistory.objects.filter(tournament__in=[self.master, self.stage]).count(), 8)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        data = client.get(reverse("tournament-completion-job", args=[job.id])).json()
+        self.assertEqual((data["job"]["status"], data["job"]["stage"]), ("done", completion.STAGE_CACHES))
+
+    def test_failed_stage_rolls_back_completion(self):
+        self.pending.delete()
+        with mock.patch.object(completion, "recalc_tournament_placements", side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError), self.assertLogs(completion.logger, "ERROR"):
+                completion.complete_tournament(self.master)
+        self.master.refresh_from_db()
+        self.players[0].refresh_from_db()
+        self.assertEqual(self.master.status, Tournament.Status.CREATED)
+        self.assertEqual(self.players[0].current_rating, 0)
+        self.assertFalse(PlayerRatingHistory.objects.exists())
+
+        result = completion.complete_tournament(self.master)
+        self.assertTrue(result.rating_calculated)
+        self.assertEqual(result.seeded_players, 1)
+        self.master.refresh_from_db()
+        self.assertEqual(self.master.status, Tournament.Status.COMPLETED)
+
+    def test_stage_progress_written_through_separate_connection(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            job, _ = request_completion(self.master, force=True)
+        progress_connection = mock.MagicMock(vendor="postgresql")
+        progress_connection.ops.quote_name = lambda name: f'"{name}"'
+        cursor = progress_connection.cursor.return_value.__enter__.return_value
+
+        with mock.patch.object(completion.connections, "create_connection", return_value=progress_connection):
+            run_completion_job(job.id)
+
+        self.assertEqual(
+            [call.args[1] for call in cursor.execute.call_args_list],
+            [[stage, job.id] for stage in (completion.STAGE_VALIDATE, completion.STAGE_SEED_RATINGS,
+                                           completion.STAGE_RATINGS, completion.STAGE_PLACEMENTS,
+                                           completion.STAGE_CACHES)],
+        )
+        progress_connection.close.assert_called_once()
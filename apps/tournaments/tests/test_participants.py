@@ -0,0 +1,100 @@
+"""
+Тесты пакетных операций с участниками турнира.
+"""
+from unittest import mock
+
+from django.test import TestCase
+
+from apps.teams.models import Team
+from apps.tournaments.models import (
+    Tournament,
+    TournamentAnnouncementSettings,
+    TournamentEntry,
+)
+from apps.tournaments.registration_models import TournamentRegistration
+from apps.tournaments.services import participants
+from apps.tournaments.tests.factories import make_players, make_round_robin
+
+
+class ParticipantsBulkTestCase(TestCase):
+    """Пакетная запись участников и однопроходная синхронизация регистраций"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tournament = make_round_robin("Пакетный турнир", planned_participants=2)
+        cls.teams = Team.objects.bulk_create([Team(player_1=p) for p in make_players(4)])
+
+    def _registration_statuses(self):
+        return dict(
+            TournamentRegistration.objects.filter(tournament=self.tournament).values_list(
+                'team_id', 'status'
+            )
+        )
+
+    def test_bulk_add_creates_registrations_in_order(self):
+        participants.bulk_add_entries(
+            self.tournament, [(team.id, None, None) for team in self.teams[:3]]
+        )
+
+        statuses = self._registration_statuses()
+        self.assertEqual(statuses[self.teams[0].id], TournamentRegistration.Status.MAIN_LIST)
+        self.assertEqual(statuses[self.teams[1].id], TournamentRegistration.Status.MAIN_LIST)
+        self.assertEqual(statuses[self.teams[2].id], TournamentRegistration.Status.RESERVE_LIST)
+
+    def test_replace_keeps_existing_and_removes_dropped(self):
+        participants.bulk_add_entries(
+            self.tournament, [(team.id, None, None) for team in self.teams[:2]]
+        )
+        kept_registration = TournamentRegistration.objects.get(
+            tournament=self.tournament, team=self.teams[0]
+        )
+
+        participants.replace_entries(
+            self.tournament, [(self.teams[0].id, 1, 2), (self.teams[3].id, 1, 1)]
+        )
+
+        positions = dict(
+            TournamentEntry.objects.filter(tournament=self.tournament).values_list(
+                'team_id', 'row_index'
+            )
+        )
+        self.assertEqual(positions, {self.teams[0].id: 2, self.teams[3].id: 1})
+        statuses = self._registration_statuses()
+        self.assertEqual(set(statuses), {self.teams[0].id, self.teams[3].id})
+        self.assertTrue(
+            TournamentRegistration.objects.filter(pk=kept_registration.pk).exists()
+        )
+
+    def test_save_uses_loaded_state_instead_of_refetch(self):
+        tournament = Tournament.objects.get(pk=self.tournament.pk)
+        tournament.status = Tournament.Status.ACTIVE
+
+        # Только UPDATE: старое значение planned_participants берётся из загруженного экземпляра
+        with self.assertNumQueries(1):
+            tournament.save(update_fields=['status'])
+
+    def test_single_entry_save_creates_registration(self):
+        # Обычное (не пакетное) сохранение проходит через сигналы регистрации и анонса состава
+        TournamentEntry.objects.create(tournament=self.tournament, team=self.teams[0])
+        self.assertEqual(
+            list(TournamentRegistration.objects.filter(tournament=self.tournament).values_list('team_id', flat=True)),
+            [self.teams[0].id],
+        )
+
+    def test_bulk_announcement_respects_roster_hash(self):
+        TournamentAnnouncementSettings.objects.create(
+            tournament=self.tournament, telegram_chat_id="-100", send_on_roster_change=True
+        )
+        entries = [(team.id, None, None) for team in self.teams[:2]]
+
+        with mock.patch("apps.telegram_bot.tasks.send_tournament_announcement_to_chat.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                participants.bulk_add_entries(self.tournament, entries)
+            # Состав тот же — повторный анонс не отправляется
+            with self.captureOnCommitCallbacks(execute=True):
+                participants.replace_entries(self.tournament, entries)
+
+        delay.assert_called_once_with(self.tournament.id, 'roster_change')
+        self.assertTrue(
+            TournamentAnnouncementSettings.objects.get(tournament=self.tournament).roster_hash
+        )
@@ -0,0 +1,114 @@
+"""
+Тесты пакетного пересчёта очереди регистраций (основной состав / резерв).
+"""
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.teams.models import Team
+from apps.tournaments.models import (
+    Tournament,
+    TournamentAnnouncementSettings,
+    TournamentEntry,
+)
+from apps.tournaments.registration_models import TournamentRegistration
+from apps.tournaments.services.registration_service import RegistrationService
+from apps.tournaments.tests.factories import make_players, round_robin_fields
+
+
+class RegistrationQueueRecalculationTestCase(TestCase):
+    """Пересчёт статусов выполняется за фиксированное число запросов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.common = round_robin_fields()
+
+    def _make_tournament(self, teams_count: int, planned: int, with_entries: bool = True) -> Tournament:
+        tournament = Tournament.objects.create(
+            name=f"Очередь {teams_count}", date="2026-01-01", planned_participants=planned, **self.common
+        )
+        players = make_players(teams_count, first_name=f"T{tournament.pk}")
+        teams = Team.objects.bulk_create([Team(player_1=p) for p in players])
+        if with_entries:
+            TournamentEntry.objects.bulk_create([TournamentEntry(tournament=tournament, team=t) for t in teams])
+        TournamentRegistration.objects.bulk_create(
+            [
+                TournamentRegistration(
+                    tournament=tournament,
+                    player=team.player_1,
+                    team=team,
+                    status=TournamentRegistration.Status.RESERVE_LIST,
+                    registration_order=i + 1,
+                )
+                for i, team in enumerate(teams)
+            ]
+        )
+        return tournament
+
+    def _recalculate_and_count_queries(self, tournament: Tournament) -> int:
+        with CaptureQueriesContext(connection) as ctx:
+            RegistrationService._recalculate_registration_statuses(tournament)
+        return len(ctx.captured_queries)
+
+    def test_fills_main_list_in_registration_order(self):
+        tournament = self._make_tournament(teams_count=5, planned=2)
+
+        RegistrationService._recalculate_registration_statuses(tournament)
+
+        statuses = list(
+            TournamentRegistration.objects.filter(tournament=tournament)
+            .order_by('registration_order')
+            .values_list('status', flat=True)
+        )
+        self.assertEqual(
+            statuses,
+            [TournamentRegistration.Status.MAIN_LIST] * 2 + [TournamentRegistration.Status.RESERVE_LIST] * 3,
+        )
+
+    def test_creates_missing_entries(self):
+        tournament = self._make_tournament(teams_count=3, planned=3, with_entries=False)
+
+        RegistrationService._recalculate_registration_statuses(tournament)
+
+        self.assertEqual(TournamentEntry.objects.filter(tournament=tournament).count(), 3)
+
+    def test_demotes_overflow_when_limit_decreases(self):
+        tournament = self._make_tournament(teams_count=4, planned=4)
+        RegistrationService._recalculate_registration_statuses(tournament)
+
+        Tournament.objects.filter(pk=tournament.pk).update(planned_participants=1)
+        RegistrationService._recalculate_registration_statuses(tournament)
+
+        main_orders = list(
+            TournamentRegistration.objects.filter(
+                tournament=tournament, status=TournamentRegistration.Status.MAIN_LIST
+            ).values_list('registration_order', flat=True)
+        )
+        self.assertEqual(main_orders, [1])
+
+    def test_constant_number_of_queries(self):
+        small = self._make_tournament(teams_count=10, planned=5)
+        large = self._make_tournament(teams_count=200, planned=100)
+
+        self.assertEqual(
+            self._recalculate_and_count_queries(small),
+            self._recalculate_and_count_queries(large),
+        )
+
+    def test_roster_change_announced_once_when_teams_move(self):
+        tournament = self._make_tournament(teams_count=3, planned=2)
+        TournamentAnnouncementSettings.objects.create(
+            tournament=tournament, telegram_chat_id="-100", send_on_roster_change=True
+        )
+
+        with mock.patch("apps.telegram_bot.tasks.send_status_changed_notification.delay"), \
+                mock.patch("apps.telegram_bot.tasks.send_tournament_announcement_to_chat.delay") as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                RegistrationService._recalculate_registration_statuses(tournament)
+            # Повторный пересчёт ничего не меняет — анонса нет
+            with self.captureOnCommitCallbacks(execute=True):
+                RegistrationService._recalculate_registration_statuses(tournament)
+
+        delay.assert_called_once_with(tournament.id, 'roster_change')
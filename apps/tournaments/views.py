@@ -357,8 +357,13 @@ def delete_tournament(request: HttpRequest, pk: int):
     # Запрещаем удалять завершённый турнир через HTTP-обработчик
     if t.status == Tournament.Status.COMPLETED:
         return HttpResponseBadRequest("tournament is completed")
+    from apps.matches.models import Match
+    from apps.players.services.pair_stats import match_player_ids, refresh_pair_stats
+
+    affected_players = match_player_ids(Match.objects.filter(tournament=t))
     # Каскадное удаление произойдёт по FK связям (Match, TournamentEntry, пр.)
     t.delete()
+    refresh_pair_stats(affected_players)
     return redirect("tournaments")
 
 
@@ -512,12 +517,21 @@ def save_participants(request: HttpRequest, pk: int):
     # 3) Удаляем устаревшие матчи (их пары не присутствуют в new_pairs)
     # Сужаемся только на матчи группового этапа этого турнира, чтобы не трогать другие стадии
     to_check = Match.objects.filter(tournament=t, stage=Match.Stage.GROUP).only("id", "team_1_id", "team_2_id")
-    removed = 0
+    stale_ids = []
     for m in to_check:
         pair_norm = (min(m.team_1_id, m.team_2_id), max(m.team_1_id, m.team_2_id))
         if pair_norm not in new_pairs:
-            m.delete()
-            removed += 1
+            stale_ids.append(m.id)
+    if stale_ids:
+        from apps.players.services.pair_stats import match_player_ids, refresh_pair_stats
+        from apps.players.services.summary_stats import invalidate_tournament_days
+
+        stale = Match.objects.filter(id__in=stale_ids)
+        affected_players = match_player_ids(stale)
+        stale.delete()
+        refresh_pair_stats(affected_players)
+        if affected_players:
+            invalidate_tournament_days([t.id])
 
     return JsonResponse({"ok": True, "saved": created_entries})
 
@@ -14,9 +14,18 @@ interface InitialRatingPlayerItem {
     city: string;
     birth_date: string | null;
     suggested_rating_from_btr: number;
+    match_score: number;
+    exact_match: boolean;
   }>;
 }
 
+// Связь с BTR предвыбирается, только если кандидат с точным совпадением ФИО ровно один
+const preselectedCandidate = (p: InitialRatingPlayerItem) => {
+  if (p.has_btr || !p.btr_candidates) return null;
+  const exact = p.btr_candidates.filter(c => c.exact_match);
+  return exact.length === 1 ? exact[0] : null;
+};
+
 interface Props {
   tournamentId: number;
   open: boolean;
@@ -45,9 +54,10 @@ export const InitialRatingModal: React.FC<Props> = ({ tournamentId, open, onClos
         const l: Record<number, number | null> = {};
         list.forEach(p => {
           let base = p.default_rating || 1000;
-          if (!p.has_btr && p.btr_candidates && p.btr_candidates.length === 1) {
-            base = p.btr_candidates[0].suggested_rating_from_btr;
-            l[p.player_id] = p.btr_candidates[0].id;
+          const cand = preselectedCandidate(p);
+          if (cand) {
+            base = cand.suggested_rating_from_btr;
+            l[p.player_id] = cand.id;
           } else {
             l[p.player_id] = null;
           }
@@ -96,9 +106,10 @@ export const InitialRatingModal: React.FC<Props> = ({ tournamentId, open, onClos
       const l: Record<number, number | null> = {};
       list.forEach(p => {
         let base = p.default_rating || 1000;
-        if (!p.has_btr && p.btr_candidates && p.btr_candidates.length === 1) {
-          base = p.btr_candidates[0].suggested_rating_from_btr;
-          l[p.player_id] = p.btr_candidates[0].id;
+        const cand = preselectedCandidate(p);
+        if (cand) {
+          base = cand.suggested_rating_from_btr;
+          l[p.player_id] = cand.id;
         } else {
           l[p.player_id] = null;
         }
@@ -220,7 +231,7 @@ export const InitialRatingModal: React.FC<Props> = ({ tournamentId, open, onClos
                           <option value="">Не связывать с РПТТ</option>
                           {p.btr_candidates.map(c => (
                             <option key={c.id} value={c.id}>
-                              {c.full_name} (РНИ {c.rni}{c.city ? `, ${c.city}` : ''}{c.birth_date ? `, ${c.birth_date}` : ''})
+                              {c.full_name} (РНИ {c.rni}{c.city ? `, ${c.city}` : ''}{c.birth_date ? `, ${c.birth_date}` : ''}){c.exact_match ? '' : ` — похоже на ${Math.round(c.match_score * 100)}%`}
                             </option>
                           ))}
                         </select>
@@ -585,8 +585,12 @@ export const KnockoutPage: React.FC = () => {
     if (!tMeta || !canManageStructure) return;
     setSaving(true);
     try {
-      // Используем complete_master для завершения всех стадий турнира
-      await api.post(`/tournaments/${tMeta.id}/complete_master/`, { force });
+      // Используем complete_master для завершения всех стадий турнира (фоновая задача с опросом статуса)
+      const result = await tournamentApi.completeMaster(tMeta.id, force);
+      if (!result.ok) {
+        alert(result.error || 'Ошибка завершения турнира');
+        return;
+      }
       alert('Турнир завершён, рейтинг рассчитан для всех стадий');
       window.location.href = '/tournaments';
     } catch (e: any) {
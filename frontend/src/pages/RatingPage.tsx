@@ -31,6 +31,7 @@ interface BtrCategoryData {
   results: BtrLeaderboardItem[];
   latest_date: string;
   total: number;
+  total_pages: number;
 }
 
 // Маппинг категорий BTR
@@ -50,10 +51,8 @@ const BtrCategoryTable: React.FC<{
   q: string;
   btrCategories: Record<string, BtrCategoryData>;
   selectedBtrCategory: string;
-  page: number;
-  pageSize: number;
   navigate: any;
-}> = ({ loading, error, q, btrCategories, selectedBtrCategory, page, pageSize, navigate }) => {
+}> = ({ loading, error, q, btrCategories, selectedBtrCategory, navigate }) => {
   // Получаем данные выбранной категории
   const categoryCode = BTR_CATEGORY_MAP[selectedBtrCategory]?.code;
   const categoryData = categoryCode ? btrCategories[categoryCode] : null;
@@ -62,10 +61,8 @@ const BtrCategoryTable: React.FC<{
   // Проверяем, является ли категория юниорской (MU или WU)
   const isJuniorCategory = selectedBtrCategory === 'MU' || selectedBtrCategory === 'WU';
   
-  // Пагинация
-  const startIdx = (page - 1) * pageSize;
-  const endIdx = startIdx + pageSize;
-  const pageResults = categoryData?.results.slice(startIdx, endIdx) || [];
+  // Сервер возвращает уже нужную страницу
+  const pageResults = categoryData?.results || [];
   
   return (
     <div>
@@ -205,14 +202,12 @@ export const RatingPage: React.FC = () => {
             setSelectedPlayerId((data.results || [])[0].id);
           }
         } else {
-          // Загрузка BTR рейтинга (все категории)
-          const data = await btrApi.leaderboard({ q });
-          setBtrCategories(data.categories || {});
-          // Вычисляем пагинацию для выбранной категории
+          // Загрузка BTR рейтинга (страница выбранной категории)
           const categoryCode = BTR_CATEGORY_MAP[selectedBtrCategory]?.code;
+          const data = await btrApi.leaderboard({ q, category: categoryCode, page, page_size: pageSize });
+          setBtrCategories(data.categories || {});
           const categoryData = categoryCode ? data.categories[categoryCode] : null;
-          const total = categoryData?.total || 0;
-          setTotalPages(Math.ceil(total / pageSize) || 1);
+          setTotalPages(categoryData?.total_pages || 1);
         }
       } catch (e: any) {
         setError(e?.response?.data?.error || 'Не удалось загрузить рейтинг');
@@ -463,8 +458,6 @@ export const RatingPage: React.FC = () => {
               q={q}
               btrCategories={btrCategories}
               selectedBtrCategory={selectedBtrCategory}
-              page={page}
-              pageSize={pageSize}
               navigate={navigate}
             />
           )}
@@ -1851,8 +1851,12 @@ export const TournamentDetailPage: React.FC = () => {
     if (!t) return;
     setSaving(true);
     try {
-      // Используем complete_master для завершения всех стадий турнира
-      await api.post(`/tournaments/${t.id}/complete_master/`, { force });
+      // Используем complete_master для завершения всех стадий турнира (фоновая задача с опросом статуса)
+      const result = await tournamentApi.completeMaster(t.id, force);
+      if (!result.ok) {
+        alert(result.error || 'Ошибка при завершении турнира');
+        return;
+      }
       alert('Турнир завершён, рейтинг рассчитан для всех стадий');
       // Перенаправить на страницу списка турниров
       window.location.href = '/tournaments';
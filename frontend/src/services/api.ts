@@ -176,6 +176,41 @@ export interface ScheduleConflictsResponse {
   }>;
 }
 
+export type ScheduleExportFormat = 'pdf' | 'docx' | 'xlsx' | 'numbers';
+
+export interface ScheduleExportJobDTO {
+  id: number;
+  schedule_id: number;
+  format: ScheduleExportFormat;
+  status: 'pending' | 'running' | 'done' | 'failed';
+  content_version: string;
+  created_at: string;
+  finished_at: string | null;
+  error: string | null;
+  detail: string | null;
+  download_url: string | null;
+}
+
+const EXPORT_POLL_INTERVAL_MS = 1000;
+const EXPORT_POLL_TIMEOUT_MS = 5 * 60 * 1000;
+
+export interface TournamentCompletionJobDTO {
+  id: number;
+  tournament_id: number;
+  status: 'pending' | 'running' | 'done' | 'failed';
+  stage: string | null;
+  timings: Record<string, number>;
+  created_at: string;
+  started_at: string | null;
+  finished_at: string | null;
+  error: string | null;
+  detail: string | null;
+  status_url: string;
+}
+
+const COMPLETION_POLL_INTERVAL_MS = 1500;
+const COMPLETION_POLL_TIMEOUT_MS = 10 * 60 * 1000;
+
 export interface Ruleset {
   id: number;
   name: string;
@@ -815,13 +850,32 @@ export const tournamentApi = {
     return data;
   },
 
-  // Завершить мастер-турнир (все стадии)
+  // Завершить мастер-турнир (все стадии): задача в очереди на сервере, опрос статуса до готовности.
+  // Незавершённые матчи проверяются сразу — ответ 400 с текстом вопроса про force.
   completeMaster: async (
     tournamentId: number,
     force: boolean = false,
   ): Promise<{ ok: boolean; message?: string; error?: string }> => {
-    const { data } = await api.post(`/tournaments/${tournamentId}/complete_master/`, { force });
-    return data;
+    const { data } = await api.post(`/tournaments/${tournamentId}/complete_master/`, { force, background: true });
+    let job: TournamentCompletionJobDTO = data.job;
+    const startedAt = Date.now();
+    while (job.status === 'pending' || job.status === 'running') {
+      if (Date.now() - startedAt > COMPLETION_POLL_TIMEOUT_MS) {
+        return { ok: false, error: 'Завершение турнира ещё выполняется, обновите страницу позже' };
+      }
+      await new Promise((resolve) => setTimeout(resolve, COMPLETION_POLL_INTERVAL_MS));
+      const resp = await api.get(`/tournaments/completion_jobs/${job.id}/`);
+      job = resp.data.job;
+    }
+    if (job.status !== 'done') {
+      if (job.error === 'queue_unavailable') {
+        // Очередь задач недоступна — синхронное завершение
+        const resp = await api.post(`/tournaments/${tournamentId}/complete_master/`, { force });
+        return resp.data;
+      }
+      return { ok: false, error: job.detail || job.error || 'Ошибка завершения турнира' };
+    }
+    return { ok: true };
   },
 
   complete: async (tournamentId: number, force: boolean = false) => {
@@ -1025,25 +1079,40 @@ export const scheduleApi = {
     const { data } = await api.post(`/schedules/${scheduleId}/waves/remove/`, payload);
     return data;
   },
-  exportPdf: async (scheduleId: number): Promise<Blob> => {
-    const resp = await api.get(`/schedules/${scheduleId}/export/pdf/`, { responseType: 'blob' });
+  // Выгрузка расписания: задача в очереди на сервере, опрос статуса, скачивание готового файла.
+  // Пока расписание не менялось, сервер сразу возвращает уже собранный файл.
+  exportFile: async (scheduleId: number, format: ScheduleExportFormat): Promise<Blob> => {
+    const variant = format === 'numbers' ? '?variant=numbers' : '';
+    const { data } = await api.post(`/schedules/${scheduleId}/exports/`, { format });
+    let job: ScheduleExportJobDTO = data.job;
+    const startedAt = Date.now();
+    while (job.status === 'pending' || job.status === 'running') {
+      if (Date.now() - startedAt > EXPORT_POLL_TIMEOUT_MS) {
+        throw new Error('Выгрузка не завершилась вовремя, попробуйте позже');
+      }
+      await new Promise((resolve) => setTimeout(resolve, EXPORT_POLL_INTERVAL_MS));
+      const resp = await api.get(`/schedules/exports/${job.id}/${variant}`);
+      job = resp.data.job;
+    }
+    if (job.status !== 'done') {
+      if (job.error === 'queue_unavailable') {
+        // Очередь задач недоступна — синхронная выгрузка
+        const resp = await api.get(`/schedules/${scheduleId}/export/${format}/`, { responseType: 'blob' });
+        return resp.data;
+      }
+      throw new Error(job.detail || job.error || 'Не удалось выгрузить расписание');
+    }
+    const resp = await api.get(`/schedules/exports/${job.id}/download/${variant}`, { responseType: 'blob' });
     return resp.data;
   },
 
-  exportDocx: async (scheduleId: number): Promise<Blob> => {
-    const resp = await api.get(`/schedules/${scheduleId}/export/docx/`, { responseType: 'blob' });
-    return resp.data;
-  },
+  exportPdf: async (scheduleId: number): Promise<Blob> => scheduleApi.exportFile(scheduleId, 'pdf'),
 
-  exportXlsx: async (scheduleId: number): Promise<Blob> => {
-    const resp = await api.get(`/schedules/${scheduleId}/export/xlsx/`, { responseType: 'blob' });
-    return resp.data;
-  },
+  exportDocx: async (scheduleId: number): Promise<Blob> => scheduleApi.exportFile(scheduleId, 'docx'),
 
-  exportNumbers: async (scheduleId: number): Promise<Blob> => {
-    const resp = await api.get(`/schedules/${scheduleId}/export/numbers/`, { responseType: 'blob' });
-    return resp.data;
-  },
+  exportXlsx: async (scheduleId: number): Promise<Blob> => scheduleApi.exportFile(scheduleId, 'xlsx'),
+
+  exportNumbers: async (scheduleId: number): Promise<Blob> => scheduleApi.exportFile(scheduleId, 'numbers'),
 };
 
 // API методы для игроков
@@ -1421,12 +1490,18 @@ export const btrApi = {
   // Таблица лидеров BTR (все 6 категорий)
   leaderboard: async (params?: {
     q?: string;
+    category?: string;
+    page?: number;
+    page_size?: number;
   }): Promise<{
     categories: Record<string, {
       label: string;
       results: BtrLeaderboardItem[];
       latest_date: string;
       total: number;
+      page: number;
+      page_size: number;
+      total_pages: number;
     }>;
   }> => {
     const { data } = await api.get('/btr/leaderboard/', { params });
@@ -0,0 +1,221 @@
+"""
+Инструментирование HTTP-запросов: SQL-запросы, время БД и время ответа по view.
+
+QueryInstrumentationMiddleware (включается REQUEST_INSTRUMENTATION=1) оборачивает
+выполнение SQL на всех подключениях (connection.execute_wrapper) и для каждого
+запроса считает число запросов, суммарное время БД, повторы одного и того же
+SQL (отпечаток — текст запроса без параметров, списки IN свёрнуты) и полное
+время ответа. Итог:
+
+- заголовок Server-Timing (db, app, total) — виден во вкладке Network браузера;
+- метрики по имени view (resolver_match.view_name, для ViewSet — имя действия)
+  в формате Prometheus по REQUEST_METRICS_PATH (metrics_view);
+- предупреждение в лог для запросов сверх порогов (время, число запросов,
+  повторы) с самыми частыми повторяющимися SQL — так находятся N+1.
+
+Метрики копятся в памяти процесса (как у бота и пула PDF): каждый воркер
+gunicorn отдаёт свои. Отдаются только персоналу (is_staff) или по заголовку
+Authorization: Bearer <REQUEST_METRICS_TOKEN>, остальным — 404.
+"""
+import hmac
+import logging
+import re
+import threading
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+from sandmatch.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Корзины гистограммы числа SQL-запросов на HTTP-запрос
+QUERY_COUNT_BUCKETS: Tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+# Сколько повторяющихся SQL показывать в логе медленного запроса
+TOP_REPEATED = 3
+
+_IN_LIST_RE = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def fingerprint(sql: str) -> str:
+    """Отпечаток SQL: литералы и списки IN (%s, %s, ...) заменены на ?, пробелы схлопнуты."""
+    sql = _IN_LIST_RE.sub("(?)", sql)
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    return _SPACES_RE.sub(" ", sql).strip()
+
+
+@dataclass
+class QueryStats:
+    """SQL одного HTTP-запроса"""
+
+    count: int = 0
+    seconds: float = 0.0
+    # отпечаток -> [число, суммарное время]
+    by_fingerprint: Dict[str, List[float]] = field(default_factory=dict)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            item = self.by_fingerprint.setdefault(fingerprint(sql), [0, 0.0])
+            item[0] += 1
+            item[1] += elapsed
+
+    @property
+    def duplicates(self) -> int:
+        """Лишние выполнения: повторы одного отпечатка сверх первого"""
+        return sum(int(count) - 1 for count, _ in self.by_fingerprint.values() if count > 1)
+
+    def top_repeated(self, limit: int = TOP_REPEATED) -> List[Tuple[str, int, float]]:
+        repeated = [(sql, int(count), seconds) for sql, (count, seconds) in self.by_fingerprint.items() if count > 1]
+        repeated.sort(key=lambda item: (-item[1], -item[2]))
+        return repeated[:limit]
+
+
+class _ViewMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.slow = 0
+        self.duplicates = 0
+        self.duration = Histogram()
+        self.db_duration = Histogram()
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+
+
+class RequestMetrics:
+    """Метрики HTTP-запросов по (view, метод)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.views: Dict[Tuple[str, str], _ViewMetrics] = {}
+
+    def observe(self, view: str, method: str, seconds: float, queries: QueryStats, slow: bool) -> None:
+        with self._lock:
+            item = self.views.get((view, method))
+            if item is None:
+                item = self.views[(view, method)] = _ViewMetrics()
+            item.requests += 1
+            item.slow += int(slow)
+            item.duplicates += queries.duplicates
+            item.duration.observe(seconds)
+            item.db_duration.observe(queries.seconds)
+            item.queries.observe(queries.count)
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            views = sorted(self.views.items())
+            sections = {
+                "http_requests_total": ["# TYPE http_requests_total counter"],
+                "http_slow_requests_total": ["# TYPE http_slow_requests_total counter"],
+                "http_duplicate_queries_total": ["# TYPE http_duplicate_queries_total counter"],
+                "http_request_duration_seconds": ["# TYPE http_request_duration_seconds histogram"],
+                "http_request_db_duration_seconds": ["# TYPE http_request_db_duration_seconds histogram"],
+                "http_request_db_queries": ["# TYPE http_request_db_queries histogram"],
+            }
+            for (view, method), item in views:
+                labels = f'view="{view}",method="{method}"'
+                sections["http_requests_total"].append(f"http_requests_total{{{labels}}} {item.requests}")
+                sections["http_slow_requests_total"].append(f"http_slow_requests_total{{{labels}}} {item.slow}")
+                sections["http_duplicate_queries_total"].append(f"http_duplicate_queries_total{{{labels}}} {item.duplicates}")
+                sections["http_request_duration_seconds"].extend(item.duration.render("http_request_duration_seconds", labels))
+                sections["http_request_db_duration_seconds"].extend(item.db_duration.render("http_request_db_duration_seconds", labels))
+                sections["http_request_db_queries"].extend(item.queries.render("http_request_db_queries", labels))
+        return "\n".join(line for lines in sections.values() for line in lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+def _server_timing(queries: QueryStats, seconds: float) -> str:
+    db_ms = queries.seconds * 1000
+    total_ms = seconds * 1000
+    return (
+        f'db;dur={db_ms:.1f};desc="{queries.count} queries, {queries.duplicates} dup", '
+        f"app;dur={max(total_ms - db_ms, 0.0):.1f}, total;dur={total_ms:.1f}"
+    )
+
+
+class QueryInstrumentationMiddleware:
+    """Число SQL-запросов, время БД, повторы и время ответа — в Server-Timing, метрики и лог порогов."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.metrics = request_metrics
+
+    def __call__(self, request):
+        if request.path == settings.REQUEST_METRICS_PATH:
+            return self.get_response(request)
+
+        queries = QueryStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        seconds = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name if match is not None else "") or "unresolved"
+        slow = (
+            seconds * 1000 >= settings.REQUEST_INSTRUMENTATION_SLOW_MS
+            or queries.count > settings.REQUEST_INSTRUMENTATION_MAX_QUERIES
+            or queries.duplicates > settings.REQUEST_INSTRUMENTATION_MAX_DUPLICATES
+        )
+        self.metrics.observe(view, request.method, seconds, queries, slow)
+        response["Server-Timing"] = _server_timing(queries, seconds)
+        if slow:
+            self._log(request, view, seconds, queries)
+        return response
+
+    @staticmethod
+    def _log(request, view: str, seconds: float, queries: QueryStats) -> None:
+        repeated = "".join(
+            f"\n  {count}× {total * 1000:.1f} мс: {sql[:300]}" for sql, count, total in queries.top_repeated()
+        )
+        logger.warning(
+            "[instrumentation] %s %s (%s): %.0f мс, запросов %s (%.0f мс БД), повторов %s%s",
+            request.method,
+            request.path,
+            view,
+            seconds * 1000,
+            queries.count,
+            queries.seconds * 1000,
+            queries.duplicates,
+            repeated,
+        )
+
+
+def _metrics_allowed(request) -> bool:
+    """Доступ к метрикам: персонал или совпавший REQUEST_METRICS_TOKEN."""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_active and user.is_staff:
+        return True
+    token = settings.REQUEST_METRICS_TOKEN
+    provided = request.headers.get("Authorization", "")
+    return bool(token) and hmac.compare_digest(provided, f"Bearer {token}")
+
+
+def metrics_view(request):
+    """Метрики запросов в формате Prometheus (только при включённом инструментировании)."""
+    if not settings.REQUEST_INSTRUMENTATION or not _metrics_allowed(request):
+        raise Http404
+    return HttpResponse(
+        request_metrics.render_prometheus(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,83 @@
+"""
+Жизненный цикл фоновых задач, хранящихся в БД: PENDING -> RUNNING -> DONE/FAILED.
+
+Модель задачи объявляет Status с PENDING/RUNNING/DONE/FAILED и поля error,
+error_detail, created_at, started_at, finished_at. Используется выгрузками
+расписаний (apps.schedules.services.exports) и завершением турниров
+(apps.tournaments.services.completion):
+
+- задача ставится в Celery после фиксации транзакции (enqueue_on_commit);
+  если брокер недоступен, она сразу помечается FAILED с ошибкой
+  queue_unavailable, и клиент не ждёт её вечно;
+- воркер берёт задачу атомарным UPDATE PENDING -> RUNNING (claim): задачу,
+  уже взятую другим воркером, второй пропускает;
+- задача в очереди/работе дольше stale_after считается потерянной (упал
+  воркер) и может быть поставлена заново (is_stale).
+"""
+import logging
+from datetime import timedelta
+from typing import Callable, Iterable
+
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+QUEUE_UNAVAILABLE = "queue_unavailable"
+
+
+def is_stale(job, stale_after: timedelta) -> bool:
+    """Задача висит в очереди/работе дольше stale_after"""
+    since = job.started_at or job.created_at
+    return since is not None and timezone.now() - since > stale_after
+
+
+def claim(model, job_id: int) -> bool:
+    """Взять задачу в работу: PENDING -> RUNNING одним UPDATE. False — задачу уже взяли."""
+    return bool(
+        model.objects.filter(id=job_id, status=model.Status.PENDING).update(
+            status=model.Status.RUNNING, started_at=timezone.now()
+        )
+    )
+
+
+def enqueue_on_commit(job, send: Callable[[int], object]) -> None:
+    """После фиксации транзакции вызвать send(job.id) (обычно task.delay); ошибка брокера — FAILED."""
+    model = type(job)
+
+    def _send():
+        try:
+            send(job.id)
+        except Exception as exc:
+            logger.exception("Не удалось поставить задачу %s #%s в очередь", model._meta.label, job.id)
+            model.objects.filter(id=job.id, status=model.Status.PENDING).update(
+                status=model.Status.FAILED,
+                error=QUEUE_UNAVAILABLE,
+                error_detail=str(exc),
+                finished_at=timezone.now(),
+            )
+            job.refresh_from_db()
+
+    transaction.on_commit(_send)
+
+
+def mark_failed(job, error: str, detail: str, update_fields: Iterable[str] = ()) -> None:
+    """Пометить задачу FAILED; update_fields — дополнительные поля модели для сохранения"""
+    job.status = type(job).Status.FAILED
+    job.error = error[:64]
+    job.error_detail = detail
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", *update_fields, "error", "error_detail", "finished_at"])
+
+
+def job_payload(job) -> dict:
+    """Общие поля статуса задачи для API"""
+    return {
+        "id": job.id,
+        "status": job.status,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "error": job.error or None,
+        "detail": job.error_detail or None,
+    }
@@ -0,0 +1,21 @@
+"""
+Состояние модели на момент загрузки из БД.
+
+LoadedValuesMixin запоминает значения полей, прочитанные из БД (from_db), в
+instance._loaded_values. Сигналы pre_save/post_save сравнивают с ними старые
+значения без повторного запроса строки. Для экземпляров, созданных вручную
+(не загруженных из БД), _loaded_values отсутствует.
+"""
+from django.db import models
+
+
+class LoadedValuesMixin:
+    """Запоминает значения полей при загрузке экземпляра из БД"""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if value is not models.DEFERRED
+        }
+        return instance
@@ -160,6 +160,34 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
 
+# ===========================
+# PDF rendering (headless Chromium pool)
+# ===========================
+# Прогретые браузеры на процесс: apps/schedules/services/pdf_render_pool.py.
+# PDF выгрузок рендерят воркеры Celery, и каждый prefork-процесс держит свой пул:
+# всего браузеров = concurrency воркера × PDF_RENDER_POOL_SIZE. Поэтому сервису
+# celery в docker-compose размер пула задан отдельно (CELERY_PDF_RENDER_POOL_SIZE, по умолчанию 1)
+PDF_RENDER_POOL_SIZE = int(os.getenv("PDF_RENDER_POOL_SIZE", "2"))
+PDF_RENDER_QUEUE_TIMEOUT = float(os.getenv("PDF_RENDER_QUEUE_TIMEOUT", "20"))
+PDF_RENDER_TIMEOUT = float(os.getenv("PDF_RENDER_TIMEOUT", "30"))
+PDF_RENDER_MAX_PENDING = int(os.getenv("PDF_RENDER_MAX_PENDING", "32"))
+PDF_RENDER_CONTEXT_MAX_RENDERS = int(os.getenv("PDF_RENDER_CONTEXT_MAX_RENDERS", "200"))
+
+# ===========================
+# Request instrumentation (опционально)
+# ===========================
+# SQL-запросы, время БД, повторы и время ответа по view: sandmatch/instrumentation.py.
+# Метрики Prometheus — по REQUEST_METRICS_PATH (персоналу или с Bearer REQUEST_METRICS_TOKEN),
+# пороги — для лога медленных запросов
+REQUEST_INSTRUMENTATION = bool(int(os.getenv("REQUEST_INSTRUMENTATION", "0")))
+REQUEST_METRICS_PATH = os.getenv("REQUEST_METRICS_PATH", "/api/metrics/")
+REQUEST_METRICS_TOKEN = os.getenv("REQUEST_METRICS_TOKEN", "")
+REQUEST_INSTRUMENTATION_SLOW_MS = float(os.getenv("REQUEST_INSTRUMENTATION_SLOW_MS", "1000"))
+REQUEST_INSTRUMENTATION_MAX_QUERIES = int(os.getenv("REQUEST_INSTRUMENTATION_MAX_QUERIES", "50"))
+REQUEST_INSTRUMENTATION_MAX_DUPLICATES = int(os.getenv("REQUEST_INSTRUMENTATION_MAX_DUPLICATES", "10"))
+if REQUEST_INSTRUMENTATION:
+    MIDDLEWARE.insert(0, "sandmatch.instrumentation.QueryInstrumentationMiddleware")
+
 # ===========================
 # Telegram Bot Configuration
 # ===========================
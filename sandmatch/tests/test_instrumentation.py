@@ -0,0 +1,60 @@
+"""
+Тесты инструментирования запросов (sandmatch/instrumentation.py).
+"""
+from django.contrib.auth.models import User
+from django.test import TestCase, modify_settings, override_settings
+from django.urls import reverse
+
+from apps.tournaments.tests.factories import make_round_robin
+from sandmatch.instrumentation import fingerprint, request_metrics
+
+
+@override_settings(
+    REQUEST_INSTRUMENTATION=True,
+    REQUEST_METRICS_TOKEN="metrics-secret",
+    REQUEST_INSTRUMENTATION_SLOW_MS=60_000,
+    REQUEST_INSTRUMENTATION_MAX_QUERIES=0,
+    REQUEST_INSTRUMENTATION_MAX_DUPLICATES=100,
+)
+@modify_settings(MIDDLEWARE={"prepend": "sandmatch.instrumentation.QueryInstrumentationMiddleware"})
+class RequestInstrumentationTestCase(TestCase):
+    """Server-Timing, метрики по view и лог запросов сверх порогов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        make_round_robin(date="2026-06-01")
+        cls.viewer = User.objects.create_user(username="viewer", password="x")
+        cls.staff = User.objects.create_user(username="staff", password="x", is_staff=True)
+
+    def setUp(self):
+        request_metrics.reset()
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint('SELECT "a" FROM "t" WHERE "id" IN (%s, %s, %s) AND "x" = 5 LIMIT 21'),
+            'SELECT "a" FROM "t" WHERE "id" IN (?) AND "x" = ? LIMIT ?',
+        )
+
+    def test_request_is_measured(self):
+        with self.assertLogs("sandmatch.instrumentation", "WARNING") as logs:
+            response = self.client.get(reverse("tournament-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries, \d+ dup", app;dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertIn("tournament-list", logs.output[0])
+
+        metrics = self.client.get(reverse("request_metrics"), HTTP_AUTHORIZATION="Bearer metrics-secret")
+        self.assertEqual(metrics.status_code, 200)
+        self.assertNotIn("Server-Timing", metrics)
+        text = metrics.content.decode()
+        self.assertIn('http_requests_total{view="tournament-list",method="GET"} 1', text)
+        self.assertIn('http_slow_requests_total{view="tournament-list",method="GET"} 1', text)
+        self.assertIn('http_request_db_queries_count{view="tournament-list",method="GET"} 1', text)
+
+    def test_metrics_require_staff_or_token(self):
+        url = reverse("request_metrics")
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code, 404)
+        self.client.force_login(self.viewer)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
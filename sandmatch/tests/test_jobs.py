@@ -0,0 +1,48 @@
+"""
+Тесты жизненного цикла фоновых задач (sandmatch/jobs.py).
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.tournaments.models import TournamentCompletionJob
+from apps.tournaments.tests.factories import make_round_robin
+from sandmatch import jobs
+
+
+class JobLifecycleTestCase(TestCase):
+    """Постановка в очередь, захват воркером и потерянные задачи"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tournament = make_round_robin("Задачи")
+
+    def _job(self):
+        return TournamentCompletionJob.objects.create(tournament=self.tournament)
+
+    def test_claim_once(self):
+        job = self._job()
+        self.assertTrue(jobs.claim(TournamentCompletionJob, job.id))
+        self.assertFalse(jobs.claim(TournamentCompletionJob, job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.status, TournamentCompletionJob.Status.RUNNING)
+        self.assertIsNotNone(job.started_at)
+
+    def test_broker_failure_marks_job_failed(self):
+        job = self._job()
+
+        def send(job_id):
+            raise ConnectionError("broker down")
+
+        with self.assertLogs("sandmatch.jobs", "ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                jobs.enqueue_on_commit(job, send)
+        self.assertEqual((job.status, job.error), (TournamentCompletionJob.Status.FAILED, jobs.QUEUE_UNAVAILABLE))
+        self.assertEqual(jobs.job_payload(job)["detail"], "broker down")
+
+    def test_stale(self):
+        job = self._job()
+        self.assertFalse(jobs.is_stale(job, timedelta(minutes=10)))
+        job.started_at = timezone.now() - timedelta(minutes=11)
+        self.assertTrue(jobs.is_stale(job, timedelta(minutes=10)))
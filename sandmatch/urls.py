@@ -28,6 +28,7 @@ from apps.tournaments.views import (
 )
 from apps.players.views import search_players, create_player
 from apps.players.views import PlayersListView
+from sandmatch.instrumentation import metrics_view
 
 # SPA View для React приложения
 class SPAView(TemplateView):
@@ -63,6 +64,8 @@ urlpatterns = [
     path("api/mini-app/", include("apps.telegram_bot.api_urls_mini_app")),
     # Health check
     path("api/health/", health, name="health"),
+    # Метрики запросов (Prometheus), при REQUEST_INSTRUMENTATION=1
+    path(settings.REQUEST_METRICS_PATH.lstrip("/"), metrics_view, name="request_metrics"),
     # Auth (JWT)
     path("api/auth/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
@@ -6,7 +6,7 @@
 2. Установка стартовых рейтингов на основе BTR
 3. Установка стартовых рейтингов для игроков без BTR
 4. Пересчет коэффициентов турниров
-5. Последовательный пересчет рейтинга по всем турнирам
+5. Пересчет рейтинга по всем турнирам (независимые турниры — параллельно)
 
 ВНИМАНИЕ: Это деструктивная операция! Создайте резервную копию БД перед запуском!
 
@@ -14,13 +14,14 @@
     python scripts/full_rating_recalculation.py [--dry-run]
     
     --dry-run: Показать что будет сделано без реального изменения данных
+    --workers N: Число процессов для шага 5 (по умолчанию — число ядер)
 """
 
 import os
 import sys
 import django
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
 
 # Настройка Django окружения
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -33,8 +34,9 @@ from apps.players.models import Player, PlayerRatingDynamic, PlayerRatingHistory
 from apps.tournaments.models import Tournament
 from apps.matches.models import Match
 from apps.players.services.initial_rating_service import get_initial_bp_rating
-from apps.players.services import rating_service
-from apps.tournaments.services.coefficient_calculator import auto_calculate_tournament_coefficient
+from apps.players.services.parallel_recompute import recompute_tournaments_parallel
+from apps.players.services.rating_timeline import invalidate_rating_timelines
+from apps.tournaments.services.coefficient_calculator import recalculate_tournament_coefficients
 
 
 def print_section(title: str):
@@ -70,6 +72,7 @@ def step1_clear_all_ratings(dry_run: bool = False):
         # Удаляем все записи рейтинга
         PlayerRatingDynamic.objects.all().delete()
         PlayerRatingHistory.objects.all().delete()
+        invalidate_rating_timelines()
         
         # Обнуляем рейтинг у всех игроков
         Player.objects.all().update(current_rating=0)
@@ -250,32 +253,28 @@ def step4_recalculate_tournament_coefficients(dry_run: bool = False):
     
     print("\n🎯 Пересчет коэффициентов...")
     
-    updated_count = 0
+    tournaments = list(tournaments)
+    old_coefficients = {tournament.id: tournament.rating_coefficient for tournament in tournaments}
+    
+    # Один проход по архиву: средние рейтинги и количество участников одним запросом, запись — bulk_update
+    new_coefficients = recalculate_tournament_coefficients(tournaments)
+    updated_count = len(new_coefficients)
+    
     for tournament in tournaments:
-        try:
-            old_coef = tournament.rating_coefficient
-            new_coef = auto_calculate_tournament_coefficient(tournament.id)
-            tournament.refresh_from_db()
-            
-            updated_count += 1
-            
-            if updated_count % 10 == 0:
-                print(f"   Обработано: {updated_count}/{tournaments.count()}")
-            
-            if old_coef != new_coef:
-                print(f"   ℹ️  {tournament.name}: {old_coef} → {new_coef}")
-        
-        except Exception as e:
-            print(f"   ⚠️  Ошибка при пересчете коэффициента для турнира {tournament.id}: {e}")
+        old_coef = old_coefficients[tournament.id]
+        new_coef = new_coefficients[tournament.id]
+        if old_coef != new_coef:
+            print(f"   ℹ️  {tournament.name}: {old_coef} → {new_coef}")
     
     print(f"✅ Пересчитаны коэффициенты для {updated_count} турниров")
 
 
-def step5_recalculate_ratings_for_all_tournaments(dry_run: bool = False):
+def step5_recalculate_ratings_for_all_tournaments(dry_run: bool = False, workers: Optional[int] = None):
     """
-    Шаг 5: Последовательный пересчет рейтинга по всем турнирам
+    Шаг 5: Пересчет рейтинга по всем турнирам в хронологическом порядке.
+    Турниры без общих игроков считаются в пуле из workers процессов (None — по числу ядер).
     """
-    print_section("ШАГ 5: Последовательный пересчет рейтинга по всем турнирам")
+    print_section("ШАГ 5: Пересчет рейтинга по всем турнирам")
     
     # Находим все завершенные турниры в хронологическом порядке
     tournaments = Tournament.objects.filter(
@@ -297,26 +296,22 @@ def step5_recalculate_ratings_for_all_tournaments(dry_run: bool = False):
     print("\n🎯 Пересчет рейтингов по турнирам...")
     print("   (это может занять некоторое время)\n")
     
-    processed_count = 0
-    error_count = 0
+    tournaments = list(tournaments)
+    total = len(tournaments)
+    applied_count = 0
     
-    for tournament in tournaments:
-        try:
-            print(f"   [{processed_count + 1}/{tournaments.count()}] {tournament.name} ({tournament.date})...", end=" ")
-            
-            # Пересчитываем рейтинг для турнира
-            rating_service.compute_ratings_for_tournament(tournament.id)
-            
-            print("✅")
-            processed_count += 1
-            
-        except Exception as e:
-            print(f"❌ Ошибка: {e}")
-            error_count += 1
+    def on_applied(tournament, error):
+        nonlocal applied_count
+        applied_count += 1
+        status = f"❌ Ошибка: {error}" if error else "✅"
+        print(f"   [{applied_count}/{total}] {tournament.name} ({tournament.date})... {status}")
     
-    print(f"\n✅ Обработано турниров: {processed_count}")
-    if error_count > 0:
-        print(f"⚠️  Ошибок: {error_count}")
+    # Независимые турниры (без общих игроков) считаются параллельно, запись — в исходном порядке
+    result = recompute_tournaments_parallel(tournaments, workers=workers, on_applied=on_applied)
+    
+    print(f"\n✅ Обработано турниров: {len(result.processed)} (волн зависимостей: {result.waves})")
+    if result.errors:
+        print(f"⚠️  Ошибок: {len(result.errors)}")
 
 
 def main():
@@ -337,6 +332,12 @@ def main():
         action='append',
         help='Пропустить указанный шаг (можно указать несколько раз)'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Число процессов для шага 5 (по умолчанию — число ядер, 1 — последовательно)'
+    )
     
     args = parser.parse_args()
     
@@ -386,7 +387,7 @@ def main():
         
         # Шаг 5: Рейтинги по турнирам
         if 5 not in skip_steps:
-            step5_recalculate_ratings_for_all_tournaments(dry_run=args.dry_run)
+            step5_recalculate_ratings_for_all_tournaments(dry_run=args.dry_run, workers=args.workers)
         else:
             print_section("ШАГ 5: ПРОПУЩЕН")
         
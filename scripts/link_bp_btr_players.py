@@ -3,10 +3,12 @@
 Скрипт для автоматической связки игроков BP с игроками BTR.
 
 Логика:
-1. Ищет совпадения по комбинации Фамилия+Имя
-2. Если для BP игрока найден ровно один BTR игрок - устанавливает связь через поле btr_player_id
+1. Ищет совпадения по комбинации Фамилия+Имя в индексе имён (ё/е, латиница,
+   порядок слов не важен; см. apps/players/services/name_index.py)
+2. Если для BP игрока найден ровно один BTR игрок с точным совпадением - устанавливает связь через поле btr_player_id
 3. Если найдено несколько BTR игроков - пропускает (требуется ручная проверка)
-4. Если связь уже установлена - пропускает
+4. Если точных совпадений нет, но есть похожие (опечатки, фонетика) - выводит их для ручной проверки
+5. Если связь уже установлена - пропускает
 
 Запуск:
     python scripts/link_bp_btr_players.py
@@ -16,21 +18,16 @@
 import os
 import sys
 import django
-from collections import defaultdict
 
 # Настройка Django окружения
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sandmatch.settings')
 django.setup()
 
-from apps.players.models import Player as BpPlayer
+from apps.players.models import Player as BpPlayer, PlayerNameKey
 from apps.btr.models import BtrPlayer
 from apps.players.services.initial_rating_service import get_initial_bp_rating
-
-
-def normalize_name(first_name: str, last_name: str) -> str:
-    """Нормализует имя и фамилию для сравнения."""
-    return f"{last_name.strip().lower()}_{first_name.strip().lower()}"
+from apps.players.services.name_index import find_name_candidates
 
 
 def link_bp_btr_players(dry_run: bool = False, verbose: bool = False):
@@ -57,18 +54,15 @@ def link_bp_btr_players(dry_run: bool = False, verbose: bool = False):
     print(f"📊 Всего игроков BP: {total_bp}")
     
     # Получаем всех BTR игроков
-    btr_players = BtrPlayer.objects.all()
-    total_btr = btr_players.count()
+    total_btr = BtrPlayer.objects.count()
     print(f"📊 Всего игроков BTR: {total_btr}")
     print()
     
-    # Создаём индекс BTR игроков по нормализованному имени
-    btr_index = defaultdict(list)
-    for btr_player in btr_players:
-        key = normalize_name(btr_player.first_name, btr_player.last_name)
-        btr_index[key].append(btr_player)
-    
-    print(f"📋 Уникальных комбинаций Фамилия+Имя в BTR: {len(btr_index)}")
+    # Индекс имён BTR поддерживается при сохранении/импорте игроков
+    indexed = PlayerNameKey.objects.filter(
+        source=PlayerNameKey.Source.BTR, kind=PlayerNameKey.Kind.EXACT
+    ).count()
+    print(f"📋 Игроков BTR в индексе имён: {indexed}")
     print()
     
     # Статистика
@@ -77,12 +71,14 @@ def link_bp_btr_players(dry_run: bool = False, verbose: bool = False):
         'linked': 0,              # Успешно связаны
         'multiple_matches': 0,    # Несколько совпадений
         'no_match': 0,            # Нет совпадений
+        'similar': 0,             # Нет точных совпадений, но есть похожие
         'errors': 0,              # Ошибки
     }
     
     # Списки для детального отчёта
     linked_players = []
     multiple_matches = []
+    similar_matches = []
     
     print("🔄 Начинаем обработку...")
     print("-" * 80)
@@ -95,11 +91,34 @@ def link_bp_btr_players(dry_run: bool = False, verbose: bool = False):
                 print(f"⏭️  {bp_player.last_name} {bp_player.first_name} - уже связан с BTR игроком #{bp_player.btr_player_id}")
             continue
         
-        # Ищем совпадения в BTR
-        key = normalize_name(bp_player.first_name, bp_player.last_name)
-        btr_matches = btr_index.get(key, [])
+        # Ищем совпадения в BTR (ранжированные кандидаты из индекса имён)
+        candidates = find_name_candidates(PlayerNameKey.Source.BTR, bp_player.last_name, bp_player.first_name)
+        btr_by_id = BtrPlayer.objects.in_bulk([c.object_id for c in candidates])
+        btr_matches = [btr_by_id[c.object_id] for c in candidates if c.match == "exact" and c.object_id in btr_by_id]
+        similar = [(btr_by_id[c.object_id], c.score) for c in candidates if c.match != "exact" and c.object_id in btr_by_id]
+        
+        if len(btr_matches) == 0 and similar:
+            # Точных совпадений нет, но есть похожие — только в отчёт
+            stats['similar'] += 1
+            similar_matches.append({
+                'bp_id': bp_player.id,
+                'bp_name': f"{bp_player.last_name} {bp_player.first_name}",
+                'btr_matches': [
+                    {
+                        'id': btr.id,
+                        'name': f"{btr.last_name} {btr.first_name}",
+                        'rni': btr.rni,
+                        'score': score,
+                    }
+                    for btr, score in similar
+                ]
+            })
+            if verbose:
+                print(f"🔍 {bp_player.last_name} {bp_player.first_name} (BP #{bp_player.id}) - похожие в BTR:")
+                for btr, score in similar:
+                    print(f"    - BTR #{btr.id}: {btr.last_name} {btr.first_name}, РНИ: {btr.rni}, сходство: {score}")
         
-        if len(btr_matches) == 0:
+        elif len(btr_matches) == 0:
             # Нет совпадений
             stats['no_match'] += 1
             if verbose:
@@ -184,6 +203,7 @@ def link_bp_btr_players(dry_run: bool = False, verbose: bool = False):
     print(f"✅ Успешно связаны:              {stats['linked']}")
     print(f"❌ Не найдены в BTR:             {stats['no_match']}")
     print(f"⚠️  Несколько совпадений:         {stats['multiple_matches']}")
+    print(f"🔍 Только похожие имена:          {stats['similar']}")
     print(f"❗ Ошибки:                        {stats['errors']}")
     print()
     
@@ -200,7 +220,7 @@ def link_bp_btr_players(dry_run: bool = False, verbose: bool = False):
         print()
     
     # Сохранение результатов в файл
-    if not dry_run and (linked_players or multiple_matches):
+    if not dry_run and (linked_players or multiple_matches or similar_matches):
         import json
         from datetime import datetime
         
@@ -210,6 +230,7 @@ def link_bp_btr_players(dry_run: bool = False, verbose: bool = False):
             'stats': stats,
             'linked_players': linked_players,
             'multiple_matches': multiple_matches,
+            'similar_matches': similar_matches,
         }
         
         with open(report_file, 'w', encoding='utf-8') as f:
@@ -12,7 +12,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
 from apps.tournaments.models import Tournament
-from apps.tournaments.services.coefficient_calculator import auto_calculate_tournament_coefficient
+from apps.tournaments.services.coefficient_calculator import recalculate_tournament_coefficients
 
 
 def recalculate_coefficients(status_filter=None, dry_run=False):
@@ -34,55 +34,41 @@ def recalculate_coefficients(status_filter=None, dry_run=False):
         # Пересчитываем для active и completed
         qs = qs.filter(status__in=[Tournament.Status.ACTIVE, Tournament.Status.COMPLETED])
     
-    qs = qs.order_by('-date', 'name')
+    tournaments = list(qs.order_by('-date', 'name'))
     
-    total = qs.count()
+    total = len(tournaments)
     print(f"{'[DRY RUN] ' if dry_run else ''}Найдено турниров для пересчета: {total}\n")
     
+    # Старые значения запоминаем до пакетного пересчета (он обновляет экземпляры)
+    old_coefficients = {tournament.id: tournament.rating_coefficient for tournament in tournaments}
+    
     success_count = 0
     error_count = 0
     
-    for tournament in qs:
+    try:
+        # Один запрос на средние рейтинги и количество участников, один bulk_update.
+        # В dry-run режиме не сохраняем, но показываем что будет
+        new_coefficients = recalculate_tournament_coefficients(tournaments, save=not dry_run)
+    except Exception as e:
+        print(f"❌ ОШИБКА пересчета: {str(e)}")
+        print()
+        new_coefficients = {}
+        error_count = total
+    
+    for tournament in tournaments:
+        if tournament.id not in new_coefficients:
+            continue
         status_display = tournament.get_status_display()
-        old_coef = tournament.rating_coefficient
+        old_coef = old_coefficients[tournament.id]
+        new_coef = new_coefficients[tournament.id]
+        
+        change_marker = "→" if old_coef != new_coef else "="
+        print(f"✅ {tournament.name} ({status_display})")
+        print(f"   Коэффициент: {old_coef:.2f} {change_marker} {new_coef:.2f}")
+        print(f"   Дата: {tournament.date}")
+        print()
         
-        try:
-            if not dry_run:
-                new_coef = auto_calculate_tournament_coefficient(tournament.id)
-            else:
-                # В dry-run режиме не сохраняем, но показываем что будет
-                from apps.tournaments.services.coefficient_calculator import (
-                    get_tournament_avg_rating,
-                    calculate_tournament_coefficient
-                )
-                from apps.tournaments.models import TournamentEntry
-                
-                avg_rating = get_tournament_avg_rating(tournament.id)
-                if avg_rating is None or avg_rating == 0:
-                    avg_rating = 1000.0
-                
-                participants_count = TournamentEntry.objects.filter(tournament=tournament).count()
-                has_prize_fund = bool(tournament.prize_fund and tournament.prize_fund.strip())
-                
-                new_coef = calculate_tournament_coefficient(
-                    avg_rating=avg_rating,
-                    participants_count=participants_count,
-                    has_prize_fund=has_prize_fund
-                )
-            
-            change_marker = "→" if old_coef != new_coef else "="
-            print(f"✅ {tournament.name} ({status_display})")
-            print(f"   Коэффициент: {old_coef:.2f} {change_marker} {new_coef:.2f}")
-            print(f"   Дата: {tournament.date}")
-            print()
-            
-            success_count += 1
-            
-        except Exception as e:
-            print(f"❌ ОШИБКА: {tournament.name} ({status_display})")
-            print(f"   {str(e)}")
-            print()
-            error_count += 1
+        success_count += 1
     
     print("\n" + "="*60)
     print(f"{'[DRY RUN] ' if dry_run else ''}Итого:")
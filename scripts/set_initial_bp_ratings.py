@@ -22,7 +22,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sandmatch.settings.base')
 django.setup()
 
 from apps.players.models import Player
-from apps.players.services.initial_rating_service import get_initial_bp_rating
+from apps.players.services.initial_rating_service import get_initial_bp_ratings
 
 
 def set_initial_bp_ratings(dry_run: bool = False, verbose: bool = False, force: bool = False):
@@ -48,11 +48,11 @@ def set_initial_bp_ratings(dry_run: bool = False, verbose: bool = False, force:
     
     # Получаем игроков
     if force:
-        players = Player.objects.all()
-        print(f"📊 Всего игроков: {players.count()}")
+        players = list(Player.objects.all())
+        print(f"📊 Всего игроков: {len(players)}")
     else:
-        players = Player.objects.filter(current_rating=0)
-        print(f"📊 Игроков с рейтингом = 0: {players.count()}")
+        players = list(Player.objects.filter(current_rating=0))
+        print(f"📊 Игроков с рейтингом = 0: {len(players)}")
     
     print()
     
@@ -70,6 +70,10 @@ def set_initial_bp_ratings(dry_run: bool = False, verbose: bool = False, force:
     print("🔄 Начинаем обработку...")
     print("-" * 80)
     
+    # Стартовые рейтинги всех игроков считаются пакетно (один запрос к BTR)
+    initial_ratings = get_initial_bp_ratings(players)
+    to_update = []
+    
     for player in players:
         # Пропускаем если рейтинг уже установлен (и не force режим)
         if not force and player.current_rating and player.current_rating > 0:
@@ -80,7 +84,7 @@ def set_initial_bp_ratings(dry_run: bool = False, verbose: bool = False, force:
         
         try:
             # Определяем стартовый рейтинг
-            initial_rating = get_initial_bp_rating(player)
+            initial_rating = initial_ratings[player.id]
             
             # Проверяем, был ли использован BTR
             is_from_btr = player.btr_player_id is not None
@@ -103,21 +107,23 @@ def set_initial_bp_ratings(dry_run: bool = False, verbose: bool = False, force:
                     print(f"📝 {player.last_name} {player.first_name} (BP #{player.id}) → "
                           f"BP рейтинг: {initial_rating} (дефолт)")
             
-            # Сохраняем
-            if not dry_run:
-                player.current_rating = initial_rating
-                player.save(update_fields=['current_rating'])
+            player.current_rating = initial_rating
+            to_update.append(player)
         
         except Exception as e:
             stats['errors'] += 1
             print(f"❗ ОШИБКА при обработке {player.last_name} {player.first_name}: {e}")
     
+    # Сохраняем одним пакетом
+    if not dry_run and to_update:
+        Player.objects.bulk_update(to_update, ['current_rating'], batch_size=1000)
+    
     # Итоговый отчёт
     print()
     print("=" * 80)
     print("📊 ИТОГОВАЯ СТАТИСТИКА")
     print("=" * 80)
-    print(f"Всего игроков обработано:        {players.count()}")
+    print(f"Всего игроков обработано:        {len(players)}")
     print(f"✅ Рейтинг из BTR:               {stats['from_btr']}")
     print(f"📝 Дефолтный рейтинг (1000):     {stats['default']}")
     print(f"⏭️  Пропущены (уже есть рейтинг): {stats['skipped']}")